@@ -12,22 +12,31 @@ import tempfile
 import os
 
 from agentpress.thread_manager import ThreadManager
+from agentpress.tool_progress import set_progress_sink, reset_progress_sink
 from services.supabase import DBConnection
 from services import redis
 import redis as redis_py  # Import the actual redis package for exceptions
 from agent.run import run_agent
-from utils.auth_utils import get_current_user_id_from_jwt, get_user_id_from_stream_auth, verify_thread_access
+from utils.auth_utils import get_current_user_id_from_jwt, get_user_id_from_stream_auth, verify_thread_access, get_account_id_from_thread
 from utils.logger import logger
 from services.billing import check_billing_status
 from utils.config import config
-from sandbox.sandbox import create_sandbox, get_or_start_sandbox
+from sandbox.sandbox import create_sandbox, get_or_start_sandbox, sandbox_handles
+from sandbox.executor import AsyncSandbox, get_sandbox_executor
+from sandbox.pool import get_sandbox_pool
+from sandbox.uploads import upload_files
 from services.llm import make_llm_api_call
+from services.run_queue import get_run_queue
+from agent.checkpoint import RunCheckpoint
+from services.scheduler import get_scheduler, get_account_limits
 
 # Initialize shared resources
 router = APIRouter()
 thread_manager = None
 db = None
 instance_id = None # Global instance ID for this backend instance
+draining = False # Set on shutdown so running agents stop at their next checkpoint
+running_runs = set() # Agent run IDs executing in this process
 
 # TTL for Redis response lists (24 hours)
 REDIS_RESPONSE_LIST_TTL = 3600 * 24
@@ -152,8 +161,32 @@ def initialize(
 
     # Note: Redis will be initialized in the lifespan function in api.py
 
+async def drain_agent_runs(timeout: float):
+    """Ask running agents to stop at their next iteration boundary and wait for them.
+
+    Drained runs keep their 'running' status and are resumed from their
+    checkpoint by another worker, or by another instance through
+    run_drained_run_claimer or restore_running_agent_runs.
+    """
+    global draining
+    draining = True
+    if not running_runs:
+        return
+
+    logger.info(f"Draining {len(running_runs)} agent runs to a checkpoint (timeout: {timeout}s)")
+    deadline = asyncio.get_running_loop().time() + timeout
+    while running_runs and asyncio.get_running_loop().time() < deadline:
+        await asyncio.sleep(0.5)
+
+    if running_runs:
+        logger.warning(f"Agent runs did not reach a checkpoint before shutdown: {sorted(running_runs)}")
+
 async def cleanup():
-    """Clean up resources and stop running agents on shutdown."""
+    """Clean up resources and stop running agents on shutdown.
+
+    Runs that were drained to a checkpoint have already released their
+    active_run keys, so only runs that could not be drained are stopped.
+    """
     logger.info("Starting cleanup of agent API resources")
 
     # Use the instance_id to find and clean up this instance's keys
@@ -262,6 +295,19 @@ async def stop_agent_run(agent_run_id: str, error_message: Optional[str] = None)
     if not update_success:
         logger.error(f"Failed to update database status for stopped/failed run {agent_run_id}")
 
+    # A stopped run must not be resumed
+    try:
+        await RunCheckpoint.delete(agent_run_id)
+    except Exception as e:
+        logger.warning(f"Failed to delete checkpoint for agent run {agent_run_id}: {str(e)}")
+
+    # Drop the run from the queue if no worker has claimed it yet
+    if config.AGENT_RUN_QUEUE_ENABLED:
+        try:
+            await get_run_queue().remove(agent_run_id)
+        except Exception as e:
+            logger.warning(f"Failed to remove agent run {agent_run_id} from run queue: {str(e)}")
+
     # Send STOP signal to the global control channel
     global_control_channel = f"agent_run:{agent_run_id}:control"
     try:
@@ -307,14 +353,83 @@ async def _cleanup_redis_response_list(agent_run_id: str):
     except Exception as e:
         logger.warning(f"Failed to set TTL on response list {response_list_key}: {str(e)}")
 
+async def resume_drained_agent_run(agent_run_id: str) -> bool:
+    """Claim a drained run and resume it from its checkpoint on this instance.
+
+    Returns True if the run was resumed here, False if it was not drained or
+    another instance claimed it first.
+    """
+    try:
+        checkpoint = await RunCheckpoint.load(agent_run_id)
+        if checkpoint and checkpoint.drained and await RunCheckpoint.claim_drained(agent_run_id):
+            logger.info(f"Resuming drained agent run {agent_run_id} from iteration {checkpoint.iteration_count}")
+            await _launch_agent_run(
+                agent_run_id=agent_run_id, sandbox=None, resume_from=checkpoint, **checkpoint.run_params
+            )
+            return True
+    except Exception as e:
+        logger.error(f"Failed to resume agent run {agent_run_id} from its checkpoint: {str(e)}")
+    return False
+
+async def claim_drained_agent_runs() -> int:
+    """Resume runs that other instances drained to a checkpoint.
+
+    Unlike restore_running_agent_runs this leaves every other 'running' run
+    alone, since those belong to live instances. Returns the number resumed.
+    """
+    client = await db.client
+    running_agent_runs = await client.table('agent_runs').select('id').eq("status", "running").execute()
+    resumed = 0
+    for run in running_agent_runs.data:
+        if run['id'] in running_runs or not await RunCheckpoint.is_drained(run['id']):
+            continue
+        if await resume_drained_agent_run(run['id']):
+            resumed += 1
+    return resumed
+
+async def run_drained_run_claimer(interval_seconds: int):
+    """Pick up drained runs while this instance is serving. Runs until cancelled.
+
+    In a rolling deploy the old instances drain after the new ones have
+    started, so a claim at startup alone would leave those runs 'running'.
+    """
+    while True:
+        await asyncio.sleep(interval_seconds)
+        if draining:
+            continue
+        try:
+            resumed = await claim_drained_agent_runs()
+            if resumed:
+                logger.info(f"Resumed {resumed} agent runs drained by other instances")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Failed to claim drained agent runs: {str(e)}")
+
 async def restore_running_agent_runs():
-    """Mark agent runs that were still 'running' in the database as failed and clean up Redis resources."""
+    """Resume drained agent runs and mark other runs still 'running' in the database as failed."""
     logger.info("Restoring running agent runs after server restart")
     client = await db.client
     running_agent_runs = await client.table('agent_runs').select('id').eq("status", "running").execute()
 
     for run in running_agent_runs.data:
         agent_run_id = run['id']
+
+        # Queued runs survive restarts: a worker picks them up, or the reaper
+        # re-queues them once their lease expires.
+        if config.AGENT_RUN_QUEUE_ENABLED:
+            try:
+                if await get_run_queue().is_tracked(agent_run_id):
+                    logger.info(f"Agent run {agent_run_id} is still tracked by the run queue, leaving it running")
+                    continue
+            except Exception as e:
+                logger.warning(f"Failed to check run queue for agent run {agent_run_id}: {str(e)}")
+
+        # Runs drained on shutdown are resumed from their checkpoint by whichever
+        # instance claims them first.
+        if await resume_drained_agent_run(agent_run_id):
+            continue
+
         logger.warning(f"Found running agent run {agent_run_id} from before server restart")
 
         # Clean up Redis resources for this run
@@ -395,15 +510,26 @@ async def get_or_create_project_sandbox(client, project_id: str):
             return sandbox, sandbox_id, sandbox_pass
         except Exception as e:
             logger.error(f"Failed to retrieve existing sandbox {sandbox_id}: {str(e)}. Creating a new one.")
+            sandbox_handles.invalidate(sandbox_id)
 
-    logger.info(f"Creating new sandbox for project {project_id}")
-    sandbox_pass = str(uuid.uuid4())
-    sandbox = create_sandbox(sandbox_pass, project_id)
-    sandbox_id = sandbox.id
-    logger.info(f"Created new sandbox {sandbox_id}")
+    claimed = None
+    if config.SANDBOX_POOL_SIZE > 0:
+        try:
+            claimed = await get_sandbox_pool().claim(project_id)
+        except Exception as e:
+            logger.warning(f"Failed to claim a pool sandbox for project {project_id}: {str(e)}")
 
-    vnc_link = sandbox.get_preview_link(6080)
-    website_link = sandbox.get_preview_link(8080)
+    if claimed:
+        sandbox, sandbox_id, sandbox_pass = claimed
+    else:
+        logger.info(f"Creating new sandbox for project {project_id}")
+        sandbox_pass = str(uuid.uuid4())
+        sandbox = await get_sandbox_executor().run(None, "create_sandbox", create_sandbox, sandbox_pass, project_id)
+        sandbox_id = sandbox.id
+        logger.info(f"Created new sandbox {sandbox_id}")
+
+    vnc_link = await AsyncSandbox(sandbox).get_preview_link(6080)
+    website_link = await AsyncSandbox(sandbox).get_preview_link(8080)
     vnc_url = vnc_link.url if hasattr(vnc_link, 'url') else str(vnc_link).split("url='")[1].split("'")[0]
     website_url = website_link.url if hasattr(website_link, 'url') else str(website_link).split("url='")[1].split("'")[0]
     token = None
@@ -425,6 +551,84 @@ async def get_or_create_project_sandbox(client, project_id: str):
 
     return sandbox, sandbox_id, sandbox_pass
 
+async def _launch_agent_run(
+    agent_run_id: str,
+    thread_id: str,
+    project_id: str,
+    sandbox,
+    model_name: str,
+    task_type: Optional[str] = None,
+    enable_thinking: Optional[bool] = False,
+    reasoning_effort: Optional[str] = 'low',
+    stream: bool = True,
+    enable_context_manager: bool = False,
+    account_id: Optional[str] = None,
+    resume_from: Optional[RunCheckpoint] = None
+):
+    """Hand an agent run to the run queue, or run it in this process if the queue is disabled.
+
+    Queued runs pick up their checkpoint from Redis when they are claimed;
+    `resume_from` is only needed to resume a run in this process.
+    """
+    run_params = {
+        "thread_id": thread_id, "project_id": project_id, "model_name": model_name,
+        "task_type": task_type, "enable_thinking": enable_thinking,
+        "reasoning_effort": reasoning_effort, "stream": stream,
+        "enable_context_manager": enable_context_manager, "account_id": account_id
+    }
+
+    if config.AGENT_RUN_QUEUE_ENABLED:
+        await get_run_queue().enqueue(agent_run_id, run_params)
+        return
+
+    # Register this run in Redis with TTL using instance ID
+    instance_key = f"active_run:{instance_id}:{agent_run_id}"
+    try:
+        await redis.set(instance_key, "running", ex=redis.REDIS_KEY_TTL)
+    except Exception as e:
+        logger.warning(f"Failed to register agent run in Redis ({instance_key}): {str(e)}")
+
+    # Run the agent in the background
+    task = asyncio.create_task(
+        run_agent_background(
+            agent_run_id=agent_run_id, instance_id=instance_id, sandbox=sandbox,
+            resume_from=resume_from, **run_params
+        )
+    )
+
+    # Set a callback to clean up Redis instance key when task is done
+    task.add_done_callback(lambda _: asyncio.create_task(_cleanup_redis_instance_key(agent_run_id)))
+
+async def run_queued_agent_run(agent_run_id: str, run_params: Dict[str, Any]):
+    """Execute an agent run claimed from the run queue on this instance.
+
+    Resumes from the run's checkpoint if it was drained or lost its worker,
+    and raises RunDrained if it stopped at a checkpoint again.
+    """
+    from agent.worker import RunDrained
+
+    if draining:
+        raise RunDrained(agent_run_id)
+
+    client = await db.client
+    run_status = await client.table('agent_runs').select('status').eq("id", agent_run_id).maybe_single().execute()
+    current_status = run_status.data.get('status') if run_status and run_status.data else None
+    if current_status != 'running':
+        logger.info(f"Skipping queued agent run {agent_run_id} with status {current_status}")
+        return
+
+    checkpoint = await RunCheckpoint.load(agent_run_id)
+    if checkpoint:
+        await RunCheckpoint.claim_drained(agent_run_id)
+        logger.info(f"Resuming queued agent run {agent_run_id} from iteration {checkpoint.iteration_count}")
+
+    final_status = await run_agent_background(
+        agent_run_id=agent_run_id, instance_id=instance_id, sandbox=None,
+        resume_from=checkpoint, **run_params
+    )
+    if final_status == "checkpointed":
+        raise RunDrained(agent_run_id)
+
 @router.post("/thread/{thread_id}/agent/start")
 async def start_agent(
     thread_id: str,
@@ -545,28 +749,15 @@ async def start_agent(
     agent_run_id = agent_run.data[0]['id']
     logger.info(f"Created new agent run: {agent_run_id}")
 
-    # Register this run in Redis with TTL using instance ID
-    instance_key = f"active_run:{instance_id}:{agent_run_id}"
-    try:
-        await redis.set(instance_key, "running", ex=redis.REDIS_KEY_TTL)
-    except Exception as e:
-        logger.warning(f"Failed to register agent run in Redis ({instance_key}): {str(e)}")
-
-    # Run the agent in the background
-    task = asyncio.create_task(
-        run_agent_background(
-            agent_run_id=agent_run_id, thread_id=thread_id, instance_id=instance_id,
-            project_id=project_id, sandbox=sandbox,
-            model_name=model_name,  # Resolved based on task_type or direct specification
-            task_type=task_type,    # Pass task_type for proper model selection
-            enable_thinking=body.enable_thinking, reasoning_effort=body.reasoning_effort,
-            stream=body.stream, enable_context_manager=body.enable_context_manager
-        )
+    await _launch_agent_run(
+        agent_run_id=agent_run_id, thread_id=thread_id, project_id=project_id, sandbox=sandbox,
+        model_name=model_name,  # Resolved based on task_type or direct specification
+        task_type=task_type,    # Pass task_type for proper model selection
+        enable_thinking=body.enable_thinking, reasoning_effort=body.reasoning_effort,
+        stream=body.stream, enable_context_manager=body.enable_context_manager,
+        account_id=account_id
     )
 
-    # Set a callback to clean up Redis instance key when task is done
-    task.add_done_callback(lambda _: asyncio.create_task(_cleanup_redis_instance_key(agent_run_id)))
-
     return {"agent_run_id": agent_run_id, "status": "running"}
 
 @router.post("/agent-run/{agent_run_id}/stop")
@@ -780,6 +971,9 @@ async def stream_agent_run(
 
                                 if channel == response_channel and data == "new":
                                     await message_queue.put({"type": "new_response"})
+                                elif channel == response_channel and data and data.startswith("{"):
+                                    # Transient event (tool progress), not stored in the response list
+                                    await message_queue.put({"type": "transient", "data": data})
                                 elif channel == control_channel and data in ["STOP", "END_STREAM", "ERROR"]:
                                     logger.info(f"Received control signal '{data}' for {agent_run_id}")
                                     await message_queue.put({"type": "control", "data": data})
@@ -844,6 +1038,9 @@ async def stream_agent_run(
                             last_processed_index += num_new
                         if terminate_stream: break
 
+                    elif queue_item["type"] == "transient":
+                        yield f"data: {queue_item['data']}\n\n"
+
                     elif queue_item["type"] == "control":
                         control_signal = queue_item["data"]
                         terminate_stream = True # Stop the stream on any control signal
@@ -908,9 +1105,26 @@ async def run_agent_background(
     enable_thinking: Optional[bool] = False,
     reasoning_effort: Optional[str] = 'low',
     stream: bool = True,
-    enable_context_manager: bool = False
+    enable_context_manager: bool = False,
+    account_id: Optional[str] = None,
+    resume_from: Optional[RunCheckpoint] = None
 ):
-    """Run the agent in the background using Redis for state."""
+    """Run the agent in the background using Redis for state.
+
+    The loop state is checkpointed at every iteration boundary. While the
+    instance is draining, the run stops at the next boundary and returns
+    'checkpointed' instead of finishing; `resume_from` continues such a run.
+
+    With the scheduler enabled the run first waits for a slot in its account's
+    run quota, and every iteration waits its turn in the fair queue. Queue
+    positions are pushed to the response list as 'queued' status messages.
+
+    Progress reported by running tools is published on the response channel
+    as JSON, for live streams only; it is not added to the response list.
+
+    Returns:
+        The final status of the run
+    """
     logger.info(f"Starting background agent run: {agent_run_id} for thread: {thread_id} (Instance: {instance_id})")
     logger.info(f"🚀 Using model: {model_name} for task_type: {task_type} (thinking: {enable_thinking}, reasoning_effort: {reasoning_effort})")
 
@@ -919,7 +1133,21 @@ async def run_agent_background(
     total_responses = 0
     pubsub = None
     stop_checker = None
+    slot_renewer = None
     stop_signal_received = False
+    progress_token = None
+    final_status = "running"
+    run_params = {
+        "thread_id": thread_id, "project_id": project_id, "model_name": model_name,
+        "task_type": task_type, "enable_thinking": enable_thinking,
+        "reasoning_effort": reasoning_effort, "stream": stream,
+        "enable_context_manager": enable_context_manager, "account_id": account_id
+    }
+    scheduler = get_scheduler() if config.AGENT_SCHEDULER_ENABLED else None
+    account_limits = None
+    pending_tool_calls = {} # tool_index -> tool started in the current iteration
+    last_tool_call = None
+    checkpointed = False
 
     # Define Redis keys and channels
     response_list_key = f"agent_run:{agent_run_id}:responses"
@@ -952,6 +1180,85 @@ async def run_agent_background(
             logger.error(f"Error in stop signal checker for {agent_run_id}: {e}", exc_info=True)
             stop_signal_received = True # Stop the run if the checker fails
 
+    def track_tool_status(response: Dict[str, Any]):
+        nonlocal last_tool_call
+        if response.get('type') != 'status':
+            return
+        try:
+            content = response.get('content', '{}')
+            if isinstance(content, str):
+                content = json.loads(content)
+        except json.JSONDecodeError:
+            return
+        if not isinstance(content, dict):
+            return
+        status_type = content.get('status_type')
+        if status_type == 'tool_started':
+            pending_tool_calls[content.get('tool_index')] = {
+                "tool_index": content.get('tool_index'),
+                "function_name": content.get('function_name'),
+                "xml_tag_name": content.get('xml_tag_name')
+            }
+        elif status_type in ['tool_completed', 'tool_failed', 'tool_error']:
+            pending_tool_calls.pop(content.get('tool_index'), None)
+            last_tool_call = content.get('xml_tag_name') or content.get('function_name')
+
+    async def save_checkpoint(completed_iterations: int, last_message_id: Optional[str]) -> bool:
+        checkpoint = RunCheckpoint(
+            agent_run_id=agent_run_id, iteration_count=completed_iterations,
+            last_message_id=last_message_id, response_offset=total_responses,
+            pending_tool_calls=list(pending_tool_calls.values()), last_tool_call=last_tool_call,
+            run_params=run_params, drained=draining
+        )
+        try:
+            await checkpoint.save()
+        except Exception as e:
+            logger.warning(f"Failed to checkpoint agent run {agent_run_id}: {str(e)}")
+            return False
+        pending_tool_calls.clear()
+        return True
+
+    async def report_queue_position(scope: str, position: int):
+        nonlocal total_responses
+        queued_message = {
+            "type": "status", "status": "queued", "scope": scope, "position": position,
+            "message": f"Waiting for capacity ({scope} queue position {position})"
+        }
+        await redis.rpush(response_list_key, json.dumps(queued_message))
+        await redis.publish(response_channel, "new")
+        total_responses += 1
+
+    async def publish_tool_progress(event: Dict[str, Any]):
+        await redis.publish(response_channel, json.dumps(event))
+
+    def wait_cancelled() -> bool:
+        return stop_signal_received or draining
+
+    async def on_iteration(completed_iterations: int, last_message_id: Optional[str]) -> bool:
+        nonlocal checkpointed
+        if scheduler:
+            await scheduler.release_iteration(agent_run_id)
+        # Only draining needs the checkpoint; without one the run keeps going, through the scheduler
+        if await save_checkpoint(completed_iterations, last_message_id) and draining:
+            logger.info(f"Agent run {agent_run_id} drained at iteration {completed_iterations}")
+            checkpointed = True
+            return False
+        if scheduler:
+            # Renew the account slot and wait for this iteration's turn
+            granted = await scheduler.acquire_run_slot(
+                agent_run_id, account_id, account_limits['concurrent_runs'], is_cancelled=wait_cancelled
+            ) and await scheduler.acquire_iteration(
+                agent_run_id, account_id, account_limits['weight'],
+                on_wait=lambda position: report_queue_position("iteration", position),
+                is_cancelled=wait_cancelled
+            )
+            if not granted:
+                if draining and await save_checkpoint(completed_iterations, last_message_id):
+                    checkpointed = True
+                return False
+        return True
+
+    running_runs.add(agent_run_id)
     try:
         # Setup Pub/Sub listener for control signals
         pubsub = await redis.create_pubsub()
@@ -962,16 +1269,54 @@ async def run_agent_background(
         # Ensure active run key exists and has TTL
         await redis.set(instance_active_key, "running", ex=redis.REDIS_KEY_TTL)
 
+        # Drop responses produced after the checkpoint; that iteration runs again
+        start_iteration = 0
+        if resume_from:
+            start_iteration = resume_from.iteration_count
+            total_responses = resume_from.response_offset
+            last_tool_call = resume_from.last_tool_call
+            if total_responses > 0:
+                await redis.ltrim(response_list_key, 0, total_responses - 1)
+            else:
+                await redis.delete(response_list_key)
+            if resume_from.pending_tool_calls:
+                logger.warning(f"Agent run {agent_run_id} resumed with interrupted tool calls: {resume_from.pending_tool_calls}")
+            logger.info(f"Resuming agent run {agent_run_id} at iteration {start_iteration} (response offset {total_responses})")
+
+        # Per-account run quota: wait while the account is at its concurrent run limit
+        if scheduler:
+            if not account_id:
+                account_id = await get_account_id_from_thread(client, thread_id)
+                run_params["account_id"] = account_id
+            account_limits = await get_account_limits(account_id)
+            granted = await scheduler.acquire_run_slot(
+                agent_run_id, account_id, account_limits['concurrent_runs'],
+                on_wait=lambda position: report_queue_position("account", position),
+                is_cancelled=wait_cancelled
+            )
+            if not granted:
+                if stop_signal_received:
+                    final_status = "stopped"
+                    return final_status
+                await save_checkpoint(start_iteration, resume_from.last_message_id if resume_from else None)
+                final_status = "checkpointed"
+                return final_status
+            # Keep the slots while an iteration runs longer than their TTL
+            slot_renewer = asyncio.create_task(scheduler.run_slot_renewer(agent_run_id, account_id))
+
+        # Tool progress goes straight to live streams
+        progress_token = set_progress_sink(publish_tool_progress)
+
         # Initialize agent generator
         agent_gen = run_agent(
             thread_id=thread_id, project_id=project_id, stream=stream,
             thread_manager=thread_manager, model_name=model_name,
             task_type=task_type, # Pass task_type for proper model selection
             enable_thinking=enable_thinking, reasoning_effort=reasoning_effort,
-            enable_context_manager=enable_context_manager
+            enable_context_manager=enable_context_manager,
+            start_iteration=start_iteration, on_iteration=on_iteration
         )
 
-        final_status = "running"
         error_message = None
 
         async for response in agent_gen:
@@ -985,6 +1330,7 @@ async def run_agent_background(
             await redis.rpush(response_list_key, response_json)
             await redis.publish(response_channel, "new")
             total_responses += 1
+            track_tool_status(response)
 
             # Check for agent-signaled completion or error
             if response.get('type') == 'status':
@@ -996,6 +1342,15 @@ async def run_agent_background(
                          error_message = response.get('message', f"Run ended with status: {status_val}")
                      break
 
+        # Drained to a checkpoint: the run stays 'running' and is resumed elsewhere
+        if checkpointed and final_status == "running":
+            final_status = "checkpointed"
+            return final_status
+
+        # Stopped while waiting for the scheduler; stop_agent_run already updated the DB
+        if stop_signal_received and final_status == "running":
+            final_status = "stopped"
+
         # If loop finished without explicit completion/error/stop signal, mark as completed
         if final_status == "running":
              final_status = "completed"
@@ -1056,6 +1411,19 @@ async def run_agent_background(
             logger.warning(f"Failed to publish ERROR signal: {str(e)}")
 
     finally:
+        running_runs.discard(agent_run_id)
+        if progress_token:
+            reset_progress_sink(progress_token)
+
+        if slot_renewer:
+            slot_renewer.cancel()
+        if scheduler and account_id:
+            try:
+                await scheduler.release_iteration(agent_run_id)
+                await scheduler.release_run_slot(agent_run_id, account_id)
+            except Exception as e:
+                logger.warning(f"Failed to release scheduler slots for agent run {agent_run_id}: {str(e)}")
+
         # Cleanup stop checker task
         if stop_checker and not stop_checker.done():
             stop_checker.cancel()
@@ -1072,6 +1440,13 @@ async def run_agent_background(
             except Exception as e:
                 logger.warning(f"Error closing pubsub for {agent_run_id}: {str(e)}")
 
+        # Finished runs are not resumed
+        if final_status != "checkpointed":
+            try:
+                await RunCheckpoint.delete(agent_run_id)
+            except Exception as e:
+                logger.warning(f"Failed to delete checkpoint for agent run {agent_run_id}: {str(e)}")
+
         # Set TTL on the response list in Redis
         await _cleanup_redis_response_list(agent_run_id)
 
@@ -1080,6 +1455,8 @@ async def run_agent_background(
 
         logger.info(f"Agent run background task fully completed for: {agent_run_id} (Instance: {instance_id}) with final status: {final_status}")
 
+    return final_status
+
 async def generate_and_update_project_name(project_id: str, prompt: str):
     """Generates a project name using an LLM and updates the database."""
     logger.info(f"Starting background task to generate name for project: {project_id}")
@@ -1188,52 +1565,27 @@ async def initiate_agent_with_files(
         # 4. Upload Files to Sandbox (if any)
         message_content = prompt
         if files:
-            successful_uploads = []
-            failed_uploads = []
+            uploads = []
             for file in files:
                 if file.filename:
-                    try:
-                        safe_filename = file.filename.replace('/', '_').replace('\\', '_')
-                        target_path = f"/workspace/{safe_filename}"
-                        logger.info(f"Attempting to upload {safe_filename} to {target_path} in sandbox {sandbox_id}")
-                        content = await file.read()
-                        upload_successful = False
-                        try:
-                            if hasattr(sandbox, 'fs') and hasattr(sandbox.fs, 'upload_file'):
-                                import inspect
-                                if inspect.iscoroutinefunction(sandbox.fs.upload_file):
-                                    await sandbox.fs.upload_file(target_path, content)
-                                else:
-                                    sandbox.fs.upload_file(target_path, content)
-                                logger.debug(f"Called sandbox.fs.upload_file for {target_path}")
-                                upload_successful = True
-                            else:
-                                raise NotImplementedError("Suitable upload method not found on sandbox object.")
-                        except Exception as upload_error:
-                            logger.error(f"Error during sandbox upload call for {safe_filename}: {str(upload_error)}", exc_info=True)
-
-                        if upload_successful:
-                            try:
-                                await asyncio.sleep(0.2)
-                                parent_dir = os.path.dirname(target_path)
-                                files_in_dir = sandbox.fs.list_files(parent_dir)
-                                file_names_in_dir = [f.name for f in files_in_dir]
-                                if safe_filename in file_names_in_dir:
-                                    successful_uploads.append(target_path)
-                                    logger.info(f"Successfully uploaded and verified file {safe_filename} to sandbox path {target_path}")
-                                else:
-                                    logger.error(f"Verification failed for {safe_filename}: File not found in {parent_dir} after upload attempt.")
-                                    failed_uploads.append(safe_filename)
-                            except Exception as verify_error:
-                                logger.error(f"Error verifying file {safe_filename} after upload: {str(verify_error)}", exc_info=True)
-                                failed_uploads.append(safe_filename)
-                        else:
-                            failed_uploads.append(safe_filename)
-                    except Exception as file_error:
-                        logger.error(f"Error processing file {file.filename}: {str(file_error)}", exc_info=True)
-                        failed_uploads.append(file.filename)
-                    finally:
-                        await file.close()
+                    safe_filename = file.filename.replace('/', '_').replace('\\', '_')
+                    uploads.append((f"/workspace/{safe_filename}", file))
+            logger.info(f"Uploading {len(uploads)} files to sandbox {sandbox_id}")
+            try:
+                upload_result = await upload_files(
+                    AsyncSandbox(sandbox), uploads,
+                    max_concurrency=config.SANDBOX_UPLOAD_CONCURRENCY,
+                    tar_min_files=config.SANDBOX_UPLOAD_TAR_MIN_FILES
+                )
+                successful_uploads = upload_result.uploaded
+                failed_uploads = [os.path.basename(path) for path in upload_result.failed]
+            except Exception as upload_error:
+                logger.error(f"Error uploading files to sandbox {sandbox_id}: {str(upload_error)}", exc_info=True)
+                successful_uploads = []
+                failed_uploads = [os.path.basename(path) for path, _ in uploads]
+            finally:
+                for file in files:
+                    await file.close()
 
             if successful_uploads:
                 message_content += "\n\n" if message_content else ""
@@ -1260,24 +1612,14 @@ async def initiate_agent_with_files(
         agent_run_id = agent_run.data[0]['id']
         logger.info(f"Created new agent run: {agent_run_id}")
 
-        # Register run in Redis
-        instance_key = f"active_run:{instance_id}:{agent_run_id}"
-        try:
-            await redis.set(instance_key, "running", ex=redis.REDIS_KEY_TTL)
-        except Exception as e:
-            logger.warning(f"Failed to register agent run in Redis ({instance_key}): {str(e)}")
-
         # Run agent in background
-        task = asyncio.create_task(
-            run_agent_background(
-                agent_run_id=agent_run_id, thread_id=thread_id, instance_id=instance_id,
-                project_id=project_id, sandbox=sandbox,
-                model_name=model_name,  # Already resolved above
-                enable_thinking=enable_thinking, reasoning_effort=reasoning_effort,
-                stream=stream, enable_context_manager=enable_context_manager
-            )
+        await _launch_agent_run(
+            agent_run_id=agent_run_id, thread_id=thread_id, project_id=project_id, sandbox=sandbox,
+            model_name=model_name,  # Already resolved above
+            enable_thinking=enable_thinking, reasoning_effort=reasoning_effort,
+            stream=stream, enable_context_manager=enable_context_manager,
+            account_id=account_id
         )
-        task.add_done_callback(lambda _: asyncio.create_task(_cleanup_redis_instance_key(agent_run_id)))
 
         return {"thread_id": thread_id, "agent_run_id": agent_run_id}
 
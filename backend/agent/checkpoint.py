@@ -0,0 +1,92 @@
+"""
+Agent run checkpoints.
+
+At every iteration boundary of `run_agent` the background runner stores a
+checkpoint of the loop state in Redis. A run that was drained on shutdown, or
+whose worker died, can then be resumed by another worker from its last
+iteration boundary instead of being failed.
+
+Keys:
+    agent_run:{id}:checkpoint  - JSON encoded RunCheckpoint
+    agent_run:{id}:drained     - set while a drained run waits to be resumed
+"""
+
+import json
+from dataclasses import dataclass, field, asdict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from services import redis
+from utils.logger import logger
+
+# Checkpoints outlive restarts and deploys but not abandoned runs
+CHECKPOINT_TTL = 3600 * 24
+
+
+def _checkpoint_key(agent_run_id: str) -> str:
+    return f"agent_run:{agent_run_id}:checkpoint"
+
+
+def _drained_key(agent_run_id: str) -> str:
+    return f"agent_run:{agent_run_id}:drained"
+
+
+@dataclass
+class RunCheckpoint:
+    """Loop state of an agent run at an iteration boundary.
+
+    Attributes:
+        agent_run_id: ID of the agent run
+        iteration_count: Number of iterations that have fully completed
+        last_message_id: ID of the latest thread message seen at the boundary
+        response_offset: Length of the run's Redis response list at the boundary
+        pending_tool_calls: Tools that were started but never reported a result
+        last_tool_call: Name of the last tool that finished
+        run_params: Arguments needed to restart the run (thread, project, model, ...)
+        drained: Whether the run was stopped on purpose to be resumed elsewhere
+        updated_at: ISO timestamp of when the checkpoint was taken
+    """
+    agent_run_id: str
+    iteration_count: int = 0
+    last_message_id: Optional[str] = None
+    response_offset: int = 0
+    pending_tool_calls: List[Dict[str, Any]] = field(default_factory=list)
+    last_tool_call: Optional[str] = None
+    run_params: Dict[str, Any] = field(default_factory=dict)
+    drained: bool = False
+    updated_at: Optional[str] = None
+
+    async def save(self) -> None:
+        """Store the checkpoint, replacing any earlier one for the run."""
+        self.updated_at = datetime.now(timezone.utc).isoformat()
+        await redis.set(_checkpoint_key(self.agent_run_id), json.dumps(asdict(self)), ex=CHECKPOINT_TTL)
+        if self.drained:
+            await redis.set(_drained_key(self.agent_run_id), "1", ex=CHECKPOINT_TTL)
+
+    @classmethod
+    async def load(cls, agent_run_id: str) -> Optional["RunCheckpoint"]:
+        """Return the latest checkpoint for a run, or None if there is none."""
+        data = await redis.get(_checkpoint_key(agent_run_id))
+        if not data:
+            return None
+        try:
+            return cls(**json.loads(data))
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable checkpoint for agent run {agent_run_id}: {str(e)}")
+            return None
+
+    @staticmethod
+    async def delete(agent_run_id: str) -> None:
+        """Drop the checkpoint of a run that finished or was stopped."""
+        await redis.delete(_checkpoint_key(agent_run_id))
+        await redis.delete(_drained_key(agent_run_id))
+
+    @staticmethod
+    async def is_drained(agent_run_id: str) -> bool:
+        """Whether a drained run is waiting for an instance to resume it."""
+        return bool(await redis.get(_drained_key(agent_run_id)))
+
+    @staticmethod
+    async def claim_drained(agent_run_id: str) -> bool:
+        """Take ownership of a drained run. Only one caller gets True."""
+        return bool(await redis.delete(_drained_key(agent_run_id)))
@@ -1,4 +1,6 @@
 import datetime
+import os
+from functools import lru_cache
 
 SYSTEM_PROMPT = f"""
 You are Suna.so, an autonomous AI Agent created by the Kortix team.
@@ -404,6 +406,7 @@ You have the ability to execute operations using both Python and CLI tools:
         - Use scrape-webpage on URLs from web-search results
         - Only if scrape-webpage fails or if the page requires interaction:
           * Use direct browser tools (browser_navigate_to, browser_go_back, browser_wait, browser_click_element, browser_input_text, browser_send_keys, browser_switch_tab, browser_close_tab, browser_scroll_down, browser_scroll_up, browser_scroll_to_text, browser_get_dropdown_options, browser_select_dropdown_option, browser_drag_drop, browser_click_coordinates etc.)
+          * Use browser_batch for several actions whose inputs are already known, like filling in the fields of a form, so they run in one step
           * This is needed for:
             - Dynamic content loading
             - JavaScript-heavy sites
@@ -654,8 +657,14 @@ For casual conversation and social interactions:
   """
 
 
-def get_system_prompt():
+@lru_cache(maxsize=None)
+def get_system_prompt(include_sample_response: bool = False):
     '''
-    Returns the system prompt
+    Returns the system prompt, optionally followed by a sample assistant response
     '''
-    return SYSTEM_PROMPT 
\ No newline at end of file
+    if not include_sample_response:
+        return SYSTEM_PROMPT
+    sample_response_path = os.path.join(os.path.dirname(__file__), 'sample_responses/1.txt')
+    with open(sample_response_path, 'r') as file:
+        sample_response = file.read()
+    return SYSTEM_PROMPT + "\n\n <sample_assistant_response>" + sample_response + "</sample_assistant_response>" 
\ No newline at end of file
@@ -1,8 +1,9 @@
-import os
 import json
 import re
+import asyncio
+import time
 from uuid import uuid4
-from typing import Optional
+from typing import Optional, Callable, Awaitable
 
 # from agent.tools.message_tool import MessageTool
 from agent.tools.message_tool import MessageTool
@@ -13,6 +14,8 @@ from dotenv import load_dotenv
 from utils.config import config
 
 from agentpress.thread_manager import ThreadManager
+from services.supabase import DBConnection
+from agent.tool_context import get_tool_context_pool
 from agentpress.response_processor import ProcessorConfig
 from agent.tools.sb_shell_tool import SandboxShellTool
 from agent.tools.sb_files_tool import SandboxFilesTool
@@ -22,10 +25,83 @@ from agent.prompt import get_system_prompt
 from utils import logger
 from utils.auth_utils import get_account_id_from_thread
 from services.billing import check_billing_status
+from services.screenshot_store import get_screenshot_store
 from agent.tools.sb_vision_tool import SandboxVisionTool
+from agent.tools.tool_request_tool import ToolRequestTool
+from agent.tool_selection import select_tool_groups, apply_tool_groups, described_groups, prompt_tokens_saved
+from utils.prompt_analyzer import get_last_user_message, rule_based_task_detection
 
 load_dotenv()
 
+# Set once the get_agent_iteration_state RPC is found to be missing, so the
+# fallback is used without retrying the RPC every iteration
+_iteration_state_rpc_available = True
+
+# PostgREST "function not found in the schema cache" and Postgres "undefined function"
+_MISSING_FUNCTION_CODES = ("PGRST202", "42883")
+
+def _is_missing_function_error(error: Exception) -> bool:
+    """Whether an RPC failed because the function is not deployed, rather than transiently."""
+    code = getattr(error, 'code', None)
+    if code in _MISSING_FUNCTION_CODES:
+        return True
+    return any(missing in str(error) for missing in _MISSING_FUNCTION_CODES)
+
+def _parse_message_content(content):
+    """Message content is stored as a JSON string or as a JSON object."""
+    return json.loads(content) if isinstance(content, str) else content
+
+async def get_iteration_state(client, thread_id: str) -> dict:
+    """Get the state the agent loop needs before each LLM call.
+
+    Returns the ID and type of the latest assistant/tool/user message and the
+    content of the latest browser_state and image_context messages. The
+    temporary messages are consumed (deleted) unless the latest message is from
+    the assistant. Uses the get_agent_iteration_state RPC, which does all of
+    this in one transaction, and falls back to concurrent queries: for good
+    if the RPC is not deployed, for this call only if it failed otherwise.
+    """
+    global _iteration_state_rpc_available
+    if _iteration_state_rpc_available:
+        try:
+            result = await client.rpc('get_agent_iteration_state', {'p_thread_id': thread_id}).execute()
+            state = result.data
+            if isinstance(state, list):
+                state = state[0] if state else {}
+            if isinstance(state, str):
+                state = json.loads(state)
+            return state or {}
+        except Exception as e:
+            if _is_missing_function_error(e):
+                logger.warning(f"get_agent_iteration_state RPC not deployed, using separate queries: {e}")
+                _iteration_state_rpc_available = False
+            else:
+                logger.warning(f"get_agent_iteration_state RPC failed, using separate queries for this iteration: {e}")
+
+    latest_message, latest_browser_state, latest_image_context = await asyncio.gather(
+        client.table('messages').select('message_id, type').eq('thread_id', thread_id).in_('type', ['assistant', 'tool', 'user']).order('created_at', desc=True).limit(1).execute(),
+        client.table('messages').select('message_id, content').eq('thread_id', thread_id).eq('type', 'browser_state').order('created_at', desc=True).limit(1).execute(),
+        client.table('messages').select('message_id, content').eq('thread_id', thread_id).eq('type', 'image_context').order('created_at', desc=True).limit(1).execute()
+    )
+
+    state = {'last_message_id': None, 'last_message_type': None, 'browser_state': None, 'image_context': None}
+    if latest_message.data:
+        state['last_message_id'] = latest_message.data[0].get('message_id')
+        state['last_message_type'] = latest_message.data[0].get('type')
+    if state['last_message_type'] == 'assistant':
+        return state
+
+    consumed = []
+    if latest_browser_state.data:
+        state['browser_state'] = latest_browser_state.data[0]['content']
+        consumed.append(latest_browser_state.data[0]['message_id'])
+    if latest_image_context.data:
+        state['image_context'] = latest_image_context.data[0]['content']
+        consumed.append(latest_image_context.data[0]['message_id'])
+    if consumed:
+        await client.table('messages').delete().in_('message_id', consumed).execute()
+    return state
+
 async def run_agent(
     thread_id: str,
     project_id: str,
@@ -37,9 +113,17 @@ async def run_agent(
     task_type: Optional[str] = None,
     enable_thinking: Optional[bool] = False,
     reasoning_effort: Optional[str] = 'low',
-    enable_context_manager: bool = True
+    enable_context_manager: bool = True,
+    start_iteration: int = 0,
+    on_iteration: Optional[Callable[[int, Optional[str]], Awaitable[bool]]] = None
 ):
-    """Run the development agent with specified configuration."""
+    """Run the development agent with specified configuration.
+
+    `start_iteration` resumes the loop after that many completed iterations.
+    `on_iteration` is awaited at every iteration boundary with the number of
+    completed iterations and the latest message ID seen so far; returning False
+    stops the run there so it can be resumed from its checkpoint.
+    """
     # If task_type is provided, ensure we're using the correct model for that task
     if task_type is not None:
         from agent.api import MODEL_NAME_ALIASES
@@ -89,9 +173,9 @@ async def run_agent(
     
     print(f"🚀 Starting agent with model: {model_name} for task type: {task_type}")
 
-    thread_manager = ThreadManager()
-
-    client = await thread_manager.db.client
+    setup_started = time.monotonic()
+    db = DBConnection()
+    client = await db.client
 
     # Get account ID from thread for billing checks
     account_id = await get_account_id_from_thread(client, thread_id)
@@ -108,228 +192,260 @@ async def run_agent(
     if not sandbox_info.get('id'):
         raise ValueError(f"No sandbox found for project {project_id}")
 
-    # Initialize tools with project_id instead of sandbox object
-    # This ensures each tool independently verifies it's operating on the correct project
-    thread_manager.add_tool(SandboxShellTool, project_id=project_id, thread_manager=thread_manager)
-    thread_manager.add_tool(SandboxFilesTool, project_id=project_id, thread_manager=thread_manager)
-    thread_manager.add_tool(SandboxBrowserTool, project_id=project_id, thread_id=thread_id, thread_manager=thread_manager)
-    thread_manager.add_tool(SandboxDeployTool, project_id=project_id, thread_manager=thread_manager)
-    thread_manager.add_tool(SandboxExposeTool, project_id=project_id, thread_manager=thread_manager)
-    thread_manager.add_tool(MessageTool) # we are just doing this via prompt as there is no need to call it as a tool
-    thread_manager.add_tool(WebSearchTool)
-    thread_manager.add_tool(SandboxVisionTool, project_id=project_id, thread_id=thread_id, thread_manager=thread_manager)
-    # Add data providers tool if RapidAPI key is available
-    if config.RAPID_API_KEY:
-        thread_manager.add_tool(DataProvidersTool)
-
+    def register_tools(thread_manager: ThreadManager):
+        # Initialize tools with project_id instead of sandbox object
+        # This ensures each tool independently verifies it's operating on the correct project
+        thread_manager.add_tool(SandboxShellTool, project_id=project_id, thread_manager=thread_manager)
+        thread_manager.add_tool(SandboxFilesTool, project_id=project_id, thread_manager=thread_manager)
+        thread_manager.add_tool(SandboxBrowserTool, project_id=project_id, thread_id=thread_id, thread_manager=thread_manager)
+        thread_manager.add_tool(SandboxDeployTool, project_id=project_id, thread_manager=thread_manager)
+        thread_manager.add_tool(SandboxExposeTool, project_id=project_id, thread_manager=thread_manager)
+        thread_manager.add_tool(MessageTool) # we are just doing this via prompt as there is no need to call it as a tool
+        thread_manager.add_tool(WebSearchTool)
+        thread_manager.add_tool(SandboxVisionTool, project_id=project_id, thread_id=thread_id, thread_manager=thread_manager)
+        # Add data providers tool if RapidAPI key is available
+        if config.RAPID_API_KEY:
+            thread_manager.add_tool(DataProvidersTool)
+        if config.AGENT_TOOL_SUBSETTING_ENABLED:
+            thread_manager.add_tool(ToolRequestTool, thread_manager=thread_manager)
+
+    # Tools, their schemas and resolved sandbox handles are reused across runs of the project
+    tool_context_pool = get_tool_context_pool()
+    tool_context = tool_context_pool.acquire(project_id, thread_id, sandbox_info.get('id'), register_tools)
+    thread_manager = tool_context.thread_manager
+    logger.info(
+        f"Agent setup for project {project_id} took {(time.monotonic() - setup_started) * 1000:.1f}ms "
+        f"(tool context {'reused' if tool_context.reused else 'built'}, "
+        f"pool hits: {tool_context_pool.hits}, misses: {tool_context_pool.misses})"
+    )
 
     # Include sample response for OpenRouter models
     # Qwen and LLaMA models benefit from sample responses, while Mistral and DeepSeek can work without
-    if "qwen" in model_name.lower() or "llama" in model_name.lower():
-        sample_response_path = os.path.join(os.path.dirname(__file__), 'sample_responses/1.txt')
-        with open(sample_response_path, 'r') as file:
-            sample_response = file.read()
-        
-        system_message = { "role": "system", "content": get_system_prompt() + "\n\n <sample_assistant_response>" + sample_response + "</sample_assistant_response>" }
+    include_sample_response = "qwen" in model_name.lower() or "llama" in model_name.lower()
+    system_message = { "role": "system", "content": get_system_prompt(include_sample_response) }
+
+    # Describe only the tool groups the task needs; the agent can request more with request-tools
+    tool_task_type = task_type
+    if config.AGENT_TOOL_SUBSETTING_ENABLED and tool_task_type is None:
+        last_user_message = await get_last_user_message(client, thread_id)
+        tool_task_type = rule_based_task_detection(last_user_message) if last_user_message else None
+    if config.AGENT_TOOL_SUBSETTING_ENABLED:
+        apply_tool_groups(thread_manager.tool_registry, select_tool_groups(tool_task_type))
     else:
-        system_message = { "role": "system", "content": get_system_prompt() }
-
-    iteration_count = 0
-    continue_execution = True
-
-    while continue_execution and iteration_count < max_iterations:
-        iteration_count += 1
-        # logger.debug(f"Running iteration {iteration_count}...")
-
-        # Billing check on each iteration - still needed within the iterations
-        can_run, message, subscription = await check_billing_status(client, account_id)
-        if not can_run:
-            error_msg = f"Billing limit reached: {message}"
-            # Yield a special message to indicate billing limit reached
-            yield {
-                "type": "status",
-                "status": "stopped",
-                "message": error_msg
-            }
-            break
-        # Check if last message is from assistant using direct Supabase query
-        latest_message = await client.table('messages').select('*').eq('thread_id', thread_id).in_('type', ['assistant', 'tool', 'user']).order('created_at', desc=True).limit(1).execute()
-        if latest_message.data and len(latest_message.data) > 0:
-            message_type = latest_message.data[0].get('type')
-            if message_type == 'assistant':
+        thread_manager.tool_registry.describe_only(None)
+    logger.info(f"Tool groups for task type '{tool_task_type}': {described_groups(thread_manager.tool_registry)}")
+    tokens_saved = 0
+
+    try:
+        iteration_count = start_iteration
+        continue_execution = True
+        last_message_id = None
+
+        while continue_execution and iteration_count < max_iterations:
+            iteration_count += 1
+            # logger.debug(f"Running iteration {iteration_count}...")
+
+            # Iteration boundary: nothing of this iteration has been consumed yet
+            if on_iteration and not await on_iteration(iteration_count - 1, last_message_id):
+                logger.info(f"Pausing agent on thread {thread_id} after {iteration_count - 1} iterations")
+                return
+
+            # Billing check and iteration state (last message, temporary context) in one round trip
+            (can_run, message, subscription), iteration_state = await asyncio.gather(
+                check_billing_status(client, account_id),
+                get_iteration_state(client, thread_id)
+            )
+            if not can_run:
+                error_msg = f"Billing limit reached: {message}"
+                # Yield a special message to indicate billing limit reached
+                yield {
+                    "type": "status",
+                    "status": "stopped",
+                    "message": error_msg
+                }
+                break
+            # Check if last message is from assistant
+            last_message_id = iteration_state.get('last_message_id')
+            if iteration_state.get('last_message_type') == 'assistant':
                 print(f"Last message was from assistant, stopping execution")
                 continue_execution = False
                 break
 
-        # ---- Temporary Message Handling (Browser State & Image Context) ----
-        temporary_message = None
-        temp_message_content_list = [] # List to hold text/image blocks
-
-        # Get the latest browser_state message
-        latest_browser_state_msg = await client.table('messages').select('*').eq('thread_id', thread_id).eq('type', 'browser_state').order('created_at', desc=True).limit(1).execute()
-        if latest_browser_state_msg.data and len(latest_browser_state_msg.data) > 0:
-            try:
-                browser_content = json.loads(latest_browser_state_msg.data[0]["content"])
-                screenshot_base64 = browser_content.get("screenshot_base64")
-                # Create a copy of the browser state without screenshot
-                browser_state_text = browser_content.copy()
-                browser_state_text.pop('screenshot_base64', None)
-                browser_state_text.pop('screenshot_url', None)
-                browser_state_text.pop('screenshot_url_base64', None)
-
-                if browser_state_text:
-                    temp_message_content_list.append({
-                        "type": "text",
-                        "text": f"The following is the current state of the browser:\n{json.dumps(browser_state_text, indent=2)}"
-                    })
-                if screenshot_base64:
-                    temp_message_content_list.append({
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:image/jpeg;base64,{screenshot_base64}",
-                        }
-                    })
-                else:
-                    logger.warning("Browser state found but no screenshot base64 data.")
-
-                await client.table('messages').delete().eq('message_id', latest_browser_state_msg.data[0]["message_id"]).execute()
-            except Exception as e:
-                logger.error(f"Error parsing browser state: {e}")
-
-        # Get the latest image_context message (NEW)
-        latest_image_context_msg = await client.table('messages').select('*').eq('thread_id', thread_id).eq('type', 'image_context').order('created_at', desc=True).limit(1).execute()
-        if latest_image_context_msg.data and len(latest_image_context_msg.data) > 0:
-            try:
-                image_context_content = json.loads(latest_image_context_msg.data[0]["content"])
-                base64_image = image_context_content.get("base64")
-                mime_type = image_context_content.get("mime_type")
-                file_path = image_context_content.get("file_path", "unknown file")
-
-                if base64_image and mime_type:
-                    temp_message_content_list.append({
-                        "type": "text",
-                        "text": f"Here is the image you requested to see: '{file_path}'"
-                    })
-                    temp_message_content_list.append({
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:{mime_type};base64,{base64_image}",
-                        }
-                    })
-                else:
-                    logger.warning(f"Image context found for '{file_path}' but missing base64 or mime_type.")
-
-                await client.table('messages').delete().eq('message_id', latest_image_context_msg.data[0]["message_id"]).execute()
-            except Exception as e:
-                logger.error(f"Error parsing image context: {e}")
-
-        # If we have any content, construct the temporary_message
-        if temp_message_content_list:
-            temporary_message = {"role": "user", "content": temp_message_content_list}
-            # logger.debug(f"Constructed temporary message with {len(temp_message_content_list)} content blocks.")
-        # ---- End Temporary Message Handling ----
-
-        # Set max_tokens based on model
-        max_tokens = None
-        if "sonnet" in model_name.lower():
-            max_tokens = 64000
-        elif "gpt-4" in model_name.lower():
-            max_tokens = 4096
-
-        response = await thread_manager.run_thread(
-            thread_id=thread_id,
-            system_prompt=system_message,
-            stream=stream,
-            llm_model=model_name,
-            llm_temperature=0,
-            llm_max_tokens=max_tokens,
-            tool_choice="auto",
-            max_xml_tool_calls=1,
-            temporary_message=temporary_message,
-            processor_config=ProcessorConfig(
-                xml_tool_calling=True,
-                native_tool_calling=False,
-                execute_tools=True,
-                execute_on_stream=True,
-                tool_execution_strategy="parallel",
-                xml_adding_strategy="user_message"
-            ),
-            native_max_auto_continues=native_max_auto_continues,
-            include_xml_examples=True,
-            enable_thinking=enable_thinking,
-            reasoning_effort=reasoning_effort,
-            enable_context_manager=enable_context_manager
-        )
+            # ---- Temporary Message Handling (Browser State & Image Context) ----
+            temporary_message = None
+            temp_message_content_list = [] # List to hold text/image blocks
 
-        if isinstance(response, dict) and "status" in response and response["status"] == "error":
-            yield response
-            return
-
-        # Track if we see ask, complete, or web-browser-takeover tool calls
-        last_tool_call = None
-
-        async for chunk in response:
-            # print(f"CHUNK: {chunk}") # Uncomment for detailed chunk logging
+            # The latest browser_state message, already consumed
+            if iteration_state.get('browser_state'):
+                try:
+                    browser_content = _parse_message_content(iteration_state['browser_state'])
+                    screenshot_base64 = browser_content.get("screenshot_base64")
+                    if not screenshot_base64 and browser_content.get("screenshot_path"):
+                        # Stored by reference
+                        screenshot_base64 = await get_screenshot_store().load_base64(client, browser_content["screenshot_path"])
+                    screenshot_mime_type = browser_content.get("screenshot_mime_type") or "image/jpeg"
+                    # Create a copy of the browser state without screenshot
+                    browser_state_text = browser_content.copy()
+                    for key in ('screenshot_base64', 'screenshot_url', 'screenshot_url_base64',
+                                'screenshot_path', 'screenshot_id', 'screenshot_mime_type'):
+                        browser_state_text.pop(key, None)
+
+                    if browser_state_text:
+                        temp_message_content_list.append({
+                            "type": "text",
+                            "text": f"The following is the current state of the browser:\n{json.dumps(browser_state_text, indent=2)}"
+                        })
+                    if screenshot_base64:
+                        temp_message_content_list.append({
+                            "type": "image_url",
+                            "image_url": {
+                                "url": f"data:{screenshot_mime_type};base64,{screenshot_base64}",
+                            }
+                        })
+                    else:
+                        logger.warning("Browser state found but no screenshot base64 data.")
+                except Exception as e:
+                    logger.error(f"Error parsing browser state: {e}")
 
-            # Check for XML versions like <ask>, <complete>, or <web-browser-takeover> in assistant content chunks
-            if chunk.get('type') == 'assistant' and 'content' in chunk:
+            # The latest image_context message, already consumed
+            if iteration_state.get('image_context'):
                 try:
-                    # The content field might be a JSON string or object
-                    content = chunk.get('content', '{}')
-                    if isinstance(content, str):
-                        assistant_content_json = json.loads(content)
+                    image_context_content = _parse_message_content(iteration_state['image_context'])
+                    base64_image = image_context_content.get("base64")
+                    mime_type = image_context_content.get("mime_type")
+                    file_path = image_context_content.get("file_path", "unknown file")
+
+                    if base64_image and mime_type:
+                        temp_message_content_list.append({
+                            "type": "text",
+                            "text": f"Here is the image you requested to see: '{file_path}'"
+                        })
+                        temp_message_content_list.append({
+                            "type": "image_url",
+                            "image_url": {
+                                "url": f"data:{mime_type};base64,{base64_image}",
+                            }
+                        })
                     else:
-                        assistant_content_json = content
-
-                    # The actual text content is nested within
-                    assistant_text = assistant_content_json.get('content', '')
-                    if isinstance(assistant_text, str): # Ensure it's a string
-                         # Check for the closing tags as they signal the end of the tool usage
-                        if '</ask>' in assistant_text or '</complete>' in assistant_text or '</web-browser-takeover>' in assistant_text:
-                           if '</ask>' in assistant_text:
-                               xml_tool = 'ask'
-                           elif '</complete>' in assistant_text:
-                               xml_tool = 'complete'
-                           elif '</web-browser-takeover>' in assistant_text:
-                               xml_tool = 'web-browser-takeover'
-
-                           last_tool_call = xml_tool
-                           print(f"Agent used XML tool: {xml_tool}")
-                except json.JSONDecodeError:
-                    # Handle cases where content might not be valid JSON
-                    print(f"Warning: Could not parse assistant content JSON: {chunk.get('content')}")
+                        logger.warning(f"Image context found for '{file_path}' but missing base64 or mime_type.")
                 except Exception as e:
-                    print(f"Error processing assistant chunk: {e}")
-
-            # # Check for native function calls (OpenAI format)
-            # elif chunk.get('type') == 'status' and 'content' in chunk:
-            #     try:
-            #         # Parse the status content
-            #         status_content = chunk.get('content', '{}')
-            #         if isinstance(status_content, str):
-            #             status_content = json.loads(status_content)
-
-            #         # Check if this is a tool call status
-            #         status_type = status_content.get('status_type')
-            #         function_name = status_content.get('function_name', '')
-
-            #         # Check for special function names that should stop execution
-            #         if status_type == 'tool_started' and function_name in ['ask', 'complete', 'web-browser-takeover']:
-            #             last_tool_call = function_name
-            #             print(f"Agent used native function call: {function_name}")
-            #     except json.JSONDecodeError:
-            #         # Handle cases where content might not be valid JSON
-            #         print(f"Warning: Could not parse status content JSON: {chunk.get('content')}")
-            #     except Exception as e:
-            #         print(f"Error processing status chunk: {e}")
-
-            yield chunk
-
-        # Check if we should stop based on the last tool call
-        if last_tool_call in ['ask', 'complete', 'web-browser-takeover']:
-            print(f"Agent decided to stop with tool: {last_tool_call}")
-            continue_execution = False
+                    logger.error(f"Error parsing image context: {e}")
+
+            # If we have any content, construct the temporary_message
+            if temp_message_content_list:
+                temporary_message = {"role": "user", "content": temp_message_content_list}
+                # logger.debug(f"Constructed temporary message with {len(temp_message_content_list)} content blocks.")
+            # ---- End Temporary Message Handling ----
+
+            # Set max_tokens based on model
+            max_tokens = None
+            if "sonnet" in model_name.lower():
+                max_tokens = 64000
+            elif "gpt-4" in model_name.lower():
+                max_tokens = 4096
+
+            tokens_saved += prompt_tokens_saved(system_message, model_name, thread_manager.tool_registry)
+
+            response = await thread_manager.run_thread(
+                thread_id=thread_id,
+                system_prompt=system_message,
+                stream=stream,
+                llm_model=model_name,
+                llm_temperature=0,
+                llm_max_tokens=max_tokens,
+                tool_choice="auto",
+                max_xml_tool_calls=1,
+                temporary_message=temporary_message,
+                processor_config=ProcessorConfig(
+                    xml_tool_calling=True,
+                    native_tool_calling=False,
+                    execute_tools=True,
+                    execute_on_stream=True,
+                    tool_execution_strategy="parallel",
+                    xml_adding_strategy="user_message"
+                ),
+                native_max_auto_continues=native_max_auto_continues,
+                include_xml_examples=True,
+                enable_thinking=enable_thinking,
+                reasoning_effort=reasoning_effort,
+                enable_context_manager=enable_context_manager
+            )
+
+            if isinstance(response, dict) and "status" in response and response["status"] == "error":
+                yield response
+                return
+
+            # Track if we see ask, complete, or web-browser-takeover tool calls
+            last_tool_call = None
+
+            async for chunk in response:
+                # print(f"CHUNK: {chunk}") # Uncomment for detailed chunk logging
+
+                # Check for XML versions like <ask>, <complete>, or <web-browser-takeover> in assistant content chunks
+                if chunk.get('type') == 'assistant' and 'content' in chunk:
+                    try:
+                        # The content field might be a JSON string or object
+                        content = chunk.get('content', '{}')
+                        if isinstance(content, str):
+                            assistant_content_json = json.loads(content)
+                        else:
+                            assistant_content_json = content
+
+                        # The actual text content is nested within
+                        assistant_text = assistant_content_json.get('content', '')
+                        if isinstance(assistant_text, str): # Ensure it's a string
+                             # Check for the closing tags as they signal the end of the tool usage
+                            if '</ask>' in assistant_text or '</complete>' in assistant_text or '</web-browser-takeover>' in assistant_text:
+                               if '</ask>' in assistant_text:
+                                   xml_tool = 'ask'
+                               elif '</complete>' in assistant_text:
+                                   xml_tool = 'complete'
+                               elif '</web-browser-takeover>' in assistant_text:
+                                   xml_tool = 'web-browser-takeover'
+
+                               last_tool_call = xml_tool
+                               print(f"Agent used XML tool: {xml_tool}")
+                    except json.JSONDecodeError:
+                        # Handle cases where content might not be valid JSON
+                        print(f"Warning: Could not parse assistant content JSON: {chunk.get('content')}")
+                    except Exception as e:
+                        print(f"Error processing assistant chunk: {e}")
+
+                # # Check for native function calls (OpenAI format)
+                # elif chunk.get('type') == 'status' and 'content' in chunk:
+                #     try:
+                #         # Parse the status content
+                #         status_content = chunk.get('content', '{}')
+                #         if isinstance(status_content, str):
+                #             status_content = json.loads(status_content)
+
+                #         # Check if this is a tool call status
+                #         status_type = status_content.get('status_type')
+                #         function_name = status_content.get('function_name', '')
+
+                #         # Check for special function names that should stop execution
+                #         if status_type == 'tool_started' and function_name in ['ask', 'complete', 'web-browser-takeover']:
+                #             last_tool_call = function_name
+                #             print(f"Agent used native function call: {function_name}")
+                #     except json.JSONDecodeError:
+                #         # Handle cases where content might not be valid JSON
+                #         print(f"Warning: Could not parse status content JSON: {chunk.get('content')}")
+                #     except Exception as e:
+                #         print(f"Error processing status chunk: {e}")
+
+                yield chunk
+
+            # Check if we should stop based on the last tool call
+            if last_tool_call in ['ask', 'complete', 'web-browser-takeover']:
+                print(f"Agent decided to stop with tool: {last_tool_call}")
+                continue_execution = False
 
+    finally:
+        logger.info(
+            f"Tool selection saved {tokens_saved} prompt tokens on thread {thread_id} "
+            f"(tool groups: {described_groups(thread_manager.tool_registry)})"
+        )
+        tool_context_pool.release(tool_context)
 
 # # TESTING
 
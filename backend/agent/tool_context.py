@@ -0,0 +1,166 @@
+"""
+Per-project pool of agent tool contexts.
+
+Building the tools for an agent run means a new ThreadManager, a new
+ToolRegistry, an instance of every tool class and, on first use, a sandbox
+lookup in every sandbox tool. Consecutive runs of a project need exactly the
+same tools, so the pool keeps the ThreadManager with its registered tools per
+project and hands it to the next run. Resolved sandbox handles are shared by
+all sandbox tools of a context.
+
+A context is used by one run at a time; a run that finds the project's
+context busy gets a fresh, unpooled one. Idle contexts are evicted after a
+TTL (kept below the sandbox auto-stop interval so handles stay valid) and the
+least recently used ones are evicted when the pool is full.
+"""
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from agentpress.thread_manager import ThreadManager
+from sandbox.sandbox import SandboxToolsBase
+from utils.logger import logger
+
+
+@dataclass
+class ToolContext:
+    """A ThreadManager with the tools of one project registered on it."""
+    project_id: str
+    sandbox_id: Optional[str]
+    thread_manager: ThreadManager
+    created_at: float = field(default_factory=time.monotonic)
+    last_used: float = field(default_factory=time.monotonic)
+    in_use: bool = False
+    pooled: bool = True
+    reused: bool = False
+
+    def tool_instances(self):
+        """Unique tool instances registered in the context."""
+        registry = self.thread_manager.tool_registry
+        instances = {id(info['instance']): info['instance'] for info in registry.tools.values()}
+        instances.update({id(info['instance']): info['instance'] for info in registry.xml_tools.values()})
+        return list(instances.values())
+
+    def bind_thread(self, thread_id: str):
+        """Point thread-bound tools (browser, vision) at the run's thread."""
+        for tool in self.tool_instances():
+            if hasattr(tool, 'thread_id'):
+                tool.thread_id = thread_id
+
+    def share_sandbox(self):
+        """Hand a sandbox resolved by one sandbox tool to the others."""
+        sandbox_tools = [tool for tool in self.tool_instances() if isinstance(tool, SandboxToolsBase)]
+        resolved = next((tool for tool in sandbox_tools if tool._sandbox is not None), None)
+        if not resolved:
+            return
+        for tool in sandbox_tools:
+            if tool._sandbox is None:
+                tool._sandbox = resolved._sandbox
+                tool._sandbox_id = resolved._sandbox_id
+                tool._sandbox_pass = resolved._sandbox_pass
+
+
+class ToolContextPool:
+    """Reuses tool contexts across runs of the same project."""
+
+    def __init__(self, ttl_seconds: int = 600, max_size: int = 100):
+        """Initialize the pool.
+
+        Args:
+            ttl_seconds: Seconds an idle context is kept
+            max_size: Max contexts kept; the least recently used are evicted first
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._contexts: "OrderedDict[str, ToolContext]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _evict_expired(self):
+        now = time.monotonic()
+        for project_id, context in list(self._contexts.items()):
+            if not context.in_use and now - context.last_used > self.ttl_seconds:
+                logger.debug(f"Evicting idle tool context for project {project_id}")
+                del self._contexts[project_id]
+
+    def _evict_overflow(self):
+        for project_id, context in list(self._contexts.items()):
+            if len(self._contexts) <= self.max_size:
+                break
+            if not context.in_use:
+                del self._contexts[project_id]
+
+    def acquire(
+        self,
+        project_id: str,
+        thread_id: str,
+        sandbox_id: Optional[str],
+        build: Callable[[ThreadManager], None]
+    ) -> ToolContext:
+        """Get the project's tool context, building it with `build` if needed.
+
+        Args:
+            project_id: Project the run belongs to
+            thread_id: Thread the run belongs to
+            sandbox_id: Current sandbox of the project; a context built for another sandbox is rebuilt
+            build: Registers the tools on a new ThreadManager
+
+        Returns:
+            The context to use; call release() when the run ends
+        """
+        self._evict_expired()
+
+        context = self._contexts.get(project_id)
+        if context and context.sandbox_id != sandbox_id and not context.in_use:
+            logger.info(f"Sandbox of project {project_id} changed, rebuilding its tool context")
+            del self._contexts[project_id]
+            context = None
+
+        if context and not context.in_use:
+            self.hits += 1
+            self._contexts.move_to_end(project_id)
+            context.reused = True
+        else:
+            self.misses += 1
+            thread_manager = ThreadManager()
+            build(thread_manager)
+            pooled = context is None
+            context = ToolContext(project_id=project_id, sandbox_id=sandbox_id, thread_manager=thread_manager, pooled=pooled)
+            if pooled:
+                self._contexts[project_id] = context
+                self._evict_overflow()
+
+        context.in_use = True
+        context.last_used = time.monotonic()
+        context.bind_thread(thread_id)
+        return context
+
+    def release(self, context: ToolContext):
+        """Return a context to the pool after a run."""
+        context.share_sandbox()
+        context.in_use = False
+        context.last_used = time.monotonic()
+
+    def invalidate(self, project_id: str):
+        """Drop a project's context, e.g. after its sandbox was replaced."""
+        context = self._contexts.pop(project_id, None)
+        if context:
+            logger.debug(f"Invalidated tool context for project {project_id}")
+
+
+# Shared pool instance configured from the environment
+tool_context_pool = None
+
+
+def get_tool_context_pool() -> ToolContextPool:
+    """Return the process-wide tool context pool, creating it on first use."""
+    global tool_context_pool
+    if tool_context_pool is None:
+        from utils.config import config
+        tool_context_pool = ToolContextPool(
+            ttl_seconds=config.TOOL_CONTEXT_TTL_SECONDS,
+            max_size=config.TOOL_CONTEXT_POOL_SIZE
+        )
+    return tool_context_pool
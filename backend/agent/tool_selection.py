@@ -0,0 +1,100 @@
+"""
+Task-aware selection of the tools described to the agent.
+
+Every tool's XML examples go into the system prompt, which costs thousands of
+tokens per LLM call even when the task is a chat question. Tools are grouped;
+the core groups (shell, files, browser, web search) are described on every
+run, and the task type detected by utils/prompt_analyzer only decides which of
+the optional groups (deploy, vision, data providers) are described too. All
+registered tools stay executable, and the agent can ask for more groups with
+the request-tools tool; they are described from its next iteration on.
+
+The task type comes from a substring matcher unless the caller passed one, so
+it is often wrong. Since it never removes a core group, a misclassification
+can only cost tokens or an extra request-tools step, not capabilities.
+Unknown task types get every group.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional
+
+from agentpress.prompt_compiler import get_prompt_compiler
+from agentpress.tool_registry import ToolRegistry
+
+# Tool groups the agent can be given: group -> tool class names and what they are for
+TOOL_GROUPS: Dict[str, Dict[str, Any]] = {
+    "shell": {"tools": ["SandboxShellTool"], "description": "Run terminal commands in the workspace"},
+    "files": {"tools": ["SandboxFilesTool"], "description": "Create, read, edit and delete workspace files"},
+    "browser": {"tools": ["SandboxBrowserTool"], "description": "Navigate and interact with web pages"},
+    "deploy": {"tools": ["SandboxDeployTool", "SandboxExposeTool"], "description": "Deploy sites and expose workspace ports"},
+    "web_search": {"tools": ["WebSearchTool"], "description": "Search the web and crawl pages"},
+    "vision": {"tools": ["SandboxVisionTool"], "description": "Look at images in the workspace"},
+    "data_providers": {"tools": ["DataProvidersTool"], "description": "Query data APIs (LinkedIn, Twitter, Zillow, Amazon, Yahoo Finance, ...)"},
+    "message": {"tools": ["MessageTool"], "description": "Ask the user and hand control back"},
+}
+
+# Groups described on every run, whatever the task type
+ALWAYS_DESCRIBED_GROUPS = ["message", "shell", "files", "browser", "web_search"]
+
+# Tool that lets the agent ask for more groups; described whenever some group is left out
+TOOL_REQUEST_TOOL = "ToolRequestTool"
+
+# Task types of utils/prompt_analyzer -> tool groups the task usually needs; only the
+# optional groups among them make a difference, the others are always described
+TASK_TOOL_GROUPS: Dict[str, List[str]] = {
+    "chat": ["web_search"],
+    "complex_dialogue": ["web_search"],
+    "summarization": ["files", "browser", "web_search"],
+    "code": ["shell", "files", "deploy"],
+    "fix_code": ["shell", "files"],
+    "math": ["shell", "files"],
+    "multilingual": ["files"],
+    "creative": ["files"],
+    "weather": ["web_search", "data_providers"],
+    "tool_use": ["shell", "files", "browser", "web_search", "data_providers"],
+    "data_analysis": ["shell", "files", "vision", "web_search", "data_providers"],
+    "market_research": ["shell", "files", "browser", "web_search", "data_providers"],
+}
+
+
+def select_tool_groups(task_type: Optional[str]) -> List[str]:
+    """Return the tool groups to describe for a task type; all groups if the type is unknown."""
+    groups = TASK_TOOL_GROUPS.get((task_type or "").lower())
+    if groups is None:
+        return list(TOOL_GROUPS)
+    return ALWAYS_DESCRIBED_GROUPS + [group for group in groups if group not in ALWAYS_DESCRIBED_GROUPS]
+
+
+def described_groups(registry: ToolRegistry) -> List[str]:
+    """Return the tool groups currently described by the registry."""
+    if registry.described_tools is None:
+        return list(TOOL_GROUPS)
+    return [
+        group for group, info in TOOL_GROUPS.items()
+        if all(tool in registry.described_tools for tool in info["tools"])
+    ]
+
+
+def apply_tool_groups(registry: ToolRegistry, groups: Iterable[str]):
+    """Describe only the tools of `groups`, plus the request-tools tool if any group is left out."""
+    groups = set(groups)
+    tool_names = {tool for group in groups for tool in TOOL_GROUPS[group]["tools"]}
+    if groups != set(TOOL_GROUPS):
+        tool_names.add(TOOL_REQUEST_TOOL)
+    registry.describe_only(tool_names)
+
+
+def add_tool_groups(registry: ToolRegistry, groups: Iterable[str]) -> List[str]:
+    """Describe additional tool groups and return the ones that were not described yet."""
+    current = described_groups(registry)
+    added = [group for group in groups if group not in current]
+    if added:
+        apply_tool_groups(registry, current + added)
+    return added
+
+
+def prompt_tokens_saved(system_prompt: Dict[str, Any], model_name: str, registry: ToolRegistry) -> int:
+    """Tokens the current tool selection saves on each LLM call compared to describing every tool."""
+    compiler = get_prompt_compiler()
+    full = compiler.compile(system_prompt, model_name, registry.get_xml_examples(described_only=False))
+    selected = compiler.compile(system_prompt, model_name, registry.get_xml_examples())
+    return max(0, full.token_count - selected.token_count)
@@ -1,6 +1,7 @@
 import os
 import time
 import base64
+import hashlib
 import aiohttp
 import asyncio
 import logging
@@ -8,7 +9,9 @@ from typing import Optional, Dict, Any, Union
 from PIL import Image
 
 from agentpress.tool import Tool, ToolResult, openapi_schema, xml_schema
+from agentpress.thread_manager import ThreadManager
 from sandbox.sandbox import SandboxToolsBase, Sandbox
+from utils.config import config
 
 KEYBOARD_KEYS = [
     'a', 'b', 'c', 'd', 'e', 'f', 'g', 'h', 'i', 'j', 'k', 'l', 'm',
@@ -22,30 +25,71 @@ KEYBOARD_KEYS = [
     'alt+tab', 'alt+f4', 'ctrl+alt+delete'
 ]
 
+AUTOMATION_API_PORT = 8000
+
+# HTTP session shared by all tool instances of the process, so connections to the
+# automation API are pooled and kept alive instead of opened per tool
+_shared_session: Optional[aiohttp.ClientSession] = None
+_shared_session_loop = None
+
+
+def get_automation_session() -> aiohttp.ClientSession:
+    """Return the process-wide automation API session, creating it on first use."""
+    global _shared_session, _shared_session_loop
+    loop = asyncio.get_running_loop()
+    # A session is bound to its event loop; workers running several loops get one each in turn
+    if _shared_session is None or _shared_session.closed or _shared_session_loop is not loop:
+        _shared_session_loop = loop
+        _shared_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=100, limit_per_host=8, keepalive_timeout=60),
+            timeout=aiohttp.ClientTimeout(total=60)
+        )
+    return _shared_session
+
+
+def _save_screenshot(img_data: bytes, timestamp: str) -> str:
+    """Write a screenshot and the latest_screenshot.png copy to disk, for debugging."""
+    screenshots_dir = "screenshots"
+    os.makedirs(screenshots_dir, exist_ok=True)
+    timestamped_filename = os.path.join(screenshots_dir, f"screenshot_{timestamp}.png")
+    with open(timestamped_filename, 'wb') as f:
+        f.write(img_data)
+    with open("latest_screenshot.png", 'wb') as f:
+        f.write(img_data)
+    return timestamped_filename
+
+
 class ComputerUseTool(SandboxToolsBase):
     """Computer automation tool for controlling the sandbox browser and GUI."""
     
-    def __init__(self, sandbox: Sandbox):
-        """Initialize automation tool with sandbox connection."""
-        super().__init__(sandbox)
-        self.session = None
+    def __init__(self, project_id: str, thread_manager: Optional[ThreadManager] = None):
+        """Initialize automation tool for the sandbox of a project."""
+        super().__init__(project_id, thread_manager)
         self.mouse_x = 0  # Track current mouse position
         self.mouse_y = 0
-        # Get automation service URL using port 8000
-        self.api_base_url = self.sandbox.get_preview_link(8000)
-        logging.info(f"Initialized Computer Use Tool with API URL: {self.api_base_url}")
+        # Resolved on first request, without blocking the event loop
+        self.api_base_url = None
+        # Hash of the last screenshot sent to the model
+        self.last_screenshot_id = None
+    
+    async def _get_api_base_url(self) -> str:
+        """Get the automation service URL (port 8000) from the sandbox preview link."""
+        if self.api_base_url is None:
+            await self._ensure_sandbox()
+            preview_link = await self.async_sandbox.get_preview_link(AUTOMATION_API_PORT)
+            self.api_base_url = (preview_link.url if hasattr(preview_link, 'url') else str(preview_link)).rstrip('/')
+            logging.info(f"Computer Use Tool API URL: {self.api_base_url}")
+        return self.api_base_url
     
     async def _get_session(self) -> aiohttp.ClientSession:
-        """Get or create aiohttp session for API requests."""
-        if self.session is None or self.session.closed:
-            self.session = aiohttp.ClientSession()
-        return self.session
+        """Get the pooled aiohttp session for API requests."""
+        return get_automation_session()
     
     async def _api_request(self, method: str, endpoint: str, data: Optional[Dict] = None) -> Dict:
         """Send request to automation service API."""
         try:
             session = await self._get_session()
-            url = f"{self.api_base_url}/api{endpoint}"
+            url = f"{await self._get_api_base_url()}/api{endpoint}"
             
             logging.debug(f"API request: {method} {url} {data}")
             
@@ -64,10 +108,9 @@ class ComputerUseTool(SandboxToolsBase):
             return {"success": False, "error": str(e)}
     
     async def cleanup(self):
-        """Clean up resources."""
-        if self.session and not self.session.closed:
-            await self.session.close()
-            self.session = None
+        """Clean up resources; the pooled session is shared and stays open."""
+        self.api_base_url = None
+        self.last_screenshot_id = None
     
     @openapi_schema({
         "type": "function",
@@ -535,43 +578,53 @@ class ComputerUseTool(SandboxToolsBase):
         except Exception as e:
             return ToolResult(success=False, output=f"Failed to drag: {str(e)}")
 
-    async def get_screenshot_base64(self) -> Optional[dict]:
-        """Capture screen and return as base64 encoded image."""
+    async def _fetch_screenshot(self) -> Optional[bytes]:
+        """Fetch the screen as PNG bytes, binary when the automation API supports it."""
+        session = await self._get_session()
+        url = f"{await self._get_api_base_url()}/api/automation/screenshot"
+        async with session.post(url, headers={"Accept": "image/png, application/json"}) as response:
+            if response.content_type.startswith("image/"):
+                return await response.read()
+            # Older automation APIs answer with the PNG base64 encoded in JSON
+            result = await response.json()
+        if "image" not in result:
+            return None
+        return base64.b64decode(result["image"])
+
+    async def get_screenshot_base64(self, force: bool = False) -> Optional[dict]:
+        """Capture screen and return as base64 encoded image.
+
+        Args:
+            force: Return the image even if the screen did not change since the last screenshot
+
+        Returns:
+            The screenshot, or None on failure. For a screen identical to the previous
+            screenshot, "unchanged" is True and no base64 image is included.
+        """
         try:
-            result = await self._api_request("POST", "/automation/screenshot")
-            
-            if "image" in result:
-                base64_str = result["image"]
-                timestamp = time.strftime("%Y%m%d_%H%M%S")
-                
-                # Save screenshot to file
-                screenshots_dir = "screenshots"
-                if not os.path.exists(screenshots_dir):
-                    os.makedirs(screenshots_dir)
-                
-                timestamped_filename = os.path.join(screenshots_dir, f"screenshot_{timestamp}.png")
-                latest_filename = "latest_screenshot.png"
-                
-                # Decode base64 string and save to file
-                img_data = base64.b64decode(base64_str)
-                with open(timestamped_filename, 'wb') as f:
-                    f.write(img_data)
-                
-                # Save a copy as the latest screenshot
-                with open(latest_filename, 'wb') as f:
-                    f.write(img_data)
-                
-                return {
-                    "content_type": "image/png",
-                    "base64": base64_str,
-                    "timestamp": timestamp,
-                    "filename": timestamped_filename
-                }
-            else:
+            img_data = await self._fetch_screenshot()
+            if img_data is None:
                 return None
-                
+
+            timestamp = time.strftime("%Y%m%d_%H%M%S")
+            screenshot_id = hashlib.sha1(img_data).hexdigest()
+            screenshot = {
+                "content_type": "image/png",
+                "screenshot_id": screenshot_id,
+                "timestamp": timestamp,
+                "unchanged": screenshot_id == self.last_screenshot_id and not force
+            }
+            if not screenshot["unchanged"]:
+                screenshot["base64"] = base64.b64encode(img_data).decode("utf-8")
+                self.last_screenshot_id = screenshot_id
+
+            if config.COMPUTER_USE_SAVE_SCREENSHOTS:
+                screenshot["filename"] = await asyncio.to_thread(_save_screenshot, img_data, timestamp)
+
+            return screenshot
+
         except Exception as e:
-            print(f"[Screenshot] Error during screenshot process: {str(e)}")
+            logging.error(f"[Screenshot] Error during screenshot process: {str(e)}")
             return None
 
     @openapi_schema({
@@ -35,23 +35,28 @@ class ActiveJobsProvider(RapidDataProviderBase):
         }
            
         base_url = "https://active-jobs-db.p.rapidapi.com"
-        super().__init__(base_url, endpoints)
+        super().__init__(base_url, endpoints, cache_ttl=3600)
 
 
 if __name__ == "__main__":
-    from dotenv import load_dotenv
-    load_dotenv()
-    tool = ActiveJobsProvider()
-
-    # Example for searching active jobs
-    jobs = tool.call_endpoint(
-        route="active_jobs",
-        payload={
-            "limit": "10",
-            "offset": "0",
-            "title_filter": "\"Data Engineer\"",
-            "location_filter": "\"United States\" OR \"United Kingdom\"",
-            "description_type": "text"
-        }
-    )
-    print("Active Jobs:", jobs)
\ No newline at end of file
+    import asyncio
+
+    async def main():
+        from dotenv import load_dotenv
+        load_dotenv()
+        tool = ActiveJobsProvider()
+
+        # Example for searching active jobs
+        jobs = await tool.call_endpoint(
+            route="active_jobs",
+            payload={
+                "limit": "10",
+                "offset": "0",
+                "title_filter": "\"Data Engineer\"",
+                "location_filter": "\"United States\" OR \"United Kingdom\"",
+                "description_type": "text"
+            }
+        )
+        print("Active Jobs:", jobs)
+
+    asyncio.run(main())
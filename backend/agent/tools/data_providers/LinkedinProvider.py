@@ -234,17 +234,32 @@ class LinkedinProvider(RapidDataProviderBase):
             }
         }
         base_url = "https://linkedin-data-scraper.p.rapidapi.com"
-        super().__init__(base_url, endpoints)
+        # Profiles and companies change rarely; posts, comments and jobs more often
+        cache_ttls = {
+            "profile_updates": 3600,
+            "profile_recent_comments": 3600,
+            "comments_from_recent_activity": 3600,
+            "company_jobs": 3600,
+            "company_updates": 3600,
+            "company_updates_post": 3600,
+            "search_posts_with_filters": 3600,
+            "search_jobs": 3600
+        }
+        super().__init__(base_url, endpoints, cache_ttl=86400, cache_ttls=cache_ttls)
 
 
 if __name__ == "__main__":
-    from dotenv import load_dotenv
-    load_dotenv()
-    tool = LinkedinProvider()
+    import asyncio
+
+    async def main():
+        from dotenv import load_dotenv
+        load_dotenv()
+        tool = LinkedinProvider()
 
-    result = tool.call_endpoint(
-        route="comments_from_recent_activity",
-        payload={"profile_url": "https://www.linkedin.com/in/adamcohenhillel/", "page": 1}
-    )
-    print(result)
+        result = await tool.call_endpoint(
+            route="comments_from_recent_activity",
+            payload={"profile_url": "https://www.linkedin.com/in/adamcohenhillel/", "page": 1}
+        )
+        print(result)
 
+    asyncio.run(main())
@@ -1,7 +1,11 @@
 import os
-import requests
+import asyncio
+import httpx
 from typing import Dict, Any, Optional, TypedDict, Literal
 
+from agent.tools.data_providers.response_cache import ResponseCache
+from utils.logger import logger
+
 
 class EndpointSchema(TypedDict):
     route: str
@@ -11,27 +15,106 @@ class EndpointSchema(TypedDict):
     payload: Dict[str, Any]
 
 
+# Statuses worth retrying: rate limits and transient upstream failures
+_RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# HTTP client and response cache shared by all providers of the process
+rapid_api_client = None
+response_cache = None
+
+
+def get_rapid_api_client() -> httpx.AsyncClient:
+    """Return the process-wide RapidAPI client, creating it on first use."""
+    global rapid_api_client
+    if rapid_api_client is None or rapid_api_client.is_closed:
+        from utils.config import config
+        rapid_api_client = httpx.AsyncClient(
+            # Connection errors are retried by the transport, statuses in call_endpoint
+            transport=httpx.AsyncHTTPTransport(retries=config.DATA_PROVIDER_RETRIES),
+            timeout=httpx.Timeout(config.DATA_PROVIDER_TIMEOUT, connect=10),
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=60)
+        )
+    return rapid_api_client
+
+
+def get_response_cache() -> ResponseCache:
+    """Return the process-wide data provider response cache, creating it on first use."""
+    global response_cache
+    if response_cache is None:
+        from utils.config import config
+        response_cache = ResponseCache(max_entries=config.DATA_PROVIDER_CACHE_SIZE)
+    return response_cache
+
+
+async def close_rapid_api_client():
+    global rapid_api_client
+    if rapid_api_client is not None:
+        await rapid_api_client.aclose()
+        rapid_api_client = None
+
+
 class RapidDataProviderBase:
-    def __init__(self, base_url: str, endpoints: Dict[str, EndpointSchema]):
+    def __init__(
+            self,
+            base_url: str,
+            endpoints: Dict[str, EndpointSchema],
+            cache_ttl: Optional[int] = None,
+            cache_ttls: Optional[Dict[str, int]] = None
+    ):
+        """
+        Args:
+            base_url: RapidAPI host of the provider
+            endpoints: Endpoints by route key
+            cache_ttl: Seconds responses stay fresh; DATA_PROVIDER_CACHE_TTL if None
+            cache_ttls: Freshness of single endpoints by route key, 0 to never cache
+        """
         self.base_url = base_url
         self.endpoints = endpoints
-    
+        self.cache_ttl = cache_ttl
+        self.cache_ttls = cache_ttls or {}
+
     def get_endpoints(self):
         return self.endpoints
-    
-    def call_endpoint(
+
+    def get_cache_ttl(self, route: str) -> int:
+        from utils.config import config
+        if route in self.cache_ttls:
+            return self.cache_ttls[route]
+        return config.DATA_PROVIDER_CACHE_TTL if self.cache_ttl is None else self.cache_ttl
+
+    async def _request(self, method: str, url: str, payload: Optional[Dict[str, Any]], headers: Dict[str, str]):
+        """Send the request, retrying rate limits and server errors; returns the JSON and whether it may be cached."""
+        from utils.config import config
+        client = get_rapid_api_client()
+        for attempt in range(config.DATA_PROVIDER_RETRIES + 1):
+            if method == 'GET':
+                response = await client.get(url, params=payload, headers=headers)
+            else:
+                response = await client.post(url, json=payload, headers=headers)
+            if response.status_code not in _RETRY_STATUSES or attempt == config.DATA_PROVIDER_RETRIES:
+                break
+            retry_after = response.headers.get("retry-after", "")
+            delay = min(float(retry_after), 10) if retry_after.isdigit() else 0.5 * 2 ** attempt
+            logger.warning(f"Data provider request {url} returned {response.status_code}, retrying in {delay}s")
+            await asyncio.sleep(delay)
+        # Errors are returned to the agent as before, but not cached
+        return response.json(), response.is_success
+
+    async def call_endpoint(
             self,
             route: str,
             payload: Optional[Dict[str, Any]] = None
     ):
         """
         Call an API endpoint with the given parameters and data.
-        
+
+        Responses are cached for the freshness of the endpoint, so repeated
+        calls with the same payload do not reach RapidAPI.
+
         Args:
-            endpoint (EndpointSchema): The endpoint configuration dictionary
-            params (dict, optional): Query parameters for GET requests
-            payload (dict, optional): JSON payload for POST requests
-            
+            route (str): The key of the endpoint to call
+            payload (dict, optional): Query parameters for GET requests, JSON payload for POST requests
+
         Returns:
             dict: The JSON response from the API
         """
@@ -41,9 +124,9 @@ class RapidDataProviderBase:
         endpoint = self.endpoints.get(route)
         if not endpoint:
             raise ValueError(f"Endpoint {route} not found")
-        
+
         url = f"{self.base_url}{endpoint['route']}"
-        
+
         headers = {
             "x-rapidapi-key": os.getenv("RAPID_API_KEY"),
             "x-rapidapi-host": url.split("//")[1].split("/")[0],
@@ -51,11 +134,12 @@ class RapidDataProviderBase:
         }
 
         method = endpoint.get('method', 'GET').upper()
-        
-        if method == 'GET':
-            response = requests.get(url, params=payload, headers=headers)
-        elif method == 'POST':
-            response = requests.post(url, json=payload, headers=headers)
-        else:
+        if method not in ('GET', 'POST'):
             raise ValueError(f"Unsupported HTTP method: {method}")
-        return response.json()
+
+        cache = get_response_cache()
+        return await cache.get_or_load(
+            ResponseCache.key(self.base_url, route, payload),
+            lambda: self._request(method, url, payload, headers),
+            self.get_cache_ttl(route)
+        )
@@ -95,93 +95,101 @@ class ZillowProvider(RapidDataProviderBase):
             },
         }
         base_url = "https://zillow56.p.rapidapi.com"
-        super().__init__(base_url, endpoints)
+        # Listings change within the day; Zestimate history daily, rates hourly
+        cache_ttls = {
+            "zestimate_history": 86400,
+            "mortgage_rates": 3600
+        }
+        super().__init__(base_url, endpoints, cache_ttl=21600, cache_ttls=cache_ttls)
 
 
 if __name__ == "__main__":
-    from dotenv import load_dotenv
-    from time import sleep
-    load_dotenv()
-    tool = ZillowProvider()
+    import asyncio
 
-    # Example for searching properties in Houston
-    search_result = tool.call_endpoint(
-        route="search",
-        payload={
-            "location": "houston, tx",
-            "status": "forSale",
-            "sortSelection": "priorityscore",
-            "listing_type": "by_agent",
-            "doz": "any"
-        }
-    )
-    logger.debug("Search Result: %s", search_result)
-    logger.debug("***")
-    logger.debug("***")
-    logger.debug("***")
-    sleep(1)
-    # Example for searching by address
-    address_result = tool.call_endpoint(
-        route="search_address",
-        payload={
-            "address": "1161 Natchez Dr College Station Texas 77845"
-        }
-    )
-    logger.debug("Address Search Result: %s", address_result)
-    logger.debug("***")
-    logger.debug("***")
-    logger.debug("***")
-    sleep(1)
-    # Example for getting property details
-    property_result = tool.call_endpoint(
-        route="propertyV2",
-        payload={
-            "zpid": "7594920"
-        }
-    )
-    logger.debug("Property Details Result: %s", property_result)
-    sleep(1)
-    logger.debug("***")
-    logger.debug("***")
-    logger.debug("***")
+    async def main():
+        from dotenv import load_dotenv
+        load_dotenv()
+        tool = ZillowProvider()
 
-    # Example for getting zestimate history
-    zestimate_result = tool.call_endpoint(
-        route="zestimate_history",
-        payload={
-            "zpid": "20476226"
-        }
-    )
-    logger.debug("Zestimate History Result: %s", zestimate_result)
-    sleep(1)
-    logger.debug("***")
-    logger.debug("***")
-    logger.debug("***")
-    # Example for getting similar properties
-    similar_result = tool.call_endpoint(
-        route="similar_properties",
-        payload={
-            "zpid": "28253016"
-        }
-    )
-    logger.debug("Similar Properties Result: %s", similar_result)
-    sleep(1)
-    logger.debug("***")
-    logger.debug("***")
-    logger.debug("***")
-    # Example for getting mortgage rates
-    mortgage_result = tool.call_endpoint(
-        route="mortgage_rates",
-        payload={
-            "program": "Fixed30Year",
-            "state": "US",
-            "refinance": "false",
-            "loanType": "Conventional",
-            "loanAmount": "Conforming",
-            "loanToValue": "Normal",
-            "creditScore": "Low",
-            "duration": "30"
-        }
-    )
-    logger.debug("Mortgage Rates Result: %s", mortgage_result)
-  
\ No newline at end of file
+        # Example for searching properties in Houston
+        search_result = await tool.call_endpoint(
+            route="search",
+            payload={
+                "location": "houston, tx",
+                "status": "forSale",
+                "sortSelection": "priorityscore",
+                "listing_type": "by_agent",
+                "doz": "any"
+            }
+        )
+        logger.debug("Search Result: %s", search_result)
+        logger.debug("***")
+        logger.debug("***")
+        logger.debug("***")
+        await asyncio.sleep(1)
+        # Example for searching by address
+        address_result = await tool.call_endpoint(
+            route="search_address",
+            payload={
+                "address": "1161 Natchez Dr College Station Texas 77845"
+            }
+        )
+        logger.debug("Address Search Result: %s", address_result)
+        logger.debug("***")
+        logger.debug("***")
+        logger.debug("***")
+        await asyncio.sleep(1)
+        # Example for getting property details
+        property_result = await tool.call_endpoint(
+            route="propertyV2",
+            payload={
+                "zpid": "7594920"
+            }
+        )
+        logger.debug("Property Details Result: %s", property_result)
+        await asyncio.sleep(1)
+        logger.debug("***")
+        logger.debug("***")
+        logger.debug("***")
+
+        # Example for getting zestimate history
+        zestimate_result = await tool.call_endpoint(
+            route="zestimate_history",
+            payload={
+                "zpid": "20476226"
+            }
+        )
+        logger.debug("Zestimate History Result: %s", zestimate_result)
+        await asyncio.sleep(1)
+        logger.debug("***")
+        logger.debug("***")
+        logger.debug("***")
+        # Example for getting similar properties
+        similar_result = await tool.call_endpoint(
+            route="similar_properties",
+            payload={
+                "zpid": "28253016"
+            }
+        )
+        logger.debug("Similar Properties Result: %s", similar_result)
+        await asyncio.sleep(1)
+        logger.debug("***")
+        logger.debug("***")
+        logger.debug("***")
+        # Example for getting mortgage rates
+        mortgage_result = await tool.call_endpoint(
+            route="mortgage_rates",
+            payload={
+                "program": "Fixed30Year",
+                "state": "US",
+                "refinance": "false",
+                "loanType": "Conventional",
+                "loanAmount": "Conforming",
+                "loanToValue": "Normal",
+                "creditScore": "Low",
+                "duration": "30"
+            }
+        )
+        logger.debug("Mortgage Rates Result: %s", mortgage_result)
+
+    asyncio.run(main())
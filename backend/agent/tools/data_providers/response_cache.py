@@ -0,0 +1,116 @@
+"""
+Process-level cache of data provider responses.
+
+The agent often repeats the same data provider call within a run (the same
+LinkedIn profile, ticker or Zillow search), and the RapidAPI data behind it
+changes slowly. Responses are cached per (provider, route, payload) for the
+freshness of their endpoint, least recently used evicted first.
+
+Loads are single-flight: concurrent identical calls share one request.
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+class ResponseCache:
+    """Caches data provider responses with per-entry TTLs."""
+
+    def __init__(self, max_entries: int = 1024):
+        """Initialize the cache.
+
+        Args:
+            max_entries: Responses kept; 0 disables caching
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._stats = {"hits": 0, "misses": 0, "shared": 0, "evictions": 0}
+
+    @staticmethod
+    def key(provider: str, route: str, payload: Optional[Dict[str, Any]]) -> str:
+        # Payloads from the model come in any key order
+        encoded = json.dumps(payload or {}, sort_keys=True, default=str)
+        return f"{provider}:{route}:{hashlib.sha1(encoded.encode()).hexdigest()}"
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """Return (True, response) if a fresh response is cached, (False, None) otherwise."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expires_at, response = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, response
+
+    def put(self, key: str, response: Any, ttl_seconds: float):
+        if ttl_seconds <= 0 or self.max_entries <= 0:
+            return
+        self._entries[key] = (time.monotonic() + ttl_seconds, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    async def get_or_load(
+        self,
+        key: str,
+        load: Callable[[], Awaitable[Tuple[Any, bool]]],
+        ttl_seconds: float
+    ) -> Any:
+        """Return the cached response, or load it once for all concurrent callers.
+
+        Args:
+            key: Cache key from ResponseCache.key
+            load: Fetches the response; returns it and whether it may be cached
+            ttl_seconds: Freshness of the endpoint; 0 bypasses the cache
+
+        Returns:
+            The response
+        """
+        if ttl_seconds <= 0:
+            response, _ = await load()
+            return response
+
+        found, response = self.get(key)
+        if found:
+            self._stats["hits"] += 1
+            return response
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self._stats["shared"] += 1
+            return await asyncio.shield(inflight)
+
+        self._stats["misses"] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            response, cacheable = await load()
+            if cacheable:
+                self.put(key, response, ttl_seconds)
+            future.set_result(response)
+            return response
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Retrieved here so a load nobody else waited for does not log a warning
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Cached responses and hit counters."""
+        return {"entries": len(self._entries), **self._stats}
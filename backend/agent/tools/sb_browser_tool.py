@@ -1,11 +1,19 @@
 import traceback
 import json
+from typing import List, Optional, Union
 
 from agentpress.tool import ToolResult, openapi_schema, xml_schema
 from agentpress.thread_manager import ThreadManager
 from sandbox.sandbox import SandboxToolsBase, Sandbox
+from sandbox.browser_client import get_browser_clients
+from services.screenshot_store import get_screenshot_store
 from utils.logger import logger
 
+# Seconds each action of a batch may take; SETTLE_NAVIGATION_TIMEOUT_MS of the browser API
+BATCH_ACTION_TIMEOUT = 10
+# Seconds left after a batch's actions to capture the state and return it
+BATCH_STATE_TIMEOUT = 30
+
 
 class SandboxBrowserTool(SandboxToolsBase):
     """Tool for executing tasks in a Daytona sandbox with browser-use capabilities."""
@@ -14,13 +22,15 @@ class SandboxBrowserTool(SandboxToolsBase):
         super().__init__(project_id, thread_manager)
         self.thread_id = thread_id
 
-    async def _execute_browser_action(self, endpoint: str, params: dict = None, method: str = "POST") -> ToolResult:
+    async def _execute_browser_action(self, endpoint: str, params: dict = None, method: str = "POST",
+                                      timeout: Optional[float] = None) -> ToolResult:
         """Execute a browser automation action through the API
         
         Args:
             endpoint (str): The API endpoint to call
             params (dict, optional): Parameters to send. Defaults to None.
             method (str, optional): HTTP method to use. Defaults to "POST".
+            timeout (float, optional): Seconds the action may take. Defaults to the client's timeout.
             
         Returns:
             ToolResult: Result of the execution
@@ -29,27 +39,21 @@ class SandboxBrowserTool(SandboxToolsBase):
             # Ensure sandbox is initialized
             await self._ensure_sandbox()
             
-            # Build the curl command
-            url = f"http://localhost:8002/api/automation/{endpoint}"
-            
-            if method == "GET" and params:
-                query_params = "&".join([f"{k}={v}" for k, v in params.items()])
-                url = f"{url}?{query_params}"
-                curl_cmd = f"curl -s -X {method} '{url}' -H 'Content-Type: application/json'"
-            else:
-                curl_cmd = f"curl -s -X {method} '{url}' -H 'Content-Type: application/json'"
-                if params:
-                    json_data = json.dumps(params)
-                    curl_cmd += f" -d '{json_data}'"
-            
-            logger.debug("\033[95mExecuting curl command:\033[0m")
-            logger.debug(f"{curl_cmd}")
+            # Pooled HTTP client through the preview URL, curl inside the sandbox as the fallback
+            client = await get_browser_clients().get(self.async_sandbox)
+            # Each thread browses in its own session, so threads sharing the sandbox do not collide.
+            # The browser API may skip a screenshot only if it matches one known to be stored
+            store = get_screenshot_store()
+            known_screenshot = store.known_screenshot(self.project_id, self.thread_id)
+            body = await client.request(
+                endpoint, params, method, session=self.thread_id,
+                options={"known_screenshot": known_screenshot} if known_screenshot else None,
+                timeout=timeout
+            )
             
-            response = self.sandbox.process.exec(curl_cmd, timeout=30)
-            
-            if response.exit_code == 0:
+            if body:
                 try:
-                    result = json.loads(response.result)
+                    result = json.loads(body)
 
                     if not "content" in result:
                         result["content"] = ""
@@ -59,6 +63,11 @@ class SandboxBrowserTool(SandboxToolsBase):
 
                     logger.info("Browser automation request completed successfully")
 
+                    # The screenshot goes to Storage; the message keeps its path
+                    result = await store.externalize(
+                        await self.thread_manager.db.client, self.project_id, result, session=self.thread_id
+                    )
+
                     # Add full result to thread messages for state tracking
                     added_message = await self.thread_manager.add_message(
                         thread_id=self.thread_id,
@@ -89,15 +98,18 @@ class SandboxBrowserTool(SandboxToolsBase):
                     # Add OCR text when available
                     if result.get("ocr_text"):
                         success_response["ocr_text"] = result["ocr_text"]
+                    # Outcome of each action of a batch
+                    if result.get("steps"):
+                        success_response["steps"] = result["steps"]
 
                     return self.success_response(success_response)
 
                 except json.JSONDecodeError as e:
-                    logger.error(f"Failed to parse response JSON: {response.result} {e}")
-                    return self.fail_response(f"Failed to parse response JSON: {response.result} {e}")
+                    logger.error(f"Failed to parse response JSON: {body} {e}")
+                    return self.fail_response(f"Failed to parse response JSON: {body} {e}")
             else:
-                logger.error(f"Browser automation request failed 2: {response}")
-                return self.fail_response(f"Browser automation request failed 2: {response}")
+                logger.error("Browser automation request returned an empty response")
+                return self.fail_response("Browser automation request returned an empty response")
 
         except Exception as e:
             logger.error(f"Error executing browser action: {e}")
@@ -115,6 +127,11 @@ class SandboxBrowserTool(SandboxToolsBase):
                     "url": {
                         "type": "string",
                         "description": "The url to navigate to"
+                    },
+                    "profile": {
+                        "type": "string",
+                        "enum": ["fast", "full"],
+                        "description": "Resources to load from now on: 'fast' skips images, media, fonts and trackers and loads text-heavy pages much faster; 'full' loads everything, for when the screenshot matters. Kept for later navigations until changed."
                     }
                 },
                 "required": ["url"]
@@ -124,24 +141,34 @@ class SandboxBrowserTool(SandboxToolsBase):
     @xml_schema(
         tag_name="browser-navigate-to",
         mappings=[
-            {"param_name": "url", "node_type": "content", "path": "."}
+            {"param_name": "url", "node_type": "content", "path": "."},
+            {"param_name": "profile", "node_type": "attribute", "path": ".", "required": False}
         ],
         example='''
         <browser-navigate-to>
         https://example.com
         </browser-navigate-to>
+
+        <!-- Reading text only: skip images, media, fonts and trackers -->
+        <browser-navigate-to profile="fast">
+        https://example.com/docs
+        </browser-navigate-to>
         '''
     )
-    async def browser_navigate_to(self, url: str) -> ToolResult:
+    async def browser_navigate_to(self, url: str, profile: Optional[str] = None) -> ToolResult:
         """Navigate to a specific url
         
         Args:
             url (str): The url to navigate to
+            profile (str, optional): Navigation profile to switch to first, "fast" or "full"
             
         Returns:
             dict: Result of the execution
         """
-        return await self._execute_browser_action("navigate_to", {"url": url})
+        params = {"url": url}
+        if profile:
+            params["profile"] = profile
+        return await self._execute_browser_action("navigate_to", params)
 
     # @openapi_schema({
     #     "type": "function",
@@ -210,6 +237,33 @@ class SandboxBrowserTool(SandboxToolsBase):
         logger.debug(f"\033[95mNavigating back in browser history\033[0m")
         return await self._execute_browser_action("go_back", {})
 
+    @openapi_schema({
+        "type": "function",
+        "function": {
+            "name": "browser_read_screen_text",
+            "description": "Read the text visible in the current screenshot with OCR. Use it when the page content is rendered in images or canvas and missing from the page text",
+            "parameters": {
+                "type": "object",
+                "properties": {}
+            }
+        }
+    })
+    @xml_schema(
+        tag_name="browser-read-screen-text",
+        mappings=[],
+        example='''
+        <browser-read-screen-text></browser-read-screen-text>
+        '''
+    )
+    async def browser_read_screen_text(self) -> ToolResult:
+        """Read the text of the current screenshot with OCR
+
+        Returns:
+            dict: Result of the execution
+        """
+        logger.debug(f"\033[95mReading screen text with OCR\033[0m")
+        return await self._execute_browser_action("ocr", {})
+
     @openapi_schema({
         "type": "function",
         "function": {
@@ -895,4 +949,71 @@ class SandboxBrowserTool(SandboxToolsBase):
             dict: Result of the execution
         """
         logger.debug(f"\033[95mClicking at coordinates: ({x}, {y})\033[0m")
-        return await self._execute_browser_action("click_coordinates", {"x": x, "y": y})
\ No newline at end of file
+        return await self._execute_browser_action("click_coordinates", {"x": x, "y": y})
+
+    @openapi_schema({
+        "type": "function",
+        "function": {
+            "name": "browser_batch",
+            "description": "Run several browser actions in one step, e.g. to fill in a form. Actions run in order, the page settles between them, and the run stops at the first action that fails. The browser state is returned once, after the last action. Use it when the next actions do not depend on what the previous ones show; element indices are those of the current state. Actions: navigate_to (url, optional profile 'fast' or 'full'), navigation_profile (profile), go_back, wait (seconds), click_element (index), click_coordinates (x, y), input_text (index, text), send_keys (keys), switch_tab (page_id), open_tab (url), close_tab (page_id), scroll_down (amount), scroll_up (amount), scroll_to_text (text), select_dropdown_option (index, option_text), drag_drop (element_source, element_target or coord_source_x, coord_source_y, coord_target_x, coord_target_y)",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "actions": {
+                        "type": "array",
+                        "description": "Actions to run in order",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "action": {"type": "string", "description": "Action name, e.g. 'input_text'"},
+                                "params": {"type": "object", "description": "Parameters of the action, e.g. {\"index\": 2, \"text\": \"Jane\"}"}
+                            },
+                            "required": ["action"]
+                        }
+                    }
+                },
+                "required": ["actions"]
+            }
+        }
+    })
+    @xml_schema(
+        tag_name="browser-batch",
+        mappings=[
+            {"param_name": "actions", "node_type": "content", "path": "."}
+        ],
+        example='''
+        <browser-batch>
+        [
+            {"action": "input_text", "params": {"index": 2, "text": "Jane Doe"}},
+            {"action": "input_text", "params": {"index": 3, "text": "jane@example.com"}},
+            {"action": "select_dropdown_option", "params": {"index": 4, "option_text": "Germany"}},
+            {"action": "click_element", "params": {"index": 5}}
+        ]
+        </browser-batch>
+        '''
+    )
+    async def browser_batch(self, actions: Union[str, List[dict]]) -> ToolResult:
+        """Run several browser actions and return the state after the last one
+
+        Args:
+            actions (str | list): Actions as a list, or its JSON text
+
+        Returns:
+            dict: Result of the execution
+        """
+        if isinstance(actions, str):
+            try:
+                actions = json.loads(actions)
+            except json.JSONDecodeError as e:
+                return self.fail_response(f"Actions must be a JSON list: {e}")
+        if not isinstance(actions, list) or not all(isinstance(step, dict) and step.get("action") for step in actions):
+            return self.fail_response("Actions must be a list of objects with an 'action' and optional 'params'")
+        logger.debug(f"\033[95mRunning {len(actions)} browser actions\033[0m")
+        steps = [{"action": step["action"], "params": step.get("params") or {}} for step in actions]
+        # The browser API stops running actions at timeout_ms and still returns the state and
+        # the steps that ran, before this request times out
+        actions_timeout = len(steps) * BATCH_ACTION_TIMEOUT
+        return await self._execute_browser_action(
+            "batch", {"actions": steps, "timeout_ms": actions_timeout * 1000},
+            timeout=actions_timeout + BATCH_STATE_TIMEOUT
+        )
@@ -72,7 +72,7 @@ class SandboxExposeTool(SandboxToolsBase):
                 return self.fail_response(f"Invalid port number: {port}. Must be between 1 and 65535.")
 
             # Get the preview link for the specified port
-            preview_link = self.sandbox.get_preview_link(port)
+            preview_link = await self.async_sandbox.get_preview_link(port)
             
             # Extract the actual URL from the preview link object
             url = preview_link.url if hasattr(preview_link, 'url') else str(preview_link)
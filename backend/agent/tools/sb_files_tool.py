@@ -1,8 +1,10 @@
 from daytona_sdk.process import SessionExecuteRequest
-from typing import Optional
+from typing import List, Optional, Union
 
 from agentpress.tool import ToolResult, openapi_schema, xml_schema
 from sandbox.sandbox import SandboxToolsBase, Sandbox, get_or_start_sandbox
+from sandbox.snapshots import get_workspace_snapshots
+from sandbox.edits import apply_file_edits, parse_edit_blocks
 from utils.files_utils import EXCLUDED_FILES, EXCLUDED_DIRS, EXCLUDED_EXT, should_exclude_file, clean_path
 from agentpress.thread_manager import ThreadManager
 from utils.logger import logger
@@ -24,44 +26,24 @@ class SandboxFilesTool(SandboxToolsBase):
         """Check if a file should be excluded based on path, name, or extension"""
         return should_exclude_file(rel_path)
 
-    def _file_exists(self, path: str) -> bool:
+    async def _file_exists(self, path: str) -> bool:
         """Check if a file exists in the sandbox"""
         try:
-            self.sandbox.fs.get_file_info(path)
+            await self.async_sandbox.fs.get_file_info(path)
             return True
         except Exception:
             return False
 
     async def get_workspace_state(self) -> dict:
-        """Get the current workspace state by reading all files"""
-        files_state = {}
+        """Get the current workspace state, fetching only the files changed since the last snapshot"""
         try:
             # Ensure sandbox is initialized
             await self._ensure_sandbox()
             
-            files = self.sandbox.fs.list_files(self.workspace_path)
-            for file_info in files:
-                rel_path = file_info.name
-                
-                # Skip excluded files and directories
-                if self._should_exclude_file(rel_path) or file_info.is_dir:
-                    continue
-
-                try:
-                    full_path = f"{self.workspace_path}/{rel_path}"
-                    content = self.sandbox.fs.download_file(full_path).decode()
-                    files_state[rel_path] = {
-                        "content": content,
-                        "is_dir": file_info.is_dir,
-                        "size": file_info.size,
-                        "modified": file_info.mod_time
-                    }
-                except Exception as e:
-                    print(f"Error reading file {rel_path}: {e}")
-                except UnicodeDecodeError:
-                    print(f"Skipping binary file: {rel_path}")
-
-            return files_state
+            snapshot = await get_workspace_snapshots().refresh(
+                self.project_id, self.async_sandbox, self.workspace_path, self._should_exclude_file
+            )
+            return dict(snapshot.files)
         
         except Exception as e:
             print(f"Error getting workspace state: {str(e)}")
@@ -119,17 +101,17 @@ class SandboxFilesTool(SandboxToolsBase):
             
             file_path = self.clean_path(file_path)
             full_path = f"{self.workspace_path}/{file_path}"
-            if self._file_exists(full_path):
+            if await self._file_exists(full_path):
                 return self.fail_response(f"File '{file_path}' already exists. Use update_file to modify existing files.")
             
             # Create parent directories if needed
             parent_dir = '/'.join(full_path.split('/')[:-1])
             if parent_dir:
-                self.sandbox.fs.create_folder(parent_dir, "755")
+                await self.async_sandbox.fs.create_folder(parent_dir, "755")
             
             # Write the file content
-            self.sandbox.fs.upload_file(full_path, file_contents.encode())
-            self.sandbox.fs.set_file_permissions(full_path, permissions)
+            await self.async_sandbox.fs.upload_file(full_path, file_contents.encode())
+            await self.async_sandbox.fs.set_file_permissions(full_path, permissions)
             
             # Get preview URL if it's an HTML file
             # preview_url = self._get_preview_url(file_path)
@@ -187,10 +169,10 @@ class SandboxFilesTool(SandboxToolsBase):
             
             file_path = self.clean_path(file_path)
             full_path = f"{self.workspace_path}/{file_path}"
-            if not self._file_exists(full_path):
+            if not await self._file_exists(full_path):
                 return self.fail_response(f"File '{file_path}' does not exist")
             
-            content = self.sandbox.fs.download_file(full_path).decode()
+            content = (await self.async_sandbox.fs.download_file(full_path)).decode()
             old_str = old_str.expandtabs()
             new_str = new_str.expandtabs()
             
@@ -203,7 +185,7 @@ class SandboxFilesTool(SandboxToolsBase):
             
             # Perform replacement
             new_content = content.replace(old_str, new_str)
-            self.sandbox.fs.upload_file(full_path, new_content.encode())
+            await self.async_sandbox.fs.upload_file(full_path, new_content.encode())
             
             # Show snippet around the edit
             replacement_line = content.split(old_str)[0].count('\n')
@@ -222,6 +204,102 @@ class SandboxFilesTool(SandboxToolsBase):
         except Exception as e:
             return self.fail_response(f"Error replacing string: {str(e)}")
 
+    @openapi_schema({
+        "type": "function",
+        "function": {
+            "name": "apply_edits",
+            "description": "Apply several edits to one file in a single step. Give either `edits` (exact replacements applied in order; each old_str must appear exactly once when it is applied) or `diff` (a unified diff of the file). Either all edits are applied or none. Returns the changed regions with a few lines of context. Prefer this over several str_replace calls on the same file. The file path must be relative to /workspace.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "file_path": {
+                        "type": "string",
+                        "description": "Path to the target file, relative to /workspace (e.g., 'src/main.py')"
+                    },
+                    "edits": {
+                        "type": "array",
+                        "description": "Replacements to apply in order",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "old_str": {"type": "string", "description": "Text to be replaced (must appear exactly once)"},
+                                "new_str": {"type": "string", "description": "Replacement text"}
+                            },
+                            "required": ["old_str", "new_str"]
+                        }
+                    },
+                    "diff": {
+                        "type": "string",
+                        "description": "Unified diff to apply to the file, used when no edits are given"
+                    }
+                },
+                "required": ["file_path"]
+            }
+        }
+    })
+    @xml_schema(
+        tag_name="apply-edits",
+        mappings=[
+            {"param_name": "file_path", "node_type": "attribute", "path": "."},
+            {"param_name": "edits", "node_type": "element", "path": "edits", "required": False},
+            {"param_name": "diff", "node_type": "element", "path": "diff", "required": False}
+        ],
+        example='''
+        <!-- Several replacements in one file: each SEARCH text must appear exactly once -->
+        <apply-edits file_path="src/main.py">
+            <edits>
+<<<<<<< SEARCH
+def greet():
+    print("hi")
+=======
+def greet(name):
+    print(f"hi {name}")
+>>>>>>> REPLACE
+<<<<<<< SEARCH
+greet()
+=======
+greet("world")
+>>>>>>> REPLACE
+            </edits>
+        </apply-edits>
+
+        <!-- Or a unified diff -->
+        <apply-edits file_path="src/main.py">
+            <diff>
+@@ -1,2 +1,2 @@
+ def greet():
+-    print("hi")
++    print("hello")
+            </diff>
+        </apply-edits>
+        '''
+    )
+    async def apply_edits(self, file_path: str, edits: Optional[Union[str, List[dict]]] = None, diff: Optional[str] = None) -> ToolResult:
+        try:
+            # Ensure sandbox is initialized
+            await self._ensure_sandbox()
+            
+            file_path = self.clean_path(file_path)
+            full_path = f"{self.workspace_path}/{file_path}"
+            
+            if isinstance(edits, str):
+                edits = parse_edit_blocks(edits)
+            if not edits and not diff:
+                return self.fail_response("No edits given. Provide SEARCH/REPLACE blocks in <edits> or a unified diff in <diff>")
+            
+            result = await apply_file_edits(self.async_sandbox, full_path, edits=edits, diff=diff, context_lines=self.SNIPPET_LINES)
+            if not result.get("ok"):
+                return self.fail_response(f"No edits applied to '{file_path}': {result.get('error')}")
+            
+            regions = "\n\n".join(
+                f"Lines {hunk['start_line']}-{hunk['end_line']}:\n{hunk['snippet']}" for hunk in result["hunks"]
+            )
+            count = f"{len(edits)} edits" if edits else "diff"
+            return self.success_response(f"Applied {count} to '{file_path}'.\n\n{regions}")
+            
+        except Exception as e:
+            return self.fail_response(f"Error applying edits: {str(e)}")
+
     @openapi_schema({
         "type": "function",
         "function": {
@@ -270,11 +348,11 @@ class SandboxFilesTool(SandboxToolsBase):
             
             file_path = self.clean_path(file_path)
             full_path = f"{self.workspace_path}/{file_path}"
-            if not self._file_exists(full_path):
+            if not await self._file_exists(full_path):
                 return self.fail_response(f"File '{file_path}' does not exist. Use create_file to create a new file.")
             
-            self.sandbox.fs.upload_file(full_path, file_contents.encode())
-            self.sandbox.fs.set_file_permissions(full_path, permissions)
+            await self.async_sandbox.fs.upload_file(full_path, file_contents.encode())
+            await self.async_sandbox.fs.set_file_permissions(full_path, permissions)
             
             # Get preview URL if it's an HTML file
             # preview_url = self._get_preview_url(file_path)
@@ -320,10 +398,10 @@ class SandboxFilesTool(SandboxToolsBase):
             
             file_path = self.clean_path(file_path)
             full_path = f"{self.workspace_path}/{file_path}"
-            if not self._file_exists(full_path):
+            if not await self._file_exists(full_path):
                 return self.fail_response(f"File '{file_path}' does not exist")
             
-            self.sandbox.fs.delete_file(full_path)
+            await self.async_sandbox.fs.delete_file(full_path)
             return self.success_response(f"File '{file_path}' deleted successfully.")
         except Exception as e:
             return self.fail_response(f"Error deleting file: {str(e)}")
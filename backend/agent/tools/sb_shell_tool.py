@@ -3,6 +3,9 @@ from uuid import uuid4
 from agentpress.tool import ToolResult, openapi_schema, xml_schema
 from sandbox.sandbox import SandboxToolsBase, Sandbox
 from agentpress.thread_manager import ThreadManager
+from agentpress.tool_progress import report_tool_progress
+from sandbox.commands import run_command
+from utils.config import config
 
 class SandboxShellTool(SandboxToolsBase):
     """Tool for executing tasks in a Daytona sandbox with browser-use capabilities. 
@@ -19,7 +22,7 @@ class SandboxShellTool(SandboxToolsBase):
             session_id = str(uuid4())
             try:
                 await self._ensure_sandbox()  # Ensure sandbox is initialized
-                self.sandbox.process.create_session(session_id)
+                await self.async_sandbox.process.create_session(session_id)
                 self._sessions[session_name] = session_id
             except Exception as e:
                 raise RuntimeError(f"Failed to create session: {str(e)}")
@@ -30,7 +33,7 @@ class SandboxShellTool(SandboxToolsBase):
         if session_name in self._sessions:
             try:
                 await self._ensure_sandbox()  # Ensure sandbox is initialized
-                self.sandbox.process.delete_session(self._sessions[session_name])
+                await self.async_sandbox.process.delete_session(self._sessions[session_name])
                 del self._sessions[session_name]
             except Exception as e:
                 print(f"Warning: Failed to cleanup session {session_name}: {str(e)}")
@@ -168,39 +171,42 @@ class SandboxShellTool(SandboxToolsBase):
                 folder = folder.strip('/')
                 cwd = f"{self.workspace_path}/{folder}"
             
-            # Ensure we're in the correct directory before executing the command
-            command = f"cd {cwd} && {command}"
-            
-            # Execute command in session
-            from sandbox.sandbox import SessionExecuteRequest
-            req = SessionExecuteRequest(
-                command=command,
-                var_async=False,  # This makes the command blocking by default
-                cwd=cwd  # Still set the working directory for reference
-            )
-            
-            response = self.sandbox.process.execute_session_command(
-                session_id=session_id,
-                req=req,
-                timeout=timeout
-            )
-            
-            # Get detailed logs
-            logs = self.sandbox.process.get_session_command_logs(
-                session_id=session_id,
-                command_id=response.cmd_id
+            async def report_output(output: str):
+                if output:
+                    await report_tool_progress("execute-command", session=session_name, output=output)
+
+            # Run asynchronously in the session, streaming output as it is produced
+            result = await run_command(
+                self.async_sandbox,
+                session_id,
+                command,
+                cwd,
+                timeout=int(timeout),
+                on_output=report_output,
+                poll_interval=config.SHELL_POLL_INTERVAL_MS / 1000,
+                head_bytes=config.SHELL_OUTPUT_HEAD_BYTES,
+                tail_bytes=config.SHELL_OUTPUT_TAIL_BYTES
             )
-            
-            if response.exit_code == 0:
+
+            if result.timed_out:
+                error_msg = (
+                    f"Command timed out after {timeout} seconds and is still running in session "
+                    f"'{session_name}'"
+                )
+                if result.output:
+                    error_msg += f". Output so far: {result.output}"
+                return self.fail_response(error_msg)
+
+            if result.exit_code == 0:
                 return self.success_response({
-                    "output": logs,
-                    "exit_code": response.exit_code,
+                    "output": result.output,
+                    "exit_code": result.exit_code,
                     "cwd": cwd
                 })
             else:
-                error_msg = f"Command failed with exit code {response.exit_code}"
-                if logs:
-                    error_msg += f": {logs}"
+                error_msg = f"Command failed with exit code {result.exit_code}"
+                if result.output:
+                    error_msg += f": {result.output}"
                 return self.fail_response(error_msg)
                 
         except Exception as e:
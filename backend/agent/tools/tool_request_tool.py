@@ -0,0 +1,71 @@
+import re
+from agentpress.tool import Tool, ToolResult, openapi_schema, xml_schema
+from agentpress.thread_manager import ThreadManager
+from agent.tool_selection import TOOL_GROUPS, add_tool_groups, described_groups
+
+_GROUP_LIST = "\n".join(f"- {group}: {info['description']}" for group, info in TOOL_GROUPS.items())
+
+
+class ToolRequestTool(Tool):
+    """Tool for asking for tool groups that are not described in the current run.
+
+    Only the tools needed for the detected task type are described to the
+    agent. This tool adds the requested groups to the description from the
+    agent's next step on.
+    """
+
+    def __init__(self, thread_manager: ThreadManager):
+        super().__init__()
+        self.thread_manager = thread_manager
+
+    @openapi_schema({
+        "type": "function",
+        "function": {
+            "name": "request_tools",
+            "description": f"Request tool groups that are not available yet. They become available on your next step. Available groups:\n{_GROUP_LIST}",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "groups": {
+                        "type": "string",
+                        "description": "Comma-separated names of the tool groups to add"
+                    }
+                },
+                "required": ["groups"]
+            }
+        }
+    })
+    @xml_schema(
+        tag_name="request-tools",
+        mappings=[
+            {"param_name": "groups", "node_type": "content", "path": "."}
+        ],
+        example=f'''
+        <!-- Only the tools needed for this task are described. If you need tools that are not listed, -->
+        <!-- request their groups here; they are available on your next step. Available groups: -->
+        <!--
+{_GROUP_LIST}
+        -->
+        <request-tools>
+        shell, files
+        </request-tools>
+        '''
+    )
+    async def request_tools(self, groups: str) -> ToolResult:
+        requested = [group.strip().lower() for group in re.split(r"[,\s]+", groups or "") if group.strip()]
+        if not requested:
+            return self.fail_response("No tool groups given. Available groups: " + ", ".join(TOOL_GROUPS))
+
+        unknown = [group for group in requested if group not in TOOL_GROUPS]
+        if unknown:
+            return self.fail_response(
+                f"Unknown tool groups: {', '.join(unknown)}. Available groups: {', '.join(TOOL_GROUPS)}"
+            )
+
+        registry = self.thread_manager.tool_registry
+        added = add_tool_groups(registry, requested)
+        return self.success_response({
+            "added": added,
+            "available": described_groups(registry),
+            "message": "The requested tools are available from your next step on."
+        })
@@ -0,0 +1,250 @@
+"""
+Agent worker.
+
+Pulls agent runs from the Redis run queue (services/run_queue.py) and executes
+them, up to a configured number at once. Leases on claimed runs are renewed by
+a heartbeat loop, and every worker also reaps expired leases so runs owned by a
+crashed worker are re-queued. A handler that stops a run at a checkpoint
+raises RunDrained, and the run is handed back to the queue to be resumed.
+
+The worker can run embedded in the API process (AGENT_WORKER_EMBEDDED=true) or
+as a separate process:
+
+    python -m agent.worker
+"""
+
+import asyncio
+import signal
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from services.run_queue import RunQueue, get_run_queue
+from utils.config import config
+from utils.logger import logger
+
+RunHandler = Callable[[str, Dict[str, Any]], Awaitable[None]]
+DeadRunHandler = Callable[[str], Awaitable[None]]
+
+
+class RunDrained(Exception):
+    """Raised by a run handler when the run stopped at a checkpoint to be resumed elsewhere."""
+
+
+class AgentWorker:
+    """Executes queued agent runs with bounded concurrency."""
+
+    def __init__(
+        self,
+        worker_id: str,
+        handler: RunHandler,
+        queue: Optional[RunQueue] = None,
+        concurrency: Optional[int] = None,
+        poll_interval: float = 0.5,
+        on_dead_run: Optional[DeadRunHandler] = None
+    ):
+        """Initialize the worker.
+
+        Args:
+            worker_id: Unique ID of this worker, used as the lease owner
+            handler: Coroutine called with (run_id, payload) for each claimed run
+            queue: Run queue to pull from (defaults to the shared queue)
+            concurrency: Max runs executed at once (defaults to AGENT_WORKER_CONCURRENCY)
+            poll_interval: Seconds to wait between claims when the queue is empty
+            on_dead_run: Coroutine called with run_id when a run exhausts its attempts
+        """
+        self.worker_id = worker_id
+        self.handler = handler
+        self.queue = queue or get_run_queue()
+        self.concurrency = concurrency or config.AGENT_WORKER_CONCURRENCY
+        self.poll_interval = poll_interval
+        self.on_dead_run = on_dead_run
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._loops: List[asyncio.Task] = []
+        self._claim_task: Optional[asyncio.Task] = None
+        self._running = False
+        self._slot_freed = asyncio.Event()
+
+    @property
+    def active_runs(self) -> List[str]:
+        """IDs of the runs currently executing on this worker."""
+        return list(self._tasks.keys())
+
+    async def start(self):
+        """Start claiming, heartbeating and reaping."""
+        if self._running:
+            return
+        self._running = True
+        self._claim_task = asyncio.create_task(self._claim_loop())
+        self._loops = [
+            self._claim_task,
+            asyncio.create_task(self._heartbeat_loop()),
+            asyncio.create_task(self._reaper_loop()),
+        ]
+        logger.info(f"Agent worker {self.worker_id} started (concurrency: {self.concurrency})")
+
+    async def stop_claiming(self):
+        """Stop taking new runs from the queue. Active runs keep their leases."""
+        if self._claim_task and not self._claim_task.done():
+            self._claim_task.cancel()
+            await asyncio.gather(self._claim_task, return_exceptions=True)
+
+    async def stop(self, timeout: float = 0):
+        """Stop claiming new runs and wait up to `timeout` seconds for active runs.
+
+        Leases are still renewed while waiting. Runs still executing after the
+        timeout are cancelled. Their leases are left to expire so the reaper
+        can re-queue them.
+        """
+        await self.stop_claiming()
+
+        tasks = list(self._tasks.values())
+        if tasks and timeout > 0:
+            await asyncio.wait(tasks, timeout=timeout)
+
+        self._running = False
+        self._slot_freed.set()
+        for loop_task in self._loops:
+            loop_task.cancel()
+        await asyncio.gather(*self._loops, return_exceptions=True)
+        self._loops = []
+
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        logger.info(f"Agent worker {self.worker_id} stopped")
+
+    async def _claim_loop(self):
+        while self._running:
+            if len(self._tasks) >= self.concurrency:
+                self._slot_freed.clear()
+                await self._slot_freed.wait()
+                continue
+
+            try:
+                claimed = await self.queue.claim(self.worker_id)
+            except Exception as e:
+                logger.error(f"Worker {self.worker_id} failed to claim from run queue: {str(e)}")
+                await asyncio.sleep(self.poll_interval * 4)
+                continue
+
+            if not claimed:
+                await asyncio.sleep(self.poll_interval)
+                continue
+
+            run_id, payload = claimed
+            self._tasks[run_id] = asyncio.create_task(self._execute(run_id, payload))
+
+    async def _execute(self, run_id: str, payload: Dict[str, Any]):
+        # Cancelled runs (lost lease or worker shutdown) are not acked so the
+        # lease expires and the run is re-queued.
+        cancelled = False
+        drained = False
+        try:
+            await self.handler(run_id, payload)
+        except RunDrained:
+            drained = True
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        except Exception as e:
+            logger.error(f"Worker {self.worker_id} failed executing agent run {run_id}: {str(e)}", exc_info=True)
+        finally:
+            self._tasks.pop(run_id, None)
+            self._slot_freed.set()
+            if drained:
+                try:
+                    await self.queue.release(run_id, self.worker_id)
+                    logger.info(f"Worker {self.worker_id} handed drained agent run {run_id} back to the queue")
+                except Exception as e:
+                    logger.warning(f"Failed to release agent run {run_id}: {str(e)}")
+            elif not cancelled:
+                try:
+                    await self.queue.ack(run_id, self.worker_id)
+                except Exception as e:
+                    logger.warning(f"Failed to ack agent run {run_id}: {str(e)}")
+
+    async def _heartbeat_loop(self):
+        interval = max(self.queue.lease_seconds / 3, 0.1)
+        while self._running:
+            await asyncio.sleep(interval)
+            for run_id, task in list(self._tasks.items()):
+                try:
+                    still_owned = await self.queue.heartbeat(run_id, self.worker_id)
+                except Exception as e:
+                    logger.warning(f"Heartbeat failed for agent run {run_id}: {str(e)}")
+                    continue
+                if not still_owned:
+                    logger.warning(f"Worker {self.worker_id} lost the lease on agent run {run_id}, cancelling it")
+                    task.cancel()
+
+    async def _reaper_loop(self):
+        while self._running:
+            await asyncio.sleep(self.queue.lease_seconds)
+            try:
+                _, dead = await self.queue.reap_expired()
+            except Exception as e:
+                logger.warning(f"Worker {self.worker_id} failed to reap expired leases: {str(e)}")
+                continue
+            if self.on_dead_run:
+                for run_id in dead:
+                    try:
+                        await self.on_dead_run(run_id)
+                    except Exception as e:
+                        logger.error(f"Failed to handle dead agent run {run_id}: {str(e)}")
+
+
+def create_agent_worker(worker_id: str) -> AgentWorker:
+    """Create a worker that executes runs through the agent API."""
+    from agent import api as agent_api
+
+    async def on_dead_run(run_id: str):
+        await agent_api.stop_agent_run(run_id, error_message="Agent run lost its worker too many times")
+
+    return AgentWorker(
+        worker_id=worker_id,
+        handler=agent_api.run_queued_agent_run,
+        on_dead_run=on_dead_run
+    )
+
+
+async def main():
+    """Run a standalone agent worker until SIGINT/SIGTERM."""
+    from agentpress.thread_manager import ThreadManager
+    from services.supabase import DBConnection
+    from services import redis
+    from agent import api as agent_api
+    from sandbox.browser_client import get_browser_clients
+    from sandbox.handle_cache import listen_for_sandbox_events
+    from sandbox.sandbox import sandbox_handles
+
+    worker_id = f"worker-{str(uuid.uuid4())[:8]}"
+    db = DBConnection()
+    await db.initialize()
+    agent_api.initialize(ThreadManager(), db, worker_id)
+    await redis.initialize_async()
+
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop_event.set)
+
+    sandbox_events_task = asyncio.create_task(
+        listen_for_sandbox_events(sandbox_handles, get_browser_clients().invalidate)
+    )
+    worker = create_agent_worker(worker_id)
+    await worker.start()
+    await stop_event.wait()
+
+    logger.info(f"Shutting down agent worker {worker_id}")
+    await worker.stop_claiming()
+    await agent_api.drain_agent_runs(config.AGENT_RUN_DRAIN_TIMEOUT)
+    await worker.stop()
+    sandbox_events_task.cancel()
+    await agent_api.cleanup()
+    await get_browser_clients().aclose()
+    await db.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
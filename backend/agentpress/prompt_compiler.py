@@ -0,0 +1,198 @@
+"""
+Compiled system prompts for AgentPress threads.
+
+The system prompt of a thread is the same for every LLM call of every run that
+uses the same model family and tool set: the agent prompt plus the XML tool
+examples of the registered tools. The compiler builds it once, together with
+its token count and content hash, and keeps the result at process level, so
+runs no longer concatenate the examples and count the prompt tokens on every
+call.
+
+Providers that cache prompt prefixes only on request (Anthropic and Gemini,
+directly or through OpenRouter) get a cache_control breakpoint on the system
+message, so the static prefix is processed and billed at full price once.
+Providers that cache prefixes automatically (OpenAI, DeepSeek) benefit from
+the prefix being byte-identical across calls.
+"""
+
+import copy
+import hashlib
+import json
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.logger import logger
+
+XML_EXAMPLES_HEADER = """
+--- XML TOOL CALLING ---
+
+In this environment you have access to a set of tools you can use to answer the user's question. The tools are specified in XML format.
+Format your tool calls using the specified XML tags. Place parameters marked as 'attribute' within the opening tag (e.g., `<tag attribute='value'>`). Place parameters marked as 'content' between the opening and closing tags. Place parameters marked as 'element' within their own child tags (e.g., `<tag><element>value</element></tag>`). Refer to the examples provided below for the exact structure of each tool.
+String and scalar parameters should be specified as attributes, while content goes between tags.
+Note that spaces for string values are not stripped. The output is parsed with regular expressions.
+
+Here are the XML tools available with examples:
+"""
+
+# Model families whose providers only cache prompt prefixes marked with cache_control
+PROMPT_CACHING_FAMILIES = ("anthropic", "claude", "google", "gemini")
+
+
+def model_family(model_name: str) -> str:
+    """Return the provider family of a model, e.g. "qwen" for "openrouter/qwen/qwen3-235b-a22b:free"."""
+    name = model_name.lower()
+    if name.startswith("openrouter/"):
+        name = name[len("openrouter/"):]
+    return name.split("/", 1)[0] if "/" in name else name.split("-", 1)[0]
+
+
+def supports_prompt_caching(model_name: str) -> bool:
+    """Whether the model's provider needs cache_control breakpoints to cache a prompt prefix."""
+    name = model_name.lower()
+    return any(family in name for family in PROMPT_CACHING_FAMILIES)
+
+
+def add_cache_breakpoints(messages: List[Dict[str, Any]], model_name: str) -> List[Dict[str, Any]]:
+    """Mark the end of the system prompt as a cache breakpoint if the provider supports it.
+
+    The messages are not modified; a new list is returned with a copy of the
+    system message.
+    """
+    if not messages or not supports_prompt_caching(model_name):
+        return messages
+    system_message = messages[0]
+    if system_message.get('role') != 'system':
+        return messages
+
+    content = system_message.get('content')
+    if isinstance(content, str):
+        blocks = [{"type": "text", "text": content}]
+    elif isinstance(content, list) and content:
+        blocks = copy.deepcopy(content)
+    else:
+        return messages
+    blocks[-1]["cache_control"] = {"type": "ephemeral"}
+    return [{**system_message, "content": blocks}] + list(messages[1:])
+
+
+@dataclass(frozen=True)
+class CompiledPrompt:
+    """An immutable system prompt ready to be sent to the LLM."""
+    content: Any
+    model_family: str
+    tool_set: Tuple[str, ...]
+    content_hash: str
+    token_count: int
+
+    @property
+    def message(self) -> Dict[str, Any]:
+        """A new system message dict with the compiled content."""
+        return {"role": "system", "content": copy.deepcopy(self.content) if isinstance(self.content, list) else self.content}
+
+
+class PromptCompiler:
+    """Builds and caches the system prompt per model family and tool set."""
+
+    def __init__(self, max_size: int = 64):
+        """Initialize the compiler.
+
+        Args:
+            max_size: Max compiled prompts kept; the least recently used are evicted first
+        """
+        self.max_size = max_size
+        self._prompts: "OrderedDict[tuple, CompiledPrompt]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def compile(
+        self,
+        system_prompt: Dict[str, Any],
+        llm_model: str,
+        xml_examples: Optional[Dict[str, str]] = None
+    ) -> CompiledPrompt:
+        """Return the compiled system prompt for a model and tool set.
+
+        Args:
+            system_prompt: System message with the agent prompt
+            llm_model: Model the prompt is sent to
+            xml_examples: XML tag name -> usage example of the registered tools, appended to the prompt
+
+        Returns:
+            The compiled prompt, shared by all callers with the same inputs
+        """
+        base_content = system_prompt.get('content')
+        family = model_family(llm_model)
+        tool_set = tuple(sorted(xml_examples)) if xml_examples else ()
+        base_key = base_content if isinstance(base_content, str) else json.dumps(base_content, sort_keys=True)
+        key = (family, tool_set, base_key)
+
+        compiled = self._prompts.get(key)
+        if compiled:
+            self.hits += 1
+            self._prompts.move_to_end(key)
+            return compiled
+
+        self.misses += 1
+        content = self._append_examples(base_content, xml_examples)
+        serialized = content if isinstance(content, str) else json.dumps(content, sort_keys=True)
+        compiled = CompiledPrompt(
+            content=content,
+            model_family=family,
+            tool_set=tool_set,
+            content_hash=hashlib.sha256(serialized.encode()).hexdigest(),
+            token_count=self._count_tokens(llm_model, content)
+        )
+        logger.info(
+            f"Compiled system prompt for {family} with {len(tool_set)} XML tools: "
+            f"{compiled.token_count} tokens, hash {compiled.content_hash[:12]}"
+        )
+
+        self._prompts[key] = compiled
+        while len(self._prompts) > self.max_size:
+            self._prompts.popitem(last=False)
+        return compiled
+
+    @staticmethod
+    def _append_examples(content: Any, xml_examples: Optional[Dict[str, str]]) -> Any:
+        if not xml_examples:
+            return copy.deepcopy(content)
+
+        examples_content = XML_EXAMPLES_HEADER
+        for tag_name, example in xml_examples.items():
+            examples_content += f"<{tag_name}> Example: {example}\\n"
+
+        if isinstance(content, str):
+            return content + examples_content
+        if isinstance(content, list):
+            content = copy.deepcopy(content)
+            for item in content:
+                if isinstance(item, dict) and item.get('type') == 'text' and 'text' in item:
+                    item['text'] += examples_content
+                    return content
+            logger.warning("System prompt content is a list but no text block found to append XML examples.")
+            return content
+        logger.warning(f"System prompt content is of unexpected type ({type(content)}), cannot add XML examples.")
+        return content
+
+    @staticmethod
+    def _count_tokens(llm_model: str, content: Any) -> int:
+        try:
+            from litellm import token_counter
+            return token_counter(model=llm_model, messages=[{"role": "system", "content": content}])
+        except Exception as e:
+            logger.warning(f"Could not count system prompt tokens for {llm_model}, estimating: {str(e)}")
+            serialized = content if isinstance(content, str) else json.dumps(content)
+            return len(serialized) // 4
+
+
+# Shared compiler instance
+prompt_compiler = None
+
+
+def get_prompt_compiler() -> PromptCompiler:
+    """Return the process-wide prompt compiler, creating it on first use."""
+    global prompt_compiler
+    if prompt_compiler is None:
+        prompt_compiler = PromptCompiler()
+    return prompt_compiler
@@ -16,6 +16,7 @@ from services.llm import make_llm_api_call
 from agentpress.tool import Tool
 from agentpress.tool_registry import ToolRegistry
 from agentpress.context_manager import ContextManager
+from agentpress.prompt_compiler import get_prompt_compiler
 from agentpress.response_processor import (
     ResponseProcessor,
     ProcessorConfig
@@ -200,51 +201,13 @@ class ThreadManager:
         if max_xml_tool_calls > 0 and not processor_config.max_xml_tool_calls:
             processor_config.max_xml_tool_calls = max_xml_tool_calls
 
-        # Create a working copy of the system prompt to potentially modify
-        working_system_prompt = system_prompt.copy()
-
-        # Add XML examples to system prompt if requested, do this only ONCE before the loop
+        # Compile the system prompt with the XML examples once per model family and tool set
+        xml_examples = None
         if include_xml_examples and processor_config.xml_tool_calling:
             xml_examples = self.tool_registry.get_xml_examples()
-            if xml_examples:
-                examples_content = """
---- XML TOOL CALLING ---
-
-In this environment you have access to a set of tools you can use to answer the user's question. The tools are specified in XML format.
-Format your tool calls using the specified XML tags. Place parameters marked as 'attribute' within the opening tag (e.g., `<tag attribute='value'>`). Place parameters marked as 'content' between the opening and closing tags. Place parameters marked as 'element' within their own child tags (e.g., `<tag><element>value</element></tag>`). Refer to the examples provided below for the exact structure of each tool.
-String and scalar parameters should be specified as attributes, while content goes between tags.
-Note that spaces for string values are not stripped. The output is parsed with regular expressions.
+        compiled_prompt = get_prompt_compiler().compile(system_prompt, llm_model, xml_examples)
+        working_system_prompt = compiled_prompt.message
 
-Here are the XML tools available with examples:
-"""
-                for tag_name, example in xml_examples.items():
-                    examples_content += f"<{tag_name}> Example: {example}\\n"
-
-                # # Save examples content to a file
-                # try:
-                #     with open('xml_examples.txt', 'w') as f:
-                #         f.write(examples_content)
-                #     logger.debug("Saved XML examples to xml_examples.txt")
-                # except Exception as e:
-                #     logger.error(f"Failed to save XML examples to file: {e}")
-
-                system_content = working_system_prompt.get('content')
-
-                if isinstance(system_content, str):
-                    working_system_prompt['content'] += examples_content
-                    logger.debug("Appended XML examples to string system prompt content.")
-                elif isinstance(system_content, list):
-                    appended = False
-                    for item in working_system_prompt['content']: # Modify the copy
-                        if isinstance(item, dict) and item.get('type') == 'text' and 'text' in item:
-                            item['text'] += examples_content
-                            logger.debug("Appended XML examples to the first text block in list system prompt content.")
-                            appended = True
-                            break
-                    if not appended:
-                        logger.warning("System prompt content is a list but no text block found to append XML examples.")
-                else:
-                    logger.warning(f"System prompt content is of unexpected type ({type(system_content)}), cannot add XML examples.")
         # Control whether we need to auto-continue due to tool_calls finish reason
         auto_continue = True
         auto_continue_count = 0
@@ -263,8 +226,8 @@ Here are the XML tools available with examples:
                 token_count = 0
                 try:
                     from litellm import token_counter
-                    # Use the potentially modified working_system_prompt for token counting
-                    token_count = token_counter(model=llm_model, messages=[working_system_prompt] + messages)
+                    # The system prompt's tokens were counted when it was compiled
+                    token_count = compiled_prompt.token_count + token_counter(model=llm_model, messages=messages)
                     token_threshold = self.context_manager.token_threshold
                     logger.info(f"Thread {thread_id} token count: {token_count}/{token_threshold} ({(token_count/token_threshold)*100:.1f}%)")
 
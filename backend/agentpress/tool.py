@@ -108,6 +108,10 @@ class Tool(ABC):
         fail_response: Create a failed result
     """
     
+    # Schemas are attached to the methods of the class, so they are discovered
+    # once per class and shared by all instances
+    _schema_cache: Dict[type, Dict[str, List[ToolSchema]]] = {}
+
     def __init__(self):
         """Initialize tool with empty schema registry."""
         self._schemas: Dict[str, List[ToolSchema]] = {}
@@ -116,10 +120,16 @@ class Tool(ABC):
 
     def _register_schemas(self):
         """Register schemas from all decorated methods."""
+        cached = Tool._schema_cache.get(self.__class__)
+        if cached is not None:
+            self._schemas.update(cached)
+            return
+
         for name, method in inspect.getmembers(self, predicate=inspect.ismethod):
             if hasattr(method, 'tool_schemas'):
                 self._schemas[name] = method.tool_schemas
                 logger.debug(f"Registered schemas for method '{name}' in {self.__class__.__name__}")
+        Tool._schema_cache[self.__class__] = dict(self._schemas)
 
     def get_schemas(self) -> Dict[str, List[ToolSchema]]:
         """Get all registered tool schemas.
@@ -0,0 +1,52 @@
+"""
+Transient progress events from running tools.
+
+A tool that takes a while (a build, an install) can report what it is doing
+before it returns its result. Events go to the progress sink of the current
+agent run, which forwards them to the run's live stream without storing them
+with the run's responses.
+
+The sink is held in a context variable: the agent run sets it once, and tool
+calls executed for that run, including those in tasks it spawns, see it.
+Without a sink, reporting is a no-op.
+"""
+
+from contextvars import ContextVar, Token
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from utils.logger import logger
+
+ProgressSink = Callable[[Dict[str, Any]], Awaitable[None]]
+
+_progress_sink: ContextVar[Optional[ProgressSink]] = ContextVar('tool_progress_sink', default=None)
+
+
+def set_progress_sink(sink: Optional[ProgressSink]) -> Token:
+    """Send progress events of the current context to sink; returns a token for reset_progress_sink."""
+    return _progress_sink.set(sink)
+
+
+def reset_progress_sink(token: Token):
+    _progress_sink.reset(token)
+
+
+async def report_tool_progress(tool: str, **data: Any) -> bool:
+    """Report progress of a running tool.
+
+    Args:
+        tool: Name of the tool (its XML tag)
+        **data: Event fields, e.g. output=...
+
+    Returns:
+        Whether a sink received the event
+    """
+    sink = _progress_sink.get()
+    if sink is None:
+        return False
+    try:
+        await sink({"type": "tool_progress", "tool": tool, **data})
+    except Exception as e:
+        # Progress is best effort and must never fail the tool
+        logger.debug(f"Failed to report progress of {tool}: {str(e)}")
+        return False
+    return True
@@ -1,4 +1,4 @@
-from typing import Dict, Type, Any, List, Optional, Callable
+from typing import Dict, Type, Any, List, Optional, Callable, Iterable, Set
 from agentpress.tool import Tool, SchemaType, ToolSchema
 from utils.logger import logger
 
@@ -19,13 +19,35 @@ class ToolRegistry:
         get_xml_tool: Get a tool by XML tag name
         get_openapi_schemas: Get OpenAPI schemas for function calling
         get_xml_examples: Get examples of XML tool usage
+        describe_only: Limit the tools described to the LLM to a subset
     """
     
     def __init__(self):
         """Initialize a new ToolRegistry instance."""
         self.tools = {}
         self.xml_tools = {}
+        self.described_tools: Optional[Set[str]] = None
+        self._openapi_schemas = None
+        self._xml_examples = None
         logger.debug("Initialized new ToolRegistry instance")
+
+    def describe_only(self, tool_names: Optional[Iterable[str]]):
+        """Limit the schemas and examples given to the LLM to some tools.
+
+        All registered tools stay executable; tools outside the subset are just
+        not described.
+
+        Args:
+            tool_names: Class names of the tools to describe, or None for all tools
+        """
+        described_tools = set(tool_names) if tool_names is not None else None
+        if described_tools != self.described_tools:
+            self.described_tools = described_tools
+            self._openapi_schemas = None
+            self._xml_examples = None
+
+    def _is_described(self, tool_info: Dict[str, Any]) -> bool:
+        return self.described_tools is None or type(tool_info['instance']).__name__ in self.described_tools
     
     def register_tool(self, tool_class: Type[Tool], function_names: Optional[List[str]] = None, **kwargs):
         """Register a tool with optional function filtering.
@@ -40,6 +62,8 @@ class ToolRegistry:
             - Handles both OpenAPI and XML schema registration
         """
         logger.debug(f"Registering tool class: {tool_class.__name__}")
+        self._openapi_schemas = None
+        self._xml_examples = None
         tool_instance = tool_class(**kwargs)
         schemas = tool_instance.get_schemas()
         
@@ -129,24 +153,35 @@ class ToolRegistry:
         Returns:
             List of OpenAPI-compatible schema definitions
         """
-        schemas = [
-            tool_info['schema'].schema 
-            for tool_info in self.tools.values()
-            if tool_info['schema'].schema_type == SchemaType.OPENAPI
-        ]
-        logger.debug(f"Retrieved {len(schemas)} OpenAPI schemas")
-        return schemas
+        if self._openapi_schemas is None:
+            self._openapi_schemas = [
+                tool_info['schema'].schema 
+                for tool_info in self.tools.values()
+                if tool_info['schema'].schema_type == SchemaType.OPENAPI and self._is_described(tool_info)
+            ]
+        logger.debug(f"Retrieved {len(self._openapi_schemas)} OpenAPI schemas")
+        return self._openapi_schemas
 
-    def get_xml_examples(self) -> Dict[str, str]:
-        """Get all XML tag examples.
+    def get_xml_examples(self, described_only: bool = True) -> Dict[str, str]:
+        """Get XML tag examples.
         
+        Args:
+            described_only: Only include the tools selected with describe_only()
+            
         Returns:
             Dict mapping tag names to their example usage
         """
+        if not described_only:
+            return self._collect_xml_examples(lambda tool_info: True)
+        if self._xml_examples is None:
+            self._xml_examples = self._collect_xml_examples(self._is_described)
+        logger.debug(f"Retrieved {len(self._xml_examples)} XML examples")
+        return self._xml_examples
+
+    def _collect_xml_examples(self, include: Callable[[Dict[str, Any]], bool]) -> Dict[str, str]:
         examples = {}
         for tool_info in self.xml_tools.values():
             schema = tool_info['schema']
-            if schema.xml_schema and schema.xml_schema.example:
+            if schema.xml_schema and schema.xml_schema.example and include(tool_info):
                 examples[schema.xml_schema.tag_name] = schema.xml_schema.example
-        logger.debug(f"Retrieved {len(examples)} XML examples")
         return examples
@@ -15,8 +15,15 @@ from collections import OrderedDict
 
 # Import the API modules
 from agent import api as agent_api
+from agent.tools.data_providers.RapidDataProviderBase import close_rapid_api_client, get_response_cache
 from sandbox import api as sandbox_api
+from sandbox.browser_client import get_browser_clients
+from sandbox.executor import get_sandbox_executor
+from sandbox.handle_cache import listen_for_sandbox_events
+from sandbox.pool import get_sandbox_pool
+from sandbox.sandbox import sandbox_handles
 from services import billing as billing_api
+from services.screenshot_store import get_screenshot_store
 from admin import api as admin_api
 from admin import activate_ai as activate_ai_api
 from routes import model_routes as model_api
@@ -28,6 +35,7 @@ load_dotenv()
 db = DBConnection()
 thread_manager = None
 instance_id = "single"
+agent_worker = None
 
 # Rate limiter state
 ip_tracker = OrderedDict()
@@ -36,7 +44,7 @@ MAX_CONCURRENT_IPS = 25
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    global thread_manager
+    global thread_manager, agent_worker
     logger.info(f"Starting up FastAPI application with instance ID: {instance_id} in {config.ENV_MODE.value} mode")
     
     try:
@@ -69,12 +77,57 @@ async def lifespan(app: FastAPI):
         
         # Start background tasks
         asyncio.create_task(agent_api.restore_running_agent_runs())
+        # Resume runs drained by instances that shut down after this one started;
+        # with the queue enabled, workers resume them instead
+        drained_claim_task = None
+        if not config.AGENT_RUN_QUEUE_ENABLED:
+            drained_claim_task = asyncio.create_task(
+                agent_api.run_drained_run_claimer(config.AGENT_DRAINED_RUN_CLAIM_INTERVAL)
+            )
+        # Drop cached sandbox handles and browser API clients when another process
+        # archives, stops or deletes a sandbox
+        sandbox_events_task = asyncio.create_task(
+            listen_for_sandbox_events(sandbox_handles, get_browser_clients().invalidate)
+        )
+        # Keep pre-started sandboxes ready for new projects
+        sandbox_pool_task = None
+        if get_sandbox_pool().enabled:
+            sandbox_pool_task = asyncio.create_task(get_sandbox_pool().run_replenisher())
+        # Delete browser screenshots past their retention
+        screenshot_purge_task = None
+        if config.BROWSER_SCREENSHOTS_BY_REFERENCE:
+            screenshot_purge_task = asyncio.create_task(get_screenshot_store().run_purger(db))
+        
+        # Start an embedded agent worker unless workers run as separate processes
+        if config.AGENT_RUN_QUEUE_ENABLED and config.AGENT_WORKER_EMBEDDED:
+            from agent.worker import create_agent_worker
+            agent_worker = create_agent_worker(f"{instance_id}-{str(uuid.uuid4())[:8]}")
+            await agent_worker.start()
         
         yield
         
+        # Stop claiming queued runs and drain in-flight runs to a checkpoint so
+        # they are resumed elsewhere. Runs that do not reach a checkpoint in time
+        # are cancelled; queued ones are re-queued once their leases expire.
+        if agent_worker:
+            await agent_worker.stop_claiming()
+        if drained_claim_task:
+            drained_claim_task.cancel()
+        await agent_api.drain_agent_runs(config.AGENT_RUN_DRAIN_TIMEOUT)
+        if agent_worker:
+            await agent_worker.stop()
+        
+        sandbox_events_task.cancel()
+        if sandbox_pool_task:
+            sandbox_pool_task.cancel()
+        if screenshot_purge_task:
+            screenshot_purge_task.cancel()
+        
         # Clean up agent resources
         logger.info("Cleaning up agent resources")
         await agent_api.cleanup()
+        await get_browser_clients().aclose()
+        await close_rapid_api_client()
         
         # Clean up Redis connection
         try:
@@ -217,7 +270,13 @@ async def health_check():
     return {
         "status": "ok", 
         "timestamp": datetime.now(timezone.utc).isoformat(),
-        "instance_id": instance_id
+        "instance_id": instance_id,
+        "sandbox_sdk": get_sandbox_executor().stats(),
+        "sandbox_handles": sandbox_handles.stats(),
+        "sandbox_pool": get_sandbox_pool().stats(),
+        "browser_api": get_browser_clients().stats(),
+        "browser_screenshots": get_screenshot_store().stats(),
+        "data_provider_cache": get_response_cache().stats()
     }
 
 if __name__ == "__main__":
@@ -1,14 +1,22 @@
 import os
+import re
 from typing import List, Optional
 
 from fastapi import FastAPI, UploadFile, File, HTTPException, APIRouter, Form, Depends, Request
-from fastapi.responses import Response, JSONResponse
+from fastapi.responses import Response, JSONResponse, StreamingResponse
 from pydantic import BaseModel
 
 from utils.logger import logger
+from utils.config import config
 from utils.auth_utils import get_current_user_id_from_jwt, get_user_id_from_stream_auth, get_optional_user_id
 from sandbox.sandbox import get_or_start_sandbox
+from sandbox.executor import AsyncSandbox
+from sandbox.uploads import upload_files
+from sandbox.downloads import (
+    RangeNotSatisfiable, etag_matches, file_etag, file_info, parse_range, preview_lines, stream_file
+)
 from services.supabase import DBConnection
+from services.screenshot_store import get_screenshot_store
 from agent.api import get_or_create_project_sandbox
 
 
@@ -16,6 +24,12 @@ from agent.api import get_or_create_project_sandbox
 router = APIRouter(tags=["sandbox"])
 db = None
 
+# Upper bound of the `lines` parameter of head/tail previews
+MAX_PREVIEW_LINES = 5000
+
+# Stored browser screenshots are named <sha1>.<ext> below their project
+SCREENSHOT_NAME_PATTERN = re.compile(r"^[0-9a-f]{40}\.(webp|jpg|png)$")
+
 def initialize(_db: DBConnection):
     """Initialize the sandbox API with resources from the main API."""
     global db
@@ -77,6 +91,35 @@ async def verify_sandbox_access(client, sandbox_id: str, user_id: Optional[str]
     
     raise HTTPException(status_code=403, detail="Not authorized to access this sandbox")
 
+async def verify_project_access(client, project_id: str, user_id: Optional[str] = None):
+    """
+    Verify that a user has access to a project, like verify_sandbox_access.
+    
+    Returns:
+        dict: Project data
+        
+    Raises:
+        HTTPException: If the user doesn't have access to the project or it doesn't exist
+    """
+    project_result = await client.table('projects').select('*').eq('project_id', project_id).execute()
+    
+    if not project_result.data or len(project_result.data) == 0:
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    project_data = project_result.data[0]
+
+    if project_data.get('is_public'):
+        return project_data
+    
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Authentication required for this resource")
+    
+    if project_data.get('account_id'):
+        # Same temporary skip of the account_user check as verify_sandbox_access
+        return project_data
+    
+    raise HTTPException(status_code=403, detail="Not authorized to access this project")
+
 async def get_sandbox_by_id_safely(client, sandbox_id: str):
     """
     Safely retrieve a sandbox object by its ID, using the project that owns it.
@@ -135,11 +178,10 @@ async def create_file(
         # Get sandbox using the safer method
         sandbox = await get_sandbox_by_id_safely(client, sandbox_id)
         
-        # Read file content directly from the uploaded file
-        content = await file.read()
-        
-        # Create file using raw binary content
-        sandbox.fs.upload_file(path, content)
+        # Upload from the request's spooled file; it is read only for the SDK call
+        result = await upload_files(AsyncSandbox(sandbox), [(path, file)], verify=False)
+        if result.failed:
+            raise Exception(result.failed[path])
         logger.info(f"File created at {path} in sandbox {sandbox_id}")
         
         return {"status": "success", "created": True, "path": path}
@@ -147,6 +189,37 @@ async def create_file(
         logger.error(f"Error creating file in sandbox {sandbox_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/sandboxes/{sandbox_id}/files/bulk")
+async def create_files(
+    sandbox_id: str,
+    path: str = Form("/workspace"),
+    files: List[UploadFile] = File(...),
+    request: Request = None,
+    user_id: Optional[str] = Depends(get_optional_user_id)
+):
+    """Upload several files into a directory of the sandbox in one request"""
+    logger.info(f"Received bulk upload request for sandbox {sandbox_id}, path: {path}, {len(files)} files, user_id: {user_id}")
+    client = await db.client
+    
+    # Verify the user has access to this sandbox
+    await verify_sandbox_access(client, sandbox_id, user_id)
+    
+    try:
+        sandbox = await get_sandbox_by_id_safely(client, sandbox_id)
+        
+        directory = path.rstrip('/')
+        uploads = [(f"{directory}/{os.path.basename(file.filename)}", file) for file in files if file.filename]
+        result = await upload_files(
+            AsyncSandbox(sandbox), uploads,
+            max_concurrency=config.SANDBOX_UPLOAD_CONCURRENCY,
+            tar_min_files=config.SANDBOX_UPLOAD_TAR_MIN_FILES
+        )
+        
+        return {"status": "success" if not result.failed else "partial", "uploaded": result.uploaded, "failed": result.failed}
+    except Exception as e:
+        logger.error(f"Error uploading files to sandbox {sandbox_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 # For backward compatibility, keep the JSON version too
 @router.post("/sandboxes/{sandbox_id}/files/json")
 async def create_file_json(
@@ -179,7 +252,7 @@ async def create_file_json(
             content = content.encode('utf-8')
         
         # Create file
-        sandbox.fs.upload_file(path, content)
+        await AsyncSandbox(sandbox).fs.upload_file(path, content)
         logger.info(f"File created at {path} in sandbox {sandbox_id}")
         
         return {"status": "success", "created": True, "path": path}
@@ -206,7 +279,7 @@ async def list_files(
         sandbox = await get_sandbox_by_id_safely(client, sandbox_id)
         
         # List files
-        files = sandbox.fs.list_files(path)
+        files = await AsyncSandbox(sandbox).fs.list_files(path)
         result = []
         
         for file in files:
@@ -233,35 +306,103 @@ async def list_files(
 async def read_file(
     sandbox_id: str, 
     path: str,
+    preview: Optional[str] = None,
+    lines: int = 100,
     request: Request = None,
     user_id: Optional[str] = Depends(get_optional_user_id)
 ):
-    """Read a file from the sandbox"""
+    """
+    Read a file from the sandbox.
+    
+    The content is streamed in chunks, so large files are never held in memory.
+    Supports single-range `Range` requests and `If-None-Match` with an ETag
+    derived from the file's size and modification time. With `preview=head`
+    or `preview=tail`, returns only the first or last `lines` lines as text.
+    """
     logger.info(f"Received file read request for sandbox {sandbox_id}, path: {path}, user_id: {user_id}")
     client = await db.client
     
     # Verify the user has access to this sandbox
     await verify_sandbox_access(client, sandbox_id, user_id)
     
+    if preview is not None and preview not in ("head", "tail"):
+        raise HTTPException(status_code=400, detail="preview must be 'head' or 'tail'")
+    if not 1 <= lines <= MAX_PREVIEW_LINES:
+        raise HTTPException(status_code=400, detail=f"lines must be between 1 and {MAX_PREVIEW_LINES}")
+    
     try:
         # Get sandbox using the safer method
-        sandbox = await get_sandbox_by_id_safely(client, sandbox_id)
+        sandbox = AsyncSandbox(await get_sandbox_by_id_safely(client, sandbox_id))
+        
+        info = await file_info(sandbox, path)
+        if info.is_dir:
+            raise HTTPException(status_code=400, detail="Path is a directory")
+        etag = file_etag(info.size, info.mod_time)
+        headers = {"ETag": etag, "Accept-Ranges": "bytes"}
+        
+        if request is not None and etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        
+        if preview:
+            content = await preview_lines(sandbox, path, preview, lines)
+            logger.info(f"Returned {preview} preview of {path} from sandbox {sandbox_id}")
+            return Response(content=content, media_type="text/plain; charset=utf-8", headers=headers)
         
-        # Read file
-        content = sandbox.fs.download_file(path)
+        try:
+            byte_range = parse_range(request.headers.get("range") if request is not None else None, info.size)
+        except RangeNotSatisfiable:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{info.size}"})
         
-        # Return a Response object with the content directly
         filename = os.path.basename(path)
-        logger.info(f"Successfully read file {filename} from sandbox {sandbox_id}")
-        return Response(
-            content=content,
+        headers["Content-Disposition"] = f"attachment; filename={filename}"
+        status_code = 200
+        start, end = 0, info.size - 1
+        if byte_range:
+            start, end = byte_range
+            status_code = 206
+            headers["Content-Range"] = f"bytes {start}-{end}/{info.size}"
+        headers["Content-Length"] = str(end - start + 1)
+        
+        logger.info(f"Streaming bytes {start}-{end} of {filename} from sandbox {sandbox_id}")
+        return StreamingResponse(
+            stream_file(sandbox, path, start, end, info.size, chunk_size=config.SANDBOX_DOWNLOAD_CHUNK_BYTES),
+            status_code=status_code,
             media_type="application/octet-stream",
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
+            headers=headers
         )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error reading file in sandbox {sandbox_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/project/{project_id}/browser-screenshots/{name}")
+async def get_browser_screenshot(
+    project_id: str,
+    name: str,
+    user_id: Optional[str] = Depends(get_optional_user_id)
+):
+    """
+    Get a browser screenshot that browser_state messages refer to by `screenshot_path`.
+    
+    Screenshots are named after their content, so they can be cached until
+    they are purged after the retention period.
+    """
+    if not SCREENSHOT_NAME_PATTERN.match(name):
+        raise HTTPException(status_code=400, detail="Invalid screenshot name")
+    client = await db.client
+    await verify_project_access(client, project_id, user_id)
+    
+    path = f"{project_id}/{name}"
+    data = await get_screenshot_store().load(client, path)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Screenshot not found")
+    return Response(
+        content=data,
+        media_type=get_screenshot_store().mime_type(path),
+        headers={"Cache-Control": f"private, max-age={get_screenshot_store().retention_seconds}, immutable"}
+    )
+
 @router.post("/project/{project_id}/sandbox/ensure-active")
 async def ensure_project_sandbox_active(
     project_id: str,
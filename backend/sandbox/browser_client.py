@@ -0,0 +1,268 @@
+"""
+Direct HTTP access to the browser automation API of a sandbox.
+
+Every browser action used to run `curl` inside the sandbox through
+`process.exec`: a blocking SDK request, a process spawn in the sandbox and
+shell quoting of the JSON payload, per click. BrowserApiClient calls the
+browser API (port 8002) through the sandbox's preview URL instead, with a
+pooled `httpx.AsyncClient` per sandbox that keeps its connections alive
+between actions.
+
+The curl path stays as the fallback. It is used when the preview link cannot
+be fetched or the request never reached the browser API (no connection, or
+the proxy rejected the token), and for a cooldown after such a failure.
+Requests that may have reached the API (read timeouts, dropped connections,
+gateway errors) are not retried, since browser actions are not idempotent.
+
+Per-transport latency is recorded, so the two paths can be compared in the
+health endpoint.
+"""
+
+import json
+import shlex
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import httpx
+
+from sandbox.executor import AsyncSandbox
+from utils.logger import logger
+
+BROWSER_API_PORT = 8002
+
+# Statuses of the preview proxy meaning the request did not reach the browser API
+_PROXY_ERROR_STATUSES = {401, 403}
+
+# Gateway statuses of the preview proxy; the action may have run in the sandbox
+_GATEWAY_ERROR_STATUSES = {502, 503, 504}
+
+
+class BrowserApiError(Exception):
+    """A browser API request failed on both transports."""
+
+
+def _merge_stats(total: Dict[str, Dict[str, float]], stats: Dict[str, Dict[str, float]]):
+    for transport, values in stats.items():
+        merged = total.setdefault(transport, {"calls": 0, "seconds": 0.0, "max_seconds": 0.0})
+        merged["calls"] += values["calls"]
+        merged["seconds"] += values["seconds"]
+        merged["max_seconds"] = max(merged["max_seconds"], values["max_seconds"])
+
+
+class BrowserApiClient:
+    """Sends browser automation requests for one sandbox, directly or through curl."""
+
+    def __init__(
+        self,
+        sandbox: AsyncSandbox,
+        direct: bool = True,
+        timeout: float = 30,
+        failure_cooldown: float = 60
+    ):
+        """Initialize the client.
+
+        Args:
+            sandbox: Sandbox running the browser API
+            direct: Use the preview URL; False always uses curl
+            timeout: Seconds a browser action may take
+            failure_cooldown: Seconds curl is used after the direct path failed
+        """
+        self.sandbox = sandbox
+        self.direct = direct
+        self.timeout = timeout
+        self.failure_cooldown = failure_cooldown
+        self._client: Optional[httpx.AsyncClient] = None
+        self._direct_disabled_until = 0.0
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self.fallbacks = 0
+
+    def _record(self, transport: str, duration: float):
+        _merge_stats(self._stats, {transport: {"calls": 1, "seconds": duration, "max_seconds": duration}})
+
+    async def _http_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            link = await self.sandbox.get_preview_link(BROWSER_API_PORT)
+            url = link.url if hasattr(link, 'url') else str(link)
+            token = getattr(link, 'token', None)
+            self._client = httpx.AsyncClient(
+                base_url=url.rstrip("/"),
+                headers={"X-Daytona-Preview-Token": token} if token else None,
+                timeout=httpx.Timeout(self.timeout, connect=5),
+                limits=httpx.Limits(max_connections=8, max_keepalive_connections=4)
+            )
+        return self._client
+
+    async def _request_direct(self, endpoint: str, params: Optional[Dict[str, Any]], method: str,
+                              query: Dict[str, str], timeout: float) -> Optional[str]:
+        """Send the request through the preview URL; None if it did not reach the browser API."""
+        try:
+            client = await self._http_client()
+        except Exception as e:
+            logger.warning(f"No preview link for the browser API of sandbox {self.sandbox.sandbox.id}: {str(e)}")
+            return None
+
+        request_timeout = httpx.Timeout(timeout, connect=5)
+        try:
+            if method == "GET":
+                response = await client.get(
+                    f"/api/automation/{endpoint}", params={**(params or {}), **query}, timeout=request_timeout
+                )
+            else:
+                response = await client.request(
+                    method, f"/api/automation/{endpoint}", json=params, params=query, timeout=request_timeout
+                )
+        except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as e:
+            logger.warning(f"Browser API of sandbox {self.sandbox.sandbox.id} unreachable: {str(e)}")
+            return None
+        except httpx.TimeoutException as e:
+            raise BrowserApiError(f"Browser action timed out after {timeout} seconds") from e
+        except httpx.TransportError as e:
+            raise BrowserApiError(f"Connection to the browser API was lost during the action: {str(e)}") from e
+
+        if response.status_code in _PROXY_ERROR_STATUSES:
+            logger.warning(f"Preview proxy of sandbox {self.sandbox.sandbox.id} returned {response.status_code}")
+            # The token may have changed with a restart; fetch the link again next time
+            await self.aclose()
+            return None
+        if response.status_code in _GATEWAY_ERROR_STATUSES:
+            raise BrowserApiError(
+                f"Preview proxy returned {response.status_code}; the browser action may not have completed"
+            )
+        return response.text
+
+    async def _request_curl(self, endpoint: str, params: Optional[Dict[str, Any]], method: str,
+                            query: Dict[str, str], timeout: float) -> str:
+        url = f"http://localhost:{BROWSER_API_PORT}/api/automation/{endpoint}"
+        if method == "GET" and params:
+            query = {**params, **query}
+        if query:
+            url = f"{url}?{httpx.QueryParams(query)}"
+        curl_cmd = f"curl -s -X {method} {shlex.quote(url)} -H 'Content-Type: application/json'"
+        if method != "GET" and params:
+            curl_cmd += f" -d {shlex.quote(json.dumps(params))}"
+
+        logger.debug(f"Executing curl command: {curl_cmd}")
+        response = await self.sandbox.process.exec(curl_cmd, timeout=timeout)
+        if response.exit_code != 0:
+            raise BrowserApiError(f"Browser automation request failed: {response}")
+        return response.result
+
+    async def request(
+        self,
+        endpoint: str,
+        params: Optional[Dict[str, Any]] = None,
+        method: str = "POST",
+        session: Optional[str] = None,
+        options: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None
+    ) -> str:
+        """Send a request to the browser API.
+
+        Args:
+            endpoint: Path below /api/automation/
+            params: JSON body, or query parameters for GET
+            method: HTTP method
+            session: Browser session (own context and tabs) to act in; the default session if None
+            options: Per-request options of the browser API, sent as query parameters
+            timeout: Seconds this action may take, for actions that outlast the client's timeout
+
+        Returns:
+            The response body
+        """
+        query = {**(options or {}), **({"session": session} if session else {})}
+        timeout = timeout or self.timeout
+        if self.direct and time.monotonic() >= self._direct_disabled_until:
+            started = time.monotonic()
+            body = await self._request_direct(endpoint, params, method, query, timeout)
+            if body is not None:
+                self._record("direct", time.monotonic() - started)
+                return body
+            self._direct_disabled_until = time.monotonic() + self.failure_cooldown
+            self.fallbacks += 1
+
+        started = time.monotonic()
+        body = await self._request_curl(endpoint, params, method, query, timeout)
+        self._record("curl", time.monotonic() - started)
+        return body
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Calls, total and max seconds per transport."""
+        return {transport: dict(values) for transport, values in self._stats.items()}
+
+    async def aclose(self):
+        if self._client is not None:
+            client, self._client = self._client, None
+            await client.aclose()
+
+
+class BrowserClientPool:
+    """Keeps one BrowserApiClient per sandbox, least recently used evicted first."""
+
+    def __init__(self, max_clients: int = 100, direct: bool = True, timeout: float = 30):
+        self.max_clients = max_clients
+        self.direct = direct
+        self.timeout = timeout
+        self._clients: "OrderedDict[str, BrowserApiClient]" = OrderedDict()
+        # Stats of clients that were closed
+        self._closed_stats: Dict[str, Dict[str, float]] = {}
+        self._closed_fallbacks = 0
+
+    async def _close(self, client: BrowserApiClient):
+        _merge_stats(self._closed_stats, client.stats())
+        self._closed_fallbacks += client.fallbacks
+        await client.aclose()
+
+    async def get(self, sandbox: AsyncSandbox) -> BrowserApiClient:
+        """Return the client of a sandbox, creating it on first use."""
+        sandbox_id = sandbox.sandbox.id
+        client = self._clients.get(sandbox_id)
+        if client is None:
+            client = BrowserApiClient(sandbox, direct=self.direct, timeout=self.timeout)
+            self._clients[sandbox_id] = client
+            while len(self._clients) > self.max_clients:
+                _, evicted = self._clients.popitem(last=False)
+                await self._close(evicted)
+        else:
+            # Handles are refreshed on revalidation; keep the client on the current one
+            client.sandbox = sandbox
+            self._clients.move_to_end(sandbox_id)
+        return client
+
+    async def invalidate(self, sandbox_id: str):
+        """Close the client of a sandbox, e.g. after it was stopped or deleted."""
+        client = self._clients.pop(sandbox_id, None)
+        if client:
+            await self._close(client)
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-transport calls and latency across all clients, and how often the direct path failed."""
+        transports: Dict[str, Dict[str, float]] = {}
+        _merge_stats(transports, self._closed_stats)
+        for client in self._clients.values():
+            _merge_stats(transports, client.stats())
+        for values in transports.values():
+            values["avg_ms"] = round(values["seconds"] / values["calls"] * 1000, 1) if values["calls"] else 0.0
+        fallbacks = self._closed_fallbacks + sum(client.fallbacks for client in self._clients.values())
+        return {"clients": len(self._clients), "fallbacks": fallbacks, "transports": transports}
+
+    async def aclose(self):
+        while self._clients:
+            _, client = self._clients.popitem()
+            await self._close(client)
+
+
+# Shared pool instance configured from the environment
+browser_clients = None
+
+
+def get_browser_clients() -> BrowserClientPool:
+    """Return the process-wide browser client pool, creating it on first use."""
+    global browser_clients
+    if browser_clients is None:
+        from utils.config import config
+        browser_clients = BrowserClientPool(
+            max_clients=config.BROWSER_API_CLIENT_POOL_SIZE,
+            direct=config.BROWSER_API_DIRECT
+        )
+    return browser_clients
@@ -0,0 +1,169 @@
+"""
+Shell commands in a sandbox session with live, bounded output.
+
+A blocking `execute_session_command` returns only when the command finished
+or timed out, with all of its output at once. run_command starts the command
+asynchronously in the session instead, with its output redirected to a log
+file, and polls: each poll reads only the bytes added to the log since the
+last one and hands them to an `on_output` callback, so callers can show
+progress while the command runs. The log is removed when run_command
+returns, also after a timeout or an error.
+
+Output is kept in an OutputBuffer that retains the first and last bytes of
+the output. Once the head is full, polls skip ahead to the part that can
+still end up in the tail, so a command that prints gigabytes costs the same
+memory and transfer as one that prints a page.
+"""
+
+import asyncio
+import base64
+import codecs
+import shlex
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+
+from sandbox.executor import AsyncSandbox
+from utils.logger import logger
+
+
+class OutputBuffer:
+    """Keeps the first head_bytes and the last tail_bytes of a byte stream."""
+
+    def __init__(self, head_bytes: int = 32768, tail_bytes: int = 32768):
+        self.head_bytes = head_bytes
+        self.tail_bytes = tail_bytes
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.total = 0
+
+    @property
+    def head_full(self) -> bool:
+        return len(self.head) >= self.head_bytes
+
+    def append(self, data: bytes):
+        self.total += len(data)
+        room = self.head_bytes - len(self.head)
+        if room > 0:
+            self.head += data[:room]
+            data = data[room:]
+        if data:
+            self.tail += data
+            del self.tail[:max(len(self.tail) - self.tail_bytes, 0)]
+
+    def skip(self, count: int):
+        """Account for bytes of the stream that were never read."""
+        self.total += count
+
+    @property
+    def omitted(self) -> int:
+        return self.total - len(self.head) - len(self.tail)
+
+    def text(self) -> str:
+        head = self.head.decode("utf-8", errors="replace")
+        if not self.omitted:
+            return head + self.tail.decode("utf-8", errors="replace")
+        return (
+            head
+            + f"\n\n... [{self.omitted} bytes of output omitted] ...\n\n"
+            + self.tail.decode("utf-8", errors="replace")
+        )
+
+
+@dataclass
+class CommandResult:
+    """Outcome of a command run with run_command."""
+    exit_code: Optional[int]
+    output: str
+    timed_out: bool
+    total_bytes: int
+
+
+async def run_command(
+    sandbox: AsyncSandbox,
+    session_id: str,
+    command: str,
+    cwd: str,
+    timeout: float = 60,
+    on_output: Optional[Callable[[str], Awaitable[None]]] = None,
+    poll_interval: float = 1.0,
+    head_bytes: int = 32768,
+    tail_bytes: int = 32768,
+    max_read_bytes: int = 262144
+) -> CommandResult:
+    """Run a command in a session and collect its output while it runs.
+
+    Args:
+        sandbox: Sandbox to run in
+        session_id: Session the command runs in, so it sees the session's state
+        command: Shell command
+        cwd: Directory to run the command in
+        timeout: Seconds to wait for the command; it keeps running after a timeout
+        on_output: Awaited with each new piece of output
+        poll_interval: Longest pause between polls; early polls come sooner
+        head_bytes, tail_bytes: Output retained from the start and the end
+        max_read_bytes: Most bytes read from the log per poll
+
+    Returns:
+        CommandResult; exit_code is None if the command timed out
+    """
+    from daytona_sdk import SessionExecuteRequest
+
+    log_path = f"/tmp/command-{uuid.uuid4().hex}.log"
+    quoted_log = shlex.quote(log_path)
+    try:
+        # A group, not a subshell, so the command can change the session's state (cd, export)
+        wrapped = f"{{ cd {cwd} && {command}\n}} > {quoted_log} 2>&1"
+        response = await sandbox.process.execute_session_command(
+            session_id, SessionExecuteRequest(command=wrapped, var_async=True)
+        )
+        command_id = response.cmd_id
+
+        buffer = OutputBuffer(head_bytes, tail_bytes)
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        offset = 0
+        exit_code = None
+        deadline = time.monotonic() + timeout
+        delay = min(0.2, poll_interval)
+
+        while True:
+            status = await sandbox.process.get_session_command(session_id, command_id)
+            exit_code = status.exit_code
+
+            # Drain the log; once the command finished, read until the end
+            while True:
+                read = await sandbox.process.exec(
+                    f"stat -c %s {quoted_log} 2>/dev/null || echo 0; "
+                    f"tail -c +{offset + 1} {quoted_log} 2>/dev/null | head -c {max_read_bytes} | base64 -w 0",
+                    timeout=30
+                )
+                size_line, _, encoded = (read.result or "").partition("\n")
+                size = int(size_line.strip() or 0)
+                chunk = base64.b64decode(encoded.strip()) if encoded.strip() else b""
+                if chunk:
+                    buffer.append(chunk)
+                    offset += len(chunk)
+                    if on_output:
+                        await on_output(decoder.decode(chunk))
+                # Bytes between the head and what can still reach the tail are never read
+                if buffer.head_full and size - offset > tail_bytes:
+                    buffer.skip(size - tail_bytes - offset)
+                    offset = size - tail_bytes
+                if exit_code is None or offset >= size or not chunk:
+                    break
+
+            if exit_code is not None:
+                break
+            if time.monotonic() >= deadline:
+                return CommandResult(None, buffer.text(), True, buffer.total)
+            await asyncio.sleep(min(delay, max(deadline - time.monotonic(), 0)))
+            delay = min(delay * 2, poll_interval)
+
+        return CommandResult(int(exit_code), buffer.text(), False, buffer.total)
+    finally:
+        # Also after a timeout or error: a command still running writes to the unlinked file
+        try:
+            await sandbox.process.exec(f"rm -f {quoted_log}", timeout=30)
+        except Exception as e:
+            logger.warning(f"Failed to remove command log {log_path}: {str(e)}")
@@ -1,4 +1,4 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Body
+from fastapi import FastAPI, APIRouter, HTTPException, Body, Depends, Query
 from playwright.async_api import async_playwright, Browser, Page, ElementHandle
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any, Union
@@ -14,8 +14,15 @@ import random
 from functools import cached_property
 import traceback
 import pytesseract
-from PIL import Image
+from PIL import Image, ImageChops
 import io
+import hashlib
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextvars import ContextVar
+import time
+from urllib.parse import urlparse
 
 #######################################################
 # Action model definitions
@@ -34,6 +41,7 @@ class ClickCoordinatesAction(BaseModel):
 
 class GoToUrlAction(BaseModel):
     url: str
+    profile: Optional[str] = None  # Navigation profile to switch to first: "fast" or "full"
 
 class InputTextAction(BaseModel):
     index: int
@@ -47,12 +55,17 @@ class SendKeysAction(BaseModel):
 
 class SearchGoogleAction(BaseModel):
     query: str
+    profile: Optional[str] = None
 
 class SwitchTabAction(BaseModel):
     page_id: int
 
 class OpenTabAction(BaseModel):
     url: str
+    profile: Optional[str] = None
+
+class NavigationProfileAction(BaseModel):
+    profile: str
 
 class CloseTabAction(BaseModel):
     page_id: int
@@ -76,6 +89,14 @@ class DoneAction(BaseModel):
     success: bool = True
     text: str = ""
 
+class BatchStep(BaseModel):
+    action: str  # Name of an /automation endpoint, e.g. "input_text"
+    params: Dict[str, Any] = {}
+
+class BatchAction(BaseModel):
+    actions: List[BatchStep]
+    timeout_ms: Optional[int] = None  # Time the actions may take; the state is captured after it
+
 #######################################################
 # DOM Structure Models
 #######################################################
@@ -260,7 +281,10 @@ class BrowserActionResult(BaseModel):
     url: Optional[str] = None
     title: Optional[str] = None
     elements: Optional[str] = None  # Formatted string of clickable elements
-    screenshot_base64: Optional[str] = None
+    screenshot_base64: Optional[str] = None  # Omitted when the screen did not change since the last result
+    screenshot_id: Optional[str] = None  # SHA-1 of the screenshot; the previous one's if unchanged
+    screenshot_mime_type: Optional[str] = None
+    screenshot_unchanged: bool = False
     pixels_above: int = 0
     pixels_below: int = 0
     content: Optional[str] = None
@@ -269,31 +293,600 @@ class BrowserActionResult(BaseModel):
     # Additional metadata
     element_count: int = 0  # Number of interactive elements found
     interactive_elements: Optional[List[Dict[str, Any]]] = None  # Simplified list of interactive elements
+    elements_delta: Optional[Dict[str, Any]] = None  # Changes since the last reported state (incremental mode)
+    steps: Optional[List[Dict[str, Any]]] = None  # Outcome of each action run by /automation/batch
     viewport_width: Optional[int] = None
     viewport_height: Optional[int] = None
     
     class Config:
         arbitrary_types_allowed = True
 
+#######################################################
+# Page Settle Detection
+#######################################################
+
+# An action is done when the DOM and network have been quiet for an adaptive
+# window between these bounds, or after the timeout, whichever comes first
+SETTLE_MIN_QUIET_MS = 100
+SETTLE_MAX_QUIET_MS = 500
+SETTLE_TIMEOUT_MS = 5000
+SETTLE_NAVIGATION_TIMEOUT_MS = 10000
+
+# Installed in every document (idempotent). Tracks the time of the last DOM
+# mutation, resource load or fetch/XHR start and end, and the requests in
+# flight. Requests open for longer than longRequestMs (long polling, streams)
+# no longer hold the page unsettled. The quiet window adapts to the page:
+# twice the recent gap between DOM mutations, so a page that renders in
+# bursts is not caught between two of them.
+PAGE_SETTLE_SCRIPT = """
+(() => {
+    if (window.__pageSettle) return;
+    const longRequestMs = 2000;
+    const state = { lastActivity: performance.now(), lastMutation: -Infinity, gaps: [], requests: new Map(), nextRequest: 0 };
+    const touch = () => { state.lastActivity = performance.now(); };
+    const mutated = () => {
+        const now = performance.now();
+        const gap = now - state.lastMutation;
+        if (gap > 0 && gap < 1000) {
+            state.gaps.push(gap);
+            if (state.gaps.length > 5) state.gaps.shift();
+        }
+        state.lastMutation = now;
+        touch();
+    };
+    const begin = () => {
+        const id = state.nextRequest++;
+        state.requests.set(id, performance.now());
+        touch();
+        return () => { state.requests.delete(id); touch(); };
+    };
+
+    new MutationObserver(mutated).observe(document, { subtree: true, childList: true, attributes: true, characterData: true });
+    try { new PerformanceObserver(touch).observe({ type: 'resource' }); } catch (e) {}
+
+    if (window.fetch) {
+        const originalFetch = window.fetch;
+        window.fetch = function (...args) {
+            const end = begin();
+            return originalFetch.apply(this, args).finally(end);
+        };
+    }
+    const originalSend = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function (...args) {
+        this.addEventListener('loadend', begin(), { once: true });
+        return originalSend.apply(this, args);
+    };
+
+    window.__pageSettle = {
+        wait(minQuietMs, maxQuietMs, timeoutMs) {
+            const started = performance.now();
+            return new Promise(resolve => {
+                const check = () => {
+                    const now = performance.now();
+                    const averageGap = state.gaps.length ? state.gaps.reduce((a, b) => a + b, 0) / state.gaps.length : 0;
+                    const quietMs = Math.min(maxQuietMs, Math.max(minQuietMs, averageGap * 2));
+                    const pending = [...state.requests.values()].filter(t => now - t < longRequestMs).length;
+                    // Effects of the action may start a moment after it, so always watch for one window
+                    const idleMs = now - Math.max(state.lastActivity, started);
+                    const settled = idleMs >= quietMs && pending === 0 && document.readyState !== 'loading';
+                    if (settled || now - started >= timeoutMs) {
+                        resolve({ settled, waited_ms: Math.round(now - started), quiet_ms: Math.round(quietMs) });
+                    } else {
+                        setTimeout(check, Math.max(16, Math.min(quietMs - idleMs, 50)));
+                    }
+                };
+                check();
+            });
+        }
+    };
+})();
+"""
+
+#######################################################
+# Element Tracking
+#######################################################
+
+# "full" returns every interactive element after each action; "incremental"
+# returns only what changed since the last reported state (elements_delta),
+# with the full list available from /automation/state
+BROWSER_STATE_MODE = os.getenv("BROWSER_STATE_MODE", "full")
+
+INTERACTIVE_SELECTOR = 'a, button, input, select, textarea, [role="button"], [role="link"], [role="checkbox"], [role="radio"], [tabindex]:not([tabindex="-1"])'
+
+# Installed in every document (idempotent). Interactive elements get a stable
+# data-agent-id, assigned in document order on the first scan, so their
+# indexes survive later changes to the page. A MutationObserver collects the
+# subtrees that changed; snapshot() re-describes only the elements in those
+# subtrees (text, attributes, computed visibility) and returns the ones whose
+# description or viewport membership changed since the previous snapshot,
+# plus the ids of all visible elements in document order. Geometry is read
+# for every tracked element, since scrolling and layout move elements
+# without mutating them.
+ELEMENT_TRACKER_SCRIPT = """
+(() => {
+    if (window.__elementTracker) return;
+    const SELECTOR = __INTERACTIVE_SELECTOR__;
+    const ID_ATTRIBUTE = 'data-agent-id';
+    const MAX_DIRTY_ROOTS = 200;
+    const documentId = Math.random().toString(36).slice(2);
+    const entries = new Map();  // id -> {element, description, key, styleVisible}
+    const reported = new Map();  // id -> key of the element in the previous snapshot
+    let dirty = new Set();
+    let needsFullScan = true;
+    let nextId = 1;
+
+    new MutationObserver(mutations => {
+        for (const mutation of mutations) {
+            if (mutation.type === 'attributes' && mutation.attributeName === ID_ATTRIBUTE) continue;
+            const target = mutation.type === 'characterData' ? mutation.target.parentElement : mutation.target;
+            if (target) dirty.add(target);
+        }
+    }).observe(document, { subtree: true, childList: true, attributes: true, characterData: true });
+
+    function describe(element) {
+        const attributes = {};
+        for (const attr of element.attributes) {
+            if (attr.name !== ID_ATTRIBUTE) attributes[attr.name] = attr.value;
+        }
+        return { tagName: element.tagName.toLowerCase(), text: element.innerText || element.value || '', attributes };
+    }
+
+    function update(element, seen) {
+        if (!element.matches(SELECTOR)) {
+            const id = Number(element.getAttribute(ID_ATTRIBUTE));
+            if (id) { entries.delete(id); element.removeAttribute(ID_ATTRIBUTE); }
+            return;
+        }
+        let id = Number(element.getAttribute(ID_ATTRIBUTE));
+        if (!id || (entries.has(id) && entries.get(id).element !== element)) {
+            // New element, or a clone carrying another element's id
+            id = nextId++;
+            element.setAttribute(ID_ATTRIBUTE, String(id));
+        }
+        const style = window.getComputedStyle(element);
+        const description = describe(element);
+        entries.set(id, {
+            element,
+            description,
+            key: JSON.stringify(description),
+            styleVisible: style.display !== 'none' && style.visibility !== 'hidden' && style.opacity !== '0'
+        });
+        seen.add(id);
+    }
+
+    window.__elementTracker = {
+        snapshot(full) {
+            const seen = new Set();
+            const roots = [...dirty].filter(root => root.isConnected);
+            dirty = new Set();
+            const fullScan = full || needsFullScan || roots.length > MAX_DIRTY_ROOTS ||
+                roots.some(root => root === document || root === document.documentElement || root === document.body);
+            needsFullScan = false;
+
+            if (fullScan) {
+                for (const element of document.querySelectorAll(SELECTOR)) update(element, seen);
+                for (const id of [...entries.keys()]) if (!seen.has(id)) entries.delete(id);
+            } else {
+                for (const root of roots) {
+                    if (root.nodeType !== Node.ELEMENT_NODE) continue;
+                    // The root itself, what it contains, and an interactive ancestor whose text it is part of
+                    const ancestor = root.parentElement && root.parentElement.closest(SELECTOR);
+                    if (ancestor) update(ancestor, seen);
+                    update(root, seen);
+                    for (const element of root.querySelectorAll(SELECTOR)) update(element, seen);
+                    for (const element of root.querySelectorAll('[' + ID_ATTRIBUTE + ']')) {
+                        if (!element.matches(SELECTOR)) update(element, seen);
+                    }
+                }
+                for (const [id, entry] of [...entries]) if (!entry.element.isConnected) entries.delete(id);
+            }
+
+            const order = [];
+            const changed = [];
+            const current = new Map();
+            for (const element of document.querySelectorAll('[' + ID_ATTRIBUTE + ']')) {
+                const id = Number(element.getAttribute(ID_ATTRIBUTE));
+                const entry = entries.get(id);
+                if (!entry || entry.element !== element || !entry.styleVisible) continue;
+                const rect = element.getBoundingClientRect();
+                if (rect.width <= 0 || rect.height <= 0) continue;
+                const isInViewport = rect.top >= 0 && rect.left >= 0 &&
+                    rect.bottom <= window.innerHeight && rect.right <= window.innerWidth;
+                const key = entry.key + (isInViewport ? '1' : '0');
+                order.push(id);
+                current.set(id, key);
+                if (fullScan || reported.get(id) !== key) {
+                    changed.push({
+                        index: id,
+                        tagName: entry.description.tagName,
+                        text: entry.description.text,
+                        attributes: entry.description.attributes,
+                        isVisible: true,
+                        isInteractive: true,
+                        pageCoordinates: { x: rect.left + window.scrollX, y: rect.top + window.scrollY, width: rect.width, height: rect.height },
+                        viewportCoordinates: { x: rect.left, y: rect.top, width: rect.width, height: rect.height },
+                        isInViewport
+                    });
+                }
+            }
+            reported.clear();
+            for (const [id, key] of current) reported.set(id, key);
+            return { documentId, full: fullScan, changed, order };
+        }
+    };
+})();
+""".replace("__INTERACTIVE_SELECTOR__", json.dumps(INTERACTIVE_SELECTOR))
+
+#######################################################
+# Screenshot OCR
+#######################################################
+
+# "always" runs OCR after every action; "auto" only when the page has less
+# than OCR_MIN_DOM_TEXT characters of text in its DOM (canvas, images of
+# text); "never" only when asked: ?ocr=true on an action, or /automation/ocr
+BROWSER_OCR_MODE = os.getenv("BROWSER_OCR_MODE", "auto")
+OCR_MIN_DOM_TEXT = int(os.getenv("BROWSER_OCR_MIN_DOM_TEXT", "200"))
+OCR_WORKERS = int(os.getenv("BROWSER_OCR_WORKERS", "1"))
+OCR_CACHE_SIZE = int(os.getenv("BROWSER_OCR_CACHE_SIZE", "64"))
+
+# Whether the current request asked for OCR (?ocr=true)
+ocr_requested: ContextVar[bool] = ContextVar("ocr_requested", default=False)
+
+# Screenshot the caller has a stored copy of (?known_screenshot=<id>); only
+# a screenshot matching it may be skipped as unchanged
+known_screenshot: ContextVar[Optional[str]] = ContextVar("known_screenshot", default=None)
+
+
+async def read_action_options(ocr: bool = Query(False), known_screenshot_id: Optional[str] = Query(None, alias="known_screenshot")):
+    """Router dependency: per-request options given as query parameters"""
+    ocr_requested.set(ocr)
+    known_screenshot.set(known_screenshot_id)
+
+
+def ocr_image_bytes(image_bytes: bytes) -> str:
+    """Run tesseract on an encoded image; runs in a worker process"""
+    image = Image.open(io.BytesIO(image_bytes))
+    return pytesseract.image_to_string(image).strip()
+
+
+class ScreenshotOcr:
+    """OCR of screenshots in a process pool, cached by screenshot hash
+    
+    Tesseract takes hundreds of milliseconds of CPU per screenshot; in the
+    request handler it stalled every other request to the API. Identical
+    screenshots (nothing changed on screen) are recognized once, and
+    concurrent requests for the same screenshot share one run.
+    """
+    
+    def __init__(self, workers: int = 1, cache_size: int = 64):
+        self.workers = workers
+        self.cache_size = cache_size
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._pending: Dict[str, asyncio.Future] = {}
+        self.stats = {"runs": 0, "cache_hits": 0, "errors": 0}
+    
+    async def text(self, image_bytes: bytes) -> str:
+        key = hashlib.sha1(image_bytes).hexdigest()
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            self.stats["cache_hits"] += 1
+            return self._cache[key]
+        if key in self._pending:
+            self.stats["cache_hits"] += 1
+            return await asyncio.shield(self._pending[key])
+        
+        if self._pool is None:
+            # Spawned, not forked: this process runs the browser driver's threads
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        future = asyncio.get_running_loop().run_in_executor(self._pool, ocr_image_bytes, image_bytes)
+        self._pending[key] = future
+        try:
+            text = await asyncio.shield(future)
+        except Exception:
+            self.stats["errors"] += 1
+            raise
+        finally:
+            self._pending.pop(key, None)
+        self.stats["runs"] += 1
+        self._cache[key] = text
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return text
+    
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+#######################################################
+# Screenshot Pipeline
+#######################################################
+
+# Screenshots are captured in CSS pixels, shrunk to fit SCREENSHOT_MAX_WIDTH x
+# SCREENSHOT_MAX_HEIGHT (0 keeps the size) and encoded as SCREENSHOT_FORMAT
+# ("webp" or "jpeg"). Quality starts at SCREENSHOT_QUALITY and is lowered
+# in steps, down to SCREENSHOT_MIN_QUALITY, while the image is larger than
+# SCREENSHOT_MAX_BYTES (0: no limit).
+SCREENSHOT_FORMAT = os.getenv("BROWSER_SCREENSHOT_FORMAT", "webp")
+SCREENSHOT_MAX_WIDTH = int(os.getenv("BROWSER_SCREENSHOT_MAX_WIDTH", "1280"))
+SCREENSHOT_MAX_HEIGHT = int(os.getenv("BROWSER_SCREENSHOT_MAX_HEIGHT", "1280"))
+SCREENSHOT_QUALITY = int(os.getenv("BROWSER_SCREENSHOT_QUALITY", "60"))
+SCREENSHOT_MIN_QUALITY = int(os.getenv("BROWSER_SCREENSHOT_MIN_QUALITY", "30"))
+SCREENSHOT_MAX_BYTES = int(os.getenv("BROWSER_SCREENSHOT_MAX_BYTES", "120000"))
+# A screenshot whose perceptual hash is at most this many bits away from the
+# one last sent for the page is not sent again, provided the caller names that
+# one as ?known_screenshot (it has a stored copy); -1 sends every screenshot. The
+# hash is taken at 256 pixels wide, where a single typed character already
+# flips a bit, so anything above 0 can hide small edits.
+SCREENSHOT_DEDUP_DISTANCE = int(os.getenv("BROWSER_SCREENSHOT_DEDUP_DISTANCE", "0"))
+SCREENSHOT_HASH_WIDTH = 256
+
+
+@dataclass
+class Screenshot:
+    data: bytes
+    mime_type: str
+    screenshot_id: str  # SHA-1 of data
+    phash: int
+    width: int
+    height: int
+
+
+def perceptual_hash(image: Image.Image, width: int = SCREENSHOT_HASH_WIDTH) -> int:
+    """Difference hash: one bit per horizontally neighbouring pixel pair of a grayscale thumbnail"""
+    height = max(1, width * image.height // image.width)
+    thumbnail = image.convert("L").resize((width + 1, height), Image.BILINEAR)
+    left = thumbnail.crop((0, 0, width, height))
+    right = thumbnail.crop((1, 0, width + 1, height))
+    # Nonzero where the left pixel is brighter
+    bits = ImageChops.subtract(left, right).point(lambda value: 255 if value else 0).convert("1")
+    return int.from_bytes(bits.tobytes(), "big")
+
+
+def hash_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def same_screen(sent: Optional[Screenshot], shot: Screenshot) -> bool:
+    """Whether shot looks like the screenshot already sent, so it need not be sent again"""
+    return (
+        sent is not None
+        and SCREENSHOT_DEDUP_DISTANCE >= 0
+        and (sent.width, sent.height) == (shot.width, shot.height)
+        and hash_distance(sent.phash, shot.phash) <= SCREENSHOT_DEDUP_DISTANCE
+    )
+
+
+def process_screenshot(raw: bytes) -> Screenshot:
+    """Downscale and encode a captured screenshot; CPU bound, runs in a thread"""
+    image = Image.open(io.BytesIO(raw)).convert("RGB")
+    if SCREENSHOT_MAX_WIDTH > 0 and SCREENSHOT_MAX_HEIGHT > 0:
+        image.thumbnail((SCREENSHOT_MAX_WIDTH, SCREENSHOT_MAX_HEIGHT), Image.LANCZOS)
+    image_format = "WEBP" if SCREENSHOT_FORMAT == "webp" else "JPEG"
+    quality = SCREENSHOT_QUALITY
+    while True:
+        buffer = io.BytesIO()
+        image.save(buffer, format=image_format, quality=quality)
+        data = buffer.getvalue()
+        if not SCREENSHOT_MAX_BYTES or len(data) <= SCREENSHOT_MAX_BYTES or quality <= SCREENSHOT_MIN_QUALITY:
+            break
+        quality = max(quality - 15, SCREENSHOT_MIN_QUALITY)
+    return Screenshot(
+        data=data,
+        mime_type=f"image/{image_format.lower()}",
+        screenshot_id=hashlib.sha1(data).hexdigest(),
+        phash=perceptual_hash(image),
+        width=image.width,
+        height=image.height
+    )
+
+#######################################################
+# Navigation Profiles
+#######################################################
+
+# Resource types blocked per profile. "fast" is for pages the agent reads
+# rather than looks at: no images, media or fonts, and no requests to known
+# tracker and ad domains. "full" loads everything, as a user would see it.
+NAVIGATION_PROFILES = {
+    "full": None,
+    "fast": {"image", "media", "font"},
+}
+BROWSER_NAVIGATION_PROFILE = os.getenv("BROWSER_NAVIGATION_PROFILE", "full")
+BLOCKED_DOMAINS = {
+    "google-analytics.com", "googletagmanager.com", "googlesyndication.com", "googleadservices.com",
+    "doubleclick.net", "adservice.google.com", "facebook.net", "connect.facebook.net", "hotjar.com",
+    "segment.io", "segment.com", "mixpanel.com", "amplitude.com", "fullstory.com", "clarity.ms",
+    "scorecardresearch.com", "quantserve.com", "taboola.com", "outbrain.com", "criteo.com",
+    "adnxs.com", "amazon-adsystem.com", "moatads.com", "newrelic.com", "nr-data.net",
+} | {domain.strip() for domain in os.getenv("BROWSER_BLOCKED_DOMAINS", "").split(",") if domain.strip()}
+
+# Request routing turns off the browser's HTTP cache, so routed pages keep
+# cacheable scripts and stylesheets in a disk cache of their own
+ROUTE_CACHE_DIR = os.getenv("BROWSER_ROUTE_CACHE_DIR", "/tmp/browser-route-cache")
+ROUTE_CACHE_MAX_BYTES = int(os.getenv("BROWSER_ROUTE_CACHE_MAX_MB", "200")) * 1024 * 1024
+ROUTE_CACHED_RESOURCE_TYPES = {"script", "stylesheet"}
+
+
+def is_blocked_domain(url: str) -> bool:
+    host = urlparse(url).hostname or ""
+    return any(host == domain or host.endswith("." + domain) for domain in BLOCKED_DOMAINS)
+
+
+def cache_lifetime(headers: Dict[str, str]) -> int:
+    """Seconds a response may be served from the cache by its Cache-Control max-age; 0 if not cacheable"""
+    cache_control = headers.get("cache-control", "").lower()
+    if "set-cookie" in headers or any(word in cache_control for word in ("no-store", "no-cache", "private")):
+        return 0
+    match = re.search(r"(?:s-maxage|max-age)=(\d+)", cache_control)
+    return int(match.group(1)) if match else 0
+
+
+class RouteCache:
+    """Disk cache of GET responses for routed pages, least recently stored evicted first"""
+    
+    # Not replayed: the body is stored decoded, and its length may differ
+    DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "set-cookie"}
+    
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._index: Optional["OrderedDict[str, int]"] = None
+        self._size = 0
+    
+    def _paths(self, key: str) -> tuple:
+        return os.path.join(self.directory, f"{key}.json"), os.path.join(self.directory, f"{key}.body")
+    
+    def _load_index(self):
+        if self._index is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".body"):
+                path = os.path.join(self.directory, name)
+                entries.append((os.path.getmtime(path), name[:-len(".body")], os.path.getsize(path)))
+        self._index = OrderedDict((key, size) for _, key, size in sorted(entries))
+        self._size = sum(self._index.values())
+    
+    def _remove(self, key: str):
+        self._size -= self._index.pop(key, 0)
+        for path in self._paths(key):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+    
+    def get(self, url: str) -> Optional[tuple]:
+        """(status, headers, body) of a fresh cached response, or None"""
+        self._load_index()
+        key = hashlib.sha1(url.encode()).hexdigest()
+        if key not in self._index:
+            return None
+        meta_path, body_path = self._paths(key)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if meta["expires"] < time.time():
+                self._remove(key)
+                return None
+            with open(body_path, "rb") as f:
+                return meta["status"], meta["headers"], f.read()
+        except (OSError, ValueError, KeyError):
+            self._remove(key)
+            return None
+    
+    def put(self, url: str, status: int, headers: Dict[str, str], body: bytes) -> bool:
+        """Store a response if its headers allow caching; returns whether it was stored"""
+        lifetime = cache_lifetime(headers)
+        if status != 200 or lifetime <= 0 or len(body) > self.max_bytes // 10:
+            return False
+        self._load_index()
+        key = hashlib.sha1(url.encode()).hexdigest()
+        self._remove(key)
+        meta_path, body_path = self._paths(key)
+        with open(body_path, "wb") as f:
+            f.write(body)
+        with open(meta_path, "w") as f:
+            json.dump({
+                "url": url,
+                "status": status,
+                "headers": {name: value for name, value in headers.items() if name not in self.DROPPED_HEADERS},
+                "expires": time.time() + lifetime
+            }, f)
+        self._index[key] = len(body)
+        self._size += len(body)
+        while self._size > self.max_bytes and self._index:
+            self._remove(next(iter(self._index)))
+        return True
+
+#######################################################
+# Batched Actions
+#######################################################
+
+BATCH_MAX_ACTIONS = int(os.getenv("BROWSER_BATCH_MAX_ACTIONS", "20"))
+# Without a timeout from the caller, each action of a batch gets as long as a navigation may settle
+BATCH_ACTION_TIMEOUT_MS = SETTLE_NAVIGATION_TIMEOUT_MS
+
+# Set while /automation/batch runs its actions: after each one the page is
+# only left to settle, and the state is captured once after the last action
+state_capture_deferred: ContextVar[bool] = ContextVar("state_capture_deferred", default=False)
+
+#######################################################
+# Browser Sessions
+#######################################################
+
+# Each session (?session=<id> on any request, "default" without) gets its own
+# browser context: cookies, storage, tabs and navigation profile. Actions on
+# one session run one at a time; sessions run in parallel. Sessions are made
+# on first use, and all but the default one are closed after being idle for
+# BROWSER_SESSION_IDLE_SECONDS, or when BROWSER_MAX_SESSIONS is reached.
+BROWSER_HEADLESS = os.getenv("BROWSER_HEADLESS", "true").lower() != "false"
+BROWSER_MAX_SESSIONS = int(os.getenv("BROWSER_MAX_SESSIONS", "8"))
+BROWSER_SESSION_IDLE_SECONDS = int(os.getenv("BROWSER_SESSION_IDLE_SECONDS", "900"))
+DEFAULT_SESSION = "default"
+SESSION_ID_PATTERN = re.compile(r"^[\w.-]{1,64}$")
+
+
+class BrowserSession:
+    """A browser context with its tabs; the lock is held for the whole of each action"""
+    
+    def __init__(self, session_id: str, context):
+        self.session_id = session_id
+        self.context = context
+        self.pages: List[Page] = []
+        self.current_page_index = 0
+        self.navigation_profile = BROWSER_NAVIGATION_PROFILE if BROWSER_NAVIGATION_PROFILE in NAVIGATION_PROFILES else "full"
+        self.route_handler = None
+        self.lock = asyncio.Lock()
+        self.last_used = time.monotonic()
+        self.closed = False
+
+
+# The session of the request being handled
+current_session: ContextVar[Optional[BrowserSession]] = ContextVar("current_session", default=None)
+
 #######################################################
 # Browser Automation Implementation 
 #######################################################
 
 class BrowserAutomation:
     def __init__(self):
-        self.router = APIRouter()
+        self.router = APIRouter(dependencies=[Depends(read_action_options), Depends(self.use_session)])
         self.browser: Browser = None
-        self.pages: List[Page] = []
-        self.current_page_index: int = 0
+        self.sessions: Dict[str, BrowserSession] = {}
+        self._sessions_lock = asyncio.Lock()
+        self._evictor: Optional[asyncio.Task] = None
         self.logger = logging.getLogger("browser_automation")
         self.include_attributes = ["id", "href", "src", "alt", "aria-label", "placeholder", "name", "role", "title", "value"]
         self.screenshot_dir = os.path.join(os.getcwd(), "screenshots")
         os.makedirs(self.screenshot_dir, exist_ok=True)
+        # Per page: element nodes by index, reused while the tracker reports them unchanged
+        self.element_caches: Dict[Page, Dict[str, Any]] = {}
+        # Per page: node and description of each element as last reported, for elements_delta
+        self.reported_elements: Dict[Page, Dict[int, tuple]] = {}
+        # Per page: the screenshot last sent, to skip sending unchanged screens again
+        self.sent_screenshots: Dict[Page, Screenshot] = {}
+        self.ocr = ScreenshotOcr(workers=OCR_WORKERS, cache_size=OCR_CACHE_SIZE)
+        self.route_cache = RouteCache(ROUTE_CACHE_DIR, ROUTE_CACHE_MAX_BYTES)
+        self.navigation_stats = {"blocked": 0, "cache_hits": 0, "cache_stores": 0}
         
         # Register routes
         self.router.on_startup.append(self.startup)
         self.router.on_shutdown.append(self.shutdown)
         
+        # Current state, with every interactive element
+        self.router.post("/automation/state")(self.get_state)
+        # Text of the current screen, recognized on demand
+        self.router.post("/automation/ocr")(self.ocr_screen)
+        # Resources loaded by every page: "fast" or "full"
+        self.router.post("/automation/navigation_profile")(self.set_navigation_profile)
+        # Close the session of the request, e.g. when its task is done
+        self.router.post("/automation/close_session")(self.close_session_endpoint)
+        # Not bound to a session, so it answers while sessions are busy
+        self.sessions_router = APIRouter()
+        self.sessions_router.get("/automation/sessions")(self.list_sessions)
+        
         # Basic navigation
         self.router.post("/automation/navigate_to")(self.navigate_to)
         self.router.post("/automation/search_google")(self.search_google)
@@ -326,6 +919,29 @@ class BrowserAutomation:
         
         # Drag and drop
         self.router.post("/automation/drag_drop")(self.drag_drop)
+        
+        # Several actions, one state capture
+        self.router.post("/automation/batch")(self.batch)
+        # Actions a batch may contain, called with the step's params
+        self.batch_actions = {
+            "navigate_to": lambda params: self.navigate_to(GoToUrlAction(**params)),
+            "search_google": lambda params: self.search_google(SearchGoogleAction(**params)),
+            "go_back": lambda params: self.go_back(NoParamsAction()),
+            "wait": lambda params: self.wait(params.get("seconds", 3)),
+            "click_element": lambda params: self.click_element(ClickElementAction(**params)),
+            "click_coordinates": lambda params: self.click_coordinates(ClickCoordinatesAction(**params)),
+            "input_text": lambda params: self.input_text(InputTextAction(**params)),
+            "send_keys": lambda params: self.send_keys(SendKeysAction(**params)),
+            "switch_tab": lambda params: self.switch_tab(SwitchTabAction(**params)),
+            "open_tab": lambda params: self.open_tab(OpenTabAction(**params)),
+            "close_tab": lambda params: self.close_tab(CloseTabAction(**params)),
+            "scroll_down": lambda params: self.scroll_down(ScrollAction(**params)),
+            "scroll_up": lambda params: self.scroll_up(ScrollAction(**params)),
+            "scroll_to_text": lambda params: self.scroll_to_text(params["text"]),
+            "select_dropdown_option": lambda params: self.select_dropdown_option(params["index"], params["option_text"]),
+            "drag_drop": lambda params: self.drag_drop(DragDropAction(**params)),
+            "navigation_profile": lambda params: self.set_navigation_profile(NavigationProfileAction(**params)),
+        }
 
     async def startup(self):
         """Initialize the browser instance on startup"""
@@ -334,9 +950,9 @@ class BrowserAutomation:
             playwright = await async_playwright().start()
             print("Playwright started, launching browser...")
             
-            # Use non-headless mode for testing with slower timeouts
+            # Headless unless BROWSER_HEADLESS=false, e.g. to watch the browser over VNC
             launch_options = {
-                "headless": False,
+                "headless": BROWSER_HEADLESS,
                 "timeout": 60000
             }
             
@@ -351,21 +967,10 @@ class BrowserAutomation:
                 self.browser = await playwright.chromium.launch(**launch_options)
                 print("Browser launched with minimal options")
 
-            try:
-                await self.get_current_page()
-                print("Found existing page, using it")
-                self.current_page_index = 0
-            except Exception as page_error:
-                print(f"Error finding existing page, creating new one. ( {page_error})")
-                page = await self.browser.new_page()
-                print("New page created successfully")
-                self.pages.append(page)
-                self.current_page_index = 0
-                # Navigate to about:blank to ensure page is ready
-                # await page.goto("google.com", timeout=30000)
-                print("Navigated to google.com")
-                
-                print("Browser initialization completed successfully")
+            # The default session is ready from the start; others are made on first use
+            await self.get_session(DEFAULT_SESSION)
+            self._evictor = asyncio.create_task(self.evict_idle_sessions())
+            print("Browser initialization completed successfully")
         except Exception as e:
             print(f"Browser startup error: {str(e)}")
             traceback.print_exc()
@@ -373,86 +978,268 @@ class BrowserAutomation:
             
     async def shutdown(self):
         """Clean up browser instance on shutdown"""
+        self.ocr.shutdown()
+        if self._evictor:
+            self._evictor.cancel()
         if self.browser:
             await self.browser.close()
     
+    @property
+    def session(self) -> BrowserSession:
+        """Session of the current request; the default session outside of requests"""
+        session = current_session.get() or self.sessions.get(DEFAULT_SESSION)
+        if session is None:
+            raise HTTPException(status_code=500, detail="Browser not started")
+        return session
+    
+    # Tabs and profile of the current session
+    
+    @property
+    def pages(self) -> List[Page]:
+        return self.session.pages
+    
+    @property
+    def current_page_index(self) -> int:
+        return self.session.current_page_index
+    
+    @current_page_index.setter
+    def current_page_index(self, index: int):
+        self.session.current_page_index = index
+    
+    @property
+    def navigation_profile(self) -> str:
+        return self.session.navigation_profile
+    
+    async def get_session(self, session_id: str) -> BrowserSession:
+        """Return a session, creating its context and first tab on first use"""
+        session = self.sessions.get(session_id)
+        if session is not None:
+            return session
+        async with self._sessions_lock:
+            if session_id in self.sessions:
+                return self.sessions[session_id]
+            if self.browser is None:
+                raise HTTPException(status_code=503, detail="Browser not started")
+            while len(self.sessions) >= BROWSER_MAX_SESSIONS:
+                # Make room: close the least recently used session that is not busy
+                idle = [s for s in self.sessions.values() if s.session_id != DEFAULT_SESSION and not s.lock.locked()]
+                if not idle:
+                    raise HTTPException(status_code=503, detail=f"All {BROWSER_MAX_SESSIONS} browser sessions are busy")
+                await self.close_session(min(idle, key=lambda s: s.last_used))
+            
+            session = BrowserSession(session_id, await self.browser.new_context())
+            session.route_handler = lambda route: self.route_request(session, route)
+            session.pages.append(await self.new_page(session))
+            self.sessions[session_id] = session
+            print(f"Browser session '{session_id}' created ({len(self.sessions)} open)")
+            return session
+    
+    async def close_session(self, session: BrowserSession):
+        session.closed = True
+        self.sessions.pop(session.session_id, None)
+        for page in session.pages:
+            self.element_caches.pop(page, None)
+            self.reported_elements.pop(page, None)
+            self.sent_screenshots.pop(page, None)
+        session.pages.clear()
+        try:
+            await session.context.close()
+        except Exception as e:
+            print(f"Error closing browser session '{session.session_id}': {e}")
+        print(f"Browser session '{session.session_id}' closed ({len(self.sessions)} open)")
+    
+    async def evict_idle_sessions(self):
+        """Close sessions other than the default one once they have been idle for too long"""
+        while True:
+            await asyncio.sleep(min(60, BROWSER_SESSION_IDLE_SECONDS))
+            cutoff = time.monotonic() - BROWSER_SESSION_IDLE_SECONDS
+            for session in list(self.sessions.values()):
+                if session.session_id != DEFAULT_SESSION and session.last_used < cutoff and not session.lock.locked():
+                    await self.close_session(session)
+    
+    async def use_session(self, session: str = Query(DEFAULT_SESSION)):
+        """Router dependency: runs the request on its session, holding the session's lock"""
+        if not SESSION_ID_PATTERN.match(session):
+            raise HTTPException(status_code=400, detail="Invalid session ID")
+        while True:
+            browser_session = await self.get_session(session)
+            await browser_session.lock.acquire()
+            if not browser_session.closed:
+                break
+            # Closed while waiting for it
+            browser_session.lock.release()
+        token = current_session.set(browser_session)
+        try:
+            yield
+        finally:
+            browser_session.last_used = time.monotonic()
+            current_session.reset(token)
+            browser_session.lock.release()
+    
+    async def close_session_endpoint(self):
+        """Close the session of the request with its tabs; it starts fresh when used again"""
+        session = self.session
+        await self.close_session(session)
+        return BrowserActionResult(success=True, message=f"Closed browser session '{session.session_id}'")
+    
+    async def list_sessions(self):
+        now = time.monotonic()
+        return {
+            "sessions": [
+                {
+                    "session_id": session.session_id,
+                    "tabs": len(session.pages),
+                    "busy": session.lock.locked(),
+                    "idle_seconds": int(now - session.last_used),
+                    "navigation_profile": session.navigation_profile
+                }
+                for session in self.sessions.values()
+            ],
+            "max_sessions": BROWSER_MAX_SESSIONS,
+            "headless": BROWSER_HEADLESS
+        }
+    
+    async def new_page(self, session: Optional[BrowserSession] = None) -> Page:
+        """Open a tab in a session (the current one by default) with the settle and element
+        tracker scripts and the session's navigation profile"""
+        session = session or self.session
+        page = await session.context.new_page()
+        await page.add_init_script(PAGE_SETTLE_SCRIPT)
+        await page.add_init_script(ELEMENT_TRACKER_SCRIPT)
+        await self.apply_navigation_profile(page, session)
+        return page
+    
+    async def route_request(self, session: BrowserSession, route):
+        """Request handler of pages with the "fast" profile"""
+        request = route.request
+        blocked_types = NAVIGATION_PROFILES[session.navigation_profile] or set()
+        if request.resource_type in blocked_types or is_blocked_domain(request.url):
+            self.navigation_stats["blocked"] += 1
+            await route.abort("blockedbyclient")
+            return
+        if request.method != "GET" or request.resource_type not in ROUTE_CACHED_RESOURCE_TYPES:
+            await route.continue_()
+            return
+        
+        cached = await asyncio.to_thread(self.route_cache.get, request.url)
+        if cached:
+            status, headers, body = cached
+            self.navigation_stats["cache_hits"] += 1
+            await route.fulfill(status=status, headers=headers, body=body)
+            return
+        try:
+            response = await route.fetch()
+            body = await response.body()
+        except Exception as e:
+            print(f"Error fetching {request.url}: {e}")
+            await route.abort("failed")
+            return
+        if await asyncio.to_thread(self.route_cache.put, request.url, response.status, response.headers, body):
+            self.navigation_stats["cache_stores"] += 1
+        await route.fulfill(response=response, body=body)
+    
+    async def apply_navigation_profile(self, page: Page, session: BrowserSession):
+        # Routing costs a round trip to this process per request; pages that load everything skip it
+        await page.unroute("**/*", session.route_handler)
+        if NAVIGATION_PROFILES[session.navigation_profile]:
+            await page.route("**/*", session.route_handler)
+    
+    async def switch_navigation_profile(self, profile: str):
+        """Use a navigation profile for every page of the session; takes effect with the next requests"""
+        if profile not in NAVIGATION_PROFILES:
+            raise ValueError(f"Unknown navigation profile '{profile}', expected one of {', '.join(NAVIGATION_PROFILES)}")
+        session = self.session
+        if profile != session.navigation_profile:
+            session.navigation_profile = profile
+            for page in session.pages:
+                await self.apply_navigation_profile(page, session)
+    
+    async def set_navigation_profile(self, action: NavigationProfileAction = Body(...)):
+        """Switch every page to a navigation profile"""
+        try:
+            await self.switch_navigation_profile(action.profile)
+            return BrowserActionResult(
+                success=True,
+                message=f"Navigation profile set to '{action.profile}' ({self.navigation_stats['blocked']} requests blocked so far)"
+            )
+        except Exception as e:
+            return BrowserActionResult(success=False, message=str(e), error=str(e))
+    
     async def get_current_page(self) -> Page:
         """Get the current active page"""
         if not self.pages:
             raise HTTPException(status_code=500, detail="No browser pages available")
         return self.pages[self.current_page_index]
     
-    async def get_selector_map(self) -> Dict[int, DOMElementNode]:
-        """Get a map of selectable elements on the page"""
+    def _element_node_from_record(self, el: dict) -> DOMElementNode:
+        """Build a DOMElementNode from an element record of the tracker script"""
+        page_coordinates = None
+        viewport_coordinates = None
+        
+        if 'pageCoordinates' in el:
+            coords = el['pageCoordinates']
+            page_coordinates = CoordinateSet(
+                x=coords.get('x', 0),
+                y=coords.get('y', 0),
+                width=coords.get('width', 0),
+                height=coords.get('height', 0)
+            )
+        
+        if 'viewportCoordinates' in el:
+            coords = el['viewportCoordinates']
+            viewport_coordinates = CoordinateSet(
+                x=coords.get('x', 0),
+                y=coords.get('y', 0),
+                width=coords.get('width', 0),
+                height=coords.get('height', 0)
+            )
+        
+        element_node = DOMElementNode(
+            is_visible=el.get('isVisible', True),
+            tag_name=el.get('tagName', 'div'),
+            attributes=el.get('attributes', {}),
+            is_interactive=el.get('isInteractive', True),
+            is_in_viewport=el.get('isInViewport', False),
+            highlight_index=el['index'],
+            page_coordinates=page_coordinates,
+            viewport_coordinates=viewport_coordinates
+        )
+        
+        # Add a text node if there's text content
+        if el.get('text'):
+            text_node = DOMTextNode(is_visible=True, text=el.get('text', ''))
+            text_node.parent = element_node
+            element_node.children.append(text_node)
+        return element_node
+    
+    async def get_selector_map(self, full: bool = False) -> Dict[int, DOMElementNode]:
+        """Get a map of selectable elements on the page, keyed by their stable index
+        
+        Only elements that changed since the previous call are described by the page
+        and rebuilt here; full=True rescans the whole page.
+        """
         page = await self.get_current_page()
         
         # Create a selector map for interactive elements
         selector_map = {}
         
         try:
-            # More comprehensive JavaScript to find interactive elements
-            elements_js = """
-            (() => {
-                // Helper function to get all attributes as an object
-                function getAttributes(el) {
-                    const attributes = {};
-                    for (const attr of el.attributes) {
-                        attributes[attr.name] = attr.value;
-                    }
-                    return attributes;
-                }
-                
-                // Find all potentially interactive elements
-                const interactiveElements = Array.from(document.querySelectorAll(
-                    'a, button, input, select, textarea, [role="button"], [role="link"], [role="checkbox"], [role="radio"], [tabindex]:not([tabindex="-1"])'
-                ));
-                
-                // Filter for visible elements
-                const visibleElements = interactiveElements.filter(el => {
-                    const style = window.getComputedStyle(el);
-                    const rect = el.getBoundingClientRect();
-                    return style.display !== 'none' && 
-                           style.visibility !== 'hidden' && 
-                           style.opacity !== '0' &&
-                           rect.width > 0 && 
-                           rect.height > 0;
-                });
-                
-                // Map to our expected structure
-                return visibleElements.map((el, index) => {
-                    const rect = el.getBoundingClientRect();
-                    const isInViewport = rect.top >= 0 && 
-                                      rect.left >= 0 && 
-                                      rect.bottom <= window.innerHeight &&
-                                      rect.right <= window.innerWidth;
-                    
-                    return {
-                        index: index + 1,
-                        tagName: el.tagName.toLowerCase(),
-                        text: el.innerText || el.value || '',
-                        attributes: getAttributes(el),
-                        isVisible: true,
-                        isInteractive: true,
-                        pageCoordinates: {
-                            x: rect.left + window.scrollX,
-                            y: rect.top + window.scrollY,
-                            width: rect.width,
-                            height: rect.height
-                        },
-                        viewportCoordinates: {
-                            x: rect.left,
-                            y: rect.top,
-                            width: rect.width,
-                            height: rect.height
-                        },
-                        isInViewport: isInViewport
-                    };
-                });
-            })();
-            """
-            
-            elements = await page.evaluate(elements_js)
-            print(f"Found {len(elements)} interactive elements in selector map")
+            await page.evaluate(ELEMENT_TRACKER_SCRIPT)
+            snapshot = await page.evaluate("full => window.__elementTracker.snapshot(full)", full)
+            
+            cache = self.element_caches.get(page)
+            if cache is None or cache["document_id"] != snapshot["documentId"] or snapshot["full"]:
+                # New document or full rescan: nothing of the previous nodes is kept
+                cache = {"document_id": snapshot["documentId"], "nodes": {}}
+                self.element_caches[page] = cache
+            nodes = cache["nodes"]
+            for el in snapshot["changed"]:
+                nodes[el["index"]] = self._element_node_from_record(el)
+            if not full and any(index not in nodes for index in snapshot["order"]):
+                # Out of step with the page (e.g. an earlier snapshot was lost); start over
+                return await self.get_selector_map(full=True)
+            print(f"Found {len(snapshot['order'])} interactive elements in selector map "
+                  f"({len(snapshot['changed'])} described, full scan: {snapshot['full']})")
             
             # Create a root element for the tree
             root = DOMElementNode(
@@ -462,51 +1249,15 @@ class BrowserAutomation:
                 is_top_element=True
             )
             
-            # Create element nodes for each element
-            for idx, el in enumerate(elements):
-                # Create coordinate sets
-                page_coordinates = None
-                viewport_coordinates = None
-                
-                if 'pageCoordinates' in el:
-                    coords = el['pageCoordinates']
-                    page_coordinates = CoordinateSet(
-                        x=coords.get('x', 0),
-                        y=coords.get('y', 0),
-                        width=coords.get('width', 0),
-                        height=coords.get('height', 0)
-                    )
-                
-                if 'viewportCoordinates' in el:
-                    coords = el['viewportCoordinates']
-                    viewport_coordinates = CoordinateSet(
-                        x=coords.get('x', 0),
-                        y=coords.get('y', 0),
-                        width=coords.get('width', 0),
-                        height=coords.get('height', 0)
-                    )
-                
-                # Create the element node
-                element_node = DOMElementNode(
-                    is_visible=el.get('isVisible', True),
-                    tag_name=el.get('tagName', 'div'),
-                    attributes=el.get('attributes', {}),
-                    is_interactive=el.get('isInteractive', True),
-                    is_in_viewport=el.get('isInViewport', False),
-                    highlight_index=el.get('index', idx + 1),
-                    page_coordinates=page_coordinates,
-                    viewport_coordinates=viewport_coordinates
-                )
-                
-                # Add a text node if there's text content
-                if el.get('text'):
-                    text_node = DOMTextNode(is_visible=True, text=el.get('text', ''))
-                    text_node.parent = element_node
-                    element_node.children.append(text_node)
-                
-                selector_map[el.get('index', idx + 1)] = element_node
+            for index in snapshot["order"]:
+                element_node = nodes[index]
+                selector_map[index] = element_node
                 root.children.append(element_node)
                 element_node.parent = root
+            
+            # Nodes of elements that are gone or hidden are dropped
+            for index in set(nodes) - set(selector_map):
+                del nodes[index]
                 
         except Exception as e:
             print(f"Error getting selector map: {e}")
@@ -526,23 +1277,22 @@ class BrowserAutomation:
         
         return selector_map
     
-    async def get_current_dom_state(self) -> DOMState:
+    async def get_current_dom_state(self, full: bool = False) -> DOMState:
         """Get the current DOM state including element tree and selector map"""
         try:
             page = await self.get_current_page()
-            selector_map = await self.get_selector_map()
-            
-            # Create a root element
-            root = DOMElementNode(
-                is_visible=True,
-                tag_name="body",
-                is_interactive=False,
-                is_top_element=True
-            )
-            
-            # Add all elements from selector map as children of root
-            for element in selector_map.values():
-                if element.parent is None:
+            selector_map = await self.get_selector_map(full)
+            
+            # Elements of the selector map hang from one root; create it if they do not
+            root = next((element.parent for element in selector_map.values() if element.parent is not None), None)
+            if root is None:
+                root = DOMElementNode(
+                    is_visible=True,
+                    tag_name="body",
+                    is_interactive=False,
+                    is_top_element=True
+                )
+                for element in selector_map.values():
                     element.parent = root
                     root.children.append(element)
             
@@ -609,12 +1359,17 @@ class BrowserAutomation:
                 pixels_below=0
             )
     
+    async def capture_screenshot(self, page: Page) -> Screenshot:
+        """Capture the viewport and run it through the screenshot pipeline"""
+        raw = await page.screenshot(type='jpeg', quality=90, full_page=False, scale='css')
+        return await asyncio.to_thread(process_screenshot, raw)
+    
     async def take_screenshot(self) -> str:
         """Take a screenshot and return as base64 encoded string"""
         try:
             page = await self.get_current_page()
-            screenshot_bytes = await page.screenshot(type='jpeg', quality=60, full_page=False)
-            return base64.b64encode(screenshot_bytes).decode('utf-8')
+            screenshot = await self.capture_screenshot(page)
+            return base64.b64encode(screenshot.data).decode('utf-8')
         except Exception as e:
             print(f"Error taking screenshot: {e}")
             # Return an empty string rather than failing
@@ -641,33 +1396,127 @@ class BrowserAutomation:
             return ""
             
         try:
-            # Decode base64 to image
-            image_bytes = base64.b64decode(screenshot_base64)
-            image = Image.open(io.BytesIO(image_bytes))
-            
-            # Extract text using pytesseract
-            ocr_text = pytesseract.image_to_string(image)
-            
-            # Clean up the text
-            ocr_text = ocr_text.strip()
-            
-            return ocr_text
+            # Recognized in a worker process, cached by screenshot
+            return await self.ocr.text(base64.b64decode(screenshot_base64))
         except Exception as e:
             print(f"Error performing OCR: {e}")
             traceback.print_exc()
             return ""
     
-    async def get_updated_browser_state(self, action_name: str) -> tuple:
+    async def should_run_ocr(self, page: Page) -> bool:
+        """Whether the state after this action includes OCR text"""
+        if ocr_requested.get() or BROWSER_OCR_MODE == "always":
+            return True
+        if BROWSER_OCR_MODE != "auto":
+            return False
+        try:
+            dom_text_length = await page.evaluate("() => (document.body && document.body.innerText || '').trim().length")
+        except Exception:
+            return True
+        return dom_text_length < OCR_MIN_DOM_TEXT
+    
+    async def ocr_screen(self):
+        """Recognize the text of the current screen"""
+        try:
+            page = await self.get_current_page()
+            screenshot = await self.take_screenshot()
+            ocr_text = await self.extract_ocr_text_from_screenshot(screenshot)
+            return BrowserActionResult(
+                success=True,
+                message=f"Recognized {len(ocr_text)} characters of text on screen",
+                url=page.url,
+                title=await page.title(),
+                ocr_text=ocr_text
+            )
+        except Exception as e:
+            return BrowserActionResult(success=False, message=str(e), error=str(e))
+    
+    async def wait_for_page_settle(self, page: Page, timeout_ms: int = SETTLE_TIMEOUT_MS) -> dict:
+        """Wait until the page's DOM and network have been quiet for a short window
+        Returns {settled, waited_ms, quiet_ms}; settled is False if the timeout was reached
+        """
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        error = ""
+        # A navigation replaces the document the wait runs in; then the new document is watched
+        for _ in range(3):
+            remaining_ms = int(timeout_ms - (loop.time() - started) * 1000)
+            if remaining_ms <= 0:
+                break
+            try:
+                await page.evaluate(PAGE_SETTLE_SCRIPT)
+                return await page.evaluate(
+                    "([minQuietMs, maxQuietMs, timeoutMs]) => window.__pageSettle.wait(minQuietMs, maxQuietMs, timeoutMs)",
+                    [SETTLE_MIN_QUIET_MS, SETTLE_MAX_QUIET_MS, remaining_ms]
+                )
+            except Exception as e:
+                error = str(e)
+                try:
+                    await page.wait_for_load_state("domcontentloaded", timeout=max(remaining_ms, 1))
+                except Exception:
+                    break
+        return {"settled": False, "waited_ms": int((loop.time() - started) * 1000), "error": error}
+
+    def _element_info(self, idx: int, element: DOMElementNode) -> dict:
+        """Compact description of an interactive element for the response"""
+        element_info = {
+            'index': idx,
+            'tag_name': element.tag_name,
+            'text': element.get_all_text_till_next_clickable_element(),
+            'is_in_viewport': element.is_in_viewport
+        }
+        
+        # Add key attributes
+        for attr_name in ['id', 'href', 'src', 'alt', 'placeholder', 'name', 'role', 'title', 'type']:
+            if attr_name in element.attributes:
+                element_info[attr_name] = element.attributes[attr_name]
+        return element_info
+    
+    def _elements_delta(self, page: Page, selector_map: Dict[int, DOMElementNode], full: bool) -> dict:
+        """Elements added, changed and removed since the state last reported for the page"""
+        full = full or page not in self.reported_elements
+        previous = {} if full else self.reported_elements[page]
+        current = {}
+        added, updated = [], []
+        for idx, element in selector_map.items():
+            reported = previous.get(idx)
+            if reported is not None and reported[0] is element:
+                # Node reused from the cache: the element did not change
+                current[idx] = reported
+                continue
+            info = self._element_info(idx, element)
+            current[idx] = (element, info)
+            if reported is None:
+                added.append(info)
+            elif reported[1] != info:
+                updated.append(info)
+        self.reported_elements[page] = current
+        return {
+            'full': full,
+            'added': added,
+            'updated': updated,
+            'removed': [idx for idx in previous if idx not in current],
+            'order': list(current)
+        }
+
+    async def get_updated_browser_state(self, action_name: str, settle_timeout_ms: int = SETTLE_TIMEOUT_MS,
+                                        full: bool = False) -> tuple:
         """Helper method to get updated browser state after any action
         Returns a tuple of (dom_state, screenshot, elements, metadata)
+        
+        In incremental mode (BROWSER_STATE_MODE) metadata holds elements_delta instead of
+        interactive_elements, unless full is set.
         """
         try:
-            # Wait a moment for any potential async processes to settle
-            await asyncio.sleep(0.5)
+            # Wait until the DOM and network are quiet, so the state reflects the action
+            settle = await self.wait_for_page_settle(await self.get_current_page(), settle_timeout_ms)
+            print(f"Page settle after {action_name}: {settle}")
+            if state_capture_deferred.get():
+                # Inside a batch: the state is captured after its last action
+                return None, "", "", {}
             
             # Get updated state
-            dom_state = await self.get_current_dom_state()
-            screenshot = await self.take_screenshot()
+            dom_state = await self.get_current_dom_state(full)
             
             # Format elements for output
             elements = dom_state.element_tree.clickable_elements_to_string(
@@ -678,27 +1527,35 @@ class BrowserAutomation:
             page = await self.get_current_page()
             metadata = {}
             
+            screenshot, shot = "", None
+            try:
+                shot = await self.capture_screenshot(page)
+            except Exception as e:
+                print(f"Error taking screenshot: {e}")
+            if shot:
+                sent = self.sent_screenshots.get(page)
+                if (not full and sent is not None and sent.screenshot_id == known_screenshot.get()
+                        and same_screen(sent, shot)):
+                    # Looks like the screenshot the caller has stored: refer to it instead
+                    metadata['screenshot_unchanged'] = True
+                    metadata['screenshot_id'] = sent.screenshot_id
+                    metadata['screenshot_mime_type'] = sent.mime_type
+                else:
+                    self.sent_screenshots[page] = shot
+                    screenshot = base64.b64encode(shot.data).decode('utf-8')
+                    metadata['screenshot_id'] = shot.screenshot_id
+                    metadata['screenshot_mime_type'] = shot.mime_type
+            
             # Get element count
             metadata['element_count'] = len(dom_state.selector_map)
             
-            # Create simplified interactive elements list
-            interactive_elements = []
-            for idx, element in dom_state.selector_map.items():
-                element_info = {
-                    'index': idx,
-                    'tag_name': element.tag_name,
-                    'text': element.get_all_text_till_next_clickable_element(),
-                    'is_in_viewport': element.is_in_viewport
-                }
-                
-                # Add key attributes
-                for attr_name in ['id', 'href', 'src', 'alt', 'placeholder', 'name', 'role', 'title', 'type']:
-                    if attr_name in element.attributes:
-                        element_info[attr_name] = element.attributes[attr_name]
-                
-                interactive_elements.append(element_info)
-            
-            metadata['interactive_elements'] = interactive_elements
+            incremental = BROWSER_STATE_MODE == "incremental" and not full
+            delta = self._elements_delta(page, dom_state.selector_map, full=not incremental)
+            if incremental:
+                metadata['elements_delta'] = delta
+            else:
+                # Every element, as added to an empty state
+                metadata['interactive_elements'] = delta['added']
             
             # Get viewport dimensions - Fix syntax error in JavaScript
             try:
@@ -717,11 +1574,12 @@ class BrowserAutomation:
                 metadata['viewport_width'] = 0
                 metadata['viewport_height'] = 0
             
-            # Extract OCR text from screenshot if available
-            ocr_text = ""
-            if screenshot:
-                ocr_text = await self.extract_ocr_text_from_screenshot(screenshot)
-                metadata['ocr_text'] = ocr_text
+            # Extract OCR text from screenshot when asked for, or when the DOM has little text
+            if shot and await self.should_run_ocr(page):
+                try:
+                    metadata['ocr_text'] = await self.ocr.text(shot.data)
+                except Exception as e:
+                    print(f"Error performing OCR: {e}")
             
             print(f"Got updated state after {action_name}: {len(dom_state.selector_map)} elements")
             return dom_state, screenshot, elements, metadata
@@ -747,27 +1605,60 @@ class BrowserAutomation:
             title=dom_state.title if dom_state else "",
             elements=elements,
             screenshot_base64=screenshot,
+            screenshot_id=metadata.get('screenshot_id'),
+            screenshot_mime_type=metadata.get('screenshot_mime_type'),
+            screenshot_unchanged=metadata.get('screenshot_unchanged', False),
             pixels_above=dom_state.pixels_above if dom_state else 0,
             pixels_below=dom_state.pixels_below if dom_state else 0,
             content=content,
             ocr_text=metadata.get('ocr_text', ""),
             element_count=metadata.get('element_count', 0),
-            interactive_elements=metadata.get('interactive_elements', []),
+            interactive_elements=metadata.get('interactive_elements', None if 'elements_delta' in metadata else []),
+            elements_delta=metadata.get('elements_delta'),
             viewport_width=metadata.get('viewport_width', 0),
             viewport_height=metadata.get('viewport_height', 0)
         )
 
+    async def get_state(self, full: bool = Body(True, embed=True)):
+        """Get the current state without acting; full rescans the page and lists every element"""
+        try:
+            dom_state, screenshot, elements, metadata = await self.get_updated_browser_state("get_state", full=full)
+            return self.build_action_result(
+                True,
+                "Current browser state",
+                dom_state,
+                screenshot,
+                elements,
+                metadata,
+                error="",
+                content=None
+            )
+        except Exception as e:
+            return self.build_action_result(
+                False,
+                str(e),
+                None,
+                "",
+                "",
+                {},
+                error=str(e),
+                content=None
+            )
+
     # Basic Navigation Actions
     
     async def navigate_to(self, action: GoToUrlAction = Body(...)):
         """Navigate to a specified URL"""
         try:
             page = await self.get_current_page()
+            if action.profile:
+                await self.switch_navigation_profile(action.profile)
             await page.goto(action.url, wait_until="domcontentloaded")
-            await page.wait_for_load_state("networkidle", timeout=10000)
             
             # Get updated state after action
-            dom_state, screenshot, elements, metadata = await self.get_updated_browser_state(f"navigate_to({action.url})")
+            dom_state, screenshot, elements, metadata = await self.get_updated_browser_state(
+                f"navigate_to({action.url})", SETTLE_NAVIGATION_TIMEOUT_MS
+            )
             
             result = self.build_action_result(
                 True,
@@ -814,12 +1705,15 @@ class BrowserAutomation:
         """Search Google with the provided query"""
         try:
             page = await self.get_current_page()
+            if action.profile:
+                await self.switch_navigation_profile(action.profile)
             search_url = f"https://www.google.com/search?q={action.query}"
-            await page.goto(search_url)
-            await page.wait_for_load_state()
+            await page.goto(search_url, wait_until="domcontentloaded")
             
             # Get updated state after action
-            dom_state, screenshot, elements, metadata = await self.get_updated_browser_state(f"search_google({action.query})")
+            dom_state, screenshot, elements, metadata = await self.get_updated_browser_state(
+                f"search_google({action.query})", SETTLE_NAVIGATION_TIMEOUT_MS
+            )
             
             return self.build_action_result(
                 True,
@@ -863,11 +1757,10 @@ class BrowserAutomation:
         """Navigate back in browser history"""
         try:
             page = await self.get_current_page()
-            await page.go_back()
-            await page.wait_for_load_state()
+            await page.go_back(wait_until="domcontentloaded")
             
             # Get updated state after action
-            dom_state, screenshot, elements, metadata = await self.get_updated_browser_state("go_back")
+            dom_state, screenshot, elements, metadata = await self.get_updated_browser_state("go_back", SETTLE_NAVIGATION_TIMEOUT_MS)
             
             return self.build_action_result(
                 True,
@@ -931,9 +1824,6 @@ class BrowserAutomation:
             # Perform the click at the specified coordinates
             await page.mouse.click(action.x, action.y)
             
-            # Give time for any navigation or DOM updates to occur
-            await page.wait_for_load_state("networkidle", timeout=5000)
-            
             # Get updated state after action
             dom_state, screenshot, elements, metadata = await self.get_updated_browser_state(f"click_coordinates({action.x}, {action.y})")
             
@@ -1001,26 +1891,9 @@ class BrowserAutomation:
             element_to_click = selector_map[action.index]
             print(f"Attempting to click element: {element_to_click}")
 
-            # Construct a more reliable selector using JavaScript evaluation
-            # Find the element based on its properties captured in selector_map
+            # Find the element by the stable id the element tracker gave it
             js_selector_script = """
-            (targetElementInfo) => {
-                const interactiveElements = Array.from(document.querySelectorAll(
-                    'a, button, input, select, textarea, [role="button"], [role="link"], [role="checkbox"], [role="radio"], [tabindex]:not([tabindex="-1"])'
-                ));
-                
-                const visibleElements = interactiveElements.filter(el => {
-                    const style = window.getComputedStyle(el);
-                    const rect = el.getBoundingClientRect();
-                    return style.display !== 'none' && style.visibility !== 'hidden' && style.opacity !== '0' && rect.width > 0 && rect.height > 0;
-                });
-
-                if (targetElementInfo.index > 0 && targetElementInfo.index <= visibleElements.length) {
-                    // Return the element at the specified index (1-based)
-                    return visibleElements[targetElementInfo.index - 1];
-                }
-                return null; // Element not found at the expected index
-            }
+            (targetElementInfo) => document.querySelector(`[data-agent-id="${targetElementInfo.index}"]`)
             """
             
             element_info = {'index': action.index} # Pass the target index to the script
@@ -1047,14 +1920,7 @@ class BrowserAutomation:
                  print(error_message)
 
 
-            # Wait for potential page changes/network activity
-            try:
-                await page.wait_for_load_state("networkidle", timeout=5000)
-            except Exception as wait_error:
-                print(f"Timeout or error waiting for network idle after click: {wait_error}")
-                await asyncio.sleep(1) # Fallback wait
-
-            # Get updated state after action
+            # Get updated state after action (waits for page changes and network activity to settle)
             dom_state, screenshot, elements, metadata = await self.get_updated_browser_state(f"click_element({action.index})")
 
             return self.build_action_result(
@@ -1125,8 +1991,6 @@ class BrowserAutomation:
             element = selector_map[action.index]
             
             # Use CSS selector or XPath to locate and type into the element
-            await page.wait_for_timeout(500)  # Small delay before typing
-            
             # Demo implementation - would use proper selectors in production
             if element.attributes.get("id"):
                 await page.fill(f"#{element.attributes['id']}", action.text)
@@ -1243,12 +2107,13 @@ class BrowserAutomation:
         try:
             print(f"Attempting to open new tab with URL: {action.url}")
             # Create new page in same browser instance
-            new_page = await self.browser.new_page()
+            if action.profile:
+                await self.switch_navigation_profile(action.profile)
+            new_page = await self.new_page()
             print(f"New page created successfully")
             
             # Navigate to the URL
             await new_page.goto(action.url, wait_until="domcontentloaded")
-            await new_page.wait_for_load_state("networkidle", timeout=10000)
             print(f"Navigated to URL in new tab: {action.url}")
             
             # Add to page list and make it current
@@ -1257,7 +2122,9 @@ class BrowserAutomation:
             print(f"New tab added as index {self.current_page_index}")
             
             # Get updated state after action
-            dom_state, screenshot, elements, metadata = await self.get_updated_browser_state(f"open_tab({action.url})")
+            dom_state, screenshot, elements, metadata = await self.get_updated_browser_state(
+                f"open_tab({action.url})", SETTLE_NAVIGATION_TIMEOUT_MS
+            )
             
             return self.build_action_result(
                 True,
@@ -1293,6 +2160,9 @@ class BrowserAutomation:
                 url = page.url
                 await page.close()
                 self.pages.pop(action.page_id)
+                self.element_caches.pop(page, None)
+                self.reported_elements.pop(page, None)
+                self.sent_screenshots.pop(page, None)
                 
                 # Adjust current index if needed
                 if self.current_page_index >= len(self.pages):
@@ -1434,8 +2304,6 @@ class BrowserAutomation:
                 await page.evaluate("window.scrollBy(0, window.innerHeight);")
                 amount_str = "one page"
             
-            await page.wait_for_timeout(500)  # Wait for scroll to complete
-            
             # Get updated state after action
             dom_state, screenshot, elements, metadata = await self.get_updated_browser_state(f"scroll_down({amount_str})")
             
@@ -1472,8 +2340,6 @@ class BrowserAutomation:
                 await page.evaluate("window.scrollBy(0, -window.innerHeight);")
                 amount_str = "one page"
             
-            await page.wait_for_timeout(500)  # Wait for scroll to complete
-            
             # Get updated state after action
             dom_state, screenshot, elements, metadata = await self.get_updated_browser_state(f"scroll_up({amount_str})")
             
@@ -1514,7 +2380,6 @@ class BrowserAutomation:
                 try:
                     if await locator.count() > 0 and await locator.first.is_visible():
                         await locator.first.scroll_into_view_if_needed()
-                        await asyncio.sleep(0.5)  # Wait for scroll to complete
                         found = True
                         break
                 except Exception:
@@ -1586,7 +2451,7 @@ class BrowserAutomation:
                     # For other dropdown types, try to get options using a more generic approach
                     # Example for custom dropdowns - would need refinement in real implementation
                     await page.click(f"#{element.attributes.get('id')}") if element.attributes.get('id') else None
-                    await page.wait_for_timeout(500)
+                    await self.wait_for_page_settle(page)
                     
                     options_js = """
                     Array.from(document.querySelectorAll('.dropdown-item, [role="option"], li'))
@@ -1673,13 +2538,11 @@ class BrowserAutomation:
                 else:
                     await page.click(f"//{element.tag_name}[{index}]")
                 
-                await page.wait_for_timeout(500)
+                await self.wait_for_page_settle(page)
                 
                 # Then try to click the option
                 await page.click(f"text={option_text}")
             
-            await page.wait_for_timeout(500)
-            
             # Get updated state after action
             dom_state, screenshot, elements, metadata = await self.get_updated_browser_state(f"select_dropdown_option({index}, '{option_text}')")
             
@@ -1791,6 +2654,66 @@ class BrowserAutomation:
                 content=None
             )
 
+    async def batch(self, action: BatchAction = Body(...)):
+        """Run actions in order, letting the page settle between them, and capture the state once
+        Stops at the first action that fails, or once timeout_ms has passed so the caller still gets
+        the state before its own timeout; steps lists the outcome of each action that ran.
+        """
+        if not action.actions:
+            return self.build_action_result(False, "No actions given", None, "", "", {}, error="No actions given")
+        if len(action.actions) > BATCH_MAX_ACTIONS:
+            error = f"A batch can have at most {BATCH_MAX_ACTIONS} actions, got {len(action.actions)}"
+            return self.build_action_result(False, error, None, "", "", {}, error=error)
+
+        timeout_ms = action.timeout_ms or len(action.actions) * BATCH_ACTION_TIMEOUT_MS
+        deadline = time.monotonic() + timeout_ms / 1000
+        steps = []
+        token = state_capture_deferred.set(True)
+        try:
+            for step in action.actions:
+                run = self.batch_actions.get(step.action)
+                remaining = deadline - time.monotonic()
+                if run is None:
+                    result = BrowserActionResult(success=False, error=f"Unknown action '{step.action}'")
+                elif remaining <= 0:
+                    result = BrowserActionResult(success=False, error=f"Not run, the batch timed out after {timeout_ms} ms")
+                else:
+                    try:
+                        result = await asyncio.wait_for(run(step.params), remaining)
+                    except asyncio.TimeoutError:
+                        result = BrowserActionResult(success=False, error=f"The batch timed out after {timeout_ms} ms")
+                    except Exception as e:
+                        # Invalid params
+                        result = BrowserActionResult(success=False, error=f"Invalid params for {step.action}: {e}")
+                steps.append({
+                    "action": step.action,
+                    "success": result.success,
+                    "message": result.message or result.error
+                })
+                if not result.success:
+                    break
+        finally:
+            state_capture_deferred.reset(token)
+
+        dom_state, screenshot, elements, metadata = await self.get_updated_browser_state(f"batch({len(steps)} actions)")
+        failed = steps[-1] if not steps[-1]["success"] else None
+        if failed:
+            message = f"Action {len(steps)} of {len(action.actions)} ({failed['action']}) failed: {failed['message']}"
+        else:
+            message = f"Ran {len(steps)} actions"
+        result = self.build_action_result(
+            failed is None,
+            message,
+            dom_state,
+            screenshot,
+            elements,
+            metadata,
+            error=message if failed else "",
+            content=None
+        )
+        result.steps = steps
+        return result
+
 # Create singleton instance
 automation_service = BrowserAutomation()
 
@@ -1803,6 +2726,7 @@ async def health_check():
 
 # Include automation service router with /api prefix
 api_app.include_router(automation_service.router, prefix="/api")
+api_app.include_router(automation_service.sessions_router, prefix="/api")
 
 async def test_browser_api():
     """Test the browser automation API functionality"""
@@ -2044,6 +2968,202 @@ async def test_browser_api_2():
         await automation_service.shutdown()
         print("Browser closed")
 
+async def benchmark_page_settle(iterations: int = 5):
+    """Compare the wait after actions on a local test site: fixed waits vs settle detection"""
+    import statistics
+    import threading
+    import time
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    pages = {
+        "/": """<html><body>
+            <button id="fetch" onclick="fetch('/data').then(r => r.json()).then(d => {
+                const div = document.createElement('div'); div.id = 'result'; div.textContent = d.text;
+                document.body.appendChild(div);
+            })">Load data</button>
+            <button id="toggle" onclick="this.textContent = this.textContent === 'On' ? 'Off' : 'On'">Off</button>
+            <div style="height: 3000px"></div>
+        </body></html>""",
+        "/data": '{"text": "loaded"}',
+    }
+
+    class TestSiteHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/data":
+                time.sleep(0.2)  # A slow API behind the button
+            body = pages.get(self.path, "").encode()
+            self.send_response(200 if self.path in pages else 404)
+            self.send_header("Content-Type", "application/json" if self.path == "/data" else "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), TestSiteHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    site_url = f"http://127.0.0.1:{server.server_address[1]}/"
+
+    async def fixed_waits(page):
+        # The waits actions used before settle detection
+        try:
+            await page.wait_for_load_state("networkidle", timeout=5000)
+        except Exception:
+            await asyncio.sleep(1)
+        await asyncio.sleep(0.5)
+
+    async def settle(page):
+        await automation_service.wait_for_page_settle(page)
+
+    scenarios = {
+        "click (fetch, then render)": lambda page: page.click("#fetch"),
+        "click (synchronous update)": lambda page: page.click("#toggle"),
+        "scroll": lambda page: page.evaluate("window.scrollBy(0, window.innerHeight)"),
+    }
+
+    playwright = await async_playwright().start()
+    browser = await playwright.chromium.launch(headless=True)
+    try:
+        page = await browser.new_page()
+        await page.add_init_script(PAGE_SETTLE_SCRIPT)
+        print(f"\n=== Wait after action on {site_url} (median of {iterations}) ===")
+        for name, action in scenarios.items():
+            medians = {}
+            for strategy_name, strategy in (("fixed waits", fixed_waits), ("settle", settle)):
+                durations = []
+                for _ in range(iterations):
+                    await page.goto(site_url, wait_until="load")
+                    await action(page)
+                    started = time.perf_counter()
+                    await strategy(page)
+                    durations.append((time.perf_counter() - started) * 1000)
+                    if name.startswith("click (fetch"):
+                        assert await page.locator("#result").count() == 1, f"{strategy_name} returned before the page updated"
+                medians[strategy_name] = statistics.median(durations)
+            print(f"{name}: fixed waits {medians['fixed waits']:.0f} ms, settle {medians['settle']:.0f} ms")
+    finally:
+        await browser.close()
+        await playwright.stop()
+        server.shutdown()
+
+async def benchmark_screenshots(url: str = "https://en.wikipedia.org/wiki/Web_browser"):
+    """Compare the screenshot bytes per action: JPEG quality 60 every time vs the screenshot pipeline"""
+    actions = [
+        ("load", lambda page: page.goto(url, wait_until="domcontentloaded")),
+        ("wait", lambda page: asyncio.sleep(1)),
+        ("hover", lambda page: page.mouse.move(200, 200)),
+        ("scroll down", lambda page: page.evaluate("window.scrollBy(0, window.innerHeight)")),
+        ("scroll down", lambda page: page.evaluate("window.scrollBy(0, window.innerHeight)")),
+        ("wait", lambda page: asyncio.sleep(1)),
+        ("scroll up", lambda page: page.evaluate("window.scrollBy(0, -window.innerHeight)")),
+        ("get state", lambda page: asyncio.sleep(0)),
+    ]
+
+    playwright = await async_playwright().start()
+    browser = await playwright.chromium.launch(headless=True)
+    sent: Optional[Screenshot] = None
+    totals = {"jpeg": 0, "pipeline": 0}
+    try:
+        page = await browser.new_page()
+        await page.add_init_script(PAGE_SETTLE_SCRIPT)
+        print(f"\n=== Base64 screenshot bytes per action on {url} ===")
+        for name, action in actions:
+            await action(page)
+            await automation_service.wait_for_page_settle(page)
+            legacy = len(base64.b64encode(await page.screenshot(type='jpeg', quality=60, full_page=False)))
+            shot = await automation_service.capture_screenshot(page)
+            unchanged = same_screen(sent, shot)
+            if not unchanged:
+                sent = shot
+            encoded = 0 if unchanged else len(base64.b64encode(shot.data))
+            totals["jpeg"] += legacy
+            totals["pipeline"] += encoded
+            print(f"{name}: jpeg {legacy} bytes, pipeline {encoded} bytes"
+                  f" ({'unchanged' if unchanged else f'{shot.width}x{shot.height} {shot.mime_type}'})")
+        print(f"Per action: jpeg {totals['jpeg'] // len(actions)} bytes, pipeline {totals['pipeline'] // len(actions)} bytes")
+    finally:
+        await browser.close()
+        await playwright.stop()
+
+async def benchmark_navigation_profiles(loads: int = 3):
+    """Compare page-load time and bytes served on a local test site: "full" vs "fast" profile"""
+    import shutil
+    import statistics
+    import tempfile
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    # A text page with the weight of a typical site: images, a web font, scripts and a tracker
+    images = "".join(f'<img src="/image-{i}.jpg" width="200">' for i in range(8))
+    resources = {
+        "/": ("text/html", "no-cache", f"""<html><head>
+            <link rel="stylesheet" href="/style.css">
+            <script src="/app.js"></script>
+            <script src="http://localhost:__PORT__/tracker.js"></script>
+            </head><body><h1>Article</h1><p>{'Some text to read. ' * 200}</p>{images}
+            <video src="/clip.mp4" autoplay muted></video></body></html>""".encode()),
+        "/style.css": ("text/css", "max-age=3600", b"@font-face { font-family: Body; src: url(/body.woff2); } "
+                       b"body { font-family: Body; } " + b"/* padding */ " * 4000),
+        "/app.js": ("application/javascript", "max-age=3600", b"window.app = 1;" + b" " * 150000),
+        "/tracker.js": ("application/javascript", "no-store", b"window.tracked = 1;" + b" " * 50000),
+        "/body.woff2": ("font/woff2", "max-age=3600", os.urandom(80000)),
+        "/clip.mp4": ("video/mp4", "max-age=3600", os.urandom(500000)),
+        **{f"/image-{i}.jpg": ("image/jpeg", "max-age=3600", os.urandom(120000)) for i in range(8)},
+    }
+    served = {"bytes": 0}
+
+    class TestSiteHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            content_type, cache_control, body = resources.get(self.path.split("?")[0], ("text/plain", "no-store", b""))
+            body = body.replace(b"__PORT__", str(self.server.server_address[1]).encode())
+            time.sleep(0.03)  # Network latency
+            self.send_response(200 if body else 404)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Cache-Control", cache_control)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            served["bytes"] += len(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), TestSiteHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    site_url = f"http://127.0.0.1:{server.server_address[1]}/"
+    # The test site's tracker is served from localhost
+    BLOCKED_DOMAINS.add("localhost")
+    cache_dir = tempfile.mkdtemp()
+    automation_service.route_cache = RouteCache(cache_dir, ROUTE_CACHE_MAX_BYTES)
+
+    playwright = await async_playwright().start()
+    automation_service.browser = await playwright.chromium.launch(headless=True)
+    current_session.set(await automation_service.get_session("benchmark"))
+    try:
+        print(f"\n=== Page load on {site_url} (median of {loads} loads after the first) ===")
+        for profile in ("full", "fast"):
+            await automation_service.switch_navigation_profile(profile)
+            page = await automation_service.new_page()
+            results = []
+            for _ in range(loads + 1):
+                served["bytes"] = 0
+                started = time.perf_counter()
+                await page.goto(site_url, wait_until="load")
+                results.append(((time.perf_counter() - started) * 1000, served["bytes"]))
+            await page.close()
+            first_ms, first_bytes = results[0]
+            print(f"{profile}: first load {first_ms:.0f} ms, {first_bytes} bytes; "
+                  f"then {statistics.median(ms for ms, _ in results[1:]):.0f} ms, "
+                  f"{statistics.median(size for _, size in results[1:]):.0f} bytes")
+        print(f"Requests blocked: {automation_service.navigation_stats['blocked']}, "
+              f"cache hits: {automation_service.navigation_stats['cache_hits']}")
+    finally:
+        await automation_service.browser.close()
+        await playwright.stop()
+        server.shutdown()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
 if __name__ == '__main__':
     import uvicorn
     import sys
@@ -2052,7 +3172,13 @@ if __name__ == '__main__':
     test_mode_1 = "--test" in sys.argv
     test_mode_2 = "--test2" in sys.argv
     
-    if test_mode_1:
+    if "--benchmark-settle" in sys.argv:
+        asyncio.run(benchmark_page_settle())
+    elif "--benchmark-screenshots" in sys.argv:
+        asyncio.run(benchmark_screenshots())
+    elif "--benchmark-navigation" in sys.argv:
+        asyncio.run(benchmark_navigation_profiles())
+    elif test_mode_1:
         print("Running in test mode 1")
         asyncio.run(test_browser_api())
     elif test_mode_2:
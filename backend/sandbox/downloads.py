@@ -0,0 +1,128 @@
+"""
+Streaming, range-aware reads of sandbox files.
+
+`fs.download_file` returns a whole file as bytes, so previewing a large log
+or dataset pulled all of it into backend memory. These helpers read a file in
+fixed-size chunks instead, each chunk with one command in the sandbox, so
+memory use depends on the chunk size and not on the file size:
+
+    info = await file_info(sandbox, path)
+    async for chunk in stream_file(sandbox, path, start, end):
+        ...
+
+Files that fit in one chunk are downloaded with a single SDK call.
+
+Also provided: HTTP Range parsing (single ranges), an ETag derived from a
+file's size and modification time, and head/tail line previews.
+"""
+
+import base64
+import hashlib
+import re
+import shlex
+from typing import Any, AsyncIterator, Optional, Tuple
+
+from sandbox.executor import AsyncSandbox
+
+# Bytes read from the sandbox per command
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+_RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeNotSatisfiable(Exception):
+    """The requested byte range lies outside the file."""
+
+
+def file_etag(size: int, mod_time: Any) -> str:
+    """Weak ETag of a file version, from its size and modification time."""
+    digest = hashlib.sha1(f"{size}:{mod_time}".encode()).hexdigest()[:16]
+    return f'W/"{size:x}-{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches the ETag (weak comparison)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def parse_range(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Parse a Range header into an inclusive (start, end) byte range.
+
+    Returns None when the whole file should be sent: no header, a header that
+    is not a single byte range (multiple ranges are not supported and are
+    answered with the full file), or an empty file.
+
+    Raises:
+        RangeNotSatisfiable: If the range starts beyond the end of the file
+    """
+    if not range_header or size == 0:
+        return None
+    match = _RANGE_PATTERN.match(range_header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise RangeNotSatisfiable(range_header)
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise RangeNotSatisfiable(range_header)
+    return start, end
+
+
+async def file_info(sandbox: AsyncSandbox, path: str) -> Any:
+    """File information (name, size, mod_time, is_dir) of a sandbox path."""
+    return await sandbox.fs.get_file_info(path)
+
+
+async def _exec(sandbox: AsyncSandbox, command: str) -> str:
+    response = await sandbox.process.exec(command, timeout=60)
+    if response.exit_code != 0:
+        raise RuntimeError(f"Reading from the sandbox failed: {getattr(response, 'result', '')}")
+    return response.result or ""
+
+
+async def stream_file(
+    sandbox: AsyncSandbox,
+    path: str,
+    start: int,
+    end: int,
+    size: int,
+    chunk_size: int = DOWNLOAD_CHUNK_SIZE
+) -> AsyncIterator[bytes]:
+    """Yield bytes start..end (inclusive) of a sandbox file in chunks of at most chunk_size."""
+    if start == 0 and end == size - 1 and size <= chunk_size:
+        yield await sandbox.fs.download_file(path)
+        return
+
+    quoted = shlex.quote(path)
+    offset = start
+    while offset <= end:
+        length = min(chunk_size, end - offset + 1)
+        # base64 keeps binary content intact through the command output
+        encoded = await _exec(sandbox, f"tail -c +{offset + 1} {quoted} | head -c {length} | base64 -w 0")
+        chunk = base64.b64decode(encoded)
+        if not chunk:
+            # The file shrank since its size was read
+            return
+        yield chunk
+        offset += len(chunk)
+
+
+async def preview_lines(sandbox: AsyncSandbox, path: str, mode: str, lines: int) -> str:
+    """First ("head") or last ("tail") lines of a sandbox file."""
+    if mode not in ("head", "tail"):
+        raise ValueError(f"Unknown preview mode: {mode}")
+    encoded = await _exec(sandbox, f"{mode} -n {int(lines)} {shlex.quote(path)} | base64 -w 0")
+    return base64.b64decode(encoded).decode("utf-8", errors="replace")
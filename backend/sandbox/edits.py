@@ -0,0 +1,185 @@
+"""
+Server-side file edits in a sandbox.
+
+Editing a file used to mean downloading it, changing it here and uploading it
+again, once per edit. apply_file_edits sends a batch of edits, either exact
+replacements or a unified diff, to a small script that applies them inside
+the sandbox in one command. Only the edits and the affected hunks (with a few
+lines of context) cross the wire, whatever the size of the file.
+
+The batch is atomic: every edit is checked before anything is written, and
+the new content replaces the file through a rename, so a failed batch leaves
+the file untouched.
+"""
+
+import base64
+import json
+import re
+import shlex
+import uuid
+from typing import Any, Dict, List, Optional
+
+from sandbox.executor import AsyncSandbox
+
+# Payloads larger than this are uploaded to a temporary file instead of passed as an argument
+MAX_INLINE_PAYLOAD = 64 * 1024
+
+_EDIT_BLOCK_PATTERN = re.compile(
+    r"<<<<<<< SEARCH\n(.*?)\n?=======\n(.*?)\n?>>>>>>> REPLACE", re.DOTALL
+)
+
+# Applies {"path", "edits" | "diff", "context"} to a file and prints {"ok", "hunks" | "error"}
+_APPLY_SCRIPT = r'''
+import base64, json, os, re, sys
+
+def fail(message):
+    print(json.dumps({"ok": False, "error": message}))
+    sys.exit(0)
+
+arg = sys.argv[1]
+if arg.startswith("@"):
+    with open(arg[1:]) as f:
+        payload = json.load(f)
+    os.remove(arg[1:])
+else:
+    payload = json.loads(base64.b64decode(arg))
+
+path = payload["path"]
+try:
+    with open(path, encoding="utf-8", newline="") as f:
+        content = f.read()
+except FileNotFoundError:
+    fail("File does not exist")
+except UnicodeDecodeError:
+    fail("File is not a text file")
+
+changed = []  # [first line, line count] of each changed region in the new content
+
+def shift(at_line, delta):
+    for region in changed:
+        if region[0] > at_line:
+            region[0] += delta
+
+if "edits" in payload:
+    for number, edit in enumerate(payload["edits"], 1):
+        old, new = edit["old_str"], edit["new_str"]
+        if not old:
+            fail(f"Edit {number}: old_str is empty")
+        occurrences = content.count(old)
+        if occurrences == 0:
+            fail(f"Edit {number}: old_str not found in file")
+        if occurrences > 1:
+            lines = [i + 1 for i, line in enumerate(content.split("\n")) if old.split("\n")[0] in line]
+            fail(f"Edit {number}: multiple occurrences found in lines {lines}. Please ensure old_str is unique")
+        index = content.index(old)
+        start = content.count("\n", 0, index)
+        shift(start, new.count("\n") - old.count("\n"))
+        content = content[:index] + new + content[index + len(old):]
+        changed.append([start, new.count("\n") + 1])
+else:
+    lines = content.split("\n")
+    hunk_header = re.compile(r"^@@ -(\d+)(?:,\d+)? \+\d+(?:,\d+)? @@")
+    hunks, current = [], None
+    for line in payload["diff"].rstrip("\n").split("\n"):
+        header = hunk_header.match(line)
+        if header:
+            current = {"start": int(header.group(1)), "old": [], "new": []}
+            hunks.append(current)
+        elif current is None or line.startswith(("---", "+++", "\\")):
+            continue
+        elif line.startswith("-"):
+            current["old"].append(line[1:])
+        elif line.startswith("+"):
+            current["new"].append(line[1:])
+        elif line.startswith(" ") or line == "":
+            current["old"].append(line[1:])
+            current["new"].append(line[1:])
+    if not hunks:
+        fail("No hunks found in diff")
+    offset = 0
+    for number, hunk in enumerate(hunks, 1):
+        old, new = hunk["old"], hunk["new"]
+        expected = max(hunk["start"] - 1 + offset, 0)
+        # Look for the hunk at its line number first, then progressively further away
+        candidates = sorted(range(len(lines) - len(old) + 1), key=lambda i: abs(i - expected))
+        position = next((i for i in candidates if lines[i:i + len(old)] == old), None)
+        if position is None:
+            fail(f"Hunk {number} (line {hunk['start']}) does not match the file")
+        shift(position, len(new) - len(old))
+        lines[position:position + len(old)] = new
+        offset += len(new) - len(old)
+        changed.append([position, max(len(new), 1)])
+    content = "\n".join(lines)
+
+temporary = f"{path}.apply-edits-{os.getpid()}"
+with open(temporary, "w", encoding="utf-8", newline="") as f:
+    f.write(content)
+os.chmod(temporary, os.stat(path).st_mode)
+os.replace(temporary, path)
+
+context = payload["context"]
+new_lines = content.split("\n")
+regions = []
+for start, count in sorted(changed):
+    first, last = max(start - context, 0), min(start + count - 1 + context, len(new_lines) - 1)
+    if regions and first <= regions[-1][1] + 1:
+        regions[-1][1] = max(regions[-1][1], last)
+    else:
+        regions.append([first, last])
+hunks = [
+    {"start_line": first + 1, "end_line": last + 1,
+     "snippet": "\n".join(f"{i + 1:6}\t{new_lines[i]}" for i in range(first, last + 1))}
+    for first, last in regions
+]
+print(json.dumps({"ok": True, "hunks": hunks}))
+'''
+
+
+def parse_edit_blocks(text: str) -> List[Dict[str, str]]:
+    """Parse SEARCH/REPLACE blocks (or a JSON list of {old_str, new_str}) into edits."""
+    stripped = text.strip()
+    if stripped.startswith("["):
+        return json.loads(stripped)
+    return [{"old_str": old, "new_str": new} for old, new in _EDIT_BLOCK_PATTERN.findall(text)]
+
+
+async def apply_file_edits(
+    sandbox: AsyncSandbox,
+    path: str,
+    edits: Optional[List[Dict[str, str]]] = None,
+    diff: Optional[str] = None,
+    context_lines: int = 4
+) -> Dict[str, Any]:
+    """Apply replacements or a unified diff to a sandbox file in one command.
+
+    Args:
+        sandbox: Sandbox holding the file
+        path: Absolute path of the file
+        edits: Exact replacements, [{"old_str": ..., "new_str": ...}], applied in order;
+            each old_str must occur exactly once when its turn comes
+        diff: Unified diff of the file, used when no edits are given
+        context_lines: Lines of context around each changed region in the result
+
+    Returns:
+        {"ok": True, "hunks": [{"start_line", "end_line", "snippet"}]} or {"ok": False, "error": ...}
+    """
+    payload: Dict[str, Any] = {"path": path, "context": context_lines}
+    if edits:
+        payload["edits"] = [{"old_str": edit["old_str"], "new_str": edit["new_str"]} for edit in edits]
+    elif diff:
+        payload["diff"] = diff
+    else:
+        return {"ok": False, "error": "No edits given"}
+
+    encoded = base64.b64encode(json.dumps(payload).encode()).decode()
+    if len(encoded) <= MAX_INLINE_PAYLOAD:
+        argument = encoded
+    else:
+        payload_path = f"/tmp/apply-edits-{uuid.uuid4().hex}.json"
+        await sandbox.fs.upload_file(payload_path, json.dumps(payload).encode())
+        argument = f"@{payload_path}"
+
+    response = await sandbox.process.exec(f"python3 -c {shlex.quote(_APPLY_SCRIPT)} {shlex.quote(argument)}", timeout=60)
+    if response.exit_code != 0:
+        return {"ok": False, "error": f"Applying edits failed: {response.result}"}
+    return json.loads(response.result)
@@ -0,0 +1,180 @@
+"""
+Non-blocking access to the Daytona sandbox SDK.
+
+The Daytona SDK is synchronous: every `sandbox.fs.*` and `sandbox.process.*`
+call is an HTTP request that blocks the calling thread. Called from async tool
+methods, each one stalls the event loop serving every other agent run and SSE
+stream of the process.
+
+SandboxExecutor runs those calls in a bounded thread pool, with a limit on
+concurrent calls per sandbox so one busy run cannot take all workers.
+AsyncSandbox wraps a Sandbox with awaitable versions of its methods:
+
+    sandbox = AsyncSandbox(raw_sandbox)
+    await sandbox.fs.upload_file(path, content)
+    response = await sandbox.process.exec(command, timeout=30)
+
+The executor records, per SDK method, how many calls ran and how long they
+took in the pool. That time is the event-loop stall the offloading removes.
+"""
+
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from utils.logger import logger
+
+
+class SandboxExecutor:
+    """Runs blocking sandbox SDK calls in a thread pool with per-sandbox limits."""
+
+    def __init__(self, max_workers: int = 32, max_calls_per_sandbox: int = 4, slow_call_seconds: float = 1.0):
+        """Initialize the executor.
+
+        Args:
+            max_workers: Threads running SDK calls across all sandboxes
+            max_calls_per_sandbox: SDK calls allowed to run at once for one sandbox
+            slow_call_seconds: Calls taking longer than this are logged
+        """
+        self.max_workers = max_workers
+        self.max_calls_per_sandbox = max_calls_per_sandbox
+        self.slow_call_seconds = slow_call_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sandbox-sdk")
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._users: Dict[str, int] = {}
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._stats_lock = threading.Lock()
+
+    def _record(self, operation: str, duration: float, wait: float, failed: bool):
+        with self._stats_lock:
+            stats = self._stats.setdefault(
+                operation,
+                {"calls": 0, "errors": 0, "offloaded_seconds": 0.0, "max_seconds": 0.0, "wait_seconds": 0.0}
+            )
+            stats["calls"] += 1
+            stats["errors"] += int(failed)
+            stats["offloaded_seconds"] += duration
+            stats["max_seconds"] = max(stats["max_seconds"], duration)
+            stats["wait_seconds"] += wait
+
+    async def run(self, sandbox_id: Optional[str], operation: str, fn: Callable, *args, **kwargs) -> Any:
+        """Run a blocking SDK call off the event loop.
+
+        Args:
+            sandbox_id: Sandbox the call operates on; None for calls without a sandbox (e.g. create)
+            operation: Name of the call in the metrics, e.g. "fs.upload_file"
+            fn: The blocking callable
+            *args, **kwargs: Arguments for fn
+
+        Returns:
+            The callable's result
+        """
+        loop = asyncio.get_running_loop()
+        call = functools.partial(fn, *args, **kwargs)
+        queued_at = time.monotonic()
+
+        if sandbox_id is None:
+            return await self._run_in_pool(loop, operation, call, queued_at)
+
+        semaphore = self._semaphores.get(sandbox_id)
+        if semaphore is None:
+            semaphore = self._semaphores[sandbox_id] = asyncio.Semaphore(self.max_calls_per_sandbox)
+        self._users[sandbox_id] = self._users.get(sandbox_id, 0) + 1
+        try:
+            async with semaphore:
+                return await self._run_in_pool(loop, operation, call, queued_at)
+        finally:
+            self._users[sandbox_id] -= 1
+            if self._users[sandbox_id] == 0:
+                del self._users[sandbox_id]
+                del self._semaphores[sandbox_id]
+
+    async def _run_in_pool(self, loop, operation: str, call: Callable, queued_at: float) -> Any:
+        timing = {}
+
+        def timed_call():
+            timing["started"] = time.monotonic()
+            try:
+                return call()
+            finally:
+                timing["finished"] = time.monotonic()
+
+        failed = False
+        try:
+            return await loop.run_in_executor(self._executor, timed_call)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            started = timing.get("started", queued_at)
+            duration = timing.get("finished", started) - started
+            self._record(operation, duration, started - queued_at, failed)
+            if duration > self.slow_call_seconds:
+                logger.debug(f"Sandbox call {operation} took {duration:.2f}s off the event loop")
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-operation call counts and timings, plus the total time kept off the event loop."""
+        with self._stats_lock:
+            operations = {name: dict(stats) for name, stats in self._stats.items()}
+        return {
+            "stall_avoided_seconds": round(sum(stats["offloaded_seconds"] for stats in operations.values()), 3),
+            "operations": operations
+        }
+
+    def shutdown(self, wait: bool = False):
+        """Stop the worker threads."""
+        self._executor.shutdown(wait=wait)
+
+
+class _AsyncNamespace:
+    """Awaitable view of an SDK object: callables run in the executor, other attributes pass through."""
+
+    def __init__(self, target: Any, executor: SandboxExecutor, sandbox_id: Optional[str], prefix: str):
+        self._target = target
+        self._executor = executor
+        self._sandbox_id = sandbox_id
+        self._prefix = prefix
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._target, name)
+        if not callable(attr):
+            return attr
+
+        operation = f"{self._prefix}.{name}" if self._prefix else name
+
+        async def call(*args, **kwargs):
+            return await self._executor.run(self._sandbox_id, operation, attr, *args, **kwargs)
+
+        return call
+
+
+class AsyncSandbox(_AsyncNamespace):
+    """A Daytona Sandbox whose SDK methods are awaitable and run off the event loop."""
+
+    def __init__(self, sandbox: Any, executor: Optional[SandboxExecutor] = None):
+        executor = executor or get_sandbox_executor()
+        sandbox_id = getattr(sandbox, 'id', None)
+        super().__init__(sandbox, executor, sandbox_id, "")
+        self.sandbox = sandbox
+        self.fs = _AsyncNamespace(sandbox.fs, executor, sandbox_id, "fs")
+        self.process = _AsyncNamespace(sandbox.process, executor, sandbox_id, "process")
+
+
+# Shared executor instance configured from the environment
+sandbox_executor = None
+
+
+def get_sandbox_executor() -> SandboxExecutor:
+    """Return the process-wide sandbox executor, creating it on first use."""
+    global sandbox_executor
+    if sandbox_executor is None:
+        from utils.config import config
+        sandbox_executor = SandboxExecutor(
+            max_workers=config.SANDBOX_EXECUTOR_WORKERS,
+            max_calls_per_sandbox=config.SANDBOX_MAX_CALLS_PER_SANDBOX,
+            slow_call_seconds=config.SANDBOX_SLOW_CALL_MS / 1000
+        )
+    return sandbox_executor
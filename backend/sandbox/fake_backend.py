@@ -0,0 +1,142 @@
+"""
+In-memory stand-in for Daytona, for running the sandbox pool offline.
+
+FakeDaytonaBackend implements SandboxBackend with FakeSandbox objects that
+mimic the parts of the Daytona Sandbox API the backend uses: `id`,
+`instance.state`, `labels`, an in-memory `fs` (upload, download, list, info), a
+`process.exec` that succeeds without running anything, `get_preview_link` and
+`set_labels`. Select it with SANDBOX_BACKEND=fake.
+"""
+
+import asyncio
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from sandbox.pool import SandboxBackend
+
+
+@dataclass
+class FakeInstance:
+    state: str = "started"
+
+
+@dataclass
+class FakePreviewLink:
+    url: str
+    token: str = "fake-token"
+
+
+@dataclass
+class FakeFileInfo:
+    name: str
+    is_dir: bool
+    size: int
+    mod_time: str = ""
+
+
+@dataclass
+class FakeExecuteResponse:
+    exit_code: int = 0
+    result: str = ""
+
+
+class FakeFileSystem:
+    """Files kept in a dict instead of a sandbox."""
+
+    def __init__(self):
+        self.files: Dict[str, bytes] = {}
+
+    def upload_file(self, path: str, content: bytes):
+        self.files[path] = content
+
+    def download_file(self, path: str) -> bytes:
+        if path not in self.files:
+            raise FileNotFoundError(path)
+        return self.files[path]
+
+    def delete_file(self, path: str):
+        self.files.pop(path, None)
+
+    def get_file_info(self, path: str) -> FakeFileInfo:
+        name = path.rstrip("/").rsplit("/", 1)[-1]
+        if path in self.files:
+            return FakeFileInfo(name=name, is_dir=False, size=len(self.files[path]))
+        if self.list_files(path):
+            return FakeFileInfo(name=name, is_dir=True, size=0)
+        raise FileNotFoundError(path)
+
+    def list_files(self, path: str) -> List[FakeFileInfo]:
+        prefix = path.rstrip("/") + "/"
+        entries = {}
+        for file_path, content in self.files.items():
+            if not file_path.startswith(prefix):
+                continue
+            name, _, rest = file_path[len(prefix):].partition("/")
+            entries[name] = FakeFileInfo(name=name, is_dir=bool(rest), size=0 if rest else len(content))
+        return list(entries.values())
+
+
+class FakeProcess:
+    """Accepts commands and reports success without running them."""
+
+    def __init__(self):
+        self.commands = []
+
+    def exec(self, command: str, cwd: Optional[str] = None, timeout: Optional[int] = None) -> FakeExecuteResponse:
+        self.commands.append(command)
+        return FakeExecuteResponse()
+
+
+class FakeSandbox:
+    """A sandbox that only exists in memory."""
+
+    def __init__(self, sandbox_id: str, labels: Optional[Dict[str, str]] = None):
+        self.id = sandbox_id
+        self.instance = FakeInstance()
+        self.labels = dict(labels or {})
+        self.fs = FakeFileSystem()
+        self.process = FakeProcess()
+
+    def get_preview_link(self, port: int) -> FakePreviewLink:
+        return FakePreviewLink(url=f"https://{port}-{self.id}.fake.daytona.local")
+
+    def set_labels(self, labels: Dict[str, str]) -> Dict[str, str]:
+        self.labels = dict(labels)
+        return self.labels
+
+
+class FakeDaytonaBackend(SandboxBackend):
+    """SandboxBackend keeping FakeSandbox objects in memory."""
+
+    def __init__(self, create_delay: float = 0.0):
+        """Initialize the backend.
+
+        Args:
+            create_delay: Seconds a create takes, to simulate a slow Daytona
+        """
+        self.create_delay = create_delay
+        self.sandboxes: Dict[str, FakeSandbox] = {}
+        self.created = 0
+        self.deleted = 0
+
+    async def create(self, password: str, project_id: Optional[str] = None) -> FakeSandbox:
+        await asyncio.sleep(self.create_delay)
+        sandbox = FakeSandbox(f"fake-{uuid.uuid4()}", {'id': project_id} if project_id else None)
+        self.sandboxes[sandbox.id] = sandbox
+        self.created += 1
+        return sandbox
+
+    async def get(self, sandbox_id: str) -> FakeSandbox:
+        sandbox = self.sandboxes.get(sandbox_id)
+        if sandbox is None:
+            raise ValueError(f"Sandbox {sandbox_id} not found")
+        sandbox.instance.state = "started"
+        return sandbox
+
+    async def set_labels(self, sandbox: Any, labels: Dict[str, str]) -> None:
+        sandbox.set_labels(labels)
+
+    async def delete(self, sandbox_id: str) -> None:
+        if self.sandboxes.pop(sandbox_id, None) is not None:
+            self.deleted += 1
@@ -0,0 +1,158 @@
+"""
+Process-level cache of sandbox handles.
+
+Every tool initialization and every file browser request used to fetch the
+sandbox from Daytona and check its state. The cache keeps the handle and its
+last known state per sandbox ID and revalidates it after a short TTL, so warm
+paths need no SDK round trip.
+
+Loads are single-flight: concurrent requests for a sandbox that is not cached,
+expired or stopped share one fetch and at most one start.
+
+Handles are invalidated when a sandbox is archived, stopped or deleted. Those
+events are published on the `sandbox_events` Redis channel so every API
+instance and worker drops its copy, along with anything else it keeps per
+sandbox (e.g. browser API clients); the TTL covers stops Daytona does on its
+own (auto-stop).
+"""
+
+import asyncio
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from services import redis
+from utils.logger import logger
+
+SANDBOX_EVENTS_CHANNEL = "sandbox_events"
+
+
+@dataclass
+class SandboxHandle:
+    """A sandbox handle and the state it had when it was last validated."""
+    sandbox: Any
+    state: str
+    validated_at: float = field(default_factory=time.monotonic)
+
+
+class SandboxHandleCache:
+    """Caches sandbox handles by ID with TTL revalidation and single-flight starts."""
+
+    def __init__(
+        self,
+        fetch: Callable[[str], Awaitable[Any]],
+        start: Callable[[Any], Awaitable[Any]],
+        needs_start: Callable[[Any], bool],
+        state_of: Callable[[Any], str],
+        ttl_seconds: float = 30
+    ):
+        """Initialize the cache.
+
+        Args:
+            fetch: Fetches a sandbox handle by ID
+            start: Starts a stopped or archived sandbox and returns its refreshed handle
+            needs_start: Whether a fetched sandbox has to be started before use
+            state_of: State of a sandbox handle, for logging and stats
+            ttl_seconds: Seconds a handle is used without revalidation
+        """
+        self.fetch = fetch
+        self.start = start
+        self.needs_start = needs_start
+        self.state_of = state_of
+        self.ttl_seconds = ttl_seconds
+        self._handles: Dict[str, SandboxHandle] = {}
+        self._loading: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.starts = 0
+
+    async def get(self, sandbox_id: str) -> Any:
+        """Return a running sandbox, fetching or starting it only when needed."""
+        handle = self._handles.get(sandbox_id)
+        if handle and time.monotonic() - handle.validated_at < self.ttl_seconds:
+            self.hits += 1
+            return handle.sandbox
+
+        task = self._loading.get(sandbox_id)
+        if task is None:
+            task = asyncio.ensure_future(self._load(sandbox_id))
+            self._loading[sandbox_id] = task
+
+            def _done(finished, sandbox_id=sandbox_id):
+                if self._loading.get(sandbox_id) is finished:
+                    del self._loading[sandbox_id]
+
+            task.add_done_callback(_done)
+        # Shielded so a cancelled caller does not abort the load for the others
+        return await asyncio.shield(task)
+
+    async def _load(self, sandbox_id: str) -> Any:
+        self.misses += 1
+        sandbox = await self.fetch(sandbox_id)
+        if self.needs_start(sandbox):
+            logger.info(f"Sandbox {sandbox_id} is in {self.state_of(sandbox)} state. Starting...")
+            self.starts += 1
+            sandbox = await self.start(sandbox)
+        self._handles[sandbox_id] = SandboxHandle(sandbox=sandbox, state=str(self.state_of(sandbox)))
+        return sandbox
+
+    def invalidate(self, sandbox_id: str):
+        """Drop the cached handle of a sandbox; the next get() fetches it again."""
+        if self._handles.pop(sandbox_id, None):
+            logger.debug(f"Invalidated cached handle of sandbox {sandbox_id}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache size and hit/miss/start counters."""
+        return {"size": len(self._handles), "hits": self.hits, "misses": self.misses, "starts": self.starts}
+
+
+async def publish_sandbox_event(cache: SandboxHandleCache, sandbox_id: str, event: str):
+    """Invalidate a sandbox locally and tell the other processes (event: "archived", "stopped", "deleted")."""
+    cache.invalidate(sandbox_id)
+    await redis.publish(SANDBOX_EVENTS_CHANNEL, json.dumps({"sandbox_id": sandbox_id, "event": event}))
+
+
+async def listen_for_sandbox_events(
+    cache: SandboxHandleCache,
+    on_invalidate: Optional[Callable[[str], Awaitable[Any]]] = None
+):
+    """Invalidate cached handles when other processes report sandbox state changes. Runs until cancelled.
+
+    Args:
+        cache: Handle cache to invalidate
+        on_invalidate: Also called with the sandbox ID, to drop other per-sandbox state
+    """
+    while True:
+        pubsub = None
+        try:
+            pubsub = await redis.create_pubsub()
+            if pubsub is None:
+                await asyncio.sleep(30)
+                continue
+            await pubsub.subscribe(SANDBOX_EVENTS_CHANNEL)
+            async for message in pubsub.listen():
+                if message.get('type') != 'message':
+                    continue
+                try:
+                    sandbox_id = json.loads(message['data'])['sandbox_id']
+                except (ValueError, KeyError, TypeError):
+                    logger.warning(f"Ignoring malformed sandbox event: {message.get('data')}")
+                    continue
+                cache.invalidate(sandbox_id)
+                if on_invalidate:
+                    try:
+                        await on_invalidate(sandbox_id)
+                    except Exception as e:
+                        logger.warning(f"Failed to drop state of sandbox {sandbox_id}: {str(e)}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Sandbox event listener failed, resubscribing: {str(e)}")
+            await asyncio.sleep(5)
+        finally:
+            if pubsub is not None:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
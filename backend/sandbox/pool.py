@@ -0,0 +1,311 @@
+"""
+Pool of pre-created, pre-started sandboxes for new projects.
+
+Creating a Daytona sandbox and starting its services takes tens of seconds,
+which a new project used to wait for on its first agent run. The pool keeps
+SANDBOX_POOL_SIZE generic sandboxes running; a new project claims one
+atomically and labels it with its project ID, and only falls back to creating
+a sandbox when the pool is empty.
+
+A background replenisher creates sandboxes until the pool is back at its
+target size and deletes members that stayed unclaimed for longer than
+SANDBOX_POOL_MAX_IDLE_SECONDS, so idle sandboxes do not run up cost. Every API
+instance runs the replenisher; a Redis lock lets one of them work at a time.
+
+Sandboxes are created through a SandboxBackend: DaytonaBackend for real
+sandboxes, or the in-memory FakeDaytonaBackend (SANDBOX_BACKEND=fake) for
+running offline.
+
+Keys:
+    sandbox_pool:ready    - ZSET sandbox ID -> time it joined the pool (unix seconds)
+    sandbox_pool:members  - HASH sandbox ID -> JSON {"pass": VNC password}
+    sandbox_pool:lock     - replenisher lock, holds the owner's token
+"""
+
+import asyncio
+import json
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+
+from services import redis
+from utils.logger import logger
+
+POOL_PREFIX = "sandbox_pool"
+
+# Atomically take the oldest pool member that has not expired yet.
+_CLAIM_SCRIPT = """
+local members = redis.call('ZRANGEBYSCORE', KEYS[1], ARGV[1], '+inf', 'LIMIT', 0, 1)
+local sandbox_id = members[1]
+if not sandbox_id then
+    return nil
+end
+redis.call('ZREM', KEYS[1], sandbox_id)
+local info = redis.call('HGET', KEYS[2], sandbox_id)
+redis.call('HDEL', KEYS[2], sandbox_id)
+if not info then
+    info = ''
+end
+return {sandbox_id, info}
+"""
+
+# Atomically remove members that joined the pool before the cutoff.
+_EXPIRE_SCRIPT = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', '(' .. ARGV[1], 'LIMIT', 0, 100)
+for _, sandbox_id in ipairs(expired) do
+    redis.call('ZREM', KEYS[1], sandbox_id)
+    redis.call('HDEL', KEYS[2], sandbox_id)
+end
+return expired
+"""
+
+# Release the replenisher lock, but only if the caller still holds it.
+_UNLOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class SandboxBackend(ABC):
+    """Creates, fetches, labels and deletes sandboxes for the pool."""
+
+    @abstractmethod
+    async def create(self, password: str, project_id: Optional[str] = None) -> Any:
+        """Create and start a sandbox; project_id is used as its label when given."""
+
+    @abstractmethod
+    async def get(self, sandbox_id: str) -> Any:
+        """Return a running sandbox by ID, starting it if needed."""
+
+    @abstractmethod
+    async def set_labels(self, sandbox: Any, labels: Dict[str, str]) -> None:
+        """Replace the labels of a sandbox."""
+
+    @abstractmethod
+    async def delete(self, sandbox_id: str) -> None:
+        """Delete a sandbox."""
+
+
+class DaytonaBackend(SandboxBackend):
+    """Sandboxes on the configured Daytona server."""
+
+    async def create(self, password: str, project_id: Optional[str] = None) -> Any:
+        from sandbox.executor import get_sandbox_executor
+        from sandbox.sandbox import create_sandbox
+        return await get_sandbox_executor().run(None, "create_sandbox", create_sandbox, password, project_id)
+
+    async def get(self, sandbox_id: str) -> Any:
+        from sandbox.sandbox import get_or_start_sandbox
+        return await get_or_start_sandbox(sandbox_id)
+
+    async def set_labels(self, sandbox: Any, labels: Dict[str, str]) -> None:
+        from sandbox.executor import AsyncSandbox
+        await AsyncSandbox(sandbox).set_labels(labels)
+
+    async def delete(self, sandbox_id: str) -> None:
+        from sandbox.executor import get_sandbox_executor
+        from sandbox.sandbox import daytona, sandbox_handles
+        executor = get_sandbox_executor()
+        sandbox = await executor.run(sandbox_id, "daytona.get_current_sandbox", daytona.get_current_sandbox, sandbox_id)
+        await executor.run(sandbox_id, "daytona.remove", daytona.remove, sandbox)
+        sandbox_handles.invalidate(sandbox_id)
+
+
+class SandboxPool:
+    """Redis-backed pool of ready sandboxes with atomic claims and a replenisher."""
+
+    def __init__(
+        self,
+        backend: SandboxBackend,
+        target_size: int = 0,
+        max_idle_seconds: int = 600,
+        replenish_interval: float = 30,
+        prefix: str = POOL_PREFIX
+    ):
+        """Initialize the pool.
+
+        Args:
+            backend: Backend the pool creates and deletes sandboxes with
+            target_size: Number of ready sandboxes to keep; 0 disables the pool
+            max_idle_seconds: Unclaimed sandboxes are deleted after this
+            replenish_interval: Seconds between replenisher passes
+            prefix: Prefix of the Redis keys
+        """
+        self.backend = backend
+        self.target_size = target_size
+        self.max_idle_seconds = max_idle_seconds
+        self.replenish_interval = replenish_interval
+        self.ready_key = f"{prefix}:ready"
+        self.members_key = f"{prefix}:members"
+        self.lock_key = f"{prefix}:lock"
+        self._wake = asyncio.Event()
+        self.claims = 0
+        self.empty_claims = 0
+        self.created = 0
+        self.expired = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.target_size > 0
+
+    async def _eval(self, script: str, keys: List[str], args: List[Any]):
+        """Run a Lua script atomically on the Redis server."""
+        redis_client = await redis.get_client()
+        if redis_client is None:
+            raise RuntimeError("Redis is not available for the sandbox pool")
+        return await redis_client.eval(script, len(keys), *keys, *args)
+
+    def _idle_cutoff(self) -> float:
+        return time.time() - self.max_idle_seconds
+
+    async def claim(self, project_id: str) -> Optional[Tuple[Any, str, str]]:
+        """Take a ready sandbox from the pool and label it with the project ID.
+
+        Returns:
+            (sandbox, sandbox_id, sandbox_pass) or None if no usable sandbox is ready
+        """
+        if not self.enabled:
+            return None
+
+        result = await self._eval(_CLAIM_SCRIPT, keys=[self.ready_key, self.members_key], args=[self._idle_cutoff()])
+        # Refill in the background right away instead of waiting for the next pass
+        self._wake.set()
+        if not result:
+            self.empty_claims += 1
+            logger.info(f"Sandbox pool is empty, project {project_id} gets a new sandbox")
+            return None
+
+        sandbox_id, info_json = result
+        sandbox_pass = json.loads(info_json).get('pass') if info_json else None
+        try:
+            sandbox = await self.backend.get(sandbox_id)
+            await self.backend.set_labels(sandbox, {'id': project_id})
+        except Exception as e:
+            logger.error(f"Claimed pool sandbox {sandbox_id} is not usable: {str(e)}")
+            await self._delete(sandbox_id)
+            self.empty_claims += 1
+            return None
+
+        self.claims += 1
+        logger.info(f"Project {project_id} claimed pool sandbox {sandbox_id}")
+        return sandbox, sandbox_id, sandbox_pass
+
+    async def _add(self) -> Optional[str]:
+        """Create a sandbox and add it to the pool."""
+        sandbox_pass = str(uuid.uuid4())
+        try:
+            sandbox = await self.backend.create(sandbox_pass)
+        except Exception as e:
+            logger.error(f"Failed to create pool sandbox: {str(e)}")
+            return None
+        redis_client = await redis.get_client()
+        async with redis_client.pipeline(transaction=True) as pipe:
+            pipe.hset(self.members_key, sandbox.id, json.dumps({'pass': sandbox_pass}))
+            pipe.zadd(self.ready_key, {sandbox.id: time.time()})
+            await pipe.execute()
+        self.created += 1
+        return sandbox.id
+
+    async def _delete(self, sandbox_id: str):
+        try:
+            await self.backend.delete(sandbox_id)
+        except Exception as e:
+            logger.warning(f"Failed to delete pool sandbox {sandbox_id}: {str(e)}")
+
+    async def replenish(self) -> Dict[str, int]:
+        """Delete expired members and create sandboxes until the pool is at its target size.
+
+        Returns:
+            Number of sandboxes created and expired in this pass
+        """
+        token = str(uuid.uuid4())
+        redis_client = await redis.get_client()
+        if redis_client is None:
+            raise RuntimeError("Redis is not available for the sandbox pool")
+        # Creating sandboxes can take a while; the lock outlives a slow pass
+        lock_seconds = max(int(self.replenish_interval * 4), 120)
+        if not await redis_client.set(self.lock_key, token, nx=True, ex=lock_seconds):
+            return {"created": 0, "expired": 0}
+
+        try:
+            expired = await self._eval(
+                _EXPIRE_SCRIPT, keys=[self.ready_key, self.members_key], args=[self._idle_cutoff()]
+            )
+            if expired:
+                logger.info(f"Deleting {len(expired)} idle pool sandboxes: {list(expired)}")
+                await asyncio.gather(*[self._delete(sandbox_id) for sandbox_id in expired])
+                self.expired += len(expired)
+
+            missing = self.target_size - await redis_client.zcard(self.ready_key)
+            created = []
+            if missing > 0:
+                logger.info(f"Creating {missing} sandboxes for the sandbox pool")
+                created = [
+                    sandbox_id for sandbox_id in await asyncio.gather(*[self._add() for _ in range(missing)])
+                    if sandbox_id
+                ]
+            return {"created": len(created), "expired": len(expired or [])}
+        finally:
+            await self._eval(_UNLOCK_SCRIPT, keys=[self.lock_key], args=[token])
+
+    async def run_replenisher(self):
+        """Keep the pool at its target size. Runs until cancelled."""
+        while True:
+            self._wake.clear()
+            try:
+                await self.replenish()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Sandbox pool replenisher failed: {str(e)}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.replenish_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def ready_count(self) -> int:
+        redis_client = await redis.get_client()
+        if redis_client is None:
+            return 0
+        return await redis_client.zcard(self.ready_key)
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool size and claim/create/expiry counters of this process."""
+        return {
+            "target_size": self.target_size,
+            "claims": self.claims,
+            "empty_claims": self.empty_claims,
+            "created": self.created,
+            "expired": self.expired
+        }
+
+
+def get_sandbox_backend(name: str) -> SandboxBackend:
+    """Return the sandbox backend for a SANDBOX_BACKEND value ("daytona" or "fake")."""
+    if name == "fake":
+        from sandbox.fake_backend import FakeDaytonaBackend
+        return FakeDaytonaBackend()
+    if name == "daytona":
+        return DaytonaBackend()
+    raise ValueError(f"Unknown sandbox backend: {name}")
+
+
+# Shared pool instance configured from the environment
+sandbox_pool = None
+
+
+def get_sandbox_pool() -> SandboxPool:
+    """Return the process-wide sandbox pool, creating it on first use."""
+    global sandbox_pool
+    if sandbox_pool is None:
+        from utils.config import config
+        sandbox_pool = SandboxPool(
+            backend=get_sandbox_backend(config.SANDBOX_BACKEND),
+            target_size=config.SANDBOX_POOL_SIZE,
+            max_idle_seconds=config.SANDBOX_POOL_MAX_IDLE_SECONDS,
+            replenish_interval=config.SANDBOX_POOL_REPLENISH_INTERVAL
+        )
+    return sandbox_pool
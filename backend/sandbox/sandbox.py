@@ -9,6 +9,8 @@ from agentpress.tool import Tool
 from utils.logger import logger
 from utils.config import config
 from utils.files_utils import clean_path
+from sandbox.executor import AsyncSandbox, get_sandbox_executor
+from sandbox.handle_cache import SandboxHandleCache
 from agentpress.thread_manager import ThreadManager
 
 load_dotenv()
@@ -38,33 +40,43 @@ else:
 daytona = Daytona(daytona_config)
 logger.debug("Daytona client initialized")
 
-async def get_or_start_sandbox(sandbox_id: str):
-    """Retrieve a sandbox by ID, check its state, and start it if needed."""
-    
-    logger.info(f"Getting or starting sandbox with ID: {sandbox_id}")
-    
+async def _fetch_sandbox(sandbox_id: str) -> Sandbox:
+    # The SDK is synchronous; run its calls off the event loop
+    return await get_sandbox_executor().run(
+        sandbox_id, "daytona.get_current_sandbox", daytona.get_current_sandbox, sandbox_id
+    )
+
+async def _start_sandbox(sandbox: Sandbox) -> Sandbox:
+    executor = get_sandbox_executor()
     try:
-        sandbox = daytona.get_current_sandbox(sandbox_id)
+        await executor.run(sandbox.id, "daytona.start", daytona.start, sandbox)
+        # Refresh sandbox state after starting
+        sandbox = await _fetch_sandbox(sandbox.id)
         
-        # Check if sandbox needs to be started
-        if sandbox.instance.state == WorkspaceState.ARCHIVED or sandbox.instance.state == WorkspaceState.STOPPED:
-            logger.info(f"Sandbox is in {sandbox.instance.state} state. Starting...")
-            try:
-                daytona.start(sandbox)
-                # Wait a moment for the sandbox to initialize
-                # sleep(5)
-                # Refresh sandbox state after starting
-                sandbox = daytona.get_current_sandbox(sandbox_id)
-                
-                # Start supervisord in a session when restarting
-                start_supervisord_session(sandbox)
-            except Exception as e:
-                logger.error(f"Error starting sandbox: {e}")
-                raise e
-        
-        logger.info(f"Sandbox {sandbox_id} is ready")
+        # Start supervisord in a session when restarting
+        await executor.run(sandbox.id, "start_supervisord_session", start_supervisord_session, sandbox)
         return sandbox
-        
+    except Exception as e:
+        logger.error(f"Error starting sandbox: {e}")
+        raise e
+
+# Handles are shared by all tools and requests of the process
+sandbox_handles = SandboxHandleCache(
+    fetch=_fetch_sandbox,
+    start=_start_sandbox,
+    needs_start=lambda sandbox: sandbox.instance.state in (WorkspaceState.ARCHIVED, WorkspaceState.STOPPED),
+    state_of=lambda sandbox: sandbox.instance.state,
+    ttl_seconds=config.SANDBOX_HANDLE_TTL_SECONDS
+)
+
+async def get_or_start_sandbox(sandbox_id: str):
+    """Retrieve a sandbox by ID, check its state, and start it if needed.
+
+    Handles come from a process-level cache and are revalidated after
+    SANDBOX_HANDLE_TTL_SECONDS; concurrent callers share one fetch and start.
+    """
+    try:
+        return await sandbox_handles.get(sandbox_id)
     except Exception as e:
         logger.error(f"Error retrieving or starting sandbox: {str(e)}")
         raise e
@@ -146,9 +158,13 @@ class SandboxToolsBase(Tool):
         self._sandbox = None
         self._sandbox_id = None
         self._sandbox_pass = None
+        self._async_sandbox = None
 
     async def _ensure_sandbox(self) -> Sandbox:
         """Ensure we have a valid sandbox instance, retrieving it from the project if needed."""
+        if self._sandbox_id is not None:
+            # Cached handle, revalidated (and restarted if stopped) once its TTL expired
+            self._sandbox = await get_or_start_sandbox(self._sandbox_id)
         if self._sandbox is None:
             try:
                 # Get database client
@@ -199,6 +215,14 @@ class SandboxToolsBase(Tool):
             raise RuntimeError("Sandbox not initialized. Call _ensure_sandbox() first.")
         return self._sandbox
 
+    @property
+    def async_sandbox(self) -> AsyncSandbox:
+        """Get the sandbox with awaitable SDK methods that run off the event loop."""
+        sandbox = self.sandbox
+        if self._async_sandbox is None or self._async_sandbox.sandbox is not sandbox:
+            self._async_sandbox = AsyncSandbox(sandbox)
+        return self._async_sandbox
+
     @property
     def sandbox_id(self) -> str:
         """Get the sandbox ID, ensuring it exists."""
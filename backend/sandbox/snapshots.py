@@ -0,0 +1,181 @@
+"""
+Incremental snapshots of a sandbox workspace.
+
+Reading the workspace state used to download and decode every file on each
+call. A snapshot instead starts from a manifest of (path, size, mtime, sha1)
+that the sandbox computes with a single command, and downloads only the files
+whose hash changed since the project's previous snapshot; unchanged files are
+taken from the cached snapshot. Each refresh also records which files were
+added, modified and deleted.
+
+Snapshots are cached per project and sandbox in a bounded LRU, so a project
+that gets a new sandbox starts over.
+"""
+
+import asyncio
+import json
+import shlex
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sandbox.executor import AsyncSandbox
+from utils.files_utils import EXCLUDED_DIRS
+from utils.logger import logger
+
+# Walks the workspace in the sandbox and prints {relative path: [size, mtime, sha1]}
+_MANIFEST_SCRIPT = r'''
+import hashlib, json, os, sys
+root, excluded_dirs = sys.argv[1], set(json.loads(sys.argv[2]))
+manifest = {}
+for directory, dirs, files in os.walk(root):
+    dirs[:] = [name for name in dirs if name not in excluded_dirs]
+    for name in files:
+        path = os.path.join(directory, name)
+        try:
+            stat = os.stat(path)
+            digest = hashlib.sha1()
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+        except OSError:
+            continue
+        manifest[os.path.relpath(path, root)] = [stat.st_size, stat.st_mtime, digest.hexdigest()]
+print(json.dumps(manifest))
+'''
+
+
+@dataclass(frozen=True)
+class ManifestEntry:
+    """Size, modification time and content hash of a workspace file."""
+    size: int
+    mtime: float
+    sha1: str
+
+
+@dataclass
+class WorkspaceSnapshot:
+    """Manifest and decoded text files of a workspace, plus what changed in the last refresh."""
+    manifest: Dict[str, ManifestEntry] = field(default_factory=dict)
+    files: Dict[str, dict] = field(default_factory=dict)
+    changes: Dict[str, List[str]] = field(default_factory=lambda: {"added": [], "modified": [], "deleted": []})
+
+
+async def read_manifest(sandbox: AsyncSandbox, root: str = "/workspace") -> Dict[str, ManifestEntry]:
+    """Compute the manifest of all files below root, skipping EXCLUDED_DIRS, with one command."""
+    command = (
+        f"python3 -c {shlex.quote(_MANIFEST_SCRIPT)} {shlex.quote(root)} "
+        f"{shlex.quote(json.dumps(sorted(EXCLUDED_DIRS)))}"
+    )
+    response = await sandbox.process.exec(command, timeout=120)
+    if response.exit_code != 0:
+        raise RuntimeError(f"Computing the workspace manifest failed: {response.result}")
+    return {path: ManifestEntry(*entry) for path, entry in json.loads(response.result).items()}
+
+
+def diff_manifests(old: Dict[str, ManifestEntry], new: Dict[str, ManifestEntry]) -> Dict[str, List[str]]:
+    """Paths added, modified (content hash changed) and deleted between two manifests."""
+    return {
+        "added": sorted(path for path in new if path not in old),
+        "modified": sorted(path for path in new if path in old and new[path].sha1 != old[path].sha1),
+        "deleted": sorted(path for path in old if path not in new)
+    }
+
+
+class WorkspaceSnapshots:
+    """Per-project cache of workspace snapshots, refreshed incrementally."""
+
+    def __init__(self, max_projects: int = 32):
+        """Initialize the cache.
+
+        Args:
+            max_projects: Snapshots kept; the least recently refreshed are dropped first
+        """
+        self.max_projects = max_projects
+        self._snapshots: "OrderedDict[Tuple[str, str], WorkspaceSnapshot]" = OrderedDict()
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+        self.files_fetched = 0
+        self.files_reused = 0
+
+    async def refresh(
+        self,
+        project_id: str,
+        sandbox: AsyncSandbox,
+        root: str = "/workspace",
+        should_exclude: Optional[Callable[[str], bool]] = None
+    ) -> WorkspaceSnapshot:
+        """Bring the project's snapshot up to date with the sandbox and return it.
+
+        Args:
+            project_id: Project the workspace belongs to
+            sandbox: The project's sandbox
+            root: Workspace directory
+            should_exclude: Relative paths for which this returns True are left out
+        """
+        key = (project_id, getattr(sandbox.sandbox, 'id', ''))
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            previous = self._snapshots.get(key) or WorkspaceSnapshot()
+            manifest = await read_manifest(sandbox, root)
+            if should_exclude:
+                manifest = {path: entry for path, entry in manifest.items() if not should_exclude(path)}
+            changes = diff_manifests(previous.manifest, manifest)
+
+            files = {path: state for path, state in previous.files.items()
+                     if path in manifest and path not in changes["modified"]}
+            changed = changes["added"] + changes["modified"]
+            # Paths the previous snapshot skipped as binary stay skipped until their content changes
+            self.files_reused += len(manifest) - len(changed)
+
+            async def fetch(path: str) -> Optional[dict]:
+                entry = manifest[path]
+                try:
+                    content = (await sandbox.fs.download_file(f"{root}/{path}")).decode()
+                except UnicodeDecodeError:
+                    logger.debug(f"Skipping binary file: {path}")
+                    return None
+                except Exception as e:
+                    logger.warning(f"Error reading file {path}: {str(e)}")
+                    return None
+                return {
+                    "content": content,
+                    "is_dir": False,
+                    "size": entry.size,
+                    "modified": datetime.fromtimestamp(entry.mtime, timezone.utc).isoformat()
+                }
+
+            # The sandbox executor bounds how many downloads run at once
+            for path, state in zip(changed, await asyncio.gather(*[fetch(path) for path in changed])):
+                if state is not None:
+                    files[path] = state
+            self.files_fetched += len(changed)
+
+            snapshot = WorkspaceSnapshot(manifest=manifest, files=files, changes=changes)
+            self._snapshots[key] = snapshot
+            self._snapshots.move_to_end(key)
+            while len(self._snapshots) > self.max_projects:
+                evicted, _ = self._snapshots.popitem(last=False)
+                self._locks.pop(evicted, None)
+            return snapshot
+
+    def invalidate(self, project_id: str):
+        """Drop the snapshots of a project."""
+        for key in [key for key in self._snapshots if key[0] == project_id]:
+            del self._snapshots[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {"projects": len(self._snapshots), "files_fetched": self.files_fetched, "files_reused": self.files_reused}
+
+
+# Shared snapshot cache configured from the environment
+workspace_snapshots = None
+
+
+def get_workspace_snapshots() -> WorkspaceSnapshots:
+    """Return the process-wide workspace snapshot cache, creating it on first use."""
+    global workspace_snapshots
+    if workspace_snapshots is None:
+        from utils.config import config
+        workspace_snapshots = WorkspaceSnapshots(max_projects=config.WORKSPACE_SNAPSHOT_CACHE_SIZE)
+    return workspace_snapshots
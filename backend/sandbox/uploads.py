@@ -0,0 +1,185 @@
+"""
+Bulk file uploads into a sandbox.
+
+Uploads used to go one file at a time, each followed by a fixed sleep and a
+directory listing to verify it. upload_files sends a batch in one of two ways:
+
+- "tar": several files are written into one gzipped tar archive, which is
+  uploaded with a single SDK call and extracted in the sandbox. The archive is
+  built on disk from the uploads' spooled files in chunks, in a worker thread.
+- "files": each file is uploaded with its own SDK call, with at most
+  `max_concurrency` uploads in flight. A file is read only when its upload
+  starts, so at most that many files are held in memory at once.
+
+Either way, the result is verified with one listing per target directory
+after all uploads finished.
+
+Sources are Starlette/FastAPI UploadFile objects, binary file objects or bytes.
+"""
+
+import asyncio
+import io
+import os
+import shlex
+import tarfile
+import tempfile
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+
+from sandbox.executor import AsyncSandbox
+from utils.logger import logger
+
+# Bytes tarfile copies per read while building an archive
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass
+class UploadResult:
+    """Outcome of a bulk upload."""
+    uploaded: List[str] = field(default_factory=list)
+    failed: Dict[str, str] = field(default_factory=dict)  # path -> error
+    method: str = "files"
+
+
+def _source_file(source: Any) -> BinaryIO:
+    """Binary file object of an upload source, rewound to its start."""
+    if isinstance(source, (bytes, bytearray)):
+        return io.BytesIO(source)
+    # UploadFile keeps its content in a spooled temporary file
+    fileobj = getattr(source, 'file', source)
+    fileobj.seek(0)
+    return fileobj
+
+
+def _source_size(fileobj: BinaryIO) -> int:
+    fileobj.seek(0, os.SEEK_END)
+    size = fileobj.tell()
+    fileobj.seek(0)
+    return size
+
+
+def _read(fileobj: BinaryIO) -> bytes:
+    fileobj.seek(0)
+    return fileobj.read()
+
+
+def _build_archive(files: List[Tuple[str, BinaryIO]]) -> BinaryIO:
+    """Write the files into a gzipped tar archive in a temporary file."""
+    archive = tempfile.TemporaryFile()
+    now = time.time()
+    with tarfile.open(fileobj=archive, mode="w:gz", bufsize=UPLOAD_CHUNK_SIZE) as tar:
+        for path, fileobj in files:
+            info = tarfile.TarInfo(name=path.lstrip("/"))
+            info.size = _source_size(fileobj)
+            info.mtime = now
+            info.mode = 0o644
+            tar.addfile(info, fileobj)
+    archive.seek(0)
+    return archive
+
+
+async def _upload_archive(sandbox: AsyncSandbox, files: List[Tuple[str, BinaryIO]]):
+    """Upload the files as one tar archive and extract it at the root of the sandbox."""
+    loop = asyncio.get_running_loop()
+    archive = await loop.run_in_executor(None, _build_archive, files)
+    try:
+        # The SDK sends bytes, so the compressed archive is read for the upload
+        content = await loop.run_in_executor(None, _read, archive)
+    finally:
+        archive.close()
+
+    archive_path = f"/tmp/upload-{uuid.uuid4().hex}.tar.gz"
+    await sandbox.fs.upload_file(archive_path, content)
+    quoted = shlex.quote(archive_path)
+    # The archive is removed whether or not it extracts, since a failed batch is retried
+    response = await sandbox.process.exec(f"tar -xzf {quoted} -C /; rc=$?; rm -f {quoted}; exit $rc", timeout=120)
+    if response.exit_code != 0:
+        raise RuntimeError(f"Extracting the upload archive failed: {getattr(response, 'result', '')}")
+
+
+async def _verify(sandbox: AsyncSandbox, paths: List[str]) -> List[str]:
+    """Return the paths that are missing in the sandbox, with one listing per directory."""
+    directories: Dict[str, List[str]] = {}
+    for path in paths:
+        directories.setdefault(os.path.dirname(path) or "/", []).append(path)
+
+    async def missing_in(directory: str, expected: List[str]) -> List[str]:
+        try:
+            names = {entry.name for entry in await sandbox.fs.list_files(directory)}
+        except Exception as e:
+            logger.error(f"Error listing {directory} to verify uploads: {str(e)}")
+            return expected
+        return [path for path in expected if os.path.basename(path) not in names]
+
+    results = await asyncio.gather(*[missing_in(directory, expected) for directory, expected in directories.items()])
+    return [path for missing in results for path in missing]
+
+
+async def upload_files(
+    sandbox: AsyncSandbox,
+    files: List[Tuple[str, Any]],
+    max_concurrency: int = 4,
+    tar_min_files: int = 4,
+    verify: bool = True
+) -> UploadResult:
+    """Upload files into a sandbox and verify them.
+
+    Args:
+        sandbox: Sandbox to upload into
+        files: (absolute target path, source) pairs; sources are UploadFile objects, file objects or bytes
+        max_concurrency: Uploads in flight at once when files are sent one by one
+        tar_min_files: Batches with at least this many files are sent as one tar archive; 0 never uses tar
+        verify: Check with a directory listing that the files arrived
+
+    Returns:
+        UploadResult with the uploaded and failed paths
+    """
+    result = UploadResult()
+    if not files:
+        return result
+    sources = [(path, _source_file(source)) for path, source in files]
+
+    if tar_min_files and len(sources) >= tar_min_files:
+        try:
+            await _upload_archive(sandbox, sources)
+            result.method = "tar"
+            result.uploaded = [path for path, _ in sources]
+        except Exception as e:
+            # Images without tar, or a failed extract: send the files one by one instead
+            logger.warning(f"Archive upload of {len(sources)} files failed, uploading them one by one: {str(e)}")
+
+    if result.method != "tar":
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def upload(path: str, fileobj: BinaryIO) -> Optional[str]:
+            async with semaphore:
+                try:
+                    content = await loop.run_in_executor(None, _read, fileobj)
+                    await sandbox.fs.upload_file(path, content)
+                    return None
+                except Exception as e:
+                    logger.error(f"Error uploading {path} to sandbox: {str(e)}", exc_info=True)
+                    return str(e)
+
+        errors = await asyncio.gather(*[upload(path, fileobj) for path, fileobj in sources])
+        for (path, _), error in zip(sources, errors):
+            if error is None:
+                result.uploaded.append(path)
+            else:
+                result.failed[path] = error
+
+    if verify and result.uploaded:
+        missing = set(await _verify(sandbox, result.uploaded))
+        for path in missing:
+            logger.error(f"Verification failed for {path}: file not found after upload")
+            result.failed[path] = "File not found after upload"
+        result.uploaded = [path for path in result.uploaded if path not in missing]
+
+    logger.info(
+        f"Uploaded {len(result.uploaded)} of {len(files)} files ({result.method})"
+        + (f", failed: {list(result.failed)}" if result.failed else "")
+    )
+    return result
@@ -20,15 +20,17 @@ stripe.api_key = config.STRIPE_SECRET_KEY
 # Initialize router
 router = APIRouter(prefix="/billing", tags=["billing"])
 
+# 'concurrent_runs' caps how many agent runs an account executes at once and
+# 'weight' is its share of agent iterations under load (see services/scheduler.py)
 SUBSCRIPTION_TIERS = {
-    config.STRIPE_FREE_TIER_ID: {'name': 'free', 'minutes': 60},
-    config.STRIPE_TIER_2_20_ID: {'name': 'tier_2_20', 'minutes': 120},  # 2 hours
-    config.STRIPE_TIER_6_50_ID: {'name': 'tier_6_50', 'minutes': 360},  # 6 hours
-    config.STRIPE_TIER_12_100_ID: {'name': 'tier_12_100', 'minutes': 720},  # 12 hours
-    config.STRIPE_TIER_25_200_ID: {'name': 'tier_25_200', 'minutes': 1500},  # 25 hours
-    config.STRIPE_TIER_50_400_ID: {'name': 'tier_50_400', 'minutes': 3000},  # 50 hours
-    config.STRIPE_TIER_125_800_ID: {'name': 'tier_125_800', 'minutes': 7500},  # 125 hours
-    config.STRIPE_TIER_200_1000_ID: {'name': 'tier_200_1000', 'minutes': 12000},  # 200 hours
+    config.STRIPE_FREE_TIER_ID: {'name': 'free', 'minutes': 60, 'concurrent_runs': 1, 'weight': 1},
+    config.STRIPE_TIER_2_20_ID: {'name': 'tier_2_20', 'minutes': 120, 'concurrent_runs': 2, 'weight': 2},  # 2 hours
+    config.STRIPE_TIER_6_50_ID: {'name': 'tier_6_50', 'minutes': 360, 'concurrent_runs': 3, 'weight': 3},  # 6 hours
+    config.STRIPE_TIER_12_100_ID: {'name': 'tier_12_100', 'minutes': 720, 'concurrent_runs': 4, 'weight': 4},  # 12 hours
+    config.STRIPE_TIER_25_200_ID: {'name': 'tier_25_200', 'minutes': 1500, 'concurrent_runs': 5, 'weight': 6},  # 25 hours
+    config.STRIPE_TIER_50_400_ID: {'name': 'tier_50_400', 'minutes': 3000, 'concurrent_runs': 6, 'weight': 8},  # 50 hours
+    config.STRIPE_TIER_125_800_ID: {'name': 'tier_125_800', 'minutes': 7500, 'concurrent_runs': 8, 'weight': 12},  # 125 hours
+    config.STRIPE_TIER_200_1000_ID: {'name': 'tier_200_1000', 'minutes': 12000, 'concurrent_runs': 10, 'weight': 16},  # 200 hours
 }
 
 # Pydantic models for request/response validation
@@ -237,6 +239,16 @@ async def calculate_monthly_usage(client, user_id: str) -> float:
     
     return total_seconds / 60  # Convert to minutes
 
+async def get_subscription_tier(user_id: str) -> Dict[str, Any]:
+    """Get the SUBSCRIPTION_TIERS entry for a user's current plan, defaulting to the free tier."""
+    subscription = await get_user_subscription(user_id)
+
+    price_id = config.STRIPE_FREE_TIER_ID
+    if subscription and subscription.get('items') and subscription['items'].get('data'):
+        price_id = subscription['items']['data'][0]['price']['id']
+
+    return SUBSCRIPTION_TIERS.get(price_id, SUBSCRIPTION_TIERS[config.STRIPE_FREE_TIER_ID])
+
 async def check_billing_status(client, user_id: str) -> Tuple[bool, str, Optional[Dict]]:
     """
     Check if a user can run agents based on their subscription and usage.
@@ -20,6 +20,7 @@ from utils.logger import logger
 from utils.config import config
 from utils.model_prices import register_custom_model_prices
 from utils.model_router.router import get_model_router
+from agentpress.prompt_compiler import add_cache_breakpoints
 from services.supabase import get_db_client
 from datetime import datetime
 import traceback
@@ -206,7 +207,9 @@ def prepare_params(
             params["extra_headers"] = extra_headers
             logger.debug(f"Added OpenRouter site URL and app name to headers")
 
-    # No Anthropic-specific code needed anymore
+    # Let providers that support it cache the static system prompt
+    params["messages"] = add_cache_breakpoints(messages, model_name)
+
     return params
 
 async def make_llm_api_call(
@@ -290,6 +290,19 @@ async def lrange(key: str, start: int, end: int):
         return []
 
 
+async def ltrim(key: str, start: int, end: int):
+    """Trim a list to the given range of elements."""
+    redis_client = await get_client()
+    if redis_client is None:
+        logger.warning(f"Cannot ltrim Redis list {key}: client is None")
+        return False
+    try:
+        return await redis_client.ltrim(key, start, end)
+    except Exception as e:
+        logger.error(f"Error trimming Redis list {key}: {e}")
+        return False
+
+
 async def llen(key: str):
     """Get the length of a list."""
     redis_client = await get_client()
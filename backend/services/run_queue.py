@@ -0,0 +1,229 @@
+"""
+Durable Redis-backed queue for agent runs.
+
+API nodes enqueue agent runs here instead of starting them in-process. Agent
+workers claim runs from the queue, which takes a lease on the run. The owning
+worker keeps the lease alive with heartbeats; a lease that is not renewed in
+time (crashed or partitioned worker) is reaped and the run is put back on the
+queue so another worker can pick it up.
+
+Keys:
+    agent_run_queue:pending   - LIST of run IDs waiting for a worker
+    agent_run_queue:jobs      - HASH run ID -> JSON payload
+    agent_run_queue:leases    - ZSET run ID -> lease expiry (unix seconds)
+    agent_run_queue:owners    - HASH run ID -> worker ID holding the lease
+    agent_run_queue:attempts  - HASH run ID -> number of lost leases
+"""
+
+import json
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from services import redis
+from utils.logger import logger
+
+QUEUE_PREFIX = "agent_run_queue"
+
+# Atomically pop the next pending run and lease it to a worker.
+_CLAIM_SCRIPT = """
+local run_id = redis.call('LPOP', KEYS[1])
+if not run_id then
+    return nil
+end
+redis.call('ZADD', KEYS[2], ARGV[2], run_id)
+redis.call('HSET', KEYS[3], run_id, ARGV[1])
+local payload = redis.call('HGET', KEYS[4], run_id)
+if not payload then
+    payload = ''
+end
+return {run_id, payload}
+"""
+
+# Extend a lease, but only if the caller still owns it.
+_HEARTBEAT_SCRIPT = """
+if redis.call('HGET', KEYS[2], ARGV[1]) ~= ARGV[2] then
+    return 0
+end
+redis.call('ZADD', KEYS[1], 'XX', ARGV[3], ARGV[1])
+return 1
+"""
+
+# Finish a run: drop the lease and the job payload.
+_ACK_SCRIPT = """
+if redis.call('HGET', KEYS[2], ARGV[1]) ~= ARGV[2] then
+    return 0
+end
+redis.call('ZREM', KEYS[1], ARGV[1])
+redis.call('HDEL', KEYS[2], ARGV[1])
+redis.call('HDEL', KEYS[3], ARGV[1])
+redis.call('HDEL', KEYS[4], ARGV[1])
+return 1
+"""
+
+# Give a leased run back to the queue (front of the line) without counting an attempt.
+_RELEASE_SCRIPT = """
+if redis.call('HGET', KEYS[2], ARGV[1]) ~= ARGV[2] then
+    return 0
+end
+redis.call('ZREM', KEYS[1], ARGV[1])
+redis.call('HDEL', KEYS[2], ARGV[1])
+redis.call('LPUSH', KEYS[3], ARGV[1])
+return 1
+"""
+
+# Re-queue runs whose lease expired. Runs that lost too many leases are dropped
+# and returned separately so the caller can mark them as failed.
+_REAP_SCRIPT = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, 100)
+local requeued = {}
+local dead = {}
+for _, run_id in ipairs(expired) do
+    redis.call('ZREM', KEYS[1], run_id)
+    redis.call('HDEL', KEYS[2], run_id)
+    local attempts = redis.call('HINCRBY', KEYS[5], run_id, 1)
+    if attempts >= tonumber(ARGV[2]) then
+        redis.call('HDEL', KEYS[4], run_id)
+        redis.call('HDEL', KEYS[5], run_id)
+        table.insert(dead, run_id)
+    else
+        redis.call('LPUSH', KEYS[3], run_id)
+        table.insert(requeued, run_id)
+    end
+end
+return {requeued, dead}
+"""
+
+
+class RunQueue:
+    """Redis-backed agent run queue with leases and heartbeats."""
+
+    def __init__(self, prefix: str = QUEUE_PREFIX, lease_seconds: int = 30, max_attempts: int = 3):
+        self.prefix = prefix
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.pending_key = f"{prefix}:pending"
+        self.jobs_key = f"{prefix}:jobs"
+        self.leases_key = f"{prefix}:leases"
+        self.owners_key = f"{prefix}:owners"
+        self.attempts_key = f"{prefix}:attempts"
+
+    async def _eval(self, script: str, keys: List[str], args: List[Any]):
+        """Run a Lua script atomically on the Redis server."""
+        redis_client = await redis.get_client()
+        if redis_client is None:
+            raise RuntimeError("Redis is not available for the agent run queue")
+        return await redis_client.eval(script, len(keys), *keys, *args)
+
+    def _lease_expiry(self) -> float:
+        return time.time() + self.lease_seconds
+
+    async def enqueue(self, run_id: str, payload: Dict[str, Any]) -> None:
+        """Add a run to the back of the queue."""
+        redis_client = await redis.get_client()
+        if redis_client is None:
+            raise RuntimeError("Redis is not available for the agent run queue")
+        async with redis_client.pipeline(transaction=True) as pipe:
+            pipe.hset(self.jobs_key, run_id, json.dumps(payload))
+            pipe.hdel(self.attempts_key, run_id)
+            pipe.rpush(self.pending_key, run_id)
+            await pipe.execute()
+        logger.info(f"Enqueued agent run {run_id} on {self.pending_key}")
+
+    async def claim(self, worker_id: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Lease the next pending run to a worker.
+
+        Returns:
+            (run_id, payload) or None if the queue is empty
+        """
+        result = await self._eval(
+            _CLAIM_SCRIPT,
+            keys=[self.pending_key, self.leases_key, self.owners_key, self.jobs_key],
+            args=[worker_id, self._lease_expiry()]
+        )
+        if not result:
+            return None
+        run_id, payload_json = result
+        payload = json.loads(payload_json) if payload_json else {}
+        logger.info(f"Worker {worker_id} claimed agent run {run_id}")
+        return run_id, payload
+
+    async def heartbeat(self, run_id: str, worker_id: str) -> bool:
+        """Extend the lease on a run. Returns False if the worker lost the lease."""
+        result = await self._eval(
+            _HEARTBEAT_SCRIPT,
+            keys=[self.leases_key, self.owners_key],
+            args=[run_id, worker_id, self._lease_expiry()]
+        )
+        return bool(result)
+
+    async def ack(self, run_id: str, worker_id: str) -> bool:
+        """Mark a run as finished and remove it from the queue."""
+        result = await self._eval(
+            _ACK_SCRIPT,
+            keys=[self.leases_key, self.owners_key, self.jobs_key, self.attempts_key],
+            args=[run_id, worker_id]
+        )
+        return bool(result)
+
+    async def release(self, run_id: str, worker_id: str) -> bool:
+        """Return a leased run to the front of the queue."""
+        result = await self._eval(
+            _RELEASE_SCRIPT,
+            keys=[self.leases_key, self.owners_key, self.pending_key],
+            args=[run_id, worker_id]
+        )
+        return bool(result)
+
+    async def reap_expired(self) -> Tuple[List[str], List[str]]:
+        """Re-queue runs with expired leases.
+
+        Returns:
+            (requeued_run_ids, dead_run_ids) - dead runs exceeded max_attempts
+        """
+        requeued, dead = await self._eval(
+            _REAP_SCRIPT,
+            keys=[self.leases_key, self.owners_key, self.pending_key, self.jobs_key, self.attempts_key],
+            args=[time.time(), self.max_attempts]
+        )
+        if requeued:
+            logger.warning(f"Re-queued agent runs with expired leases: {requeued}")
+        if dead:
+            logger.error(f"Dropped agent runs after {self.max_attempts} lost leases: {dead}")
+        return list(requeued), list(dead)
+
+    async def remove(self, run_id: str) -> None:
+        """Remove a run that has not been claimed yet."""
+        redis_client = await redis.get_client()
+        if redis_client is None:
+            return
+        async with redis_client.pipeline(transaction=True) as pipe:
+            pipe.lrem(self.pending_key, 0, run_id)
+            pipe.hdel(self.jobs_key, run_id)
+            pipe.hdel(self.attempts_key, run_id)
+            await pipe.execute()
+
+    async def is_tracked(self, run_id: str) -> bool:
+        """Whether the run is pending or leased in the queue."""
+        redis_client = await redis.get_client()
+        if redis_client is None:
+            return False
+        return bool(await redis_client.hexists(self.jobs_key, run_id))
+
+    async def pending_count(self) -> int:
+        return await redis.llen(self.pending_key)
+
+
+# Shared queue instance configured from the environment
+run_queue = None
+
+
+def get_run_queue() -> RunQueue:
+    """Return the process-wide run queue, creating it on first use."""
+    global run_queue
+    if run_queue is None:
+        from utils.config import config
+        run_queue = RunQueue(
+            lease_seconds=config.AGENT_RUN_LEASE_SECONDS,
+            max_attempts=config.AGENT_RUN_MAX_ATTEMPTS
+        )
+    return run_queue
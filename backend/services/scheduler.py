@@ -0,0 +1,258 @@
+"""
+Fair scheduling of agent runs across accounts.
+
+Two limits are kept in Redis so they hold across API instances and workers:
+
+- Run quotas: an account executes at most `concurrent_runs` agent runs at once,
+  taken from its tier in services/billing.SUBSCRIPTION_TIERS. Further runs of
+  the account wait in arrival order.
+- Iteration fair queueing: at most AGENT_MAX_CONCURRENT_ITERATIONS agent
+  iterations (one LLM call plus its tool executions) run at once across the
+  system. Waiting iterations are served by weighted fair queueing: each request
+  gets a virtual finish tag 1/weight after the account's previous one, and the
+  lowest tag goes next. An account with many runs cannot starve accounts with
+  few, and higher tiers get a proportionally larger share.
+
+Both limits use the same slot script. Held slots expire after a TTL so a
+crashed process cannot leak capacity, and waiters that stop polling are
+dropped from the line.
+
+Keys (per scope, where scope is "iterations" or "account:{account_id}"):
+    agent_scheduler:{scope}:active   - ZSET run ID -> slot expiry
+    agent_scheduler:{scope}:waiting  - ZSET run ID -> virtual finish tag
+    agent_scheduler:{scope}:seen     - ZSET run ID -> last time the waiter polled
+    agent_scheduler:{scope}:finish   - HASH account ID -> last virtual finish tag
+    agent_scheduler:{scope}:vtime    - virtual time (tag of the last granted slot)
+"""
+
+import asyncio
+import json
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from services import redis
+from utils.logger import logger
+
+SCHEDULER_PREFIX = "agent_scheduler"
+
+# Seconds an account's subscription tier is cached
+TIER_CACHE_TTL = 600
+
+# Waiters that have not polled for this many seconds are dropped from the line
+WAITER_STALE_SECONDS = 30
+
+# Take a slot if the caller is first in line and there is capacity, otherwise
+# return its 1-based position in the line.
+_ACQUIRE_SCRIPT = """
+local run_id = ARGV[1]
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[2])
+
+local stale = redis.call('ZRANGEBYSCORE', KEYS[3], '-inf', ARGV[7])
+for _, waiter in ipairs(stale) do
+    redis.call('ZREM', KEYS[2], waiter)
+    redis.call('ZREM', KEYS[3], waiter)
+end
+
+if redis.call('ZSCORE', KEYS[1], run_id) then
+    redis.call('ZADD', KEYS[1], ARGV[3], run_id)
+    return 0
+end
+
+local tag = redis.call('ZSCORE', KEYS[2], run_id)
+if not tag then
+    local vtime = tonumber(redis.call('GET', KEYS[5]) or '0')
+    local last = tonumber(redis.call('HGET', KEYS[4], ARGV[6]) or '0')
+    tag = math.max(vtime, last) + 1 / tonumber(ARGV[5])
+    redis.call('HSET', KEYS[4], ARGV[6], tag)
+    redis.call('ZADD', KEYS[2], tag, run_id)
+end
+redis.call('ZADD', KEYS[3], ARGV[2], run_id)
+
+local head = redis.call('ZRANGE', KEYS[2], 0, 0)
+if head[1] == run_id and redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[4]) then
+    redis.call('ZREM', KEYS[2], run_id)
+    redis.call('ZREM', KEYS[3], run_id)
+    redis.call('SET', KEYS[5], tag)
+    redis.call('ZADD', KEYS[1], ARGV[3], run_id)
+    return 0
+end
+return redis.call('ZRANK', KEYS[2], run_id) + 1
+"""
+
+PositionCallback = Callable[[int], Awaitable[None]]
+
+
+class AgentRunScheduler:
+    """Per-account run quotas and weighted fair queueing of agent iterations."""
+
+    def __init__(
+        self,
+        prefix: str = SCHEDULER_PREFIX,
+        max_concurrent_iterations: int = 32,
+        slot_ttl: int = 600,
+        poll_interval: float = 0.5
+    ):
+        """Initialize the scheduler.
+
+        Args:
+            prefix: Prefix of the Redis keys
+            max_concurrent_iterations: Agent iterations allowed to run at once system-wide
+            slot_ttl: Seconds after which a slot that was not renewed is freed
+            poll_interval: Seconds between attempts while waiting for a slot
+        """
+        self.prefix = prefix
+        self.max_concurrent_iterations = max_concurrent_iterations
+        self.slot_ttl = slot_ttl
+        self.poll_interval = poll_interval
+
+    def _keys(self, scope: str) -> List[str]:
+        base = f"{self.prefix}:{scope}"
+        return [f"{base}:active", f"{base}:waiting", f"{base}:seen", f"{base}:finish", f"{base}:vtime"]
+
+    async def _try_acquire(self, scope: str, run_id: str, capacity: int, weight: float, account_id: str) -> int:
+        redis_client = await redis.get_client()
+        if redis_client is None:
+            raise RuntimeError("Redis is not available for the agent scheduler")
+        now = time.time()
+        keys = self._keys(scope)
+        return int(await redis_client.eval(
+            _ACQUIRE_SCRIPT, len(keys), *keys,
+            run_id, now, now + self.slot_ttl, capacity, weight, account_id, now - WAITER_STALE_SECONDS
+        ))
+
+    async def _acquire(
+        self,
+        scope: str,
+        run_id: str,
+        capacity: int,
+        weight: float,
+        account_id: str,
+        on_wait: Optional[PositionCallback] = None,
+        is_cancelled: Optional[Callable[[], bool]] = None
+    ) -> bool:
+        last_position = None
+        while True:
+            position = await self._try_acquire(scope, run_id, capacity, weight, account_id)
+            if position == 0:
+                return True
+            if is_cancelled and is_cancelled():
+                await self._leave_line(scope, run_id)
+                return False
+            if on_wait and position != last_position:
+                await on_wait(position)
+            last_position = position
+            await asyncio.sleep(self.poll_interval)
+
+    async def _leave_line(self, scope: str, run_id: str):
+        redis_client = await redis.get_client()
+        if redis_client is None:
+            return
+        active_key, waiting_key, seen_key = self._keys(scope)[:3]
+        async with redis_client.pipeline(transaction=True) as pipe:
+            pipe.zrem(active_key, run_id)
+            pipe.zrem(waiting_key, run_id)
+            pipe.zrem(seen_key, run_id)
+            await pipe.execute()
+
+    async def acquire_run_slot(
+        self,
+        run_id: str,
+        account_id: str,
+        quota: int,
+        on_wait: Optional[PositionCallback] = None,
+        is_cancelled: Optional[Callable[[], bool]] = None
+    ) -> bool:
+        """Wait until the account is below its concurrent run quota.
+
+        Args:
+            run_id: Agent run taking the slot
+            account_id: Account the run is billed to
+            quota: Max runs the account may execute at once
+            on_wait: Called with the run's position in the account's line whenever it changes
+            is_cancelled: Checked while waiting; the wait is abandoned once it returns True
+
+        Returns:
+            True once the slot is held, False if the wait was cancelled
+        """
+        return await self._acquire(f"account:{account_id}", run_id, quota, 1, account_id, on_wait, is_cancelled)
+
+    async def release_run_slot(self, run_id: str, account_id: str):
+        """Free the account run slot held by a run."""
+        await self._leave_line(f"account:{account_id}", run_id)
+
+    async def acquire_iteration(
+        self,
+        run_id: str,
+        account_id: str,
+        weight: float,
+        on_wait: Optional[PositionCallback] = None,
+        is_cancelled: Optional[Callable[[], bool]] = None
+    ) -> bool:
+        """Wait for the fair queue to grant the run its next iteration.
+
+        Args:
+            run_id: Agent run starting an iteration
+            account_id: Account the run is billed to
+            weight: Tier weight of the account; its share of iterations under load
+            on_wait: Called with the run's position in the line whenever it changes
+            is_cancelled: Checked while waiting; the wait is abandoned once it returns True
+
+        Returns:
+            True once the iteration may run, False if the wait was cancelled
+        """
+        return await self._acquire(
+            "iterations", run_id, self.max_concurrent_iterations, weight, account_id, on_wait, is_cancelled
+        )
+
+    async def release_iteration(self, run_id: str):
+        """Free the iteration slot held by a run."""
+        await self._leave_line("iterations", run_id)
+
+    async def renew_slots(self, run_id: str, account_id: str):
+        """Extend the run and iteration slots a run holds by another slot_ttl; slots not held stay free."""
+        redis_client = await redis.get_client()
+        if redis_client is None:
+            return
+        expires_at = time.time() + self.slot_ttl
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for scope in (f"account:{account_id}", "iterations"):
+                pipe.zadd(self._keys(scope)[0], {run_id: expires_at}, xx=True)
+            await pipe.execute()
+
+    async def run_slot_renewer(self, run_id: str, account_id: str):
+        """Renew a run's slots every third of slot_ttl, so long iterations keep them. Runs until cancelled."""
+        while True:
+            await asyncio.sleep(self.slot_ttl / 3)
+            try:
+                await self.renew_slots(run_id, account_id)
+            except Exception as e:
+                logger.warning(f"Failed to renew scheduler slots of agent run {run_id}: {str(e)}")
+
+
+async def get_account_limits(account_id: str) -> Dict[str, Any]:
+    """Return the subscription tier of an account, cached in Redis."""
+    cache_key = f"{SCHEDULER_PREFIX}:tier:{account_id}"
+    cached = await redis.get(cache_key)
+    if cached:
+        return json.loads(cached)
+
+    from services.billing import get_subscription_tier
+    tier = await get_subscription_tier(account_id)
+    await redis.set(cache_key, json.dumps(tier), ex=TIER_CACHE_TTL)
+    return tier
+
+
+# Shared scheduler instance configured from the environment
+scheduler = None
+
+
+def get_scheduler() -> AgentRunScheduler:
+    """Return the process-wide scheduler, creating it on first use."""
+    global scheduler
+    if scheduler is None:
+        from utils.config import config
+        scheduler = AgentRunScheduler(
+            max_concurrent_iterations=config.AGENT_MAX_CONCURRENT_ITERATIONS,
+            slot_ttl=config.AGENT_SCHEDULER_SLOT_TTL
+        )
+    return scheduler
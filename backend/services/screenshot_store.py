@@ -0,0 +1,237 @@
+"""
+Browser screenshots kept in Supabase Storage instead of message rows.
+
+Every browser action used to write its screenshot, base64 encoded, into the
+JSONB content of a `browser_state` message, which the agent loop read back and
+deleted one iteration later. ScreenshotStore uploads the image once, as a
+binary object named after its SHA-1 (the `screenshot_id` the browser API
+reports), and leaves only its path in the message.
+
+Screenshots uploaded before cost no upload. The store remembers, per browser
+session, the last screenshot it stored; the tool passes its ID to the browser
+API as `known_screenshot`, and only then may the browser API skip a screenshot
+that looks the same and report that ID instead. Without a stored copy (by
+reference disabled, failed upload, another process) the image is always sent,
+and when an upload fails it stays inline, as before.
+
+Stored screenshots are deleted after a retention period by run_purger. The
+store only refers to copies stored within the first half of that period, so
+a reference never outlives its object.
+"""
+
+import asyncio
+import base64
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from utils.logger import logger
+
+_EXTENSIONS = {"image/webp": "webp", "image/jpeg": "jpg", "image/png": "png"}
+
+
+class ScreenshotStore:
+    """Uploads browser screenshots to a Storage bucket and reads them back by path."""
+
+    def __init__(
+        self,
+        bucket: str = "browser_screenshots",
+        by_reference: bool = True,
+        known_paths: int = 4096,
+        retention_seconds: int = 86400
+    ):
+        """Initialize the store.
+
+        Args:
+            bucket: Storage bucket the screenshots are kept in
+            by_reference: False keeps screenshots inline in the messages
+            known_paths: Uploaded paths remembered per process, so they are not uploaded twice
+            retention_seconds: Age after which run_purger deletes stored screenshots
+        """
+        self.bucket = bucket
+        self.by_reference = by_reference
+        self.known_paths = known_paths
+        self.retention_seconds = retention_seconds
+        # Path -> when it was uploaded
+        self._known: "OrderedDict[str, float]" = OrderedDict()
+        # Browser session -> ID of the last screenshot stored for it, and when
+        self._session_screenshots: "OrderedDict[str, tuple]" = OrderedDict()
+        self._stats = {
+            "uploads": 0,
+            "upload_bytes": 0,
+            "reused": 0,
+            "inline_fallbacks": 0,
+            "messages": 0,
+            "message_bytes": 0,
+            "inline_bytes_avoided": 0,
+            "purged": 0
+        }
+
+    @staticmethod
+    def path(project_id: str, screenshot_id: str, mime_type: Optional[str]) -> str:
+        # The browser API of a project's sandbox refers to screenshots it sent before by ID
+        return f"{project_id}/{screenshot_id}.{_EXTENSIONS.get(mime_type, 'jpg')}"
+
+    def _fresh(self, stored_at: float) -> bool:
+        # Referred to only in the first half of the retention period, long before it is purged
+        return time.time() - stored_at < self.retention_seconds / 2
+
+    def _remember(self, path: str):
+        self._known[path] = time.time()
+        self._known.move_to_end(path)
+        while len(self._known) > self.known_paths:
+            self._known.popitem(last=False)
+
+    def _is_stored(self, path: str) -> bool:
+        stored_at = self._known.get(path)
+        return stored_at is not None and self._fresh(stored_at)
+
+    def known_screenshot(self, project_id: str, session: str) -> Optional[str]:
+        """ID of the last screenshot stored for a browser session; None if there is no stored copy."""
+        if not self.by_reference:
+            return None
+        entry = self._session_screenshots.get(f"{project_id}:{session}")
+        if entry is None or not self._fresh(entry[1]):
+            return None
+        return entry[0]
+
+    def _set_session_screenshot(self, project_id: str, session: Optional[str], path: Optional[str] = None,
+                                screenshot_id: Optional[str] = None):
+        """Record the screenshot stored at path as the last one of a session; None forgets it."""
+        if session is None:
+            return
+        key = f"{project_id}:{session}"
+        self._session_screenshots.pop(key, None)
+        if path:
+            self._session_screenshots[key] = (screenshot_id, self._known[path])
+            while len(self._session_screenshots) > self.known_paths:
+                self._session_screenshots.popitem(last=False)
+
+    async def externalize(
+        self, client, project_id: str, state: Dict[str, Any], session: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Replace the inline screenshot of a browser state with a reference to the stored object.
+
+        Args:
+            client: Supabase client
+            project_id: Project the browser belongs to
+            state: Result of a browser API action, changed in place
+            session: Browser session the action ran in
+
+        Returns:
+            The browser state to store as message content
+        """
+        screenshot_id = state.get("screenshot_id")
+        encoded = state.get("screenshot_base64")
+        if state.get("screenshot_unchanged") and not encoded:
+            # Only sent when the tool passed this ID as known_screenshot, i.e. it was stored
+            if screenshot_id and self.known_screenshot(project_id, session) == screenshot_id:
+                path = self.path(project_id, screenshot_id, state.get("screenshot_mime_type"))
+                self._stats["reused"] += 1
+                state["screenshot_path"] = path
+            else:
+                logger.warning(f"Screenshot {screenshot_id} reported unchanged but no stored copy is known")
+        elif self.by_reference and screenshot_id and encoded:
+            path = self.path(project_id, screenshot_id, state.get("screenshot_mime_type"))
+            if not self._is_stored(path):
+                try:
+                    data = base64.b64decode(encoded, validate=True)
+                    await client.storage.from_(self.bucket).upload(
+                        path, data, {"content-type": state.get("screenshot_mime_type") or "image/jpeg", "upsert": "true"}
+                    )
+                    self._stats["uploads"] += 1
+                    self._stats["upload_bytes"] += len(data)
+                    self._remember(path)
+                except Exception as e:
+                    logger.warning(f"Failed to store screenshot {path}, keeping it inline: {str(e)}")
+                    self._stats["inline_fallbacks"] += 1
+                    path = None
+            else:
+                self._stats["reused"] += 1
+            self._set_session_screenshot(project_id, session, path, screenshot_id)
+            if path:
+                self._stats["inline_bytes_avoided"] += len(encoded)
+                state.pop("screenshot_base64", None)
+                state["screenshot_path"] = path
+        elif encoded:
+            # Inline: nothing stored the browser API could refer to
+            self._set_session_screenshot(project_id, session)
+
+        self._stats["messages"] += 1
+        self._stats["message_bytes"] += len(json.dumps(state))
+        return state
+
+    async def load(self, client, path: str) -> Optional[bytes]:
+        """Read a stored screenshot back; None if it is gone."""
+        try:
+            data = await client.storage.from_(self.bucket).download(path)
+        except Exception as e:
+            logger.warning(f"Failed to load screenshot {path}: {str(e)}")
+            return None
+        return data
+
+    async def load_base64(self, client, path: str) -> Optional[str]:
+        """Read a stored screenshot back, base64 encoded; None if it is gone."""
+        data = await self.load(client, path)
+        return base64.b64encode(data).decode("utf-8") if data is not None else None
+
+    @staticmethod
+    def mime_type(path: str) -> str:
+        extension = path.rsplit(".", 1)[-1]
+        return next((mime for mime, ext in _EXTENSIONS.items() if ext == extension), "image/jpeg")
+
+    async def purge_expired(self, client, batch_size: int = 1000) -> int:
+        """Delete screenshots stored longer than the retention period; returns how many."""
+        before = (datetime.now(timezone.utc) - timedelta(seconds=self.retention_seconds)).isoformat()
+        purged = 0
+        while True:
+            result = await client.rpc('list_expired_browser_screenshots', {
+                'p_bucket': self.bucket, 'p_before': before, 'p_limit': batch_size
+            }).execute()
+            names = [row if isinstance(row, str) else row.get('list_expired_browser_screenshots')
+                     for row in (result.data or [])]
+            names = [name for name in names if name]
+            if not names:
+                break
+            await client.storage.from_(self.bucket).remove(names)
+            purged += len(names)
+            if len(names) < batch_size:
+                break
+        self._stats["purged"] += purged
+        return purged
+
+    async def run_purger(self, db, interval_seconds: int = 3600):
+        """Delete expired screenshots every interval. Runs until cancelled."""
+        while True:
+            try:
+                purged = await self.purge_expired(await db.client)
+                if purged:
+                    logger.info(f"Deleted {purged} browser screenshots older than {self.retention_seconds}s")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Browser screenshot purge failed: {str(e)}")
+            await asyncio.sleep(interval_seconds)
+
+    def stats(self) -> Dict[str, int]:
+        """Uploads and bytes written, and how many base64 bytes were kept out of message rows."""
+        return dict(self._stats)
+
+
+# Shared store instance configured from the environment
+screenshot_store = None
+
+
+def get_screenshot_store() -> ScreenshotStore:
+    """Return the process-wide screenshot store, creating it on first use."""
+    global screenshot_store
+    if screenshot_store is None:
+        from utils.config import config
+        screenshot_store = ScreenshotStore(
+            bucket=config.BROWSER_SCREENSHOT_BUCKET,
+            by_reference=config.BROWSER_SCREENSHOTS_BY_REFERENCE,
+            retention_seconds=config.BROWSER_SCREENSHOT_RETENTION_HOURS * 3600
+        )
+    return screenshot_store
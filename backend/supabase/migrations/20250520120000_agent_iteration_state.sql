@@ -0,0 +1,64 @@
+-- Per-iteration state for the agent loop in a single round trip.
+-- Returns the latest assistant/tool/user message and the pending temporary
+-- context (latest browser_state and image_context messages). Unless the agent
+-- is about to stop (latest message is from the assistant), the temporary
+-- messages are consumed in the same transaction.
+CREATE OR REPLACE FUNCTION get_agent_iteration_state(p_thread_id UUID)
+RETURNS JSONB
+SECURITY DEFINER
+SET search_path = public
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    last_message_id UUID;
+    last_message_type TEXT;
+    browser_state JSONB;
+    image_context JSONB;
+BEGIN
+    SELECT message_id, type
+    INTO last_message_id, last_message_type
+    FROM messages
+    WHERE thread_id = p_thread_id
+    AND type IN ('assistant', 'tool', 'user')
+    ORDER BY created_at DESC
+    LIMIT 1;
+
+    IF last_message_type = 'assistant' THEN
+        RETURN jsonb_build_object(
+            'last_message_id', last_message_id,
+            'last_message_type', last_message_type,
+            'browser_state', NULL,
+            'image_context', NULL
+        );
+    END IF;
+
+    DELETE FROM messages
+    WHERE message_id = (
+        SELECT message_id FROM messages
+        WHERE thread_id = p_thread_id AND type = 'browser_state'
+        ORDER BY created_at DESC
+        LIMIT 1
+    )
+    RETURNING content INTO browser_state;
+
+    DELETE FROM messages
+    WHERE message_id = (
+        SELECT message_id FROM messages
+        WHERE thread_id = p_thread_id AND type = 'image_context'
+        ORDER BY created_at DESC
+        LIMIT 1
+    )
+    RETURNING content INTO image_context;
+
+    RETURN jsonb_build_object(
+        'last_message_id', last_message_id,
+        'last_message_type', last_message_type,
+        'browser_state', browser_state,
+        'image_context', image_context
+    );
+END;
+$$;
+
+-- Consumes rows, so only the backend may call it
+REVOKE EXECUTE ON FUNCTION get_agent_iteration_state FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION get_agent_iteration_state TO service_role;
@@ -0,0 +1,6 @@
+-- Browser screenshots referenced by path from browser_state messages,
+-- named <project_id>/<sha1>.<ext>. Written and read by the backend only
+-- (service role), so the bucket has no policies for other roles.
+INSERT INTO storage.buckets (id, name, public, file_size_limit, allowed_mime_types)
+VALUES ('browser_screenshots', 'browser_screenshots', false, 5242880, ARRAY['image/webp', 'image/jpeg', 'image/png'])
+ON CONFLICT (id) DO NOTHING;
@@ -0,0 +1,27 @@
+-- Browser screenshots are only needed while their browser_state message is
+-- pending and while the browser tool view shows them. The backend deletes
+-- objects older than BROWSER_SCREENSHOT_RETENTION_HOURS through the Storage
+-- API (so the files go too), using this function to find them. The same
+-- screenshot is uploaded again (upsert) once it is stale, which keeps
+-- created_at, so age is counted from the last upload.
+CREATE OR REPLACE FUNCTION list_expired_browser_screenshots(
+    p_bucket TEXT,
+    p_before TIMESTAMPTZ,
+    p_limit INTEGER DEFAULT 1000
+)
+RETURNS SETOF TEXT
+SECURITY DEFINER
+SET search_path = public
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT name
+    FROM storage.objects
+    WHERE bucket_id = p_bucket
+    AND COALESCE(updated_at, created_at) < p_before
+    ORDER BY COALESCE(updated_at, created_at)
+    LIMIT p_limit;
+$$;
+
+REVOKE EXECUTE ON FUNCTION list_expired_browser_screenshots FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION list_expired_browser_screenshots TO service_role;
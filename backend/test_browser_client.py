@@ -0,0 +1,166 @@
+"""
+Browser Client Test
+
+Checks the browser API transports in sandbox/browser_client.py and compares
+their per-action latency:
+
+- actions go through the preview URL on one kept-alive connection
+- payloads with quotes arrive intact on both transports, and so does the
+  browser session an action is meant for
+- when the preview URL is unreachable, actions fall back to curl and the
+  direct path is not retried during the cooldown
+- gateway errors of the preview proxy are not replayed through curl, since
+  the action may already have run
+
+A local HTTP server stands in for the browser API, and the curl fallback
+runs the local curl against it, so no Daytona access is needed. The curl
+timing includes the process spawn but not the SDK round trip to the
+sandbox, so it understates what the direct path saves in production.
+
+Usage:
+    python test_browser_client.py
+"""
+
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Configuration is validated on import; these defaults only matter when no .env is present
+for _key in ("SUPABASE_URL", "SUPABASE_ANON_KEY", "SUPABASE_SERVICE_ROLE_KEY", "REDIS_HOST", "REDIS_PASSWORD",
+             "DAYTONA_API_KEY", "DAYTONA_SERVER_URL", "DAYTONA_TARGET", "TAVILY_API_KEY",
+             "RAPID_API_KEY", "FIRECRAWL_API_KEY"):
+    os.environ.setdefault(_key, "test")
+
+ACTIONS = 30
+
+
+class _BrowserApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    connections = 0
+    requests = []
+    gateway_errors = 0
+
+    def setup(self):
+        super().setup()
+        type(self).connections += 1
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        type(self).requests.append((self.path, json.loads(body) if body else None))
+        status = 200
+        if type(self).gateway_errors:
+            type(self).gateway_errors -= 1
+            status = 504
+        payload = json.dumps({"success": True, "message": "ok", "url": "https://example.com"}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _make_sandbox(preview_port, api_port):
+    from sandbox.fake_backend import FakeExecuteResponse, FakePreviewLink, FakeSandbox
+
+    sandbox = FakeSandbox("browser")
+
+    def get_preview_link(port):
+        return FakePreviewLink(url=f"http://127.0.0.1:{preview_port}")
+
+    def exec_locally(command, cwd=None, timeout=None):
+        command = command.replace("localhost:8002", f"127.0.0.1:{api_port}")
+        completed = subprocess.run(["bash", "-c", command], capture_output=True, text=True)
+        return FakeExecuteResponse(exit_code=completed.returncode, result=completed.stdout)
+
+    sandbox.get_preview_link, sandbox.process.exec = get_preview_link, exec_locally
+    return sandbox
+
+
+async def _time_actions(client):
+    durations = []
+    for i in range(ACTIONS):
+        started = time.perf_counter()
+        await client.request("click_element", {"index": i})
+        durations.append((time.perf_counter() - started) * 1000)
+    return statistics.median(durations)
+
+
+async def _run_checks(api_port, closed_port):
+    from sandbox.browser_client import BrowserApiClient, BrowserApiError, BrowserClientPool
+    from sandbox.executor import AsyncSandbox, SandboxExecutor
+
+    executor = SandboxExecutor(max_workers=4)
+    sandbox = AsyncSandbox(_make_sandbox(api_port, api_port), executor)
+    tricky = {"index": 3, "text": "it's \"quoted\" & $HOME"}
+
+    # Direct path, one kept-alive connection
+    pool = BrowserClientPool(max_clients=2)
+    client = await pool.get(sandbox)
+    assert await pool.get(sandbox) is client
+    connections = _BrowserApiHandler.connections
+    direct_ms = await _time_actions(client)
+    assert _BrowserApiHandler.connections == connections + 1, "Direct requests did not reuse their connection"
+    await client.request("input_text", tricky)
+    assert _BrowserApiHandler.requests[-1] == ("/api/automation/input_text", tricky)
+    await client.request("go_back", session="thread-1")
+    assert _BrowserApiHandler.requests[-1] == ("/api/automation/go_back?session=thread-1", None)
+    assert pool.stats()["transports"]["direct"]["calls"] == ACTIONS + 2
+
+    # A gateway error after the action reached the API is reported, not replayed
+    _BrowserApiHandler.gateway_errors = 1
+    sent = len(_BrowserApiHandler.requests)
+    try:
+        await client.request("click_element", {"index": 0})
+        raise AssertionError("Gateway error was not reported")
+    except BrowserApiError:
+        pass
+    assert len(_BrowserApiHandler.requests) == sent + 1, "Action was replayed through curl"
+    assert client.fallbacks == 0
+
+    # curl, as before
+    curl_client = BrowserApiClient(sandbox, direct=False)
+    curl_ms = await _time_actions(curl_client)
+    await curl_client.request("input_text", tricky)
+    assert _BrowserApiHandler.requests[-1] == ("/api/automation/input_text", tricky)
+    await curl_client.request("go_back", session="thread-1")
+    assert _BrowserApiHandler.requests[-1] == ("/api/automation/go_back?session=thread-1", None)
+
+    # Unreachable preview URL: curl is used, and the direct path is skipped during the cooldown
+    unreachable = BrowserApiClient(AsyncSandbox(_make_sandbox(closed_port, api_port), executor))
+    body = await unreachable.request("navigate_to", {"url": "https://example.com"})
+    assert json.loads(body)["success"]
+    await unreachable.request("go_back")
+    assert unreachable.fallbacks == 1 and unreachable.stats()["curl"]["calls"] == 2, unreachable.stats()
+
+    await pool.aclose()
+    await unreachable.aclose()
+    executor.shutdown(wait=True)
+    return direct_ms, curl_ms
+
+
+def test_browser_client():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _BrowserApiHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    closed = ThreadingHTTPServer(("127.0.0.1", 0), _BrowserApiHandler)
+    closed_port = closed.server_address[1]
+    closed.server_close()
+    try:
+        direct_ms, curl_ms = asyncio.run(_run_checks(server.server_address[1], closed_port))
+    finally:
+        server.shutdown()
+        server.server_close()
+    print(f"Median latency per action over {ACTIONS} actions: direct {direct_ms:.2f} ms, curl {curl_ms:.2f} ms")
+
+
+if __name__ == "__main__":
+    test_browser_client()
+    print("Browser client test passed")
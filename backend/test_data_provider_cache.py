@@ -0,0 +1,131 @@
+"""
+Data Provider Cache Test
+
+Checks the shared HTTP client and response cache of the RapidAPI data
+providers in agent/tools/data_providers/RapidDataProviderBase.py:
+
+- repeated calls with the same payload, in any key order, reach the API once
+- concurrent identical calls share one request
+- endpoints with a freshness of 0 are never cached
+- rate limits and server errors are retried, and error responses are not cached
+
+A local HTTP server stands in for RapidAPI, so no API key is needed.
+
+Usage:
+    python test_data_provider_cache.py
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Configuration is validated on import; these defaults only matter when no .env is present
+for _key in ("SUPABASE_URL", "SUPABASE_ANON_KEY", "SUPABASE_SERVICE_ROLE_KEY", "REDIS_HOST", "REDIS_PASSWORD",
+             "DAYTONA_API_KEY", "DAYTONA_SERVER_URL", "DAYTONA_TARGET", "TAVILY_API_KEY",
+             "RAPID_API_KEY", "FIRECRAWL_API_KEY"):
+    os.environ.setdefault(_key, "test")
+
+# Latency of the stand-in API per request
+API_DELAY = 0.2
+
+
+class _RapidApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    requests = []
+    failures = {}
+
+    def _respond(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        type(self).requests.append(self.path)
+        time.sleep(API_DELAY)
+        route = self.path.split("?")[0]
+        if type(self).failures.get(route):
+            type(self).failures[route] -= 1
+            self._respond(503, {"message": "Service unavailable"})
+        else:
+            self._respond(200, {"path": self.path, "served": len(type(self).requests)})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _make_provider(port):
+    from agent.tools.data_providers.RapidDataProviderBase import RapidDataProviderBase
+
+    def endpoint(route):
+        return {"route": route, "method": "GET", "name": route, "description": route, "payload": {}}
+
+    class StandInProvider(RapidDataProviderBase):
+        def __init__(self):
+            endpoints = {"quote": endpoint("/quote"), "profile": endpoint("/profile"), "live": endpoint("/live")}
+            super().__init__(f"http://127.0.0.1:{port}", endpoints, cache_ttl=3600, cache_ttls={"live": 0})
+
+    return StandInProvider()
+
+
+async def _run_checks(port):
+    from agent.tools.data_providers.RapidDataProviderBase import close_rapid_api_client, get_response_cache
+
+    provider = _make_provider(port)
+    requests = _RapidApiHandler.requests
+
+    # Repeated calls, payload keys in any order
+    started = time.perf_counter()
+    first = await provider.call_endpoint("quote", {"symbol": "AAPL", "interval": "1d"})
+    cold_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    again = await provider.call_endpoint("/quote", {"interval": "1d", "symbol": "AAPL"})
+    cached_ms = (time.perf_counter() - started) * 1000
+    assert again == first and len(requests) == 1, requests
+    await provider.call_endpoint("quote", {"symbol": "MSFT", "interval": "1d"})
+    assert len(requests) == 2
+
+    # Concurrent identical calls share one request
+    results = await asyncio.gather(*(provider.call_endpoint("profile", {"id": "42"}) for _ in range(5)))
+    assert len(requests) == 3 and all(result == results[0] for result in results)
+    assert get_response_cache().stats()["shared"] == 4, get_response_cache().stats()
+
+    # Endpoints that must stay live are not cached
+    await provider.call_endpoint("live", {"id": "1"})
+    await provider.call_endpoint("live", {"id": "1"})
+    assert len(requests) == 5
+
+    # A transient failure is retried; a persistent one is returned but not cached
+    _RapidApiHandler.failures["/profile"] = 1
+    result = await provider.call_endpoint("profile", {"id": "7"})
+    assert "path" in result and len(requests) == 7, requests
+    _RapidApiHandler.failures["/profile"] = 10
+    result = await provider.call_endpoint("profile", {"id": "8"})
+    assert result == {"message": "Service unavailable"}
+    _RapidApiHandler.failures["/profile"] = 0
+    result = await provider.call_endpoint("profile", {"id": "8"})
+    assert "path" in result
+
+    await close_rapid_api_client()
+    return cold_ms, cached_ms
+
+
+def test_data_provider_cache():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _RapidApiHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        cold_ms, cached_ms = asyncio.run(_run_checks(server.server_address[1]))
+    finally:
+        server.shutdown()
+        server.server_close()
+    print(f"Data provider call: {cold_ms:.1f} ms from the API, {cached_ms:.2f} ms from the cache")
+
+
+if __name__ == "__main__":
+    test_data_provider_cache()
+    print("Data provider cache test passed")
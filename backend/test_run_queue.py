@@ -0,0 +1,251 @@
+"""
+Run Queue Test
+
+Local multi-process test for the Redis-backed agent run queue. It starts
+several worker processes against one Redis server, enqueues a batch of runs,
+kills one worker in the middle of a run and checks that:
+
+- every run is executed to completion exactly once by a live worker
+- the run held by the killed worker is re-queued after its lease expires
+- no worker runs more than its configured concurrency at once
+- a run drained to a checkpoint is handed back to the queue and resumed from it
+
+Uses the Redis server from REDIS_HOST/REDIS_PORT if one is reachable, otherwise
+starts an in-process fakeredis TCP server.
+
+Usage:
+    python test_run_queue.py
+"""
+
+import asyncio
+import multiprocessing
+import os
+import socket
+import threading
+import time
+import uuid
+
+# Configuration is validated on import; these defaults only matter when no .env is present
+for _key in ("SUPABASE_URL", "SUPABASE_ANON_KEY", "SUPABASE_SERVICE_ROLE_KEY", "REDIS_PASSWORD",
+             "DAYTONA_API_KEY", "DAYTONA_SERVER_URL", "DAYTONA_TARGET", "TAVILY_API_KEY",
+             "RAPID_API_KEY", "FIRECRAWL_API_KEY"):
+    os.environ.setdefault(_key, "test")
+
+NUM_WORKERS = 3
+NUM_RUNS = 12
+CONCURRENCY = 2
+LEASE_SECONDS = 2
+RUN_SECONDS = 0.5
+CRASH_RUN_ID = "run-crash"
+
+
+def _redis_reachable(host: str, port: int) -> bool:
+    try:
+        with socket.create_connection((host, port), timeout=0.5):
+            return True
+    except OSError:
+        return False
+
+
+def _start_redis_server():
+    """Return (host, port, fake_server) for a Redis server usable by child processes."""
+    host = os.getenv("REDIS_HOST", "localhost")
+    port = int(os.getenv("REDIS_PORT", 6379))
+    if _redis_reachable(host, port):
+        return host, port, None
+
+    from fakeredis import TcpFakeServer
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = TcpFakeServer(("127.0.0.1", port), server_type="redis")
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return "127.0.0.1", port, server
+
+
+def _worker_process(host: str, port: int, prefix: str, crash_on_claim: bool):
+    os.environ["REDIS_HOST"] = host
+    os.environ["REDIS_PORT"] = str(port)
+    os.environ["REDIS_PASSWORD"] = ""
+    os.environ["REDIS_SSL"] = "false"
+    asyncio.run(_run_worker(prefix, crash_on_claim))
+
+
+async def _run_worker(prefix: str, crash_on_claim: bool):
+    from services import redis
+    from services.run_queue import RunQueue
+    from agent.worker import AgentWorker
+
+    await redis.initialize_async()
+    worker_id = f"test-worker-{os.getpid()}"
+    queue = RunQueue(prefix=prefix, lease_seconds=LEASE_SECONDS, max_attempts=3)
+    running = 0
+    max_running = 0
+
+    async def handler(run_id, payload):
+        nonlocal running, max_running
+        client = await redis.get_client()
+        if crash_on_claim and run_id == CRASH_RUN_ID:
+            # Simulate a crashed process: no ack, no more heartbeats
+            await client.rpush(f"{prefix}:test:crashed", worker_id)
+            os._exit(1)
+        running += 1
+        max_running = max(max_running, running)
+        await client.hset(f"{prefix}:test:max_running", worker_id, max_running)
+        await asyncio.sleep(RUN_SECONDS)
+        await client.hincrby(f"{prefix}:test:completed", run_id, 1)
+        running -= 1
+
+    worker = AgentWorker(worker_id, handler, queue=queue, concurrency=CONCURRENCY, poll_interval=0.05)
+    await worker.start()
+    client = await redis.get_client()
+    while not await client.exists(f"{prefix}:test:done"):
+        await asyncio.sleep(0.1)
+    await worker.stop(timeout=5)
+    await redis.close()
+
+
+async def _drive_workers(host: str, port: int, prefix: str, expected_runs, timeout: float):
+    from services import redis
+    from services.run_queue import RunQueue
+
+    await redis.initialize_async()
+    queue = RunQueue(prefix=prefix, lease_seconds=LEASE_SECONDS, max_attempts=3)
+    client = await redis.get_client()
+
+    ctx = multiprocessing.get_context("spawn")
+    crashing = ctx.Process(target=_worker_process, args=(host, port, prefix, True))
+    workers = [ctx.Process(target=_worker_process, args=(host, port, prefix, False)) for _ in range(NUM_WORKERS - 1)]
+
+    try:
+        # Only the crashing worker is up while the crash run is queued, so it claims it
+        await queue.enqueue(CRASH_RUN_ID, {"thread_id": f"thread-{CRASH_RUN_ID}"})
+        crashing.start()
+        await asyncio.get_running_loop().run_in_executor(None, crashing.join, 30)
+
+        for proc in workers:
+            proc.start()
+        for run_id in expected_runs[1:]:
+            await queue.enqueue(run_id, {"thread_id": f"thread-{run_id}"})
+
+        deadline = time.time() + timeout
+        completed = {}
+        while time.time() < deadline:
+            completed = await client.hgetall(f"{prefix}:test:completed")
+            if len(completed) == len(expected_runs):
+                break
+            await asyncio.sleep(0.2)
+
+        crashed = await client.lrange(f"{prefix}:test:crashed", 0, -1)
+        max_running = await client.hgetall(f"{prefix}:test:max_running")
+        leftover_pending = await queue.pending_count()
+    finally:
+        await client.set(f"{prefix}:test:done", "1")
+        for proc in [crashing] + workers:
+            await asyncio.get_running_loop().run_in_executor(None, proc.join, 15)
+            if proc.is_alive():
+                proc.terminate()
+        await redis.close()
+
+    return completed, crashed, max_running, leftover_pending
+
+
+def test_run_queue_multiprocess():
+    host, port, fake_server = _start_redis_server()
+    os.environ["REDIS_HOST"] = host
+    os.environ["REDIS_PORT"] = str(port)
+    os.environ["REDIS_PASSWORD"] = ""
+    os.environ["REDIS_SSL"] = "false"
+
+    prefix = f"test_run_queue:{uuid.uuid4().hex[:8]}"
+    expected_runs = [CRASH_RUN_ID] + [f"run-{i}" for i in range(NUM_RUNS - 1)]
+
+    try:
+        completed, crashed, max_running, leftover_pending = asyncio.run(
+            _drive_workers(host, port, prefix, expected_runs, timeout=60)
+        )
+    finally:
+        if fake_server:
+            fake_server.shutdown()
+            fake_server.server_close()
+
+    print(f"Completed runs: {len(completed)}/{len(expected_runs)}")
+    print(f"Crashed workers: {crashed}")
+    print(f"Max concurrent runs per worker: {max_running}")
+
+    assert crashed, "The crashing worker never claimed the crash run"
+    assert sorted(completed.keys()) == sorted(expected_runs), f"Missing runs: {set(expected_runs) - set(completed)}"
+    assert all(int(count) == 1 for count in completed.values()), f"Runs executed more than once: {completed}"
+    assert all(int(count) <= CONCURRENCY for count in max_running.values()), f"Concurrency exceeded: {max_running}"
+    assert leftover_pending == 0
+
+
+async def _drain_and_resume(prefix: str):
+    from services import redis
+    from services.run_queue import RunQueue
+    from agent.checkpoint import RunCheckpoint
+    from agent.worker import AgentWorker, RunDrained
+
+    # The Redis wrapper rate limits reconnects within a process
+    redis._last_connection_attempt = 0
+    await redis.initialize_async()
+    queue = RunQueue(prefix=prefix, lease_seconds=LEASE_SECONDS, max_attempts=3)
+    run_id = f"{prefix}-drained"
+    resumed_from = []
+
+    async def handler(run_id, payload):
+        checkpoint = await RunCheckpoint.load(run_id)
+        if checkpoint is None:
+            # First attempt: stop at iteration 2 as if the instance was shutting down
+            await RunCheckpoint(
+                agent_run_id=run_id, iteration_count=2, response_offset=7,
+                run_params=payload, drained=True
+            ).save()
+            raise RunDrained(run_id)
+        assert await RunCheckpoint.is_drained(run_id)
+        assert await RunCheckpoint.claim_drained(run_id)
+        assert not await RunCheckpoint.claim_drained(run_id), "Drained run claimed twice"
+        assert not await RunCheckpoint.is_drained(run_id), "Claimed run still offered to other instances"
+        resumed_from.append((checkpoint.iteration_count, checkpoint.response_offset, checkpoint.run_params))
+        await RunCheckpoint.delete(run_id)
+
+    try:
+        worker = AgentWorker("drain-worker", handler, queue=queue, concurrency=1, poll_interval=0.05)
+        await queue.enqueue(run_id, {"thread_id": "thread-drained"})
+        await worker.start()
+        deadline = time.time() + 10
+        while not resumed_from and time.time() < deadline:
+            await asyncio.sleep(0.05)
+        await worker.stop(timeout=5)
+        tracked = await queue.is_tracked(run_id)
+        leftover = await RunCheckpoint.load(run_id)
+    finally:
+        await redis.close()
+
+    return resumed_from, tracked, leftover
+
+
+def test_drained_run_resumes_from_checkpoint():
+    host, port, fake_server = _start_redis_server()
+    os.environ["REDIS_HOST"] = host
+    os.environ["REDIS_PORT"] = str(port)
+    os.environ["REDIS_PASSWORD"] = ""
+    os.environ["REDIS_SSL"] = "false"
+
+    try:
+        resumed_from, tracked, leftover = asyncio.run(_drain_and_resume(f"test_run_queue:{uuid.uuid4().hex[:8]}"))
+    finally:
+        if fake_server:
+            fake_server.shutdown()
+            fake_server.server_close()
+
+    assert resumed_from == [(2, 7, {"thread_id": "thread-drained"})], f"Unexpected resume: {resumed_from}"
+    assert not tracked, "Resumed run was not acked"
+    assert leftover is None
+
+
+if __name__ == "__main__":
+    test_run_queue_multiprocess()
+    test_drained_run_resumes_from_checkpoint()
+    print("Run queue test passed")
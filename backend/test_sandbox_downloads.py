@@ -0,0 +1,124 @@
+"""
+Sandbox Downloads Test
+
+Checks the streaming file reads in sandbox/downloads.py:
+
+- a file larger than one chunk is streamed in chunks no larger than the
+  chunk size, and the chunks add up to the file
+- Range headers map to the right bytes, including suffix and open ranges;
+  ranges beyond the end of the file are rejected
+- the ETag changes with the file and matches If-None-Match
+- head/tail previews return only the requested lines
+
+Uses the in-memory FakeSandbox from sandbox/fake_backend.py with a process
+that emulates the tail/head/base64 pipelines, so no Daytona access is needed.
+
+Usage:
+    python test_sandbox_downloads.py
+"""
+
+import asyncio
+import base64
+import os
+import re
+import shlex
+
+# Configuration is validated on import; these defaults only matter when no .env is present
+for _key in ("SUPABASE_URL", "SUPABASE_ANON_KEY", "SUPABASE_SERVICE_ROLE_KEY", "REDIS_HOST", "REDIS_PASSWORD",
+             "DAYTONA_API_KEY", "DAYTONA_SERVER_URL", "DAYTONA_TARGET", "TAVILY_API_KEY",
+             "RAPID_API_KEY", "FIRECRAWL_API_KEY"):
+    os.environ.setdefault(_key, "test")
+
+CHUNK_SIZE = 1000
+
+
+def _make_sandbox(content):
+    from sandbox.fake_backend import FakeExecuteResponse, FakeSandbox
+
+    sandbox = FakeSandbox("downloads")
+    sandbox.fs.upload_file("/workspace/app.log", content)
+    largest_read = {"bytes": 0}
+
+    def exec_pipeline(command, cwd=None, timeout=None):
+        byte_read = re.match(r"tail -c \+(\d+) (.+) \| head -c (\d+) \| base64 -w 0$", command)
+        line_read = re.match(r"(head|tail) -n (\d+) (.+) \| base64 -w 0$", command)
+        if byte_read:
+            offset, path, length = int(byte_read.group(1)) - 1, shlex.split(byte_read.group(2))[0], int(byte_read.group(3))
+            output = sandbox.fs.files[path][offset:offset + length]
+            largest_read["bytes"] = max(largest_read["bytes"], len(output))
+        elif line_read:
+            mode, count, path = line_read.group(1), int(line_read.group(2)), shlex.split(line_read.group(3))[0]
+            lines = sandbox.fs.files[path].splitlines(keepends=True)
+            output = b"".join(lines[:count] if mode == "head" else lines[-count:])
+        else:
+            return FakeExecuteResponse(exit_code=1, result=f"unexpected command: {command}")
+        return FakeExecuteResponse(result=base64.b64encode(output).decode())
+
+    sandbox.process.exec = exec_pipeline
+    return sandbox, largest_read
+
+
+async def _collect(stream):
+    chunks = [chunk async for chunk in stream]
+    return b"".join(chunks), max((len(chunk) for chunk in chunks), default=0)
+
+
+async def _run_checks():
+    from sandbox.executor import AsyncSandbox, SandboxExecutor
+    from sandbox.downloads import (
+        RangeNotSatisfiable, etag_matches, file_etag, file_info, parse_range, preview_lines, stream_file
+    )
+
+    content = b"".join(f"line {i:05d} ".encode() + bytes([i % 256]) + b"\n" for i in range(1000))
+    raw_sandbox, largest_read = _make_sandbox(content)
+    executor = SandboxExecutor(max_workers=4)
+    sandbox = AsyncSandbox(raw_sandbox, executor)
+    info = await file_info(sandbox, "/workspace/app.log")
+    assert info.size == len(content)
+
+    # Whole file, in chunks
+    data, biggest_chunk = await _collect(stream_file(sandbox, "/workspace/app.log", 0, info.size - 1, info.size, CHUNK_SIZE))
+    assert data == content
+    assert biggest_chunk <= CHUNK_SIZE and largest_read["bytes"] <= CHUNK_SIZE
+
+    # Ranges
+    for header, expected in (
+        ("bytes=0-99", content[:100]),
+        ("bytes=2500-", content[2500:]),
+        ("bytes=-300", content[-300:]),
+        ("bytes=100-999999", content[100:]),
+    ):
+        start, end = parse_range(header, info.size)
+        data, _ = await _collect(stream_file(sandbox, "/workspace/app.log", start, end, info.size, CHUNK_SIZE))
+        assert data == expected, header
+    assert parse_range(None, info.size) is None
+    assert parse_range("bytes=0-1,5-9", info.size) is None
+    for header in (f"bytes={info.size}-", "bytes=-0"):
+        try:
+            parse_range(header, info.size)
+            raise AssertionError(f"{header} should not be satisfiable")
+        except RangeNotSatisfiable:
+            pass
+
+    # ETag
+    etag = file_etag(info.size, info.mod_time)
+    assert etag_matches(etag, etag) and etag_matches(f'"other", {etag}', etag)
+    assert not etag_matches(None, etag)
+    assert file_etag(info.size, "2026-01-01T00:00:00Z") != file_etag(info.size + 1, "2026-01-01T00:00:00Z")
+
+    # Previews
+    head = await preview_lines(sandbox, "/workspace/app.log", "head", 3)
+    tail = await preview_lines(sandbox, "/workspace/app.log", "tail", 2)
+    assert head.splitlines()[0].startswith("line 00000") and len(head.splitlines()) == 3
+    assert tail.splitlines()[-1].startswith("line 00999") and len(tail.splitlines()) == 2
+
+    executor.shutdown(wait=True)
+
+
+def test_sandbox_downloads():
+    asyncio.run(_run_checks())
+
+
+if __name__ == "__main__":
+    test_sandbox_downloads()
+    print("Sandbox downloads test passed")
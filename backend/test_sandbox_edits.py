@@ -0,0 +1,145 @@
+"""
+Sandbox Edits Test
+
+Checks the server-side file edits in sandbox/edits.py:
+
+- several replacements are applied with one command and only the changed
+  regions come back
+- a unified diff is applied, also when its line numbers are off
+- a batch with one bad edit leaves the file untouched
+- SEARCH/REPLACE blocks from the XML tool call are parsed into edits
+- large payloads go through a temporary file instead of the command line
+
+Runs the real edit script with the local python against a temporary
+directory standing in for /workspace, so no Daytona access is needed.
+
+Usage:
+    python test_sandbox_edits.py
+"""
+
+import asyncio
+import os
+import shlex
+import subprocess
+import sys
+import tempfile
+
+# Configuration is validated on import; these defaults only matter when no .env is present
+for _key in ("SUPABASE_URL", "SUPABASE_ANON_KEY", "SUPABASE_SERVICE_ROLE_KEY", "REDIS_HOST", "REDIS_PASSWORD",
+             "DAYTONA_API_KEY", "DAYTONA_SERVER_URL", "DAYTONA_TARGET", "TAVILY_API_KEY",
+             "RAPID_API_KEY", "FIRECRAWL_API_KEY"):
+    os.environ.setdefault(_key, "test")
+
+ORIGINAL = "".join(f"line {i}\n" for i in range(1, 201))
+
+
+def _make_sandbox(workspace_dir):
+    from sandbox.fake_backend import FakeExecuteResponse, FakeSandbox
+
+    sandbox = FakeSandbox("edits")
+    calls = {"exec": 0, "upload_file": 0}
+
+    def local_path(path):
+        if path.startswith("/workspace/"):
+            return os.path.join(workspace_dir, path[len("/workspace/"):])
+        if path.startswith("/tmp/apply-edits"):
+            return os.path.join(workspace_dir, os.path.basename(path))
+        return path
+
+    def upload_file(path, content):
+        calls["upload_file"] += 1
+        with open(local_path(path), "wb") as f:
+            f.write(content)
+
+    def exec_locally(command, cwd=None, timeout=None):
+        calls["exec"] += 1
+        args = shlex.split(command)
+        argument = args[3]
+        if argument.startswith("@"):
+            argument = "@" + local_path(argument[1:])
+        completed = subprocess.run([sys.executable, "-c", args[2], argument],
+                                   capture_output=True, text=True)
+        return FakeExecuteResponse(exit_code=completed.returncode, result=completed.stdout or completed.stderr)
+
+    sandbox.fs.upload_file, sandbox.process.exec = upload_file, exec_locally
+    return sandbox, calls, local_path
+
+
+async def _run_checks(workspace_dir):
+    from sandbox.edits import apply_file_edits, parse_edit_blocks
+    from sandbox.executor import AsyncSandbox, SandboxExecutor
+
+    raw_sandbox, calls, local_path = _make_sandbox(workspace_dir)
+    executor = SandboxExecutor(max_workers=2)
+    sandbox = AsyncSandbox(raw_sandbox, executor)
+    path = "/workspace/notes.txt"
+
+    def read():
+        with open(local_path(path)) as f:
+            return f.read()
+
+    def reset():
+        with open(local_path(path), "w") as f:
+            f.write(ORIGINAL)
+
+    async def apply(**kwargs):
+        return await apply_file_edits(sandbox, local_path(path), context_lines=1, **kwargs)
+
+    # Several replacements, one command, only the changed regions returned
+    reset()
+    result = await apply(edits=[
+        {"old_str": "line 5\n", "new_str": "line five\nline five and a half\n"},
+        {"old_str": "line 30\n", "new_str": "line thirty\n"},
+        {"old_str": "line 2\n", "new_str": ""},
+    ])
+    assert result["ok"], result
+    assert calls["exec"] == 1 and calls["upload_file"] == 0, calls
+    content = read()
+    assert "line five\nline five and a half\n" in content and "line thirty\n" in content and "line 2\n" not in content
+    snippets = "\n".join(hunk["snippet"] for hunk in result["hunks"])
+    assert "line five and a half" in snippets and "line thirty" in snippets
+    assert "line 20" not in snippets, "Unchanged lines were returned"
+    assert len(snippets) < len(content) / 2
+
+    # A bad edit in a batch leaves the file untouched
+    reset()
+    result = await apply(edits=[
+        {"old_str": "line 5\n", "new_str": "changed\n"},
+        {"old_str": "line 1", "new_str": "ambiguous"},
+    ])
+    assert not result["ok"] and "multiple occurrences" in result["error"], result
+    assert read() == ORIGINAL
+
+    # Unified diff whose line numbers are off by a few lines
+    reset()
+    diff = "--- a/notes.txt\n+++ b/notes.txt\n@@ -8,3 +8,3 @@\n line 11\n-line 12\n+line twelve\n line 13\n"
+    result = await apply(diff=diff)
+    assert result["ok"], result
+    assert "line twelve\n" in read() and "line 12\n" not in read()
+    result = await apply(diff="@@ -1,1 +1,1 @@\n-not in file\n+x\n")
+    assert not result["ok"] and "does not match" in result["error"]
+
+    # SEARCH/REPLACE blocks as written in the XML tool call
+    edits = parse_edit_blocks(
+        "<<<<<<< SEARCH\nline 3\n=======\nline three\n>>>>>>> REPLACE\n"
+        "<<<<<<< SEARCH\nline 4\n=======\nline four\n>>>>>>> REPLACE"
+    )
+    assert edits == [{"old_str": "line 3", "new_str": "line three"}, {"old_str": "line 4", "new_str": "line four"}]
+
+    # Large payloads are uploaded first
+    reset()
+    result = await apply(edits=[{"old_str": "line 40\n", "new_str": "x" * 100000 + "\n"}])
+    assert result["ok"] and calls["upload_file"] == 1, (result, calls)
+    assert not [name for name in os.listdir(workspace_dir) if name.startswith("apply-edits")], "Payload file left behind"
+
+    executor.shutdown(wait=True)
+
+
+def test_sandbox_edits():
+    with tempfile.TemporaryDirectory() as workspace_dir:
+        asyncio.run(_run_checks(workspace_dir))
+
+
+if __name__ == "__main__":
+    test_sandbox_edits()
+    print("Sandbox edits test passed")
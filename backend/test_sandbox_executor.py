@@ -0,0 +1,134 @@
+"""
+Sandbox Executor Test
+
+Checks that sandbox/executor.py keeps blocking SDK calls off the event loop:
+
+- a ticker keeps running on time while slow sandbox calls are in flight,
+  whereas calling the same methods directly stalls it
+- no more than max_calls_per_sandbox calls run at once for one sandbox, while
+  other sandboxes are not held back
+- the stall the executor removed shows up in its stats
+
+Uses a fake sandbox whose fs/process methods sleep, so no Daytona access is needed.
+
+Usage:
+    python test_sandbox_executor.py
+"""
+
+import asyncio
+import os
+import threading
+import time
+
+# Configuration is validated on import; these defaults only matter when no .env is present
+for _key in ("SUPABASE_URL", "SUPABASE_ANON_KEY", "SUPABASE_SERVICE_ROLE_KEY", "REDIS_HOST", "REDIS_PASSWORD",
+             "DAYTONA_API_KEY", "DAYTONA_SERVER_URL", "DAYTONA_TARGET", "TAVILY_API_KEY",
+             "RAPID_API_KEY", "FIRECRAWL_API_KEY"):
+    os.environ.setdefault(_key, "test")
+
+CALL_SECONDS = 0.1
+
+
+class _FakeFileSystem:
+    def __init__(self, tracker):
+        self.tracker = tracker
+
+    def download_file(self, path):
+        with self.tracker:
+            time.sleep(CALL_SECONDS)
+        return path.encode()
+
+
+class _ConcurrencyTracker:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.current = 0
+        self.peak = 0
+
+    def __enter__(self):
+        with self.lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+
+    def __exit__(self, *exc):
+        with self.lock:
+            self.current -= 1
+
+
+class _FakeSandbox:
+    def __init__(self, sandbox_id):
+        self.id = sandbox_id
+        self.tracker = _ConcurrencyTracker()
+        self.fs = _FakeFileSystem(self.tracker)
+        self.process = object()
+
+
+async def _max_tick_gap(work):
+    """Run `work` while ticking every 10ms and return the longest gap between ticks."""
+    gaps = []
+    done = asyncio.Event()
+
+    async def ticker():
+        last = time.monotonic()
+        while not done.is_set():
+            await asyncio.sleep(0.01)
+            now = time.monotonic()
+            gaps.append(now - last)
+            last = now
+
+    ticker_task = asyncio.create_task(ticker())
+    await asyncio.sleep(0.02)
+    try:
+        await work()
+    finally:
+        done.set()
+        await ticker_task
+    return max(gaps)
+
+
+async def _run_checks():
+    from sandbox.executor import AsyncSandbox, SandboxExecutor
+
+    executor = SandboxExecutor(max_workers=8, max_calls_per_sandbox=2)
+    busy, other = _FakeSandbox("busy"), _FakeSandbox("other")
+
+    async def direct_calls():
+        for i in range(3):
+            busy.fs.download_file(f"/workspace/{i}")
+
+    async def offloaded_calls():
+        busy_sandbox, other_sandbox = AsyncSandbox(busy, executor), AsyncSandbox(other, executor)
+        contents = await asyncio.gather(
+            *[busy_sandbox.fs.download_file(f"/workspace/{i}") for i in range(6)],
+            *[other_sandbox.fs.download_file(f"/workspace/{i}") for i in range(2)]
+        )
+        assert contents[0] == b"/workspace/0"
+
+    blocking_gap = await _max_tick_gap(direct_calls)
+    busy.tracker.peak = 0
+    started = time.monotonic()
+    offloaded_gap = await _max_tick_gap(offloaded_calls)
+    elapsed = time.monotonic() - started
+    executor.shutdown(wait=True)
+    return blocking_gap, offloaded_gap, elapsed, busy.tracker.peak, other.tracker.peak, executor.stats()
+
+
+def test_sandbox_calls_do_not_block_the_event_loop():
+    blocking_gap, offloaded_gap, elapsed, busy_peak, other_peak, stats = asyncio.run(_run_checks())
+
+    print(f"Longest event loop stall: {blocking_gap * 1000:.0f}ms direct, {offloaded_gap * 1000:.0f}ms through the executor")
+    print(f"Executor stats: {stats}")
+
+    assert blocking_gap >= 3 * CALL_SECONDS * 0.9, "Direct calls were expected to stall the loop"
+    assert offloaded_gap < CALL_SECONDS, f"Executor calls stalled the loop for {offloaded_gap:.3f}s"
+    # 6 calls on one sandbox with a limit of 2 take 3 rounds; the other sandbox runs alongside
+    assert busy_peak == 2, f"Per-sandbox limit not applied: {busy_peak} calls at once"
+    assert other_peak == 2
+    assert elapsed < 4 * CALL_SECONDS + 0.5, f"Calls were serialized: {elapsed:.2f}s"
+    assert stats["operations"]["fs.download_file"]["calls"] == 8
+    assert stats["stall_avoided_seconds"] >= 8 * CALL_SECONDS * 0.9
+
+
+if __name__ == "__main__":
+    test_sandbox_calls_do_not_block_the_event_loop()
+    print("Sandbox executor test passed")
@@ -0,0 +1,127 @@
+"""
+Sandbox Handle Cache Test
+
+Checks the process-level sandbox handle cache in sandbox/handle_cache.py:
+
+- warm lookups need no fetch; expired handles are revalidated
+- concurrent lookups of a stopped sandbox share one fetch and one start
+- a sandbox event published by another process invalidates the handle and
+  the other state kept for the sandbox
+
+Uses fake fetch/start functions instead of Daytona, and the Redis server from
+REDIS_HOST/REDIS_PORT if one is reachable, otherwise an in-process fakeredis
+TCP server.
+
+Usage:
+    python test_sandbox_handle_cache.py
+"""
+
+import asyncio
+import os
+
+# Configuration is validated on import; these defaults only matter when no .env is present
+for _key in ("SUPABASE_URL", "SUPABASE_ANON_KEY", "SUPABASE_SERVICE_ROLE_KEY", "REDIS_PASSWORD",
+             "DAYTONA_API_KEY", "DAYTONA_SERVER_URL", "DAYTONA_TARGET", "TAVILY_API_KEY",
+             "RAPID_API_KEY", "FIRECRAWL_API_KEY"):
+    os.environ.setdefault(_key, "test")
+
+from test_run_queue import _start_redis_server
+
+
+class _FakeDaytona:
+    def __init__(self):
+        self.states = {"sb-1": "started", "sb-2": "stopped"}
+        self.fetches = 0
+        self.starts = 0
+
+    async def fetch(self, sandbox_id):
+        self.fetches += 1
+        await asyncio.sleep(0.05)
+        return {"id": sandbox_id, "state": self.states[sandbox_id]}
+
+    async def start(self, sandbox):
+        self.starts += 1
+        await asyncio.sleep(0.1)
+        self.states[sandbox["id"]] = "started"
+        return await self.fetch(sandbox["id"])
+
+
+async def _run_checks():
+    from services import redis
+    from sandbox.handle_cache import SandboxHandleCache, listen_for_sandbox_events, publish_sandbox_event
+
+    daytona = _FakeDaytona()
+
+    def make_cache():
+        return SandboxHandleCache(
+            fetch=daytona.fetch,
+            start=daytona.start,
+            needs_start=lambda sandbox: sandbox["state"] in ("stopped", "archived"),
+            state_of=lambda sandbox: sandbox["state"],
+            ttl_seconds=0.3
+        )
+
+    cache = make_cache()
+
+    # Warm path: one fetch, then hits until the TTL expires
+    await cache.get("sb-1")
+    for _ in range(5):
+        await cache.get("sb-1")
+    assert daytona.fetches == 1, f"Warm lookups fetched the sandbox: {daytona.fetches}"
+    await asyncio.sleep(0.35)
+    await cache.get("sb-1")
+    assert daytona.fetches == 2, "Expired handle was not revalidated"
+
+    # Concurrent lookups of a stopped sandbox: one fetch, one start, one refresh
+    daytona.fetches = 0
+    handles = await asyncio.gather(*[cache.get("sb-2") for _ in range(10)])
+    assert all(handle["state"] == "started" for handle in handles)
+    assert daytona.starts == 1, f"Sandbox started {daytona.starts} times"
+    assert daytona.fetches == 2, f"Expected fetch + refresh, got {daytona.fetches} fetches"
+
+    # Another process archives the sandbox and publishes the event
+    redis._last_connection_attempt = 0
+    await redis.initialize_async()
+    dropped = []
+
+    async def drop_sandbox_state(sandbox_id):
+        dropped.append(sandbox_id)
+
+    listener = asyncio.create_task(listen_for_sandbox_events(cache, drop_sandbox_state))
+    try:
+        await asyncio.sleep(0.2)
+        other_process_cache = make_cache()
+        await publish_sandbox_event(other_process_cache, "sb-2", "archived")
+        for _ in range(50):
+            if "sb-2" not in cache._handles and dropped:
+                break
+            await asyncio.sleep(0.02)
+        assert "sb-2" not in cache._handles, "Sandbox event did not invalidate the handle"
+        assert dropped == ["sb-2"], f"Other sandbox state was not dropped: {dropped}"
+    finally:
+        listener.cancel()
+        await redis.close()
+    return cache.stats()
+
+
+def test_sandbox_handle_cache():
+    host, port, fake_server = _start_redis_server()
+    os.environ["REDIS_HOST"] = host
+    os.environ["REDIS_PORT"] = str(port)
+    os.environ["REDIS_PASSWORD"] = ""
+    os.environ["REDIS_SSL"] = "false"
+
+    try:
+        stats = asyncio.run(_run_checks())
+    finally:
+        if fake_server:
+            fake_server.shutdown()
+            fake_server.server_close()
+
+    print(f"Handle cache stats: {stats}")
+    assert stats["hits"] >= 5
+
+
+if __name__ == "__main__":
+    test_sandbox_handle_cache()
+    print("Sandbox handle cache test passed")
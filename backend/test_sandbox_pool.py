@@ -0,0 +1,104 @@
+"""
+Sandbox Pool Test
+
+Checks the pre-warmed sandbox pool in sandbox/pool.py against the in-memory
+fake Daytona backend:
+
+- the replenisher fills the pool to its target size, and concurrent passes
+  from several instances do not overshoot it
+- concurrent claims never hand the same sandbox to two projects, and claimed
+  sandboxes are labeled with their project ID
+- an empty pool returns None so the caller creates a sandbox itself
+- members idle for longer than max_idle_seconds are deleted
+
+Uses the Redis server from REDIS_HOST/REDIS_PORT if one is reachable,
+otherwise an in-process fakeredis TCP server.
+
+Usage:
+    python test_sandbox_pool.py
+"""
+
+import asyncio
+import os
+
+# Configuration is validated on import; these defaults only matter when no .env is present
+for _key in ("SUPABASE_URL", "SUPABASE_ANON_KEY", "SUPABASE_SERVICE_ROLE_KEY", "REDIS_PASSWORD",
+             "DAYTONA_API_KEY", "DAYTONA_SERVER_URL", "DAYTONA_TARGET", "TAVILY_API_KEY",
+             "RAPID_API_KEY", "FIRECRAWL_API_KEY"):
+    os.environ.setdefault(_key, "test")
+
+from test_run_queue import _start_redis_server
+
+POOL_SIZE = 4
+
+
+async def _run_checks():
+    from services import redis
+    from sandbox.fake_backend import FakeDaytonaBackend
+    from sandbox.pool import SandboxPool
+
+    redis._last_connection_attempt = 0
+    await redis.initialize_async()
+    prefix = f"test_sandbox_pool_{os.getpid()}"
+    backend = FakeDaytonaBackend(create_delay=0.05)
+
+    def make_pool(max_idle_seconds=600):
+        return SandboxPool(backend, target_size=POOL_SIZE, max_idle_seconds=max_idle_seconds, prefix=prefix)
+
+    try:
+        # Two instances replenish at once; the lock keeps the pool at its target size
+        await asyncio.gather(make_pool().replenish(), make_pool().replenish())
+        pool = make_pool()
+        assert await pool.ready_count() == POOL_SIZE
+        assert backend.created == POOL_SIZE, f"Created {backend.created} sandboxes for a pool of {POOL_SIZE}"
+
+        # More projects than pooled sandboxes claim at once
+        projects = [f"project-{i}" for i in range(POOL_SIZE + 2)]
+        claims = await asyncio.gather(*[make_pool().claim(project_id) for project_id in projects])
+        claimed = [(project_id, claim) for project_id, claim in zip(projects, claims) if claim]
+        claimed_ids = [claim[1] for _, claim in claimed]
+        assert len(claimed) == POOL_SIZE, f"{len(claimed)} claims succeeded"
+        assert len(set(claimed_ids)) == POOL_SIZE, "A sandbox was claimed twice"
+        for project_id, (sandbox, sandbox_id, sandbox_pass) in claimed:
+            assert sandbox.labels == {'id': project_id}
+            assert sandbox_pass
+        assert await pool.ready_count() == 0
+
+        # Refill, then expire the idle members
+        await pool.replenish()
+        assert await pool.ready_count() == POOL_SIZE
+        await asyncio.sleep(1.1)
+        idle_pool = make_pool(max_idle_seconds=1)
+        assert await idle_pool.claim("late-project") is None, "Expired sandbox was claimed"
+        idle_pool.target_size = 1
+        result = await idle_pool.replenish()
+        assert result == {"created": 1, "expired": POOL_SIZE}, result
+        assert backend.deleted == POOL_SIZE
+        assert len(backend.sandboxes) == POOL_SIZE + 1
+    finally:
+        redis_client = await redis.get_client()
+        await redis_client.delete(f"{prefix}:ready", f"{prefix}:members", f"{prefix}:lock")
+        await redis.close()
+    return backend
+
+
+def test_sandbox_pool():
+    host, port, fake_server = _start_redis_server()
+    os.environ["REDIS_HOST"] = host
+    os.environ["REDIS_PORT"] = str(port)
+    os.environ["REDIS_PASSWORD"] = ""
+    os.environ["REDIS_SSL"] = "false"
+
+    try:
+        backend = asyncio.run(_run_checks())
+    finally:
+        if fake_server:
+            fake_server.shutdown()
+            fake_server.server_close()
+
+    print(f"Fake backend: {backend.created} created, {backend.deleted} deleted")
+
+
+if __name__ == "__main__":
+    test_sandbox_pool()
+    print("Sandbox pool test passed")
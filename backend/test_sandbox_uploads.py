@@ -0,0 +1,116 @@
+"""
+Sandbox Uploads Test
+
+Checks the bulk upload path in sandbox/uploads.py:
+
+- a batch of files is sent as one tar archive with a single upload call and
+  verified with one listing, instead of one upload and listing per file
+- small batches are uploaded file by file, with no more than max_concurrency
+  uploads in flight
+- a failed archive extract falls back to file-by-file uploads and does not
+  leave the archive behind
+- files that are missing after the upload are reported as failed
+
+Uses the in-memory FakeSandbox from sandbox/fake_backend.py with a process
+that extracts tar archives into its file system, so no Daytona access is needed.
+
+Usage:
+    python test_sandbox_uploads.py
+"""
+
+import asyncio
+import io
+import os
+import shlex
+import tarfile
+
+# Configuration is validated on import; these defaults only matter when no .env is present
+for _key in ("SUPABASE_URL", "SUPABASE_ANON_KEY", "SUPABASE_SERVICE_ROLE_KEY", "REDIS_HOST", "REDIS_PASSWORD",
+             "DAYTONA_API_KEY", "DAYTONA_SERVER_URL", "DAYTONA_TARGET", "TAVILY_API_KEY",
+             "RAPID_API_KEY", "FIRECRAWL_API_KEY"):
+    os.environ.setdefault(_key, "test")
+
+
+def _make_sandbox(tar_available=True, drop_path=None):
+    import threading
+    import time
+    from sandbox.fake_backend import FakeExecuteResponse, FakeSandbox
+
+    sandbox = FakeSandbox("uploads")
+    fs = sandbox.fs
+    calls = {"upload_file": 0, "list_files": 0, "in_flight": 0, "peak": 0}
+    lock = threading.Lock()
+    upload_file, list_files = fs.upload_file, fs.list_files
+
+    def counting_upload(path, content):
+        with lock:
+            calls["upload_file"] += 1
+            calls["in_flight"] += 1
+            calls["peak"] = max(calls["peak"], calls["in_flight"])
+        time.sleep(0.02)
+        if path != drop_path:
+            upload_file(path, content)
+        with lock:
+            calls["in_flight"] -= 1
+
+    def counting_list(path):
+        calls["list_files"] += 1
+        return list_files(path)
+
+    def exec_tar(command, cwd=None, timeout=None):
+        archive_path = shlex.split(command)[2]
+        if not tar_available:
+            # rm only runs after a failed tar if it is not chained with &&
+            if "&& rm" not in command:
+                fs.files.pop(archive_path, None)
+            return FakeExecuteResponse(exit_code=127, result="tar: command not found")
+        with tarfile.open(fileobj=io.BytesIO(fs.files.pop(archive_path)), mode="r:gz") as tar:
+            for member in tar.getmembers():
+                fs.files["/" + member.name] = tar.extractfile(member).read()
+        return FakeExecuteResponse()
+
+    fs.upload_file, fs.list_files, sandbox.process.exec = counting_upload, counting_list, exec_tar
+    return sandbox, calls
+
+
+async def _run_checks():
+    from sandbox.executor import AsyncSandbox, SandboxExecutor
+    from sandbox.uploads import upload_files
+
+    executor = SandboxExecutor(max_workers=8, max_calls_per_sandbox=8)
+    files = [(f"/workspace/file-{i}.txt", io.BytesIO(f"content {i}".encode() * 1000)) for i in range(6)]
+
+    # Tar: one upload, one listing
+    sandbox, calls = _make_sandbox()
+    result = await upload_files(AsyncSandbox(sandbox, executor), files, tar_min_files=4)
+    assert result.method == "tar" and not result.failed, result
+    assert sorted(result.uploaded) == sorted(path for path, _ in files)
+    assert sandbox.fs.files["/workspace/file-3.txt"] == b"content 3" * 1000
+    assert calls["upload_file"] == 1 and calls["list_files"] == 1, calls
+
+    # File by file with bounded concurrency
+    sandbox, calls = _make_sandbox()
+    result = await upload_files(AsyncSandbox(sandbox, executor), files, max_concurrency=2, tar_min_files=0)
+    assert result.method == "files" and len(result.uploaded) == 6, result
+    assert calls["upload_file"] == 6 and calls["list_files"] == 1, calls
+    assert calls["peak"] == 2, f"{calls['peak']} uploads in flight"
+
+    # No tar in the sandbox: fall back; a file that never arrives is reported
+    sandbox, calls = _make_sandbox(tar_available=False, drop_path="/workspace/file-5.txt")
+    result = await upload_files(AsyncSandbox(sandbox, executor), files, tar_min_files=4)
+    assert result.method == "files", result
+    assert not [path for path in sandbox.fs.files if path.startswith("/tmp/upload-")], "Archive left in the sandbox"
+    assert list(result.failed) == ["/workspace/file-5.txt"], result.failed
+    assert len(result.uploaded) == 5
+    assert sandbox.fs.files["/workspace/file-0.txt"] == b"content 0" * 1000
+
+    executor.shutdown(wait=True)
+
+
+def test_sandbox_uploads():
+    asyncio.run(_run_checks())
+
+
+if __name__ == "__main__":
+    test_sandbox_uploads()
+    print("Sandbox uploads test passed")
@@ -0,0 +1,143 @@
+"""
+Agent Scheduler Test
+
+Checks the per-account run quotas and the weighted fair queueing of agent
+iterations in services/scheduler.py:
+
+- an account cannot hold more run slots than its quota; extra runs wait in
+  line and report their position
+- with one iteration slot, an account with a single run is served before a
+  busy account's backlog drains, and a heavier weight gets a larger share
+- slots that are renewed outlive their TTL; slots that are not are freed
+
+Uses the Redis server from REDIS_HOST/REDIS_PORT if one is reachable, otherwise
+starts an in-process fakeredis TCP server.
+
+Usage:
+    python test_scheduler.py
+"""
+
+import asyncio
+import os
+import uuid
+
+# Configuration is validated on import; these defaults only matter when no .env is present
+for _key in ("SUPABASE_URL", "SUPABASE_ANON_KEY", "SUPABASE_SERVICE_ROLE_KEY", "REDIS_PASSWORD",
+             "DAYTONA_API_KEY", "DAYTONA_SERVER_URL", "DAYTONA_TARGET", "TAVILY_API_KEY",
+             "RAPID_API_KEY", "FIRECRAWL_API_KEY"):
+    os.environ.setdefault(_key, "test")
+
+from test_run_queue import _start_redis_server
+
+
+async def _check_run_quota(scheduler):
+    positions = []
+
+    async def on_wait(position):
+        positions.append(position)
+
+    assert await scheduler.acquire_run_slot("run-1", "acct", quota=2)
+    assert await scheduler.acquire_run_slot("run-2", "acct", quota=2)
+
+    waiter = asyncio.create_task(scheduler.acquire_run_slot("run-3", "acct", quota=2, on_wait=on_wait))
+    await asyncio.sleep(0.2)
+    assert not waiter.done(), "Run exceeded the account quota"
+    assert positions == [1], f"Unexpected queue positions: {positions}"
+
+    await scheduler.release_run_slot("run-1", "acct")
+    assert await asyncio.wait_for(waiter, timeout=2)
+
+    # Another account is not affected by the first account's quota
+    assert await scheduler.acquire_run_slot("run-4", "other", quota=1)
+
+    cancelled = await scheduler.acquire_run_slot("run-5", "other", quota=1, is_cancelled=lambda: True)
+    assert not cancelled
+
+
+async def _check_renewal(scheduler):
+    assert await scheduler.acquire_iteration("long", "acct", 1)
+    renewer = asyncio.create_task(scheduler.run_slot_renewer("long", "acct"))
+    await asyncio.sleep(scheduler.slot_ttl * 1.5)
+    assert not await scheduler.acquire_iteration("next", "acct", 1, is_cancelled=lambda: True), \
+        "Renewed iteration slot expired"
+
+    # Once the run stops renewing, its slot expires and the next run gets it
+    renewer.cancel()
+    assert await asyncio.wait_for(scheduler.acquire_iteration("next", "acct", 1), timeout=scheduler.slot_ttl * 3)
+
+
+async def _serve_order(scheduler, requests):
+    """Let every run in `requests` wait for the single iteration slot and return the grant order."""
+    order = []
+
+    async def run(run_id, account_id, weight):
+        await scheduler.acquire_iteration(run_id, account_id, weight)
+        order.append(account_id)
+        await asyncio.sleep(0.01)
+        await scheduler.release_iteration(run_id)
+
+    # Hold the slot while everyone joins the line so arrival order does not matter
+    assert await scheduler.acquire_iteration("blocker", "blocker", 1)
+    tasks = []
+    for run_id, account_id, weight in requests:
+        tasks.append(asyncio.create_task(run(run_id, account_id, weight)))
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.1)
+    await scheduler.release_iteration("blocker")
+    await asyncio.wait_for(asyncio.gather(*tasks), timeout=10)
+    return order
+
+
+async def _run_checks(prefix):
+    from services import redis
+    from services.scheduler import AgentRunScheduler
+
+    redis._last_connection_attempt = 0
+    await redis.initialize_async()
+    try:
+        quota_scheduler = AgentRunScheduler(prefix=f"{prefix}:quota", poll_interval=0.05)
+        await _check_run_quota(quota_scheduler)
+
+        renew_scheduler = AgentRunScheduler(
+            prefix=f"{prefix}:renew", max_concurrent_iterations=1, slot_ttl=1, poll_interval=0.05
+        )
+        await _check_renewal(renew_scheduler)
+
+        scheduler = AgentRunScheduler(prefix=f"{prefix}:fair", max_concurrent_iterations=1, poll_interval=0.02)
+        busy_first = [(f"busy-{i}", "busy", 1) for i in range(6)] + [("light-0", "light", 1)]
+        fair_order = await _serve_order(scheduler, busy_first)
+
+        scheduler = AgentRunScheduler(prefix=f"{prefix}:weighted", max_concurrent_iterations=1, poll_interval=0.02)
+        weighted = [(f"heavy-{i}", "heavy", 3) for i in range(6)] + [(f"plain-{i}", "plain", 1) for i in range(6)]
+        weighted_order = await _serve_order(scheduler, weighted)
+    finally:
+        await redis.close()
+    return fair_order, weighted_order
+
+
+def test_scheduler_quotas_and_fairness():
+    host, port, fake_server = _start_redis_server()
+    os.environ["REDIS_HOST"] = host
+    os.environ["REDIS_PORT"] = str(port)
+    os.environ["REDIS_PASSWORD"] = ""
+    os.environ["REDIS_SSL"] = "false"
+
+    try:
+        fair_order, weighted_order = asyncio.run(_run_checks(f"test_scheduler:{uuid.uuid4().hex[:8]}"))
+    finally:
+        if fake_server:
+            fake_server.shutdown()
+            fake_server.server_close()
+
+    print(f"Fair order: {fair_order}")
+    print(f"Weighted order: {weighted_order}")
+
+    # The light account joined last but is served right after the busy account's first iteration
+    assert fair_order.index("light") <= 1, f"Light account starved: {fair_order}"
+    # With weight 3 vs 1, the heavy account gets 3 of the first 4 iterations
+    assert weighted_order[:4].count("heavy") == 3, f"Weights not applied: {weighted_order}"
+
+
+if __name__ == "__main__":
+    test_scheduler_quotas_and_fairness()
+    print("Scheduler test passed")
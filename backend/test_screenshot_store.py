@@ -0,0 +1,174 @@
+"""
+Screenshot Store Test
+
+Checks services/screenshot_store.py on a sequence of browser action results
+like the browser API returns them, and compares the bytes written to message
+rows with screenshots inline and by reference:
+
+- a new screenshot is uploaded once and the message keeps only its path
+- results the browser API marked unchanged, and screenshots stored before,
+  cost no upload
+- the browser API is told a screenshot is known only once it is stored, so
+  with uploads failing or screenshots kept inline every image is sent
+- a failed upload leaves the screenshot inline
+- screenshots past the retention period are purged, and the store stops
+  referring to them before that; uploading one again restarts its retention
+- the agent loop reads stored screenshots back by path
+
+An in-memory Storage client stands in for Supabase, so no credentials are
+needed.
+
+Usage:
+    python test_screenshot_store.py
+"""
+
+import asyncio
+import base64
+import copy
+import hashlib
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+# Configuration is validated on import; these defaults only matter when no .env is present
+for _key in ("SUPABASE_URL", "SUPABASE_ANON_KEY", "SUPABASE_SERVICE_ROLE_KEY", "REDIS_HOST", "REDIS_PASSWORD",
+             "DAYTONA_API_KEY", "DAYTONA_SERVER_URL", "DAYTONA_TARGET", "TAVILY_API_KEY",
+             "RAPID_API_KEY", "FIRECRAWL_API_KEY"):
+    os.environ.setdefault(_key, "test")
+
+
+class _Bucket:
+    def __init__(self, storage, name):
+        self.storage = storage
+        self.name = name
+
+    async def upload(self, path, data, file_options=None):
+        if self.storage.fail_uploads:
+            raise RuntimeError("Storage unavailable")
+        # Like Storage, an upsert keeps created_at and moves updated_at
+        self.storage.objects[(self.name, path)] = bytes(data)
+        self.storage.created_at.setdefault((self.name, path), datetime.now(timezone.utc))
+        self.storage.updated_at[(self.name, path)] = datetime.now(timezone.utc)
+        self.storage.upload_bytes += len(data)
+
+    async def download(self, path):
+        return self.storage.objects[(self.name, path)]
+
+    async def remove(self, paths):
+        for path in paths:
+            self.storage.objects.pop((self.name, path), None)
+
+
+class _Storage:
+    def __init__(self):
+        self.objects = {}
+        self.created_at = {}
+        self.updated_at = {}
+        self.upload_bytes = 0
+        self.fail_uploads = False
+
+    def from_(self, bucket):
+        return _Bucket(self, bucket)
+
+
+class _Query:
+    def __init__(self, data):
+        self.data = data
+
+    async def execute(self):
+        return self
+
+
+class _Client:
+    def __init__(self):
+        self.storage = _Storage()
+
+    def rpc(self, name, params):
+        # list_expired_browser_screenshots
+        before = datetime.fromisoformat(params["p_before"])
+        names = [path for (bucket, path), updated in self.storage.updated_at.items()
+                 if bucket == params["p_bucket"] and updated < before and (bucket, path) in self.storage.objects]
+        return _Query(names[:params["p_limit"]])
+
+
+def _result(image, unchanged_of=None):
+    """A browser API result; unchanged_of is the screenshot the browser API already sent"""
+    result = {"success": True, "url": "https://example.com", "elements": "[0]<a>Home</a>", "content": "", "role": "assistant"}
+    if unchanged_of is not None:
+        result.update(screenshot_unchanged=True, screenshot_id=hashlib.sha1(unchanged_of).hexdigest())
+    else:
+        result.update(screenshot_base64=base64.b64encode(image).decode(), screenshot_id=hashlib.sha1(image).hexdigest())
+    result["screenshot_mime_type"] = "image/webp"
+    return result
+
+
+async def _run_checks():
+    from services.screenshot_store import ScreenshotStore
+
+    home, search = os.urandom(60000), os.urandom(50000)
+    # load, wait (unchanged), search, back to the same screen as the load, hover (unchanged)
+    actions = [_result(home), _result(None, home), _result(search), _result(home), _result(None, home)]
+
+    inline_store = ScreenshotStore(by_reference=False)
+    for result in copy.deepcopy(actions):
+        await inline_store.externalize(_Client(), "project", result, session="thread")
+    assert inline_store.known_screenshot("project", "thread") is None
+
+    client = _Client()
+    store = ScreenshotStore()
+    messages = []
+    for result in copy.deepcopy(actions):
+        if result.get("screenshot_unchanged"):
+            # The browser API only skips a screenshot the tool named as known
+            assert store.known_screenshot("project", "thread") == result["screenshot_id"]
+        messages.append(await store.externalize(client, "project", result, session="thread"))
+    assert all("screenshot_base64" not in message for message in messages)
+    assert messages[0]["screenshot_path"] == f"project/{hashlib.sha1(home).hexdigest()}.webp"
+    assert messages[1]["screenshot_path"] == messages[0]["screenshot_path"] == messages[3]["screenshot_path"]
+    stats = store.stats()
+    assert stats["uploads"] == 2 and stats["reused"] == 3, stats
+    assert client.storage.upload_bytes == len(home) + len(search)
+
+    # The agent loop reads them back
+    loaded = await store.load_base64(client, messages[1]["screenshot_path"])
+    assert base64.b64decode(loaded) == home
+    assert await store.load_base64(client, "project/missing.webp") is None
+
+    # Storage down: the screenshot stays inline
+    failing = _Client()
+    failing.storage.fail_uploads = True
+    failing_store = ScreenshotStore()
+    message = await failing_store.externalize(failing, "project", _result(os.urandom(1000)), session="thread")
+    assert "screenshot_base64" in message and "screenshot_path" not in message
+    assert failing_store.known_screenshot("project", "thread") is None
+    # An unchanged result for a screenshot that was never stored gets no dangling path
+    message = await failing_store.externalize(failing, "project", _result(None, home), session="thread")
+    assert "screenshot_path" not in message
+
+    # Retention: nothing is purged early; once expired, objects go and are no longer referred to
+    assert await store.purge_expired(client) == 0
+    store.retention_seconds = 0.2
+    time.sleep(0.2)
+    assert store.known_screenshot("project", "thread") is None
+    assert await store.purge_expired(client, batch_size=1) == 2 and not client.storage.objects
+    message = await store.externalize(client, "project", _result(home), session="thread")
+    assert message["screenshot_path"] and client.storage.objects, "Purged screenshot was not uploaded again"
+    # Uploading an old screenshot again restarts its retention
+    time.sleep(0.2)
+    message = await store.externalize(client, "project", _result(home), session="thread")
+    assert await store.purge_expired(client) == 0, "Re-uploaded screenshot was purged"
+
+    before, after = inline_store.stats()["message_bytes"], stats["message_bytes"]
+    assert after < before / 50, (before, after)
+    print(f"Over {len(actions)} actions: message rows {before} bytes inline, {after} bytes by reference; "
+          f"{stats['upload_bytes']} bytes uploaded to Storage")
+
+
+def test_screenshot_store():
+    asyncio.run(_run_checks())
+
+
+if __name__ == "__main__":
+    test_screenshot_store()
+    print("Screenshot store test passed")
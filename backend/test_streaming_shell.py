@@ -0,0 +1,139 @@
+"""
+Streaming Shell Test
+
+Checks the asynchronous session commands in sandbox/commands.py:
+
+- output is handed to the callback while the command still runs, and the
+  tool progress it is reported as reaches the run's progress sink
+- huge outputs keep only their head and tail, and the middle is not read
+- a command that outlives its timeout returns its partial output, and its
+  log is removed
+- exit codes come from the session command
+
+Runs the commands with the local bash, with /workspace and /tmp mapped to a
+temporary directory, so no Daytona access is needed.
+
+Usage:
+    python test_streaming_shell.py
+"""
+
+import asyncio
+import os
+import re
+import subprocess
+import tempfile
+import time
+
+# Configuration is validated on import; these defaults only matter when no .env is present
+for _key in ("SUPABASE_URL", "SUPABASE_ANON_KEY", "SUPABASE_SERVICE_ROLE_KEY", "REDIS_HOST", "REDIS_PASSWORD",
+             "DAYTONA_API_KEY", "DAYTONA_SERVER_URL", "DAYTONA_TARGET", "TAVILY_API_KEY",
+             "RAPID_API_KEY", "FIRECRAWL_API_KEY"):
+    os.environ.setdefault(_key, "test")
+
+
+class _SessionCommand:
+    def __init__(self, cmd_id, exit_code=None):
+        self.cmd_id = cmd_id
+        self.id = cmd_id
+        self.exit_code = exit_code
+
+
+def _make_sandbox(root_dir):
+    from sandbox.fake_backend import FakeExecuteResponse, FakeSandbox
+
+    sandbox = FakeSandbox("shell")
+    processes = {}
+    reads = []
+
+    def local(command):
+        return re.sub(r"(?<![\w/])/(workspace|tmp)\b",
+                      lambda match: os.path.join(root_dir, "workspace" if match.group(1) == "workspace" else ""),
+                      command)
+
+    def execute_session_command(session_id, req, timeout=None):
+        assert req.var_async, "Commands must run asynchronously"
+        cmd_id = f"cmd-{len(processes)}"
+        processes[cmd_id] = subprocess.Popen(["bash", "-c", local(req.command)])
+        return _SessionCommand(cmd_id)
+
+    def get_session_command(session_id, command_id):
+        return _SessionCommand(command_id, processes[command_id].poll())
+
+    def exec_locally(command, cwd=None, timeout=None):
+        completed = subprocess.run(["bash", "-c", local(command)], capture_output=True, text=True)
+        if "base64" in command:
+            reads.append(len(completed.stdout))
+        return FakeExecuteResponse(exit_code=completed.returncode, result=completed.stdout)
+
+    sandbox.process.execute_session_command = execute_session_command
+    sandbox.process.get_session_command = get_session_command
+    sandbox.process.exec = exec_locally
+    return sandbox, processes, reads
+
+
+async def _run_checks(root_dir):
+    from agentpress.tool_progress import report_tool_progress, reset_progress_sink, set_progress_sink
+    from sandbox.commands import run_command
+    from sandbox.executor import AsyncSandbox, SandboxExecutor
+
+    os.makedirs(os.path.join(root_dir, "workspace"))
+    raw_sandbox, processes, reads = _make_sandbox(root_dir)
+    executor = SandboxExecutor(max_workers=4)
+    sandbox = AsyncSandbox(raw_sandbox, executor)
+
+    # Output is reported while the command runs
+    events = []
+
+    async def sink(event):
+        events.append((time.monotonic(), event))
+
+    async def on_output(output):
+        await report_tool_progress("execute-command", output=output)
+
+    token = set_progress_sink(sink)
+    result = await run_command(
+        sandbox, "session", "echo started; sleep 1.5; echo finished", "/workspace",
+        timeout=10, on_output=on_output, poll_interval=0.2
+    )
+    finished_at = time.monotonic()
+    reset_progress_sink(token)
+    assert result.exit_code == 0 and not result.timed_out, result
+    assert result.output == "started\nfinished\n", result.output
+    assert events and events[0][1] == {"type": "tool_progress", "tool": "execute-command", "output": "started\n"}
+    assert finished_at - events[0][0] > 1, "Output was not reported before the command finished"
+    assert not await report_tool_progress("execute-command", output="x"), "Reported without a sink"
+    assert not [name for name in os.listdir(root_dir) if name.endswith(".log")], "Log file left behind"
+
+    # Huge output keeps head and tail, and the middle is skipped
+    reads.clear()
+    result = await run_command(
+        sandbox, "session", "seq 1 2000000; exit 3", "/workspace",
+        timeout=30, poll_interval=0.2, head_bytes=1000, tail_bytes=1000, max_read_bytes=4096
+    )
+    assert result.exit_code == 3, result
+    assert result.output.startswith("1\n2\n3\n") and result.output.endswith("1999999\n2000000\n")
+    assert "bytes of output omitted" in result.output
+    assert result.total_bytes == len("".join(f"{i}\n" for i in range(1, 2000001)))
+    assert sum(reads) < 200000, f"Read {sum(reads)} encoded bytes of a {result.total_bytes} byte output"
+
+    # A timeout returns the output so far and leaves the command running
+    result = await run_command(
+        sandbox, "session", "echo partial; sleep 5", "/workspace", timeout=1, poll_interval=0.2
+    )
+    assert result.timed_out and result.exit_code is None and result.output == "partial\n", result
+    assert not [name for name in os.listdir(root_dir) if name.endswith(".log")], "Log file left after a timeout"
+    for process in processes.values():
+        if process.poll() is None:
+            process.kill()
+
+    executor.shutdown(wait=True)
+
+
+def test_streaming_shell():
+    with tempfile.TemporaryDirectory() as root_dir:
+        asyncio.run(_run_checks(root_dir))
+
+
+if __name__ == "__main__":
+    test_streaming_shell()
+    print("Streaming shell test passed")
@@ -0,0 +1,117 @@
+"""
+Workspace Snapshots Test
+
+Checks the incremental workspace snapshots in sandbox/snapshots.py:
+
+- the first refresh fetches every text file; excluded directories and files
+  are left out and binary files are skipped
+- a refresh without changes fetches nothing
+- after adding, modifying and deleting files, only the added and modified
+  files are fetched, and the changes are reported
+
+Runs the real manifest script with the local python against a temporary
+directory standing in for /workspace, so no Daytona access is needed.
+
+Usage:
+    python test_workspace_snapshots.py
+"""
+
+import asyncio
+import os
+import shlex
+import subprocess
+import sys
+import tempfile
+
+# Configuration is validated on import; these defaults only matter when no .env is present
+for _key in ("SUPABASE_URL", "SUPABASE_ANON_KEY", "SUPABASE_SERVICE_ROLE_KEY", "REDIS_HOST", "REDIS_PASSWORD",
+             "DAYTONA_API_KEY", "DAYTONA_SERVER_URL", "DAYTONA_TARGET", "TAVILY_API_KEY",
+             "RAPID_API_KEY", "FIRECRAWL_API_KEY"):
+    os.environ.setdefault(_key, "test")
+
+
+def _make_sandbox(workspace_dir):
+    from sandbox.fake_backend import FakeExecuteResponse, FakeSandbox
+
+    sandbox = FakeSandbox("snapshots")
+    downloads = []
+
+    def local_path(path):
+        return os.path.join(workspace_dir, os.path.relpath(path, "/workspace"))
+
+    def download_file(path):
+        downloads.append(path)
+        with open(local_path(path), "rb") as f:
+            return f.read()
+
+    def exec_locally(command, cwd=None, timeout=None):
+        args = shlex.split(command)
+        assert args[0] == "python3" and args[3] == "/workspace", command
+        completed = subprocess.run([sys.executable, args[1], args[2], workspace_dir, args[4]],
+                                   capture_output=True, text=True)
+        return FakeExecuteResponse(exit_code=completed.returncode, result=completed.stdout or completed.stderr)
+
+    sandbox.fs.download_file, sandbox.process.exec = download_file, exec_locally
+    return sandbox, downloads
+
+
+def _write(workspace_dir, rel_path, content):
+    path = os.path.join(workspace_dir, rel_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(content)
+
+
+async def _run_checks(workspace_dir):
+    from sandbox.executor import AsyncSandbox, SandboxExecutor
+    from sandbox.snapshots import WorkspaceSnapshots
+    from utils.files_utils import should_exclude_file
+
+    _write(workspace_dir, "index.html", b"<h1>hello</h1>")
+    _write(workspace_dir, "src/app.py", b"print('hello')\n")
+    _write(workspace_dir, "src/util.py", b"X = 1\n")
+    _write(workspace_dir, "data.bin", b"\xff\xfe\x00binary")
+    _write(workspace_dir, "logo.png", b"not fetched")
+    _write(workspace_dir, "node_modules/lib/index.js", b"module.exports = {}")
+
+    raw_sandbox, downloads = _make_sandbox(workspace_dir)
+    executor = SandboxExecutor(max_workers=4)
+    sandbox = AsyncSandbox(raw_sandbox, executor)
+    snapshots = WorkspaceSnapshots(max_projects=2)
+
+    async def refresh():
+        downloads.clear()
+        return await snapshots.refresh("project-1", sandbox, "/workspace", should_exclude_file)
+
+    snapshot = await refresh()
+    assert set(snapshot.files) == {"index.html", "src/app.py", "src/util.py"}, set(snapshot.files)
+    assert "node_modules/lib/index.js" not in snapshot.manifest and "logo.png" not in snapshot.manifest
+    assert snapshot.files["src/app.py"]["content"] == "print('hello')\n"
+    assert len(downloads) == 4, downloads  # three text files and the binary one
+
+    snapshot = await refresh()
+    assert downloads == [], f"Unchanged workspace fetched {downloads}"
+    assert snapshot.changes == {"added": [], "modified": [], "deleted": []}
+
+    _write(workspace_dir, "src/app.py", b"print('changed')\n")
+    _write(workspace_dir, "README.md", b"# readme\n")
+    os.remove(os.path.join(workspace_dir, "src/util.py"))
+    snapshot = await refresh()
+    assert sorted(downloads) == ["/workspace/README.md", "/workspace/src/app.py"], downloads
+    assert snapshot.changes == {"added": ["README.md"], "modified": ["src/app.py"], "deleted": ["src/util.py"]}
+    assert snapshot.files["src/app.py"]["content"] == "print('changed')\n"
+    assert set(snapshot.files) == {"index.html", "src/app.py", "README.md"}
+
+    executor.shutdown(wait=True)
+    return snapshots.stats()
+
+
+def test_workspace_snapshots():
+    with tempfile.TemporaryDirectory() as workspace_dir:
+        stats = asyncio.run(_run_checks(workspace_dir))
+    print(f"Snapshot stats: {stats}")
+
+
+if __name__ == "__main__":
+    test_workspace_snapshots()
+    print("Workspace snapshots test passed")
@@ -163,6 +163,54 @@ class Configuration:
     STRIPE_WEBHOOK_SECRET: Optional[str] = None
     STRIPE_DEFAULT_PLAN_ID: Optional[str] = None
     STRIPE_DEFAULT_TRIAL_DAYS: int = 14
+
+    # Agent run queue configuration
+    AGENT_RUN_QUEUE_ENABLED: bool = False   # Enqueue runs in Redis instead of running them in the API process
+    AGENT_WORKER_EMBEDDED: bool = True      # Run an agent worker inside the API process when the queue is enabled
+    AGENT_WORKER_CONCURRENCY: int = 4       # Max agent runs a single worker executes at once
+    AGENT_RUN_LEASE_SECONDS: int = 30       # Lease duration; a worker heartbeats at a third of this
+    AGENT_RUN_MAX_ATTEMPTS: int = 3         # Lost leases before a run is marked as failed
+    AGENT_RUN_DRAIN_TIMEOUT: int = 60       # Seconds to wait on shutdown for runs to reach a checkpoint
+    AGENT_DRAINED_RUN_CLAIM_INTERVAL: int = 15  # Seconds between checks for runs drained by other instances
+
+    # Agent scheduler configuration (per-account run quotas and fair queueing of iterations)
+    AGENT_SCHEDULER_ENABLED: bool = False
+    AGENT_MAX_CONCURRENT_ITERATIONS: int = 32  # Agent iterations running at once across all instances
+    AGENT_SCHEDULER_SLOT_TTL: int = 600        # Seconds before an unrenewed run or iteration slot is freed
+
+    # Tool context pool (tools reused across agent runs of the same project)
+    TOOL_CONTEXT_TTL_SECONDS: int = 600     # Idle contexts are evicted after this; keep below the sandbox auto-stop interval
+    TOOL_CONTEXT_POOL_SIZE: int = 100       # Max projects with a pooled context per process
+    AGENT_TOOL_SUBSETTING_ENABLED: bool = True  # Describe optional tool groups only when the detected task type needs them
+
+    # Sandbox SDK executor (blocking Daytona calls run in a thread pool)
+    SANDBOX_EXECUTOR_WORKERS: int = 32      # Threads for sandbox SDK calls per process
+    SANDBOX_MAX_CALLS_PER_SANDBOX: int = 4  # SDK calls running at once for one sandbox
+    SANDBOX_SLOW_CALL_MS: int = 1000        # SDK calls slower than this are logged
+    SANDBOX_HANDLE_TTL_SECONDS: int = 30    # Cached sandbox handles are revalidated after this
+    SANDBOX_UPLOAD_CONCURRENCY: int = 4     # File uploads in flight at once for one batch
+    SANDBOX_UPLOAD_TAR_MIN_FILES: int = 4   # Batches with this many files are sent as one tar archive; 0 disables
+    SANDBOX_DOWNLOAD_CHUNK_BYTES: int = 1048576  # Bytes read from a sandbox per chunk when streaming a file
+    WORKSPACE_SNAPSHOT_CACHE_SIZE: int = 32  # Projects whose workspace snapshot is kept per process
+    SHELL_OUTPUT_HEAD_BYTES: int = 32768    # Command output kept from the start
+    SHELL_OUTPUT_TAIL_BYTES: int = 32768    # Command output kept from the end; the middle of huge outputs is dropped
+    SHELL_POLL_INTERVAL_MS: int = 1000      # Longest pause between polls of a running command's output
+    BROWSER_API_DIRECT: bool = True         # Call the sandbox browser API through its preview URL; False always uses curl
+    BROWSER_API_CLIENT_POOL_SIZE: int = 100  # Sandboxes with a pooled browser API client per process
+    BROWSER_SCREENSHOTS_BY_REFERENCE: bool = True  # Keep browser screenshots in Storage; messages hold their path
+    BROWSER_SCREENSHOT_BUCKET: str = "browser_screenshots"  # Storage bucket of browser screenshots
+    BROWSER_SCREENSHOT_RETENTION_HOURS: int = 24  # Stored browser screenshots are deleted after this
+    COMPUTER_USE_SAVE_SCREENSHOTS: bool = False  # Also write computer use screenshots to ./screenshots for debugging
+    DATA_PROVIDER_TIMEOUT: int = 30         # Seconds a RapidAPI data provider request may take
+    DATA_PROVIDER_RETRIES: int = 2          # Retries of data provider requests on connection errors, 429 and 5xx
+    DATA_PROVIDER_CACHE_TTL: int = 3600     # Seconds data provider responses stay fresh, unless the endpoint sets its own
+    DATA_PROVIDER_CACHE_SIZE: int = 1024    # Data provider responses cached per process; 0 disables the cache
+
+    # Sandbox pool (pre-started sandboxes claimed by new projects)
+    SANDBOX_POOL_SIZE: int = 0              # Ready sandboxes to keep; 0 disables the pool
+    SANDBOX_POOL_MAX_IDLE_SECONDS: int = 600  # Unclaimed pool sandboxes are deleted after this
+    SANDBOX_POOL_REPLENISH_INTERVAL: int = 30  # Seconds between replenisher passes
+    SANDBOX_BACKEND: str = "daytona"        # Backend of the pool: "daytona" or "fake" (in-memory, offline)
     
     # Stripe Product IDs
     STRIPE_PRODUCT_ID_PROD: str = 'prod_SCl7AQ2C8kK1CD'  # Production product ID
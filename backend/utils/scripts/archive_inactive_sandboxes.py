@@ -27,7 +27,8 @@ from dotenv import load_dotenv
 load_dotenv(".env")
 
 from services.supabase import DBConnection
-from sandbox.sandbox import daytona
+from sandbox.sandbox import daytona, sandbox_handles
+from sandbox.handle_cache import publish_sandbox_event
 from utils.logger import logger
 
 # Global DB connection to reuse
@@ -174,6 +175,7 @@ async def archive_sandbox(project: Dict[str, Any], dry_run: bool) -> bool:
         if sandbox_info.state == "stopped":
             logger.info(f"Archiving sandbox {sandbox_id} as it is in stopped state")
             sandbox.archive()
+            await publish_sandbox_event(sandbox_handles, sandbox_id, "archived")
             logger.info(f"Successfully archived sandbox {sandbox_id}")
             return True
         else:
@@ -16,7 +16,8 @@ from dotenv import load_dotenv
 load_dotenv(".env")
 
 from services.supabase import DBConnection
-from sandbox.sandbox import daytona
+from sandbox.sandbox import daytona, sandbox_handles
+from sandbox.handle_cache import publish_sandbox_event
 from utils.logger import logger
 
 
@@ -85,6 +86,7 @@ async def delete_sandboxes(projects: List[Dict[str, Any]]) -> None:
             # Get the sandbox and delete it
             sandbox = daytona.get_current_sandbox(sandbox_id)
             daytona.delete(sandbox)
+            await publish_sandbox_event(sandbox_handles, sandbox_id, "deleted")
             
             logger.info(f"Successfully deleted sandbox {sandbox_id}")
         except Exception as e:
@@ -1,4 +1,4 @@
-import React, { useMemo } from 'react';
+import React, { useEffect, useMemo, useState } from 'react';
 import {
   Globe,
   MonitorPlay,
@@ -17,6 +17,7 @@ import {
 import { ApiMessageType } from '@/components/thread/types';
 import { safeJsonParse } from '@/components/thread/utils';
 import { cn } from '@/lib/utils';
+import { getBrowserScreenshot } from '@/lib/api';
 
 export function BrowserToolView({
   name = 'browser-operation',
@@ -70,8 +71,11 @@ export function BrowserToolView({
     );
   }
 
-  // Find the browser_state message and extract the screenshot
+  // Find the browser_state message and extract the screenshot: inline, or
+  // stored by the backend and referenced by path
   let screenshotBase64: string | null = null;
+  let screenshotPath: string | null = null;
+  let screenshotMimeType = 'image/jpeg';
   if (browserStateMessageId && messages.length > 0) {
     const browserStateMessage = messages.find(
       (msg) =>
@@ -80,14 +84,49 @@ export function BrowserToolView({
     );
 
     if (browserStateMessage) {
-      const browserStateContent = safeJsonParse<{ screenshot_base64?: string }>(
-        browserStateMessage.content,
-        {},
-      );
+      const browserStateContent = safeJsonParse<{
+        screenshot_base64?: string;
+        screenshot_path?: string;
+        screenshot_mime_type?: string;
+      }>(browserStateMessage.content, {});
       screenshotBase64 = browserStateContent?.screenshot_base64 || null;
+      screenshotPath = browserStateContent?.screenshot_path || null;
+      screenshotMimeType =
+        browserStateContent?.screenshot_mime_type || screenshotMimeType;
     }
   }
 
+  const [storedScreenshotUrl, setStoredScreenshotUrl] = useState<
+    string | null
+  >(null);
+
+  useEffect(() => {
+    if (screenshotBase64 || !screenshotPath) {
+      setStoredScreenshotUrl(null);
+      return;
+    }
+    let objectUrl: string | null = null;
+    let cancelled = false;
+    getBrowserScreenshot(screenshotPath)
+      .then((blob) => {
+        if (cancelled) return;
+        objectUrl = URL.createObjectURL(blob);
+        setStoredScreenshotUrl(objectUrl);
+      })
+      .catch((error) => {
+        console.error('[BrowserToolView] Error loading screenshot:', error);
+        if (!cancelled) setStoredScreenshotUrl(null);
+      });
+    return () => {
+      cancelled = true;
+      if (objectUrl) URL.revokeObjectURL(objectUrl);
+    };
+  }, [screenshotBase64, screenshotPath]);
+
+  const screenshotSrc = screenshotBase64
+    ? `data:${screenshotMimeType};base64,${screenshotBase64}`
+    : storedScreenshotUrl;
+
   // Check if we have a VNC preview URL from the project
   const vncPreviewUrl = project?.sandbox?.vnc_preview
     ? `${project.sandbox.vnc_preview}/vnc_lite.html?password=${project?.sandbox?.pass}&autoconnect=true&scale=local&width=1024&height=768`
@@ -139,10 +178,10 @@ export function BrowserToolView({
               isRunning && vncIframe ? (
                 // Use the memoized iframe for live preview
                 vncIframe
-              ) : screenshotBase64 ? (
+              ) : screenshotSrc ? (
                 <div className="flex items-center justify-center w-full h-full max-h-[650px] overflow-auto">
                   <img
-                    src={`data:image/jpeg;base64,${screenshotBase64}`}
+                    src={screenshotSrc}
                     alt="Browser Screenshot"
                     className="max-w-full max-h-full object-contain"
                   />
@@ -169,10 +208,10 @@ export function BrowserToolView({
                 </div>
               )
             ) : // For non-last tool calls, only show screenshot if available, otherwise show "No Browser State image found"
-            screenshotBase64 ? (
+            screenshotSrc ? (
               <div className="flex items-center justify-center w-full h-full max-h-[650px] overflow-auto">
                 <img
-                  src={`data:image/jpeg;base64,${screenshotBase64}`}
+                  src={screenshotSrc}
                   alt="Browser Screenshot"
                   className="max-w-full max-h-full object-contain"
                 />
@@ -1163,6 +1163,34 @@ export const listSandboxFiles = async (
   }
 };
 
+// Browser screenshots stored by the backend, referenced by screenshot_path
+// ("<project_id>/<name>") from browser_state messages
+export const getBrowserScreenshot = async (
+  screenshotPath: string,
+): Promise<Blob> => {
+  const supabase = createClient();
+  const {
+    data: { session },
+  } = await supabase.auth.getSession();
+
+  const [projectId, name] = screenshotPath.split('/');
+  const headers: Record<string, string> = {};
+  if (session?.access_token) {
+    headers['Authorization'] = `Bearer ${session.access_token}`;
+  }
+
+  const response = await fetch(
+    `${API_URL}/project/${projectId}/browser-screenshots/${name}`,
+    { headers },
+  );
+  if (!response.ok) {
+    throw new Error(
+      `Error getting browser screenshot: ${response.statusText} (${response.status})`,
+    );
+  }
+  return await response.blob();
+};
+
 export const getSandboxFileContent = async (
   sandboxId: string,
   path: string,